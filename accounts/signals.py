@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from core.imaging import schedule_derivatives
+
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+def queue_profile_picture_derivatives(sender, instance, raw=False, **kwargs):
+    """Gera os derivados responsivos da foto de perfil"""
+    if raw or not instance.profile_picture:
+        return
+    name = instance.profile_picture.name
+    transaction.on_commit(lambda: schedule_derivatives(name))
@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, reverse_lazy
 from django.contrib.auth import views as auth_views
 
 app_name = 'accounts'
@@ -6,4 +6,10 @@ app_name = 'accounts'
 urlpatterns = [
     path('login/', auth_views.LoginView.as_view(template_name='accounts/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
-]
\ No newline at end of file
+    # Convite das alunas importadas (students.onboarding): define a primeira senha
+    path(
+        'convite/<uidb64>/<token>/',
+        auth_views.PasswordResetConfirmView.as_view(success_url=reverse_lazy('accounts:login')),
+        name='invite',
+    ),
+]
@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import BrandSettings
+
+
+@admin.register(BrandSettings)
+class BrandSettingsAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'company_name', 'primary_color', 'secondary_color', 'accent_color', 'updated_at']
+    search_fields = ['host', 'company_name']
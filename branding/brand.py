@@ -0,0 +1,98 @@
+"""
+Identidade visual servida sem consultas ao banco.
+
+As linhas de ``BrandSettings`` são poucas e mudam raramente: cada processo as
+mantém em memória, junto com a versão lida do cache compartilhado
+(``branding:version``). A versão é conferida no máximo a cada
+``BRANDING_VERSION_CHECK_INTERVAL`` segundos; só quando ela muda a tabela é
+relida (uma consulta). Salvar ou apagar uma linha incrementa a versão após o
+commit e limpa a memória do processo que salvou, então os demais workers veem
+a mudança em até um intervalo.
+
+Campos vazios herdam da linha padrão (sem host), que por sua vez herda de
+``DEFAULTS``.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULTS = {
+    'company_name': 'Aurora Fit',
+    'primary_color': '#FFB366',
+    'secondary_color': '#9B59B6',
+    'accent_color': '#FFF4B7',
+    'logo_url': '',
+}
+FIELDS = ('company_name', 'primary_color', 'secondary_color', 'accent_color')
+VERSION_KEY = 'branding:version'
+
+_lock = threading.Lock()
+_state = {'version': None, 'checked_at': 0.0, 'rows': None, 'brands': {}}
+
+
+def _shared_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Chave expulsa do cache (ou primeiro acesso): recomeça e força a releitura
+        version = _fresh_version()
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def _fresh_version():
+    # Baseada no relógio: não colide com a versão antiga que um processo ainda guarde
+    return time.time_ns() // 1000
+
+
+def _load_rows():
+    from .models import BrandSettings
+
+    rows = {}
+    for brand in BrandSettings.objects.all():
+        values = {name: getattr(brand, name) for name in FIELDS if getattr(brand, name)}
+        if brand.logo:
+            values['logo_url'] = brand.logo.url
+        rows[brand.host.lower()] = values
+    return rows
+
+
+def _refresh():
+    now = time.monotonic()
+    if now - _state['checked_at'] >= settings.BRANDING_VERSION_CHECK_INTERVAL or _state['rows'] is None:
+        version = _shared_version()
+        if version != _state['version'] or _state['rows'] is None:
+            _state.update(version=version, rows=_load_rows(), brands={})
+        _state['checked_at'] = now
+
+
+def current_version():
+    """Versão da identidade visual em uso neste processo (entra nas chaves de cache de página)"""
+    with _lock:
+        _refresh()
+        return _state['version']
+
+
+def get_brand(host=''):
+    """Dicionário com nome, cores e logo para ``host`` (sem porta)"""
+    host = (host or '').lower()
+    with _lock:
+        _refresh()
+        brand = _state['brands'].get(host)
+        if brand is None:
+            rows = _state['rows']
+            brand = {**DEFAULTS, **rows.get('', {}), **(rows.get(host, {}) if host else {})}
+            _state['brands'][host] = brand
+        return brand
+
+
+def invalidate():
+    """Nova versão no cache compartilhado e memória local descartada"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, _fresh_version(), None)
+    with _lock:
+        _state.update(version=None, checked_at=0.0, rows=None, brands={})
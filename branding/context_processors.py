@@ -1,12 +1,10 @@
+from .brand import get_brand
+
+
 def company_settings(request):
     """
     Disponibiliza as configurações da empresa em todos os templates
+    (de ``BrandSettings``, via cache em memória: nenhuma consulta por render)
     """
-    return {
-        'company': {
-            'company_name': 'Aurora Fit',
-            'primary_color': '#FFB366',
-            'secondary_color': '#9B59B6',
-            'accent_color': '#FFF4B7',
-        }
-    }
\ No newline at end of file
+    host = request.get_host().rsplit(':', 1)[0] if request is not None else ''
+    return {'company': get_brand(host)}
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:40
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BrandSettings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('host', models.CharField(blank=True, help_text='Domínio (ex: estudio.aurorafit.com.br). Vazio = padrão para todos.', max_length=255, unique=True, verbose_name='Domínio')),
+                ('company_name', models.CharField(blank=True, max_length=100, verbose_name='Nome da Empresa')),
+                ('primary_color', models.CharField(blank=True, max_length=7, validators=[django.core.validators.RegexValidator('^#[0-9A-Fa-f]{6}$', 'Use o formato #RRGGBB.')], verbose_name='Cor Primária')),
+                ('secondary_color', models.CharField(blank=True, max_length=7, validators=[django.core.validators.RegexValidator('^#[0-9A-Fa-f]{6}$', 'Use o formato #RRGGBB.')], verbose_name='Cor Secundária')),
+                ('accent_color', models.CharField(blank=True, max_length=7, validators=[django.core.validators.RegexValidator('^#[0-9A-Fa-f]{6}$', 'Use o formato #RRGGBB.')], verbose_name='Cor de Destaque')),
+                ('logo', models.ImageField(blank=True, null=True, upload_to='branding/', verbose_name='Logo')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Identidade Visual',
+                'verbose_name_plural': 'Identidades Visuais',
+                'ordering': ['host'],
+            },
+        ),
+    ]
@@ -1,3 +1,26 @@
+from django.core.validators import RegexValidator
 from django.db import models
 
-# Create your models here.
+hex_color = RegexValidator(r'^#[0-9A-Fa-f]{6}$', 'Use o formato #RRGGBB.')
+
+
+class BrandSettings(models.Model):
+    """Identidade visual: a linha sem host é o padrão; as demais sobrescrevem por domínio"""
+    host = models.CharField(
+        max_length=255, unique=True, blank=True,
+        help_text='Domínio (ex: estudio.aurorafit.com.br). Vazio = padrão para todos.', verbose_name='Domínio',
+    )
+    company_name = models.CharField(max_length=100, blank=True, verbose_name='Nome da Empresa')
+    primary_color = models.CharField(max_length=7, blank=True, validators=[hex_color], verbose_name='Cor Primária')
+    secondary_color = models.CharField(max_length=7, blank=True, validators=[hex_color], verbose_name='Cor Secundária')
+    accent_color = models.CharField(max_length=7, blank=True, validators=[hex_color], verbose_name='Cor de Destaque')
+    logo = models.ImageField(upload_to='branding/', null=True, blank=True, verbose_name='Logo')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Identidade Visual'
+        verbose_name_plural = 'Identidades Visuais'
+        ordering = ['host']
+
+    def __str__(self):
+        return self.host or 'Padrão'
@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import brand
+from .models import BrandSettings
+
+
+@receiver(post_save, sender=BrandSettings)
+@receiver(post_delete, sender=BrandSettings)
+def invalidate_brand_cache(sender, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(brand.invalidate)
@@ -1,3 +1,52 @@
-from django.test import TestCase
+from django.template import engines
+from django.test import RequestFactory, TestCase, override_settings
 
-# Create your tests here.
+from . import brand
+from .context_processors import company_settings
+from .models import BrandSettings
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class BrandSettingsTests(TestCase):
+    def setUp(self):
+        brand.invalidate()
+        # A memória do processo sobrevive ao rollback do teste
+        self.addCleanup(brand.invalidate)
+        self.factory = RequestFactory()
+
+    def render(self, host='aurorafit.com.br'):
+        template = engines['django'].from_string('{{ company.company_name }} {{ company.primary_color }}')
+        return template.render({}, self.factory.get('/', HTTP_HOST=host))
+
+    def test_defaults_without_rows(self):
+        self.assertEqual(self.render(), 'Aurora Fit #FFB366')
+
+    def test_host_override_inherits_blank_fields(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            BrandSettings.objects.create(company_name='Aurora', primary_color='#112233')
+            BrandSettings.objects.create(host='zen.example.com', company_name='Zen Studio')
+        self.assertEqual(self.render(), 'Aurora #112233')
+        self.assertEqual(self.render('Zen.example.com:8000'), 'Zen Studio #112233')
+
+    def test_no_queries_after_warm_up(self):
+        BrandSettings.objects.create(company_name='Aurora')
+        self.render()
+        with self.assertNumQueries(0):
+            for _ in range(50):
+                self.render()
+                company_settings(self.factory.get('/', HTTP_HOST='outro.example.com'))
+
+    def test_save_invalidates_other_processes_by_version(self):
+        settings_row = BrandSettings.objects.create(company_name='Aurora')
+        self.assertEqual(self.render(), 'Aurora #FFB366')
+        with self.captureOnCommitCallbacks(execute=True):
+            settings_row.company_name = 'Aurora Pilates'
+            settings_row.save()
+        self.assertEqual(self.render(), 'Aurora Pilates #FFB366')
+
+        # Outro worker: a memória local só é relida quando a versão compartilhada muda
+        BrandSettings.objects.filter(pk=settings_row.pk).update(company_name='Sem aviso')
+        with override_settings(BRANDING_VERSION_CHECK_INTERVAL=0):
+            self.assertEqual(self.render(), 'Aurora Pilates #FFB366')
+            brand.cache.incr(brand.VERSION_KEY)
+            self.assertEqual(self.render(), 'Sem aviso #FFB366')
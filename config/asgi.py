@@ -3,14 +3,46 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Only the live class chat WebSocket (``videos.chat``) is served here, in its
+own process: ``gunicorn -c gunicorn_chat.conf.py``. HTTP stays on WSGI
+(``config.wsgi``), where streaming responses are sent chunk by chunk; plain
+HTTP requests reaching this application get a 404.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Lido por config/settings/database.py (conexões não persistem entre threads)
+os.environ.setdefault('DJANGO_ASGI', 'True')
+
+django.setup(set_prefix=False)
+
+from videos.chat import ChatApplication, get_hub  # noqa: E402
+
+chat_application = ChatApplication()
+
+
+async def lifespan(scope, receive, send):
+    while True:
+        event = await receive()
+        if event['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif event['type'] == 'lifespan.shutdown':
+            # Grava as mensagens do chat ainda pendentes
+            await get_hub().close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
 
-application = get_asgi_application()
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await chat_application(scope, receive, send)
+    if scope['type'] == 'lifespan':
+        return await lifespan(scope, receive, send)
+    await send({'type': 'http.response.start', 'status': 404, 'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': b'Not Found'})
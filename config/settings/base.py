@@ -1,5 +1,8 @@
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
+
+from .cache import cache_settings
+from .database import database_settings
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -36,6 +39,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -68,16 +72,16 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
-# Database
-DATABASES = {
-    'default': {
-        'ENGINE': config('DB_ENGINE', default='django.db.backends.sqlite3'),
-        'NAME': config('DB_NAME', default=BASE_DIR / 'db.sqlite3'),
-        'USER': config('DB_USER', default=''),
-        'PASSWORD': config('DB_PASSWORD', default=''),
-        'HOST': config('DB_HOST', default=''),
-        'PORT': config('DB_PORT', default=''),
-    }
+# Database (config/settings/database.py: DATABASE_URL, conexões persistentes ou pool)
+DATABASES = {'default': database_settings(BASE_DIR)}
+
+# Cache compartilhado (config/settings/cache.py); em produção use Redis ou Memcached
+CACHES = {
+    'default': cache_settings(
+        config('CACHE_URL', default='locmem://'),
+        key_prefix=config('CACHE_KEY_PREFIX', default='aurora'),
+        timeout=config('CACHE_DEFAULT_TIMEOUT', default=300, cast=int),
+    ),
 }
 
 # Custom User Model
@@ -112,11 +116,54 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+# Threads de compressão/conversão no collectstatic (core/static_storage.py); 0 = um por núcleo
+STATIC_OPTIMIZE_WORKERS = config('STATIC_OPTIMIZE_WORKERS', default=0, cast=int)
 
 # Media files (uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Derivados responsivos de imagens (core/imaging.py)
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 960, 1280)
+IMAGE_DERIVATIVE_WORKERS = config('IMAGE_DERIVATIVE_WORKERS', default=2, cast=int)
+IMAGE_DERIVATIVES_ASYNC = config('IMAGE_DERIVATIVES_ASYNC', default=True, cast=bool)
+
+# Streaming de vídeos
+VIDEO_STREAM_CHUNK_SIZE = config('VIDEO_STREAM_CHUNK_SIZE', default=512 * 1024, cast=int)
+# Ex.: '/protected-media/' para delegar o envio ao nginx (X-Accel-Redirect)
+VIDEO_ACCEL_REDIRECT_PREFIX = config('VIDEO_ACCEL_REDIRECT_PREFIX', default='')
+
+# Transcodificação HLS (python manage.py transcode_videos)
+VIDEO_TRANSCODE_BACKEND = config('VIDEO_TRANSCODE_BACKEND', default='videos.transcoding.FFmpegBackend')
+VIDEO_TRANSCODE_MAX_WORKERS = config('VIDEO_TRANSCODE_MAX_WORKERS', default=2, cast=int)
+VIDEO_TRANSCODE_NICENESS = config('VIDEO_TRANSCODE_NICENESS', default=10, cast=int)
+VIDEO_TRANSCODE_STALE_AFTER = config('VIDEO_TRANSCODE_STALE_AFTER', default=3600, cast=int)
+VIDEO_TRANSCODE_MAX_ATTEMPTS = config('VIDEO_TRANSCODE_MAX_ATTEMPTS', default=3, cast=int)
+VIDEO_TRANSCODE_RETRY_DELAY = config('VIDEO_TRANSCODE_RETRY_DELAY', default=300, cast=int)
+VIDEO_HLS_SEGMENT_SECONDS = config('VIDEO_HLS_SEGMENT_SECONDS', default=6, cast=int)
+FFMPEG_BINARY = config('FFMPEG_BINARY', default='ffmpeg')
+FFPROBE_BINARY = config('FFPROBE_BINARY', default='ffprobe')
+
+# Catálogo de vídeos
+VIDEO_CATALOG_PAGE_SIZE = 24
+VIDEO_CATALOG_MAX_PAGE_SIZE = 100
+VIDEO_CATALOG_CACHE_TIMEOUT = config('VIDEO_CATALOG_CACHE_TIMEOUT', default=300, cast=int)
+
+# Chat das aulas ao vivo (WebSocket via config/asgi.py, processo gunicorn_chat.conf.py)
+CHAT_BROKER_BACKEND = config('CHAT_BROKER_BACKEND', default='videos.chat.brokers.InMemoryBroker')
+CHAT_BROKER_OPTIONS = {'url': config('CHAT_BROKER_URL', default='redis://localhost:6379/0')}
+CHAT_SEND_QUEUE_SIZE = config('CHAT_SEND_QUEUE_SIZE', default=100, cast=int)
+CHAT_PERSIST_BATCH_SIZE = config('CHAT_PERSIST_BATCH_SIZE', default=200, cast=int)
+CHAT_PERSIST_INTERVAL = config('CHAT_PERSIST_INTERVAL', default=0.5, cast=float)
+# Mensagens aguardando gravação enquanto o banco falha (acima disso, as antigas são descartadas)
+CHAT_PERSIST_MAX_PENDING = config('CHAT_PERSIST_MAX_PENDING', default=5000, cast=int)
+CHAT_HISTORY_SIZE = 50
+CHAT_MAX_MESSAGE_LENGTH = 500
+
+# Contadores de visualizações/curtidas (gravação em lote)
+VIDEO_COUNTER_FLUSH_INTERVAL = config('VIDEO_COUNTER_FLUSH_INTERVAL', default=5, cast=int)
+VIDEO_COUNTER_FLUSH_THRESHOLD = config('VIDEO_COUNTER_FLUSH_THRESHOLD', default=1000, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -128,6 +175,52 @@ LOGOUT_REDIRECT_URL = 'core:home'
 # Mercado Pago
 MERCADOPAGO_ACCESS_TOKEN = config('MERCADOPAGO_ACCESS_TOKEN', default='')
 MERCADOPAGO_PUBLIC_KEY = config('MERCADOPAGO_PUBLIC_KEY', default='')
+MERCADOPAGO_API_URL = config('MERCADOPAGO_API_URL', default='https://api.mercadopago.com')
+# Chave secreta da assinatura dos webhooks (x-signature); vazia desativa a verificação
+MERCADOPAGO_WEBHOOK_SECRET = config('MERCADOPAGO_WEBHOOK_SECRET', default='')
+# Diferença máxima (segundos) entre o ts assinado do webhook e o relógio local
+MERCADOPAGO_WEBHOOK_TOLERANCE = config('MERCADOPAGO_WEBHOOK_TOLERANCE', default=300, cast=int)
+MERCADOPAGO_HTTP_POOL_SIZE = config('MERCADOPAGO_HTTP_POOL_SIZE', default=10, cast=int)
+MERCADOPAGO_HTTP_TIMEOUT = config('MERCADOPAGO_HTTP_TIMEOUT', default=10, cast=float)
+MERCADOPAGO_WEBHOOK_BATCH_SIZE = config('MERCADOPAGO_WEBHOOK_BATCH_SIZE', default=200, cast=int)
+MERCADOPAGO_WEBHOOK_MAX_ATTEMPTS = config('MERCADOPAGO_WEBHOOK_MAX_ATTEMPTS', default=8, cast=int)
+
+# Faturamento das assinaturas
+BILLING_CHUNK_SIZE = config('BILLING_CHUNK_SIZE', default=2000, cast=int)
+# Cobranças são geradas com esta antecedência do vencimento
+BILLING_DAYS_AHEAD = config('BILLING_DAYS_AHEAD', default=10, cast=int)
+
+# Exportações em CSV/XLSX: linhas lidas do banco por vez
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Análises de medidas: resumo por aluna e distribuição da base (percentis)
+MEASUREMENT_ANALYTICS_CACHE_TIMEOUT = config('MEASUREMENT_ANALYTICS_CACHE_TIMEOUT', default=3600, cast=int)
+MEASUREMENT_COHORT_CACHE_TIMEOUT = config('MEASUREMENT_COHORT_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Instrumentação de consultas (core.instrumentation) e métricas Prometheus (core.metrics)
+QUERY_INSTRUMENTATION_SAMPLE_RATE = config('QUERY_INSTRUMENTATION_SAMPLE_RATE', default=0.05, cast=float)
+N_PLUS_ONE_THRESHOLD = config('N_PLUS_ONE_THRESHOLD', default=5, cast=int)
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1', cast=Csv())
+# Com token, a coleta exige "Authorization: Bearer <token>" e ignora os IPs
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Diretório compartilhado pelos workers (vazio: métricas só do processo que atende)
+METRICS_DIR = config('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=1.0, cast=float)
+
+# Admin: acima disto (sem filtros, PostgreSQL) a paginação usa a contagem estimada
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=100_000, cast=int)
+
+# Identidade visual (branding.brand): intervalo entre conferências da versão no cache
+BRANDING_VERSION_CHECK_INTERVAL = config('BRANDING_VERSION_CHECK_INTERVAL', default=5, cast=float)
+
+# Cache de página inteira das páginas públicas (core.pagecache); 0 desliga
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=86400, cast=int)
+PAGE_CACHE_MAX_AGE = config('PAGE_CACHE_MAX_AGE', default=300, cast=int)
+# Identificador do deploy (ex.: hash do commit); muda as chaves a cada release
+PAGE_CACHE_VERSION = config('PAGE_CACHE_VERSION', default='1')
+
+# Calendário previsto das fases do ciclo menstrual (semanas à frente)
+CYCLE_CALENDAR_WEEKS = config('CYCLE_CALENDAR_WEEKS', default=12, cast=int)
 
 # Email Configuration
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
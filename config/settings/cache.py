@@ -0,0 +1,39 @@
+"""
+``CACHES['default']`` a partir de ``CACHE_URL``.
+
+* ``redis://host:6379/1`` (ou ``rediss://``): ``RedisCache`` do Django, requer o pacote ``redis``;
+* ``memcached://host1:11211,host2:11211``: ``PyMemcacheCache``, requer ``pymemcache``;
+* ``file:///var/tmp/aurora-cache``: ``FileBasedCache``, compartilhado pelos
+  workers da mesma máquina (padrão em produção quando não há Redis);
+* ``locmem://`` (padrão em desenvolvimento e nos testes): memória de cada processo;
+* ``dummy://``: sem cache.
+"""
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+BACKENDS = {
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'rediss': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def cache_settings(url, key_prefix='', timeout=300):
+    parts = urlsplit(url)
+    backend = BACKENDS.get(parts.scheme)
+    if backend is None:
+        raise ImproperlyConfigured(f'CACHE_URL com esquema desconhecido: {parts.scheme!r} (use {", ".join(BACKENDS)})')
+
+    if parts.scheme in ('redis', 'rediss'):
+        location = url
+    elif parts.scheme == 'memcached':
+        location = parts.netloc.split(',')
+    elif parts.scheme == 'file':
+        location = parts.path
+    else:
+        location = parts.netloc
+    return {'BACKEND': backend, 'LOCATION': location, 'KEY_PREFIX': key_prefix, 'TIMEOUT': timeout}
@@ -0,0 +1,94 @@
+"""
+Configuração do banco a partir de ``DATABASE_URL`` (ou das variáveis DB_*).
+
+No PostgreSQL há dois modos:
+
+* conexões persistentes (padrão, também no SQLite): no HTTP (WSGI, threads
+  do gunicorn) cada thread reaproveita a sua conexão por ``DB_CONN_MAX_AGE``
+  segundos, com ``CONN_HEALTH_CHECKS`` para descartar conexões derrubadas
+  pelo servidor antes de usá-las. No processo do chat (``config.asgi``) o
+  código síncrono roda em threads do asgiref, então uma conexão persistente
+  poderia ficar presa a uma thread morta: ali ``CONN_MAX_AGE`` é sempre 0;
+* pool nativo do Django 5.1+ (``DB_POOL=True``, exige ``psycopg[pool]``): o
+  tamanho do pool por worker segue ``WORKER_CONCURRENCY`` (threads de cada
+  worker do gunicorn), limitado para que ``WEB_CONCURRENCY`` workers caibam
+  em ``DB_MAX_CONNECTIONS``.
+
+``python manage.py bench_db_connections`` compara os modos.
+"""
+import importlib.util
+
+import dj_database_url
+from decouple import config
+from django.core.exceptions import ImproperlyConfigured
+
+
+def gunicorn_workers():
+    return config('WEB_CONCURRENCY', default=2, cast=int)
+
+
+def worker_concurrency():
+    return config('WORKER_CONCURRENCY', default=10, cast=int)
+
+
+def serving_asgi():
+    # Definido por config/asgi.py antes de carregar os settings
+    return config('DJANGO_ASGI', default=False, cast=bool)
+
+
+def pool_size(workers, concurrency, max_connections, reserved=0, min_size=1):
+    """``(min_size, max_size)`` do pool de cada worker
+
+    Uma conexão por requisição simultânea basta; ``reserved`` fica de fora
+    para migrações, shell e comandos agendados.
+    """
+    budget = max((max_connections - reserved) // max(workers, 1), 1)
+    max_size = min(concurrency, budget)
+    return min(min_size, max_size), max_size
+
+
+def database_settings(base_dir):
+    url = config('DATABASE_URL', default='')
+    if url:
+        database = dj_database_url.parse(url)
+    else:
+        database = {
+            'ENGINE': config('DB_ENGINE', default='django.db.backends.sqlite3'),
+            'NAME': config('DB_NAME', default=base_dir / 'db.sqlite3'),
+            'USER': config('DB_USER', default=''),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default=''),
+            'PORT': config('DB_PORT', default=''),
+        }
+
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        # BEGIN IMMEDIATE: escritas concorrentes aguardam o lock em vez de falhar
+        options = database.setdefault('OPTIONS', {})
+        options.setdefault('transaction_mode', 'IMMEDIATE')
+        options.setdefault('timeout', 20)
+        # Banco de testes em arquivo (o SQLite em memória não suporta os testes de concorrência)
+        database['TEST'] = {'NAME': base_dir / 'test_db.sqlite3'}
+    postgresql = 'postgresql' in database['ENGINE']
+    if postgresql:
+        database.setdefault('OPTIONS', {}).setdefault('connect_timeout', config('DB_CONNECT_TIMEOUT', default=5, cast=int))
+    if postgresql and config('DB_POOL', default=False, cast=bool):
+        if importlib.util.find_spec('psycopg_pool') is None:
+            raise ImproperlyConfigured('DB_POOL=True requer o pacote "psycopg[pool]" (psycopg 3)')
+        min_size, max_size = pool_size(
+            gunicorn_workers(), worker_concurrency(),
+            config('DB_MAX_CONNECTIONS', default=20, cast=int), config('DB_RESERVED_CONNECTIONS', default=3, cast=int),
+            config('DB_POOL_MIN_SIZE', default=1, cast=int),
+        )
+        database['OPTIONS']['pool'] = {
+            'min_size': min_size,
+            'max_size': max_size,
+            # Espera por uma conexão livre antes de falhar a requisição
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        }
+        # Com pool, o Django devolve a conexão ao fim de cada requisição
+        database['CONN_MAX_AGE'] = 0
+    else:
+        # Sob ASGI a conexão morreria com a thread da requisição: fecha ao fim dela
+        database['CONN_MAX_AGE'] = 0 if serving_asgi() else config('DB_CONN_MAX_AGE', default=600, cast=int)
+        database['CONN_HEALTH_CHECKS'] = True
+    return database
@@ -1,5 +1,5 @@
 ﻿from .base import *
-from decouple import config
+from decouple import Csv, config
 
 DEBUG = False
 ALLOWED_HOSTS = config('ALLOWED_HOSTS').split(',')
@@ -12,4 +12,21 @@ SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Sem CACHE_URL, cache em disco: ao menos os workers da máquina compartilham as entradas
+CACHES = {
+    'default': cache_settings(
+        config('CACHE_URL', default=f'file://{BASE_DIR / ".cache"}'),
+        key_prefix=config('CACHE_KEY_PREFIX', default='aurora'),
+        timeout=config('CACHE_DEFAULT_TIMEOUT', default=300, cast=int),
+    ),
+}
+
+# Métricas somadas entre os workers; atrás do proxy o REMOTE_ADDR não identifica o coletor
+METRICS_DIR = config('METRICS_DIR', default=str(BASE_DIR / '.metrics'))
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='', cast=Csv())
+
+# STATICFILES_STORAGE deixou de existir no Django 5.1
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'core.static_storage.OptimizedStaticFilesStorage'},
+}
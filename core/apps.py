@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.core.signals import request_finished
+
+        from .metrics import flush_after_request
+
+        request_finished.connect(flush_after_request, dispatch_uid='core-metrics-flush')
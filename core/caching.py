@@ -0,0 +1,158 @@
+"""
+Cache-aside com namespaces versionados e proteção contra estouro de recomputação.
+
+``@cached(Video, VideoCategory, timeout=600)`` guarda o resultado da função
+sob uma chave que inclui a versão de cada namespace (um por model, ou uma
+string livre). ``bump(Video)`` (ou ``invalidate_on_change(Video)``, que liga
+o bump ao ``post_save``/``post_delete`` após o commit) troca a versão e todas
+as chaves antigas deixam de ser lidas; elas expiram sozinhas. ``update()`` e
+``bulk_create`` não disparam signals: quem os usa chama ``bump`` à mão.
+
+Contra o estouro de recomputação (muitos workers recalculando a mesma chave
+ao mesmo tempo):
+
+* chave quente: expiração antecipada probabilística (XFetch). Cada leitura
+  recalcula antes do vencimento com probabilidade que cresce perto dele e com
+  o custo da última recomputação, então em geral um único worker renova;
+* chave fria: um lock curto (``cache.add``) elege quem calcula; os demais
+  aguardam o valor por até ``lock_timeout`` segundos antes de calcular também.
+
+Acertos, faltas e recomputações antecipadas vão para ``core.metrics``.
+"""
+import functools
+import hashlib
+import math
+import random
+import time
+from typing import Callable, ParamSpec, TypeVar
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+
+from .metrics import REGISTRY
+
+P = ParamSpec('P')
+R = TypeVar('R')
+
+KEY_PREFIX = 'cache-aside'
+POLL_INTERVAL = 0.05
+
+REQUESTS = REGISTRY.counter(
+    'django_cache_aside_requests_total', 'Leituras do cache-aside por função e resultado', ('function', 'result'),
+)
+RECOMPUTE = REGISTRY.histogram('django_cache_aside_recompute_seconds', 'Tempo de recomputação por função', ('function',))
+
+
+def namespace(target):
+    """``'app_label.model'`` para models; strings passam direto"""
+    if isinstance(target, type) and issubclass(target, models.Model):
+        return target._meta.label_lower
+    return str(target)
+
+
+def _version_key(name):
+    return f'{KEY_PREFIX}:version:{name}'
+
+
+def versions(*targets):
+    """Versão atual de cada namespace (uma ida ao cache)"""
+    names = [namespace(target) for target in targets]
+    keys = [_version_key(name) for name in names]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Primeira leitura ou chave expulsa: parte de um valor que não colide com versões antigas
+            version = time.time_ns() // 1000
+            cache.add(key, version, None)
+            found[key] = cache.get(key, version)
+    return [found[key] for key in keys]
+
+
+def bump(*targets):
+    for target in targets:
+        key = _version_key(namespace(target))
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns() // 1000, None)
+
+
+def _bump_on_commit(sender, **kwargs):
+    transaction.on_commit(lambda: bump(sender))
+
+
+def invalidate_on_change(*model_classes):
+    """Invalida o namespace do model a cada save/delete (após o commit)"""
+    for model in model_classes:
+        post_save.connect(_bump_on_commit, sender=model, dispatch_uid=f'cache-aside-save-{namespace(model)}')
+        post_delete.connect(_bump_on_commit, sender=model, dispatch_uid=f'cache-aside-delete-{namespace(model)}')
+
+
+def _normalize(value):
+    if isinstance(value, models.Model):
+        return (value._meta.label_lower, value.pk)
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted(((key, _normalize(item)) for key, item in value.items()), key=lambda pair: pair[0]))
+    # O tipo entra na chave: f(1) e f('1') não se confundem
+    return (type(value).__name__, value)
+
+
+def cached(*targets, timeout: int = 300, beta: float = 1.0, lock_timeout: float = 10) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorador cache-aside; o resultado (inclusive ``None``) fica ``timeout`` segundos no cache"""
+
+    def decorator(function: Callable[P, R]) -> Callable[P, R]:
+        label = f'{function.__module__}.{function.__qualname__}'
+
+        def make_key(*args, **kwargs):
+            digest = hashlib.sha256(repr((_normalize(args), _normalize(kwargs))).encode()).hexdigest()[:32]
+            version = '.'.join(str(value) for value in versions(*targets))
+            return f'{KEY_PREFIX}:{label}:{version}:{digest}'
+
+        def compute(key, args, kwargs):
+            began = time.perf_counter()
+            value = function(*args, **kwargs)
+            delta = time.perf_counter() - began
+            RECOMPUTE.observe(delta, function=label)
+            cache.set(key, (value, delta, time.time() + timeout), timeout)
+            return value
+
+        @functools.wraps(function)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            key = make_key(*args, **kwargs)
+            entry = cache.get(key)
+            if entry is not None:
+                value, delta, expires_at = entry
+                # XFetch: -log(U) ~ Exp(1), antecipação proporcional ao custo de recomputar
+                if time.time() - delta * beta * math.log(1 - random.random()) < expires_at:
+                    REQUESTS.inc(function=label, result='hit')
+                    return value
+                REQUESTS.inc(function=label, result='early')
+                return compute(key, args, kwargs)
+
+            REQUESTS.inc(function=label, result='miss')
+            lock_key = f'{key}:lock'
+            if cache.add(lock_key, 1, math.ceil(lock_timeout)):
+                try:
+                    return compute(key, args, kwargs)
+                finally:
+                    cache.delete(lock_key)
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry[0]
+            return compute(key, args, kwargs)
+
+        def invalidate(*args, **kwargs):
+            cache.delete(make_key(*args, **kwargs))
+
+        wrapper.key = make_key
+        wrapper.invalidate = invalidate
+        wrapper.uncached = function
+        return wrapper
+
+    return decorator
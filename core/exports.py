@@ -0,0 +1,280 @@
+"""
+Exportação de listagens em CSV e XLSX sem carregar o resultado em memória.
+
+As linhas vêm de ``values_list(...).iterator(chunk_size=...)`` (cursor no
+servidor no PostgreSQL, leitura em blocos nos demais bancos) e os writers são
+geradores que produzem o arquivo em pedaços de alguns KB, consumidos pelo
+``StreamingHttpResponse`` (sob ASGI, um pedaço por vez via ``core.streams``). O pico de memória depende de ``chunk_size``, não
+do número de linhas.
+
+O XLSX é escrito diretamente como ZIP + SpreadsheetML (sem openpyxl): a
+planilha usa strings inline, então não há tabela de strings compartilhadas
+crescendo com o arquivo, e o ``zipfile`` grava em fluxo não posicionável
+(descritores de dados após cada entrada).
+"""
+import codecs
+import csv
+import io
+import re
+import zipfile
+import zlib
+from itertools import islice
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .streams import stream_body
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+# Linhas acumuladas antes de entregar um pedaço ao servidor
+ROWS_PER_CHUNK = 500
+
+
+class Column:
+    """Coluna exportada: cabeçalho, lookup do ``values_list`` e formatação opcional"""
+
+    def __init__(self, header, lookup, formatter=None):
+        self.header = header
+        self.lookup = lookup
+        self.formatter = formatter
+
+
+def choice_label(field):
+    """Formatação que troca o valor gravado pelo rótulo de ``choices``"""
+    labels = {value: str(label) for value, label in field.choices}
+    return lambda value: labels.get(value, value)
+
+
+def yes_no(value):
+    return 'Sim' if value else 'Não'
+
+
+class Export:
+    """Um queryset e as colunas que vão para a planilha"""
+
+    def __init__(self, name, queryset, columns, chunk_size=None):
+        self.name = name
+        self.queryset = queryset
+        self.columns = columns
+        self.chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+
+    @property
+    def header(self):
+        return [column.header for column in self.columns]
+
+    def rows(self):
+        formatters = [(index, column.formatter) for index, column in enumerate(self.columns) if column.formatter]
+        rows = self.queryset.values_list(*[column.lookup for column in self.columns])
+        for row in rows.iterator(chunk_size=self.chunk_size):
+            if formatters:
+                row = list(row)
+                for index, formatter in formatters:
+                    row[index] = formatter(row[index])
+            yield row
+
+    def filename(self, extension):
+        return f'{self.name}-{timezone.localdate():%Y%m%d}.{extension}'
+
+
+# Planilhas interpretam textos iniciados por estes caracteres como fórmula
+# (injeção de fórmulas/DDE): o apóstrofo faz o valor ser lido como texto
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def neutralize(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+# CSV
+
+def csv_chunks(header, rows, delimiter=';'):
+    """CSV em UTF-8 com BOM e ``;`` (abre direto no Excel em pt-BR)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter)
+    writer.writerow([neutralize(value) for value in header])
+    yield codecs.BOM_UTF8 + buffer.getvalue().encode()
+    rows = iter(rows)
+    while batch := list(islice(rows, ROWS_PER_CHUNK)):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([neutralize(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode()
+
+
+# XLSX
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Estilos: 0 = padrão, 1 = data (dd/mm/aaaa), 2 = data e hora, 3 = cabeçalho em negrito
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '</styleSheet>'
+)
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_END = '</sheetData></worksheet>'
+
+EXCEL_EPOCH = datetime(1899, 12, 30)
+# Caracteres de controle não são permitidos em XML 1.0
+INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _Sink:
+    """Destino do ``zipfile``: acumula os bytes escritos até serem entregues"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _cell(value, style=0):
+    if value is None or value == '':
+        return '<c/>'
+    if isinstance(value, bool):
+        value = yes_no(value)
+    elif isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.make_naive(value)
+        serial = (value - EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c s="2"><v>{serial:.6f}</v></c>'
+    elif isinstance(value, date):
+        return f'<c s="1"><v>{(value - EXCEL_EPOCH.date()).days}</v></c>'
+    elif isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    text = escape(INVALID_XML.sub('', neutralize(str(value))))
+    style_attr = f' s="{style}"' if style else ''
+    return f'<c t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def xlsx_chunks(header, rows, sheet_name='Planilha'):
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', ROOT_RELS)
+        archive.writestr('xl/workbook.xml', WORKBOOK.format(name=escape(sheet_name[:31])))
+        archive.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS)
+        archive.writestr('xl/styles.xml', STYLES)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(SHEET_START.encode())
+            sheet.write(('<row>' + ''.join(_cell(value, style=3) for value in header) + '</row>').encode())
+            rows = iter(rows)
+            while batch := list(islice(rows, ROWS_PER_CHUNK)):
+                sheet.write(''.join(
+                    '<row>' + ''.join([_cell(value) for value in row]) + '</row>' for row in batch
+                ).encode())
+                yield sink.drain()
+            sheet.write(SHEET_END.encode())
+    yield sink.drain()
+
+
+# Compressão
+
+def gzip_chunks(chunks, level=6):
+    """Comprime um fluxo de bytes em formato gzip, pedaço a pedaço"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+WRITERS = {'csv': csv_chunks, 'xlsx': xlsx_chunks}
+
+
+def export_response(export, fmt='csv', compress=False, request=None):
+    """
+    ``StreamingHttpResponse`` com ``export`` em ``fmt``. Com ``compress`` o
+    arquivo é entregue como ``.gz`` (o XLSX já é compactado e ignora a opção).
+    ``request`` decide se o corpo é síncrono (WSGI) ou assíncrono (ASGI).
+    """
+    content_type, extension = FORMATS[fmt]
+    chunks = WRITERS[fmt](export.header, export.rows())
+    if compress and fmt != 'xlsx':
+        chunks = gzip_chunks(chunks)
+        content_type, extension = 'application/gzip', f'{extension}.gz'
+    response = StreamingHttpResponse(stream_body(request, chunks), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{export.filename(extension)}"'
+    # Sem buffer no proxy: o download começa antes da consulta terminar
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def export_view_response(request, export):
+    """Resposta a partir dos parâmetros ``?format=csv|xlsx&gzip=1``"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        fmt = 'csv'
+    return export_response(export, fmt, compress=request.GET.get('gzip') in ('1', 'true'), request=request)
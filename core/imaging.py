@@ -0,0 +1,285 @@
+"""
+Derivados responsivos de imagens enviadas (miniaturas e fotos de perfil).
+
+As imagens originais nunca são servidas nas listagens: para cada largura em
+``IMAGE_DERIVATIVE_WIDTHS`` são gerados arquivos AVIF, WebP e um fallback
+(JPEG, ou PNG quando há transparência). Os nomes derivam do hash do conteúdo,
+então o mesmo arquivo nunca é processado duas vezes e o cache de disco pode
+ser compartilhado entre workers.
+
+A geração roda fora do ciclo da requisição, em um ``ThreadPoolExecutor``,
+e grava também um registro por nome de arquivo (hash, tamanho e mtime da
+origem): o template tag ``responsive_image`` só faz um ``stat`` e consulta
+esse registro, sem ler a imagem. Sem derivados, agenda a geração e,
+enquanto isso, usa a imagem original.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = 'derivatives'
+
+ENCODERS = {
+    'avif': ('AVIF', {'quality': 55}),
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'png': ('PNG', {'optimize': True}),
+}
+
+# Entradas memorizadas por processo em cada cache
+CACHE_SIZE = 1024
+
+
+class _LRUCache:
+    """Dicionário limitado a ``max_size`` entradas (descarta a usada há mais tempo)"""
+
+    def __init__(self, max_size=CACHE_SIZE):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
+_hash_cache = _LRUCache()
+_index_cache = _LRUCache()
+_name_cache = _LRUCache()
+_cache_lock = threading.Lock()
+_in_flight = set()
+_executor = None
+
+
+def get_widths():
+    return tuple(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (320, 640, 960, 1280)))
+
+
+def get_formats():
+    """Formatos modernos disponíveis no Pillow instalado"""
+    from PIL import features
+
+    return tuple(fmt for fmt in ('avif', 'webp') if features.check(fmt))
+
+
+def content_hash(path):
+    """SHA-256 do arquivo, memorizado por (caminho, tamanho, mtime)"""
+    stat_result = os.stat(path)
+    key = (path, stat_result.st_size, stat_result.st_mtime_ns)
+    cached = _hash_cache.get(key)
+    if cached:
+        return cached
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(block)
+    value = digest.hexdigest()[:20]
+    _hash_cache.set(key, value)
+    return value
+
+
+def _index_path(digest):
+    return os.path.join(settings.MEDIA_ROOT, DERIVATIVES_DIR, digest[:2], f'{digest}.json')
+
+
+def _name_path(name):
+    key = hashlib.sha1(name.encode()).hexdigest()
+    return os.path.join(settings.MEDIA_ROOT, DERIVATIVES_DIR, 'names', key[:2], f'{key}.json')
+
+
+def _read_json(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as fh:
+        json.dump(data, fh)
+    os.replace(temporary, path)
+
+
+def _source_version(path):
+    stat_result = os.stat(path)
+    return [stat_result.st_size, stat_result.st_mtime_ns]
+
+
+def load_index(digest):
+    """Lista de derivados já gerados para ``digest`` (ou ``None``)"""
+    index = _index_cache.get(digest)
+    if index is None:
+        index = _read_json(_index_path(digest))
+        if index is not None:
+            _index_cache.set(digest, index)
+    return index
+
+
+def derivatives_for(name):
+    """
+    Índice dos derivados do arquivo ``name`` sem ler o seu conteúdo (só
+    ``stat``); ``None`` se ainda não foram gerados ou se o arquivo mudou.
+    """
+    version = _source_version(os.path.join(settings.MEDIA_ROOT, name))
+    record = _name_cache.get(name)
+    if record is None or record['version'] != version:
+        # Outro worker pode ter gerado (ou regenerado) os derivados
+        record = _read_json(_name_path(name))
+        if record is None or record['version'] != version:
+            return None
+        _name_cache.set(name, record)
+    return load_index(record['digest'])
+
+
+def _record_name(name, source, digest):
+    record = {'digest': digest, 'version': _source_version(source)}
+    _write_json(_name_path(name), record)
+    _name_cache.set(name, record)
+
+
+def _atomic_save(image, destination, fmt):
+    pil_format, options = ENCODERS[fmt]
+    directory = os.path.dirname(destination)
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            image.save(fh, pil_format, **options)
+        os.replace(temporary, destination)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def generate_derivatives(name):
+    """
+    Gera os derivados do arquivo ``name`` (relativo a MEDIA_ROOT).
+
+    Retorna o índice ``{'width': ..., 'height': ..., 'fallback': ...,
+    'sources': {formato: [[largura, caminho], ...]}}``.
+    """
+    from PIL import Image, ImageOps
+
+    source = os.path.join(settings.MEDIA_ROOT, name)
+    digest = content_hash(source)
+    index = load_index(digest)
+    if index is not None:
+        _record_name(name, source, digest)
+        return index
+
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        has_alpha = original.mode in ('RGBA', 'LA') or 'transparency' in original.info
+        image = original.convert('RGBA' if has_alpha else 'RGB')
+
+    fallback = 'png' if has_alpha else 'jpeg'
+    widths = sorted({width for width in get_widths() if width < image.width} | {min(image.width, max(get_widths()))})
+    relative_dir = os.path.join(DERIVATIVES_DIR, digest[:2])
+    sources = {}
+    for width in widths:
+        height = max(round(image.height * width / image.width), 1)
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in get_formats() + (fallback,):
+            relative = os.path.join(relative_dir, f'{digest}-{width}.{fmt}')
+            _atomic_save(resized, os.path.join(settings.MEDIA_ROOT, relative), fmt)
+            sources.setdefault(fmt, []).append([width, relative.replace(os.sep, '/')])
+
+    index = {'width': image.width, 'height': image.height, 'fallback': fallback, 'sources': sources}
+    _write_json(_index_path(digest), index)
+    _index_cache.set(digest, index)
+    _record_name(name, source, digest)
+    return index
+
+
+def extract_video_poster(video_id):
+    """Extrai um quadro de ``video_file`` para vídeos sem miniatura"""
+    from django.core.files import File
+
+    from videos.models import Video
+    from videos.transcoding import get_backend
+
+    video = Video.objects.filter(pk=video_id).first()
+    if video is None or video.thumbnail or not video.video_file:
+        return None
+    fd, frame_path = tempfile.mkstemp(suffix='.jpg')
+    os.close(fd)
+    try:
+        get_backend().extract_frame(video.video_file.path, frame_path)
+        with open(frame_path, 'rb') as fh:
+            video.thumbnail.save(f'{video.slug}-poster.jpg', File(fh), save=False)
+    finally:
+        os.unlink(frame_path)
+    # update() para não reenfileirar transcodificação/derivados via signals
+    Video.objects.filter(pk=video.pk, thumbnail='').update(thumbnail=video.thumbnail.name)
+    generate_derivatives(video.thumbnail.name)
+    return video.thumbnail.name
+
+
+def _get_executor():
+    global _executor
+    with _cache_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2),
+                thread_name_prefix='image-derivatives',
+            )
+        return _executor
+
+
+def _run(key, function, *args):
+    try:
+        function(*args)
+    except Exception:
+        logger.exception('Falha ao gerar derivados para %s', key)
+    finally:
+        with _cache_lock:
+            _in_flight.discard(key)
+
+
+def _run_in_worker(key, function, *args):
+    try:
+        _run(key, function, *args)
+    finally:
+        close_old_connections()
+
+
+def _schedule(key, function, *args):
+    if not getattr(settings, 'IMAGE_DERIVATIVES_ASYNC', True):
+        return _run(key, function, *args)
+    with _cache_lock:
+        if key in _in_flight:
+            return None
+        _in_flight.add(key)
+    return _get_executor().submit(_run_in_worker, key, function, *args)
+
+
+def schedule_derivatives(name):
+    if name:
+        return _schedule(('image', name), generate_derivatives, name)
+
+
+def schedule_video_poster(video_id):
+    return _schedule(('poster', video_id), extract_video_poster, video_id)
@@ -0,0 +1,175 @@
+"""
+Instrumentação de consultas por requisição: contagem, tempo de banco,
+SQL repetido e detecção de N+1.
+
+``record_queries()`` instala um ``execute_wrapper`` nas conexões e registra
+cada consulta pela sua "impressão digital" (o SQL sem literais e com listas
+``IN (...)`` colapsadas). Quando a mesma impressão aparece
+``N_PLUS_ONE_THRESHOLD`` vezes, o frame do projeto que disparou a consulta é
+guardado: é ali que está o laço (ou o ``__str__``) que precisa de
+``select_related``/``prefetch_related``.
+
+O ``QueryInstrumentationMiddleware`` mede a duração de toda requisição, mas
+só instrumenta as consultas de uma amostra (``QUERY_INSTRUMENTATION_SAMPLE_RATE``),
+o que o mantém barato em produção. Os números vão para o registro de
+``core.metrics`` e, nas requisições amostradas, para o cabeçalho
+``Server-Timing``. Consultas feitas depois da resposta sair do middleware
+(corpo de ``StreamingHttpResponse``) não entram na conta.
+
+Nos testes, ``assert_no_n_plus_one()`` falha apontando a origem de cada N+1.
+"""
+import logging
+import os
+import random
+import re
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = REGISTRY.counter('django_http_requests_total', 'Requisições por view, método e status', ('view', 'method', 'status'))
+REQUEST_DURATION = REGISTRY.histogram('django_http_request_duration_seconds', 'Duração das requisições', ('view',))
+SAMPLED = REGISTRY.counter('django_http_requests_sampled_total', 'Requisições com consultas instrumentadas', ('view',))
+QUERIES = REGISTRY.histogram(
+    'django_db_queries_per_request', 'Consultas por requisição (amostra)', ('view',),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_DURATION = REGISTRY.histogram('django_db_duration_seconds', 'Tempo de banco por requisição (amostra)', ('view',))
+DUPLICATES = REGISTRY.counter(
+    'django_db_duplicate_queries_total', 'Consultas com SQL repetido na mesma requisição (amostra)', ('view',),
+)
+N_PLUS_ONE = REGISTRY.counter('django_db_n_plus_one_total', 'Padrões N+1 detectados (amostra)', ('view', 'origin'))
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_THIS_FILE = os.path.abspath(__file__)
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """SQL sem literais, com ``IN (%s, %s, ...)`` colapsado em ``IN (...)``"""
+    sql = _NUMBER.sub('?', _STRING.sub('?', sql))
+    return ' '.join(_IN_LIST.sub('(...)', sql).split())
+
+
+def _project_frame():
+    """Primeiro frame do código do projeto (fora do Django e das bibliotecas) na pilha atual"""
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(base_dir) and filename != _THIS_FILE and 'site-packages' not in filename:
+            return f'{os.path.relpath(filename, base_dir)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'desconhecida'
+
+
+class QueryRecorder:
+    """``execute_wrapper`` que acumula as consultas de um trecho de código"""
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or settings.N_PLUS_ONE_THRESHOLD
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = {}
+        # impressão digital -> frame de origem, para as que passaram do limite
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - began
+            self.count += 1
+            key = fingerprint(sql)
+            seen = self.fingerprints.get(key, 0) + 1
+            self.fingerprints[key] = seen
+            if seen == self.threshold:
+                self.origins[key] = _project_frame()
+
+    @property
+    def duplicates(self):
+        """Impressões digitais executadas mais de uma vez -> vezes"""
+        return {key: count for key, count in self.fingerprints.items() if count > 1}
+
+    @property
+    def n_plus_one(self):
+        """``[(impressão digital, vezes, origem), ...]``"""
+        return [(key, self.fingerprints[key], origin) for key, origin in self.origins.items()]
+
+    def report(self):
+        lines = [f'{self.count} consultas em {self.duration * 1000:.1f} ms']
+        for key, count, origin in self.n_plus_one:
+            lines.append(f'  N+1: {count}x a partir de {origin}: {key[:300]}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def record_queries(threshold=None, using=None):
+    recorder = QueryRecorder(threshold)
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+@contextmanager
+def assert_no_n_plus_one(threshold=None, using=None):
+    """Para testes: falha se algum SQL se repetir ``threshold`` vezes ou mais"""
+    with record_queries(threshold, using) as recorder:
+        yield recorder
+    if recorder.n_plus_one:
+        raise AssertionError(f'Padrão N+1 detectado\n{recorder.report()}')
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    # Nome da rota, não o caminho: mantém baixa a cardinalidade dos rótulos
+    return match.view_name if match else 'unmatched'
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        began = time.perf_counter()
+        rate = settings.QUERY_INSTRUMENTATION_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            response = self.get_response(request)
+            self._observe(request, response, time.perf_counter() - began)
+            return response
+
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - began
+        view = self._observe(request, response, elapsed)
+        SAMPLED.inc(view=view)
+        QUERIES.observe(recorder.count, view=view)
+        DB_DURATION.observe(recorder.duration, view=view)
+        repeated = sum(count - 1 for count in recorder.duplicates.values())
+        if repeated:
+            DUPLICATES.inc(repeated, view=view)
+        for key, count, origin in recorder.n_plus_one:
+            N_PLUS_ONE.inc(view=view, origin=origin)
+            logger.warning('N+1 em %s: %sx a partir de %s: %s', view, count, origin, key[:300])
+        response['Server-Timing'] = (
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} consultas", total;dur={elapsed * 1000:.1f}'
+        )
+        return response
+
+    def _observe(self, request, response, elapsed):
+        view = _view_name(request)
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        REQUEST_DURATION.observe(elapsed, view=view)
+        return view
@@ -0,0 +1,75 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from payments.models import Plan
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara latência por requisição e conexões abertas com e sem conexões persistentes '
+        '(reproduz os sinais de início/fim de requisição do handler do Django)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--queries', type=int, default=3, help='Consultas por requisição')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        settings_dict = connection.settings_dict
+        original = settings_dict['CONN_MAX_AGE'], settings_dict['CONN_HEALTH_CHECKS']
+        self.stdout.write(
+            f'{connection.vendor} {settings_dict.get("HOST") or settings_dict["NAME"]}: '
+            f'{options["requests"]} requisições x {options["queries"]} consultas'
+        )
+
+        modes = [('uma conexão por requisição', 0, False), ('persistente + health check', 600, True)]
+        pooled = 'pool' in settings_dict.get('OPTIONS', {})
+        if pooled:
+            # O pool é criado com a conexão: só dá para medir a configuração atual
+            modes = [('pool (configuração atual)', None, None)]
+        try:
+            for label, max_age, health_checks in modes:
+                if max_age is not None:
+                    settings_dict['CONN_MAX_AGE'], settings_dict['CONN_HEALTH_CHECKS'] = max_age, health_checks
+                connection.close()
+                latencies, opened = self._run(connection, options['requests'], options['queries'])
+                line = (
+                    f'{label:<28} p50 {statistics.median(latencies) * 1000:6.2f}ms '
+                    f'p95 {statistics.quantiles(latencies, n=20)[-1] * 1000:6.2f}ms '
+                    f'| {opened} conexões abertas ({opened / len(latencies):.2f}/requisição)'
+                )
+                if pooled:
+                    stats = connection.pool.get_stats()
+                    line += f' | {stats.get("connections_num", 0)} conexões físicas no pool'
+                self.stdout.write(line)
+        finally:
+            settings_dict['CONN_MAX_AGE'], settings_dict['CONN_HEALTH_CHECKS'] = original
+            connection.close()
+
+    def _run(self, connection, requests, queries):
+        opened = []
+
+        def count(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count, weak=False)
+        latencies = []
+        try:
+            for _ in range(requests):
+                began = time.perf_counter()
+                # close_old_connections roda nos dois sinais, como no handler
+                request_started.send(sender=self.__class__)
+                for _ in range(queries):
+                    list(Plan.objects.using(connection.alias).values_list('pk', flat=True)[:1])
+                request_finished.send(sender=self.__class__)
+                latencies.append(time.perf_counter() - began)
+        finally:
+            connection_created.disconnect(count)
+        return latencies, len(opened)
@@ -0,0 +1,75 @@
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from students.models import Measurement, Student
+from students.views import export_measurements
+
+INSERT_BATCH = 50_000
+
+
+class Command(BaseCommand):
+    help = 'Teste de carga das exportações: baixa N medidas em CSV, CSV.gz e XLSX (tudo é desfeito no final)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--no-trace', action='store_true', help='Mede só o tempo (tracemalloc deixa a exportação mais lenta)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._seed(options['rows'], options['students'])
+            staff = CustomUser.objects.create_user('bench-export-staff', is_staff=True)
+            factory = RequestFactory()
+            for query in ('format=csv', 'format=csv&gzip=1', 'format=xlsx'):
+                request = factory.get('/students/export/measurements/?' + query)
+                request.user = staff
+                began = time.perf_counter()
+                size = sum(len(chunk) for chunk in export_measurements(request).streaming_content)
+                line = f'{query:<18} {size / 1024 / 1024:8.1f}MB em {time.perf_counter() - began:.1f}s'
+                if not options['no_trace']:
+                    tracemalloc.start()
+                    for _ in export_measurements(request).streaming_content:
+                        pass
+                    line += f' | pico de memória alocada {tracemalloc.get_traced_memory()[1] / 1024 / 1024:.1f}MB'
+                    tracemalloc.stop()
+                self.stdout.write(line)
+            transaction.set_rollback(True)
+
+    def _seed(self, total, students):
+        began = time.perf_counter()
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f'bench-export-{index}', password='!', first_name=f'Aluna {index}') for index in range(students)],
+            batch_size=5000,
+        )
+        users = CustomUser.objects.filter(username__startswith='bench-export-').order_by('pk')
+        Student.objects.bulk_create(
+            [Student(user=user, cpf=f'bench-exp-{index}') for index, user in enumerate(users)], batch_size=5000,
+        )
+        student_ids = list(Student.objects.filter(cpf__startswith='bench-exp-').values_list('pk', flat=True))
+        columns = ['student_id', 'measurement_date', 'weight', 'height', 'bmi', 'waist', 'hip', 'body_fat_percentage', 'observations', 'created_at']
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(Measurement._meta.db_table),
+            ', '.join(connection.ops.quote_name(column) for column in columns),
+            ', '.join(['%s'] * len(columns)),
+        )
+        now = timezone.now()
+        first_day = date.today() - timedelta(days=3650)
+        with connection.cursor() as cursor:
+            for start in range(0, total, INSERT_BATCH):
+                batch = []
+                for index in range(start, min(start + INSERT_BATCH, total)):
+                    weight = round(random.uniform(50, 90), 2)
+                    batch.append((
+                        student_ids[index % len(student_ids)], first_day + timedelta(days=index % 3650),
+                        weight, 1.65, round(weight / 1.65 ** 2, 2), 75.5, 98.0, 24.3, '', now,
+                    ))
+                cursor.executemany(sql, batch)
+        self.stdout.write(f'{total} medidas criadas em {time.perf_counter() - began:.1f}s')
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import query_audit, seeding
+
+
+class Command(BaseCommand):
+    help = (
+        'Roda EXPLAIN nas consultas canônicas do projeto e falha se alguma fizer varredura sequencial. '
+        'Com --seed, gera a massa de dados antes (tudo é desfeito no final).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, metavar='ALUNAS', help='Gera a massa com este número de alunas antes do EXPLAIN')
+        parser.add_argument('--verbose-plans', action='store_true', help='Mostra o plano de todas as consultas')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                seeding.seed(students=options['seed'], log=self.stdout.write)
+                seeding.analyze()
+            results = query_audit.audit()
+            transaction.set_rollback(True)
+
+        failures = []
+        for name, plan, scans in results:
+            self.stdout.write(f'{"SEQ SCAN" if scans else "ok":>8}  {name}' + (f' ({", ".join(scans)})' if scans else ''))
+            if scans or options['verbose_plans']:
+                self.stdout.write('\n'.join(f'          {line}' for line in plan.splitlines()))
+            if scans:
+                failures.append(name)
+        if failures:
+            raise CommandError(f'Varredura sequencial em: {", ".join(failures)}')
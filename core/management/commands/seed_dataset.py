@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import seeding
+
+
+class Command(BaseCommand):
+    help = 'Gera a massa de dados sintética (alunas, cobranças, medidas, ciclos, vídeos e lives)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=20_000)
+        parser.add_argument('--months', type=int, default=12, help='Cobranças mensais por aluna')
+        parser.add_argument('--measurements', type=int, default=6, help='Medidas por aluna')
+        parser.add_argument('--clear', action='store_true', help='Remove a massa gerada anteriormente antes de criar')
+        parser.add_argument('--clear-only', action='store_true', help='Só remove a massa gerada anteriormente')
+
+    def handle(self, *args, **options):
+        began = time.perf_counter()
+        if options['clear'] or options['clear_only']:
+            deleted = seeding.clear()
+            self.stdout.write(f'Removido: {deleted}')
+            if options['clear_only']:
+                return
+        with transaction.atomic():
+            created = seeding.seed(
+                students=options['students'], months=options['months'], measurements=options['measurements'],
+                log=self.stdout.write,
+            )
+        seeding.analyze()
+        self.stdout.write(f'Criado em {time.perf_counter() - began:.1f}s: {created}')
@@ -0,0 +1,283 @@
+"""
+Métricas no formato texto do Prometheus.
+
+Registro mínimo em memória (contadores e histogramas com rótulos), sem
+dependência externa. Com vários workers do gunicorn, todos atendem na mesma
+porta e formam um único alvo do Prometheus: cada coleta cairia num worker
+qualquer e os contadores "voltariam". Por isso, com ``METRICS_DIR``
+configurado, cada processo grava o seu estado em
+``METRICS_DIR/<pid>-<id>.json`` (ao fim das requisições, no máximo a cada
+``METRICS_FLUSH_INTERVAL`` segundos, e ao sair) e a coleta soma os arquivos
+de todos os processos. Arquivos de workers encerrados continuam somando, então
+os contadores nunca diminuem; o gunicorn limpa o diretório ao iniciar
+(``gunicorn.conf.py``). Gauges ficam com o valor gravado mais recentemente.
+
+As métricas são expostas em ``core:metrics``, que exige
+``Authorization: Bearer <METRICS_TOKEN>`` (sem token configurado, só
+``METRICS_ALLOWED_IPS``, útil em desenvolvimento: atrás de um proxy reverso o
+``REMOTE_ADDR`` é o do proxy).
+"""
+import atexit
+import copy
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def describe(self):
+        return {'kind': self.kind, 'documentation': self.documentation, 'labels': list(self.label_names)}
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), copy.deepcopy(value)] for key, value in self._values.items()]
+
+    def merge(self, values):
+        """Soma valores de outro processo (``snapshot``)"""
+        with self._lock:
+            for key, value in values:
+                key = tuple(key)
+                self._values[key] = self._combine(self._values.get(key), value)
+
+    @staticmethod
+    def _combine(current, value):
+        return value if current is None else current + value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self, key, value):
+        return [f'{self.name}{_labels(self.label_names, key)} {_number(value)}']
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    @staticmethod
+    def _combine(current, value):
+        # Os arquivos são lidos do mais antigo ao mais recente
+        return value
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Contagem por faixa (não cumulativa), soma, total
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def describe(self):
+        return {**super().describe(), 'buckets': [bound for bound in self.buckets if bound != math.inf]}
+
+    @staticmethod
+    def _combine(current, value):
+        if current is None:
+            return value
+        return [[a + b for a, b in zip(current[0], value[0])], current[1] + value[1], current[2] + value[2]]
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _samples(self, key, state):
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _labels(self.label_names, key, [f'le="{_number(bound)}"'])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _labels(self.label_names, key)
+        lines.append(f'{self.name}_sum{labels} {_number(total)}')
+        lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+KINDS = {'counter': Counter, 'gauge': Gauge, 'histogram': Histogram}
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flushed_at = 0.0
+        self._pid = None
+        self._file = None
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f'Métrica {name} já registrada como {metric.kind}')
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._get_or_create(Counter, name, documentation, labels)
+
+    def gauge(self, name, documentation, labels=()):
+        return self._get_or_create(Gauge, name, documentation, labels)
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labels, buckets=buckets)
+
+    def clear(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+    # Agregação entre processos
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: {**metric.describe(), 'values': metric.snapshot()} for metric in metrics}
+
+    def _filename(self):
+        # O id muda a cada processo: um pid reaproveitado não sobrescreve o arquivo de outro worker
+        if self._pid != os.getpid():
+            self._pid, self._file = os.getpid(), f'{os.getpid()}-{uuid.uuid4().hex[:12]}.json'
+        return self._file
+
+    def flush(self, directory):
+        """Grava o estado deste processo em ``directory`` (troca atômica do arquivo)"""
+        with self._flush_lock:
+            os.makedirs(directory, exist_ok=True)
+            fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(self.snapshot(), fh)
+            os.replace(temporary, os.path.join(directory, self._filename()))
+            self._flushed_at = time.monotonic()
+
+    def maybe_flush(self, directory, interval):
+        if time.monotonic() - self._flushed_at >= interval:
+            self.flush(directory)
+
+    @classmethod
+    def collect(cls, directory):
+        """Registro com a soma dos arquivos de todos os processos em ``directory``"""
+        merged = cls()
+        paths = [entry.path for entry in os.scandir(directory) if entry.name.endswith('.json')]
+        snapshots = []
+        for path in paths:
+            try:
+                with open(path) as fh:
+                    snapshots.append((os.path.getmtime(path), json.load(fh)))
+            except (OSError, ValueError):
+                # Arquivo removido ou trocado durante a leitura
+                continue
+        for _, snapshot in sorted(snapshots, key=lambda item: item[0]):
+            for name, data in snapshot.items():
+                kind = KINDS[data['kind']]
+                extra = {'buckets': data['buckets']} if kind is Histogram else {}
+                merged._get_or_create(kind, name, data['documentation'], data['labels'], **extra).merge(data['values'])
+        return merged
+
+    def render(self, directory=None):
+        """Texto do Prometheus; com ``directory``, somando todos os processos"""
+        if directory:
+            self.flush(directory)
+            return self.collect(directory).render()
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def flush_after_request(sender, **kwargs):
+    """Receiver de ``request_finished`` (ligado em ``CoreConfig.ready``)"""
+    from django.conf import settings
+
+    if settings.METRICS_DIR:
+        REGISTRY.maybe_flush(settings.METRICS_DIR, settings.METRICS_FLUSH_INTERVAL)
+
+
+def _flush_at_exit():
+    from django.conf import settings
+
+    if settings.configured and getattr(settings, 'METRICS_DIR', ''):
+        REGISTRY.flush(settings.METRICS_DIR)
+
+
+atexit.register(_flush_at_exit)
@@ -0,0 +1,155 @@
+"""
+Cache de página inteira para as páginas públicas (landing page).
+
+A página renderizada fica no cache do Django junto com as variantes gzip e
+brotli (esta só com o pacote ``brotli`` instalado), um ETag forte (SHA-256 do
+corpo) e a data de geração para o ``Last-Modified``. A chave combina caminho,
+host, ``PAGE_CACHE_VERSION`` (identificador do deploy), o hash do código do
+template e a versão de ``branding.brand``: mudar a identidade visual ou o
+template gera outra chave, sem invalidação manual.
+
+Só entram no cache GET/HEAD de visitantes sem cookie de sessão; a query string
+é ignorada (``utm_*``, ``gclid`` e afins não criam novas entradas). Num acerto
+não há renderização nem consulta ao banco, e ``If-None-Match`` /
+``If-Modified-Since`` são respondidos com 304. Respostas que definem cookies
+(por exemplo, páginas com ``{% csrf_token %}``) nunca são guardadas.
+"""
+import gzip
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.views.generic import TemplateView
+
+from branding import brand
+
+from .metrics import REGISTRY
+
+try:
+    import brotli
+except ImportError:  # dependência opcional: sem ela só há a variante gzip
+    brotli = None
+
+KEY_PREFIX = 'page'
+# Abaixo disto a compressão não compensa o custo no cliente
+MIN_COMPRESS_SIZE = 512
+
+PAGE_CACHE = REGISTRY.counter(
+    'django_page_cache_requests_total', 'Requisições às páginas públicas por resultado do cache', ('result',),
+)
+
+_template_versions = {}
+
+
+def template_version(template_name):
+    """Hash do código do template; calculado uma vez por processo (fora do DEBUG)"""
+    version = _template_versions.get(template_name)
+    if version is None:
+        source = get_template(template_name).template.source
+        version = hashlib.sha256(source.encode()).hexdigest()[:16]
+        if not settings.DEBUG:
+            _template_versions[template_name] = version
+    return version
+
+
+def cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and settings.PAGE_CACHE_TIMEOUT > 0
+    )
+
+
+def page_key(request, template_name):
+    host = request.get_host().split(':')[0].lower()
+    return ':'.join((
+        KEY_PREFIX, settings.PAGE_CACHE_VERSION, template_version(template_name),
+        str(brand.current_version()), host, request.path,
+    ))
+
+
+def build_entry(content, content_type):
+    digest = hashlib.sha256(content).hexdigest()[:32]
+    bodies = {'identity': content}
+    if len(content) >= MIN_COMPRESS_SIZE:
+        # mtime=0: o mesmo conteúdo sempre gera os mesmos bytes
+        bodies['gzip'] = gzip.compress(content, compresslevel=9, mtime=0)
+        if brotli is not None:
+            bodies['br'] = brotli.compress(content, quality=11)
+    return {
+        'content_type': content_type,
+        'digest': digest,
+        'last_modified': int(time.time()),
+        'bodies': {encoding: body for encoding, body in bodies.items() if len(body) < len(content) or encoding == 'identity'},
+    }
+
+
+def accepted_encodings(header):
+    """Codificações com q > 0 em ``Accept-Encoding``"""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(request, entry):
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    for encoding in ('br', 'gzip'):
+        if encoding in entry['bodies'] and (encoding in accepted or '*' in accepted):
+            return encoding
+    return 'identity'
+
+
+def entry_response(request, entry):
+    encoding = choose_encoding(request, entry)
+    body = entry['bodies'][encoding]
+    # ETag forte distinto por representação (os bytes de cada variante diferem)
+    etag = f'"{entry["digest"]}"' if encoding == 'identity' else f'"{entry["digest"]}-{encoding}"'
+    response = HttpResponse(b'' if request.method == 'HEAD' else body, content_type=entry['content_type'])
+    if encoding != 'identity':
+        response['Content-Encoding'] = encoding
+    response['Content-Length'] = str(len(body))
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    response['Cache-Control'] = f'public, max-age={settings.PAGE_CACHE_MAX_AGE}'
+    patch_vary_headers(response, ('Accept-Encoding', 'Cookie'))
+    return get_conditional_response(
+        request, etag=etag, last_modified=entry['last_modified'], response=response,
+    )
+
+
+class PublicPageView(TemplateView):
+    """``TemplateView`` servido do cache de página inteira para visitantes anônimos"""
+
+    def get(self, request, *args, **kwargs):
+        if not cacheable(request):
+            PAGE_CACHE.inc(result='bypass')
+            return super().get(request, *args, **kwargs)
+
+        key = page_key(request, self.template_name)
+        entry = cache.get(key)
+        if entry is None:
+            response = super().get(request, *args, **kwargs).render()
+            if response.status_code != 200 or response.cookies or request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+                PAGE_CACHE.inc(result='bypass')
+                return response
+            entry = build_entry(response.content, response['Content-Type'])
+            cache.set(key, entry, settings.PAGE_CACHE_TIMEOUT)
+            PAGE_CACHE.inc(result='miss')
+        else:
+            PAGE_CACHE.inc(result='hit')
+        return entry_response(request, entry)
@@ -0,0 +1,32 @@
+"""
+Paginação do admin para tabelas grandes.
+
+No PostgreSQL, ``COUNT(*)`` percorre a tabela inteira a cada página da
+listagem. Sem filtros, ``EstimatedCountPaginator`` usa a estimativa do
+planejador (``pg_class.reltuples``, atualizada pelo autovacuum/ANALYZE) quando
+ela passa de ``ADMIN_ESTIMATED_COUNT_THRESHOLD``; com filtros ou em tabelas
+pequenas, e nos demais bancos, a contagem continua exata. Os admins que o
+usam também desligam ``show_full_result_count``, que faria um segundo
+``COUNT(*)`` da tabela toda.
+"""
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [connection.ops.quote_name(queryset.model._meta.db_table)],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
@@ -0,0 +1,81 @@
+"""
+Auditoria dos planos das consultas mais frequentes do projeto.
+
+``canonical_queries()`` lista os filtros quentes (inadimplência, webhooks,
+renovações, agenda de lives, catálogo, histórico de medidas, fases do ciclo,
+fila do Mercado Pago). ``audit()`` roda ``EXPLAIN`` em cada uma e aponta as
+tabelas lidas por varredura sequencial:
+
+* PostgreSQL: nós ``Seq Scan on <tabela>``;
+* SQLite: linhas ``SCAN <tabela>``, inclusive ``USING INDEX`` (percorrer o
+  índice inteiro só para ordenar também lê a tabela toda); buscas indexadas
+  aparecem como ``SEARCH``.
+
+Em tabelas pequenas o PostgreSQL prefere a varredura sequencial de propósito,
+por isso o ``explain_queries`` roda sobre a massa de ``core.seeding``.
+"""
+import re
+from datetime import timedelta
+
+from django.db import connections
+from django.utils import timezone
+
+from payments.models import MercadoPagoNotification, Payment, Subscription
+from students.models import CyclePhaseSpan, Measurement, Student
+from videos.models import LiveClass, Video
+
+_POSTGRES_SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+_SQLITE_SCAN = re.compile(r'\bSCAN (\w+)')
+
+
+def _any_id(model):
+    return model.objects.order_by('pk').values_list('pk', flat=True).first() or 0
+
+
+def canonical_queries():
+    """``[(nome, queryset), ...]`` com valores típicos de produção"""
+    today = timezone.localdate()
+    now = timezone.now()
+    student_id = _any_id(Student)
+    mp_ids = list(
+        Payment.objects.exclude(mercadopago_payment_id='').order_by('-pk').values_list('mercadopago_payment_id', flat=True)[:20]
+    ) or ['0']
+    return [
+        ('cobrancas_em_atraso', Payment.objects.filter(status='pending', due_date__lt=today).order_by('due_date')[:100]),
+        ('cobrancas_do_mes', Payment.objects.filter(
+            status='approved', due_date__range=(today.replace(day=1), today),
+        ).order_by('due_date')[:100]),
+        ('webhook_por_id_mercado_pago', Payment.objects.filter(mercadopago_payment_id__in=mp_ids).exclude(mercadopago_payment_id='')),
+        ('assinaturas_vencendo', Subscription.objects.filter(
+            is_active=True, end_date__range=(today, today + timedelta(days=7)),
+        )),
+        ('proximas_lives', LiveClass.objects.filter(status='scheduled', scheduled_date__gte=now).order_by('scheduled_date')[:20]),
+        ('catalogo_publico', Video.objects.filter(is_public=True, published_at__lte=now).order_by('-published_at')[:24]),
+        ('historico_de_medidas', Measurement.objects.filter(student_id=student_id).order_by('-measurement_date')),
+        ('cobrancas_da_aluna', Payment.objects.filter(student_id=student_id).order_by('-due_date')),
+        ('fases_do_ciclo_hoje', CyclePhaseSpan.objects.filter(start_date__lte=today, end_date__gte=today)),
+        ('fila_mercado_pago', MercadoPagoNotification.objects.filter(
+            status='pending', available_at__lte=now,
+        ).order_by('available_at')[:100]),
+    ]
+
+
+def sequential_scans(plan, vendor):
+    """Tabelas lidas inteiras segundo o texto do ``EXPLAIN``"""
+    tables = []
+    for line in plan.splitlines():
+        if vendor == 'postgresql':
+            tables.extend(_POSTGRES_SEQ_SCAN.findall(line))
+        else:
+            tables.extend(_SQLITE_SCAN.findall(line))
+    return tables
+
+
+def audit(queries=None, using='default'):
+    """``[(nome, plano, tabelas com varredura sequencial), ...]``"""
+    vendor = connections[using].vendor
+    results = []
+    for name, queryset in queries or canonical_queries():
+        plan = queryset.using(using).explain()
+        results.append((name, plan, sequential_scans(plan, vendor)))
+    return results
@@ -0,0 +1,199 @@
+"""
+Massa de dados sintética com proporções parecidas com as de produção.
+
+Usada pelo ``seed_dataset`` (ambientes de desenvolvimento/homologação) e pelo
+``explain_queries``, que precisa de tabelas grandes para que o planejador
+escolha os mesmos planos que escolheria em produção. Tudo é inserido com
+``bulk_create`` (sem signals); o calendário de ciclos é gerado pelo próprio
+``students.cycles``. Os registros levam o prefixo ``SEED_PREFIX`` para
+poderem ser removidos com ``clear()``.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from payments.models import MercadoPagoNotification, Payment, Plan, Subscription
+from students import cycles
+from students.models import Measurement, MenstrualCycle, Student
+from videos.models import LiveClass, Video, VideoCategory
+
+SEED_PREFIX = 'seed-'
+BATCH_SIZE = 5000
+
+PLAN_TYPES = (('monthly', 129), ('quarterly', 349), ('semiannual', 659), ('annual', 1199))
+PAYMENT_STATUSES = ('approved',) * 8 + ('pending', 'rejected')
+LIVE_STATUSES = ('scheduled', 'finished', 'finished', 'cancelled')
+
+
+def seed(students=20_000, months=12, measurements=6, cycles_per_student=3, videos=2000, lives=1000, rng=None, log=None):
+    """Cria a massa de dados; retorna ``{modelo: linhas criadas}``"""
+    rng = rng or random.Random(42)
+    log = log or (lambda message: None)
+    today = timezone.localdate()
+    now = timezone.now()
+    created = {}
+
+    plans = []
+    for plan_type, price in PLAN_TYPES:
+        plan, _ = Plan.objects.get_or_create(
+            slug=f'{SEED_PREFIX}{plan_type}',
+            defaults={'name': f'Seed {plan_type}', 'description': '', 'price': price, 'plan_type': plan_type},
+        )
+        plans.append(plan)
+
+    CustomUser.objects.bulk_create(
+        [
+            CustomUser(
+                username=f'{SEED_PREFIX}{index}', password='!', first_name=f'Aluna {index}', last_name='Seed',
+                email=f'{SEED_PREFIX}{index}@example.com',
+            )
+            for index in range(students)
+        ] + [
+            CustomUser(username=f'{SEED_PREFIX}instrutora-{index}', password='!', first_name=f'Instrutora {index}', user_type='instructor')
+            for index in range(20)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    users = list(CustomUser.objects.filter(username__startswith=SEED_PREFIX, user_type='student').order_by('pk').values_list('pk', flat=True))
+    instructors = list(CustomUser.objects.filter(username__startswith=SEED_PREFIX, user_type='instructor').values_list('pk', flat=True))
+    Student.objects.bulk_create(
+        [
+            Student(
+                user_id=user_id, cpf=f'{SEED_PREFIX}{index}', modality=rng.choice(plans), is_active=rng.random() < 0.85,
+                enrollment_date=today - timedelta(days=rng.randrange(30 * months + 365)),
+            )
+            for index, user_id in enumerate(users)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    student_ids = list(Student.objects.filter(cpf__startswith=SEED_PREFIX).order_by('pk').values_list('pk', flat=True))
+    created['students'] = len(student_ids)
+    log(f'{len(student_ids)} alunas')
+
+    subscriptions = []
+    for student_id in student_ids:
+        active = rng.random() < 0.8
+        start = today - timedelta(days=rng.randrange(30, 30 * months))
+        subscriptions.append(Subscription(
+            student_id=student_id, plan=rng.choice(plans), is_active=active, start_date=start,
+            end_date=today + timedelta(days=rng.randrange(-30, 365)) if rng.random() < 0.6 else None,
+            cancelled_at=None if active else now - timedelta(days=rng.randrange(365)),
+        ))
+    Subscription.objects.bulk_create(subscriptions, batch_size=BATCH_SIZE)
+    created['subscriptions'] = len(subscriptions)
+
+    payments = []
+    first_due = today.replace(day=10) - timedelta(days=30 * (months - 1))
+    for student_id in student_ids:
+        for month in range(months):
+            due_date = first_due + timedelta(days=30 * month)
+            status = 'pending' if due_date >= today - timedelta(days=5) else rng.choice(PAYMENT_STATUSES)
+            paid = status == 'approved'
+            payments.append(Payment(
+                student_id=student_id, plan=plans[0], amount=Decimal('129.00'), due_date=due_date, status=status,
+                payment_date=due_date if paid else None,
+                mercadopago_payment_id=f'{SEED_PREFIX}{student_id}-{month}' if paid else '',
+                reference_code=f'{SEED_PREFIX}{student_id}-{month}',
+            ))
+        if len(payments) >= BATCH_SIZE * 4:
+            Payment.objects.bulk_create(payments, batch_size=BATCH_SIZE)
+            created['payments'] = created.get('payments', 0) + len(payments)
+            payments = []
+    Payment.objects.bulk_create(payments, batch_size=BATCH_SIZE)
+    created['payments'] = created.get('payments', 0) + len(payments)
+    log(f'{created["payments"]} cobranças')
+
+    rows = []
+    for student_id in student_ids:
+        weight = rng.uniform(55, 95)
+        for index in range(measurements):
+            weight += rng.uniform(-1.5, 1)
+            rows.append(Measurement(
+                student_id=student_id, measurement_date=today - timedelta(days=30 * (measurements - index) + rng.randrange(5)),
+                weight=Decimal(f'{weight:.2f}'), height=Decimal('1.65'), bmi=Decimal(f'{weight / 1.65 ** 2:.2f}'),
+            ))
+        if len(rows) >= BATCH_SIZE * 4:
+            Measurement.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+            created['measurements'] = created.get('measurements', 0) + len(rows)
+            rows = []
+    Measurement.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    created['measurements'] = created.get('measurements', 0) + len(rows)
+    log(f'{created["measurements"]} medidas')
+
+    rows = []
+    for student_id in student_ids:
+        duration = rng.randint(25, 33)
+        start = today - timedelta(days=duration * cycles_per_student - rng.randrange(duration))
+        for _ in range(cycles_per_student):
+            rows.append(MenstrualCycle(student_id=student_id, cycle_start_date=start, cycle_duration=duration))
+            start += timedelta(days=duration + rng.randint(-2, 2))
+    MenstrualCycle.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    created['menstrual_cycles'] = len(rows)
+    created['cycle_calendars'], _ = cycles.refresh_due(today=today, full=True)
+    log(f'{created["cycle_calendars"]} calendários de ciclo')
+
+    categories = []
+    for index in range(10):
+        category, _ = VideoCategory.objects.get_or_create(slug=f'{SEED_PREFIX}{index}', defaults={'name': f'Seed {index}', 'order': index})
+        categories.append(category)
+    Video.objects.bulk_create(
+        [
+            Video(
+                title=f'Aula {index}', slug=f'{SEED_PREFIX}{index}', description='', category=rng.choice(categories),
+                instructor_id=rng.choice(instructors), is_public=rng.random() < 0.7,
+                published_at=now - timedelta(days=rng.randrange(1000)) if rng.random() < 0.9 else None,
+            )
+            for index in range(videos)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    created['videos'] = videos
+    LiveClass.objects.bulk_create(
+        [
+            LiveClass(
+                title=f'{SEED_PREFIX}live {index}', description='', instructor_id=rng.choice(instructors),
+                category=rng.choice(categories), scheduled_date=now + timedelta(hours=rng.randrange(-24 * 365, 24 * 60)),
+                status=rng.choice(LIVE_STATUSES),
+            )
+            for index in range(lives)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    created['live_classes'] = lives
+
+    notifications = [
+        MercadoPagoNotification(
+            topic='payment', resource_id=f'{SEED_PREFIX}{index}', status='done' if rng.random() < 0.98 else 'pending',
+            received_at=now - timedelta(minutes=index), available_at=now - timedelta(minutes=index),
+        )
+        for index in range(students)
+    ]
+    MercadoPagoNotification.objects.bulk_create(notifications, batch_size=BATCH_SIZE)
+    created['notifications'] = len(notifications)
+    return created
+
+
+def analyze():
+    """Atualiza as estatísticas do planejador (sqlite_stat1 / pg_statistic)"""
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def clear():
+    """Remove a massa de dados criada por ``seed()``"""
+    deleted = {}
+    for label, queryset in (
+        ('notifications', MercadoPagoNotification.objects.filter(resource_id__startswith=SEED_PREFIX)),
+        ('live_classes', LiveClass.objects.filter(title__startswith=SEED_PREFIX)),
+        ('videos', Video.objects.filter(slug__startswith=SEED_PREFIX)),
+        ('video_categories', VideoCategory.objects.filter(slug__startswith=SEED_PREFIX)),
+        # Alunas levam junto cobranças, assinaturas, medidas e ciclos (CASCADE)
+        ('users', CustomUser.objects.filter(username__startswith=SEED_PREFIX)),
+        ('plans', Plan.objects.filter(slug__startswith=SEED_PREFIX)),
+    ):
+        deleted[label], _ = queryset.delete()
+    return deleted
@@ -0,0 +1,171 @@
+"""
+Storage do ``collectstatic`` em produção: manifesto com hash (WhiteNoise),
+variantes Brotli/gzip e irmãos WebP/AVIF das imagens.
+
+Antes do hash do manifesto, cada PNG/JPEG copiado para ``STATIC_ROOT`` ganha
+irmãos ``.webp`` (sem perdas) e ``.avif`` com o mesmo nome-base
+(``images/logo.png`` -> ``images/logo.webp``), mantidos só quando menores que
+o original; o próprio PNG é regravado com ``optimize=True`` (sem perdas)
+quando isso reduz o arquivo. Os irmãos entram no manifesto, então
+``{% static 'images/logo.webp' %}`` funciona como qualquer outro arquivo.
+
+A compressão (Brotli só com o pacote ``brotli`` instalado) e a conversão
+rodam em ``STATIC_OPTIMIZE_WORKERS`` threads: zlib, brotli e Pillow liberam
+o GIL, então as threads ocupam todos os núcleos. ``staticfiles-optimized.json``
+em ``STATIC_ROOT`` guarda o SHA-256 de cada arquivo processado e o que foi
+gerado a partir dele; arquivos com o mesmo conteúdo e saídas ainda presentes
+não são reprocessados no próximo deploy.
+"""
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from .imaging import content_hash, get_formats
+
+STATE_FILE = 'staticfiles-optimized.json'
+RASTER_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+ENCODERS = {
+    'webp': ('WEBP', {'lossless': True, 'method': 6}),
+    'avif': ('AVIF', {'quality': 80}),
+}
+
+
+def _workers():
+    return getattr(settings, 'STATIC_OPTIMIZE_WORKERS', None) or os.cpu_count() or 1
+
+
+class OptimizedStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            yield from super().post_process(paths, dry_run=dry_run, **options)
+            return
+        # Só as entradas vistas nesta execução sobrevivem (arquivos removidos somem do estado)
+        self._previous = self._load_state()
+        self._state = {}
+        self._state_lock = threading.Lock()
+        self.skipped = 0
+        # O manifesto passa a ler de STATIC_ROOT as imagens otimizadas e os irmãos gerados
+        for name in self.convert_images(paths):
+            paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        self._save_state()
+
+    # Estado entre deploys
+
+    def _load_state(self):
+        try:
+            with open(self.path(STATE_FILE)) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        destination = self.path(STATE_FILE)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(destination), suffix='.tmp')
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(self._state, fh, sort_keys=True)
+        os.replace(temporary, destination)
+
+    def _unchanged(self, key, name):
+        """Saídas já geradas para o conteúdo atual de ``name`` (ou ``None``)"""
+        entry = self._previous.get(key)
+        if entry is None or entry['digest'] != content_hash(self.path(name)):
+            return None
+        if not all(self.exists(output) for output in entry['outputs']):
+            return None
+        with self._state_lock:
+            self._state[key] = entry
+            self.skipped += 1
+        return entry['outputs']
+
+    def _remember(self, key, name, outputs):
+        entry = {'digest': content_hash(self.path(name)), 'outputs': outputs}
+        with self._state_lock:
+            self._state[key] = entry
+
+    # Imagens
+
+    def convert_images(self, paths):
+        """Otimiza as imagens e gera os irmãos WebP/AVIF; retorna os nomes a ler de ``STATIC_ROOT``"""
+        names = [
+            name for name in paths
+            if name.lower().endswith(RASTER_EXTENSIONS) and not self._is_sibling_taken(name, paths)
+        ]
+        with ThreadPoolExecutor(max_workers=_workers()) as executor:
+            generated = [output for outputs in executor.map(self._convert_image, names) for output in outputs]
+        return names + generated
+
+    @staticmethod
+    def _sibling(name, fmt):
+        return f'{os.path.splitext(name)[0]}.{fmt}'
+
+    def _is_sibling_taken(self, name, paths):
+        # Um logo.webp de verdade em static/ vence o gerado
+        return any(self._sibling(name, fmt) in paths for fmt in ENCODERS)
+
+    def _convert_image(self, name):
+        key = f'image:{name}'
+        outputs = self._unchanged(key, name)
+        if outputs is not None:
+            return outputs
+
+        from PIL import Image
+
+        source = self.path(name)
+        with Image.open(source) as image:
+            image.load()
+        if name.lower().endswith('.png'):
+            self._save_if_smaller(image, source, 'PNG', {'optimize': True})
+        size = os.path.getsize(source)
+        outputs = []
+        for fmt in get_formats():
+            sibling = self._sibling(name, fmt)
+            pil_format, options = ENCODERS[fmt]
+            if self._save_if_smaller(image, self.path(sibling), pil_format, options, limit=size):
+                outputs.append(sibling)
+            elif self.exists(sibling):
+                self.delete(sibling)
+        self._remember(key, name, outputs)
+        return outputs
+
+    @staticmethod
+    def _save_if_smaller(image, destination, pil_format, options, limit=None):
+        limit = limit if limit is not None else os.path.getsize(destination)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(destination), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                image.save(fh, pil_format, **options)
+            if os.path.getsize(temporary) < limit:
+                os.chmod(temporary, 0o644)
+                os.replace(temporary, destination)
+                return True
+        finally:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+        return False
+
+    # Compressão
+
+    def compress_files(self, paths):
+        extensions = getattr(settings, 'WHITENOISE_SKIP_COMPRESS_EXTENSIONS', None)
+        self.compressor = self.create_compressor(extensions=extensions, quiet=True)
+        names = [name for name in paths if self.compressor.should_compress(name)]
+        with ThreadPoolExecutor(max_workers=_workers()) as executor:
+            for name, outputs in zip(names, executor.map(self._compress, names)):
+                for output in outputs:
+                    yield name, output
+
+    def _compress(self, name):
+        key = f'compress:{name}'
+        outputs = self._unchanged(key, name)
+        if outputs is None:
+            full_path = self.path(name)
+            prefix_len = len(full_path) - len(name)
+            outputs = [path[prefix_len:] for path in self.compressor.compress(full_path)]
+            self._remember(key, name, outputs)
+        return outputs
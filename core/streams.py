@@ -0,0 +1,39 @@
+"""
+Corpo de ``StreamingHttpResponse`` que sai bloco a bloco em WSGI e em ASGI.
+
+Sob ASGI o Django consome um iterador síncrono inteiro (``sync_to_async(list)``)
+antes de enviar o primeiro byte. ``stream_body`` entrega o iterador como está
+às requisições WSGI e, nas ASGI, o embrulha num gerador assíncrono que lê um
+bloco por vez.
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+_DONE = object()
+
+
+async def aiter_chunks(chunks):
+    """
+    Versão assíncrona de um iterador síncrono. Cada ``next()`` roda na thread
+    da requisição (``thread_sensitive``), a mesma das conexões de banco que
+    geradores de exportação mantêm abertas.
+    """
+    chunks = iter(chunks)
+    next_chunk = sync_to_async(next)
+    try:
+        while True:
+            chunk = await next_chunk(chunks, _DONE)
+            if chunk is _DONE:
+                return
+            yield chunk
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def stream_body(request, chunks):
+    """``chunks`` pronto para o ``StreamingHttpResponse`` que responde ``request``"""
+    if isinstance(request, ASGIRequest):
+        return aiter_chunks(chunks)
+    return chunks
@@ -0,0 +1,77 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from core.imaging import derivatives_for, schedule_derivatives
+
+register = template.Library()
+
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+}
+
+
+def _srcset(entries):
+    return ', '.join(f'{default_storage.url(path)} {width}w' for width, path in entries)
+
+
+def _derivatives(image):
+    if not image:
+        return None
+    try:
+        index = derivatives_for(image.name)
+    except (OSError, ValueError):
+        return None
+    if index is None:
+        schedule_derivatives(image.name)
+    return index
+
+
+@register.simple_tag
+def image_srcset(image, fmt='webp'):
+    """Atributo ``srcset`` dos derivados de ``image`` no formato pedido"""
+    index = _derivatives(image)
+    if not index:
+        return ''
+    return _srcset(index['sources'].get(fmt) or index['sources'][index['fallback']])
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', alt='', css_class='', loading='lazy'):
+    """
+    ``<picture>`` com fontes AVIF/WebP e fallback para a imagem enviada.
+
+    Enquanto os derivados não existem, agenda a geração e usa o original.
+    """
+    if not image:
+        return ''
+    index = _derivatives(image)
+    if index is None:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}">',
+            image.url, alt, css_class, loading,
+        )
+
+    sources = format_html_join(
+        '',
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (MIME_TYPES[fmt], _srcset(entries), sizes)
+            for fmt, entries in index['sources'].items()
+            if fmt in MIME_TYPES
+        ),
+    )
+    fallback = index['sources'][index['fallback']]
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" loading="{}"></picture>',
+        sources,
+        default_storage.url(fallback[-1][1]),
+        _srcset(fallback),
+        sizes,
+        index['width'],
+        index['height'],
+        alt,
+        css_class,
+        loading,
+    )
@@ -1,3 +1,521 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from unittest.mock import patch
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.db import connection
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+from PIL import Image
+
+from accounts.models import CustomUser
+from config.settings import database
+from config.settings.cache import cache_settings
+from branding import brand
+from core import caching, exports, imaging, pagecache, query_audit
+from core.instrumentation import assert_no_n_plus_one, fingerprint, record_queries
+from core.metrics import REGISTRY, Registry
+from core.paginator import EstimatedCountPaginator
+from payments.exports import payment_export
+from payments.models import Payment, Plan, Subscription
+from students.models import Measurement, Student
+from videos.models import Video, VideoCategory
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(size=(1600, 900), mode='RGB'):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 120, 60)).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue())
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    IMAGE_DERIVATIVE_WIDTHS=(320, 640, 1280),
+    IMAGE_DERIVATIVES_ASYNC=False,
+    VIDEO_TRANSCODE_BACKEND='videos.transcoding.StubBackend',
+)
+class ImageDerivativeTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_generates_widths_and_formats(self):
+        video = Video(title='Yoga', slug='yoga', description='')
+        video.thumbnail.save('yoga.png', make_image(), save=False)
+        index = imaging.generate_derivatives(video.thumbnail.name)
+        self.assertEqual(index['fallback'], 'jpeg')
+        self.assertEqual([width for width, _ in index['sources']['jpeg']], [320, 640, 1280])
+        for fmt in imaging.get_formats():
+            for width, path in index['sources'][fmt]:
+                with Image.open(os.path.join(MEDIA_ROOT, path)) as derivative:
+                    self.assertEqual(derivative.width, width)
+        # Mesmo conteúdo reaproveita o índice pelo hash
+        self.assertIs(imaging.generate_derivatives(video.thumbnail.name), index)
+
+    def test_small_images_are_not_upscaled(self):
+        video = Video(title='Mini', slug='mini', description='')
+        video.thumbnail.save('mini.png', make_image((200, 100), 'RGBA'), save=False)
+        index = imaging.generate_derivatives(video.thumbnail.name)
+        self.assertEqual(index['fallback'], 'png')
+        self.assertEqual([width for width, _ in index['sources']['png']], [200])
+
+    def test_template_tag_emits_srcset(self):
+        video = Video(title='Dança', slug='danca', description='')
+        video.thumbnail.save('danca.png', make_image(), save=False)
+        template = Template('{% load responsive_images %}{% responsive_image image sizes="50vw" alt="Dança" %}')
+        # Primeira renderização agenda (aqui, executa) a geração e usa o original
+        self.assertIn('<img src=', template.render(Context({'image': video.thumbnail})))
+        # Com os derivados prontos a renderização não lê nem hasheia a imagem
+        with patch.object(imaging, 'content_hash', side_effect=AssertionError('hash na requisição')):
+            html = template.render(Context({'image': video.thumbnail}))
+        self.assertIn('<picture>', html)
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('640w', html)
+        self.assertIn('sizes="50vw"', html)
+
+    def test_poster_frame_for_video_without_thumbnail(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            video = Video(title='Funcional', slug='funcional', description='')
+            video.video_file.save('funcional.mp4', ContentFile(b'0' * 100), save=False)
+            video.save()
+        video.refresh_from_db()
+        self.assertTrue(video.thumbnail.name.startswith('thumbnails/funcional-poster'))
+        self.assertIsNotNone(imaging.derivatives_for(video.thumbnail.name))
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_user('equipe-export', is_staff=True)
+        for index in range(3):
+            user = CustomUser.objects.create_user(f'aluna-export-{index}', first_name=f'Aluna {index}', email=f'a{index}@x.com')
+            student = Student.objects.create(user=user, cpf=f'export-{index}')
+            Payment.objects.create(student=student, amount='99.90', due_date=date(2024, 1, 10 + index), status='approved')
+            Measurement.objects.create(student=student, measurement_date=date(2024, 2, 1), weight=Decimal('60'), height=Decimal('1.65'))
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_requires_staff(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('payments:export_payments')).status_code, 302)
+
+    def test_payments_csv_gzip(self):
+        response = self.client.get(reverse('payments:export_payments'), {'gzip': '1', 'from': '2024-01-11'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+        text = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8-sig')
+        rows = list(csv.reader(io.StringIO(text), delimiter=';'))
+        self.assertEqual(rows[0][:3], ['ID', 'ID Aluna', 'Nome'])
+        self.assertEqual([row[2] for row in rows[1:]], ['Aluna 1', 'Aluna 2'])
+        self.assertEqual(rows[1][9], 'Aprovado')
+
+    def test_impossible_date_filter_is_ignored(self):
+        response = self.client.get(reverse('payments:export_payments'), {'from': '2024-02-30'})
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig')), delimiter=';'))
+        self.assertEqual(len(rows) - 1, Payment.objects.count())
+
+    def test_asgi_request_gets_async_body(self):
+        request = AsyncRequestFactory().get('/')
+        response = exports.export_response(payment_export({}), request=request)
+        self.assertTrue(response.is_async)
+
+    def test_students_xlsx(self):
+        response = self.client.get(reverse('students:export_students'), {'format': 'xlsx'})
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        namespace = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        rows = sheet.findall('s:sheetData/s:row', namespace)
+        self.assertEqual(len(rows), 4)
+        header = [cell.findtext('s:is/s:t', namespaces=namespace) for cell in rows[0]]
+        self.assertEqual(header[:4], ['ID', 'Nome', 'Sobrenome', 'E-mail'])
+        self.assertEqual(rows[1][3].findtext('s:is/s:t', namespaces=namespace), 'a0@x.com')
+
+    def test_formula_values_are_neutralized(self):
+        rows = [(1, '=HYPERLINK("http://x","y")', '-2+3', '@SUM(A1)', '\tcmd', 'Ana', -5)]
+        text = b''.join(exports.csv_chunks(['ID', 'Nome', 'A', 'B', 'C', 'D', 'E'], rows)).decode('utf-8-sig')
+        row = list(csv.reader(io.StringIO(text), delimiter=';'))[1]
+        self.assertEqual(row, ['1', '\'=HYPERLINK("http://x","y")', "'-2+3", "'@SUM(A1)", "'\tcmd", 'Ana', '-5'])
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(exports.xlsx_chunks(['+Nome'], [('=1+1',)]))))
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn("<t xml:space=\"preserve\">'+Nome</t>", sheet)
+        self.assertIn("<t xml:space=\"preserve\">'=1+1</t>", sheet)
+
+    def test_measurements_single_query(self):
+        with self.assertNumQueries(3):  # sessão + usuária + exportação
+            content = b''.join(self.client.get(reverse('students:export_measurements')).streaming_content)
+        self.assertEqual(content.decode('utf-8-sig').count('\n'), 4)
+
+    def test_memory_ceiling_on_one_million_rows(self):
+        rows = ((index, f'Aluna {index}', date(2024, 1, 1)) for index in range(1_000_000))
+        baseline = sys.getallocatedblocks()
+        largest = growth = total = 0
+        for chunk in exports.gzip_chunks(exports.csv_chunks(['ID', 'Nome', 'Data'], rows)):
+            largest = max(largest, len(chunk))
+            growth = max(growth, sys.getallocatedblocks() - baseline)
+            total += len(chunk)
+        self.assertGreater(total, 1024 * 1024)
+        self.assertLess(largest, 256 * 1024)
+        # Materializar as linhas custaria milhões de blocos; o fluxo fica em alguns milhares
+        self.assertLess(growth, 20_000)
+
+
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_user('equipe-metricas', is_staff=True)
+        for index in range(6):
+            student = Student.objects.create(user=CustomUser.objects.create_user(f'aluna-n1-{index}'), cpf=f'n1-{index}')
+            Payment.objects.create(student=student, amount=100, due_date=date(2024, 1, 1))
+
+    def setUp(self):
+        REGISTRY.clear()
+
+    def test_fingerprint_ignores_literals_and_in_lists(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            fingerprint('SELECT * FROM t WHERE id IN (%s)  AND name = \'y\' LIMIT 5'),
+        )
+
+    def test_detects_n_plus_one_with_origin(self):
+        with record_queries() as recorder:
+            labels = [str(payment) for payment in Payment.objects.all()]
+        self.assertEqual(len(labels), 6)
+        self.assertEqual(recorder.count, 13)
+        origins = [origin for _, count, origin in recorder.n_plus_one]
+        self.assertEqual(len(origins), 2)
+        self.assertTrue(origins[0].startswith('payments/models.py:'), origins)
+        self.assertIn('__str__', origins[0])
+
+        with assert_no_n_plus_one():
+            [str(payment) for payment in Payment.objects.select_related('student__user')]
+        with self.assertRaisesMessage(AssertionError, 'N+1'):
+            with assert_no_n_plus_one():
+                [str(payment) for payment in Payment.objects.all()]
+
+    @override_settings(QUERY_INSTRUMENTATION_SAMPLE_RATE=1)
+    def test_middleware_exports_prometheus_metrics(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('dashboard_admin:dashboard_api'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ consultas", total;dur=')
+
+        metrics = self.client.get(reverse('core:metrics'))
+        self.assertTrue(metrics['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = metrics.content.decode()
+        self.assertIn('django_http_requests_total{view="dashboard_admin:dashboard_api",method="GET",status="200"} 1', text)
+        self.assertIn('django_db_queries_per_request_count{view="dashboard_admin:dashboard_api"} 1', text)
+        self.assertIn('# TYPE django_http_request_duration_seconds histogram', text)
+
+        self.assertEqual(self.client.get(reverse('core:metrics'), REMOTE_ADDR='10.0.0.8').status_code, 404)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_metrics_require_bearer_token(self):
+        url = reverse('core:metrics')
+        # Atrás do proxy todo mundo chega como 127.0.0.1: o IP não basta
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer errado').status_code, 404)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret', REMOTE_ADDR='10.0.0.8').status_code, 200)
+
+    def test_metrics_are_summed_across_workers(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        # Outro worker (registro separado) já gravou o seu estado
+        worker = Registry()
+        worker.counter('django_http_requests_total', 'x', ('view', 'method', 'status')).inc(
+            5, view='core:home', method='GET', status='200',
+        )
+        worker.histogram('django_http_request_duration_seconds', 'x', ('view',)).observe(0.2, view='core:home')
+        worker.flush(directory)
+        with override_settings(METRICS_DIR=directory):
+            self.client.get(reverse('core:home'))
+            text = self.client.get(reverse('core:metrics')).content.decode()
+        self.assertIn('django_http_requests_total{view="core:home",method="GET",status="200"} 6', text)
+        self.assertIn('django_http_request_duration_seconds_count{view="core:home"} 2', text)
+        self.assertEqual(len(os.listdir(directory)), 2)
+
+    @override_settings(QUERY_INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_requests_only_time(self):
+        response = self.client.get(reverse('core:home'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        text = self.client.get(reverse('core:metrics')).content.decode()
+        self.assertIn('django_http_requests_total{view="core:home",method="GET",status="200"} 1', text)
+        self.assertNotIn('django_db_queries_per_request_count', text)
+
+
+class AdminChangelistTests(TestCase):
+    CHANGELISTS = [
+        'admin:students_student_changelist', 'admin:students_measurement_changelist',
+        'admin:payments_payment_changelist', 'admin:payments_subscription_changelist',
+        'admin:videos_video_changelist',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser('admin-listas', 'admin@example.com', 'x')
+        cls.plan = Plan.objects.create(name='Mensal', slug='mensal-admin', description='', price=100, plan_type='monthly')
+        cls.category = VideoCategory.objects.create(name='Pilates', slug='pilates-admin')
+        cls.instructor = CustomUser.objects.create_user('prof-admin', first_name='Paula', user_type='instructor')
+
+    def add_rows(self, start, total):
+        for index in range(start, start + total):
+            user = CustomUser.objects.create_user(f'aluna-admin-{index}', first_name=f'Aluna {index}')
+            student = Student.objects.create(user=user, cpf=f'admin-{index}', modality=self.plan)
+            Payment.objects.create(student=student, plan=self.plan, amount=100, due_date=date(2024, 1, 1))
+            Subscription.objects.create(student=student, plan=self.plan)
+            Measurement.objects.create(student=student, measurement_date=date(2024, 2, 1), weight=Decimal('60'), height=Decimal('1.65'))
+            Video.objects.create(
+                title=f'Aula {index}', slug=f'aula-admin-{index}', description='', category=self.category, instructor=self.instructor,
+            )
+
+    def changelist_queries(self):
+        counts = {}
+        for name in self.CHANGELISTS:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            counts[name] = len(queries)
+        return counts
+
+    def test_changelist_query_count_does_not_grow_with_rows(self):
+        self.client.force_login(self.admin)
+        self.add_rows(0, 2)
+        few = self.changelist_queries()
+        self.add_rows(2, 25)
+        self.assertEqual(self.changelist_queries(), few)
+
+    def test_autocomplete_replaces_select_boxes(self):
+        self.client.force_login(self.admin)
+        self.add_rows(0, 3)
+        response = self.client.get(reverse('admin:payments_payment_add'))
+        self.assertContains(response, 'data-field-name="student"')
+        self.assertContains(response, 'data-field-name="plan"')
+        self.assertNotContains(response, 'Aluna 1')
+
+    def test_estimated_count_is_exact_outside_postgres(self):
+        self.add_rows(0, 3)
+        self.assertEqual(EstimatedCountPaginator(Payment.objects.order_by('pk'), 2).count, 3)
+
+
+class QueryAuditTests(TestCase):
+    def test_canonical_queries_use_indexes(self):
+        for name, plan, scans in query_audit.audit():
+            self.assertEqual(scans, [], f'{name}\n{plan}')
+
+    def test_flags_sequential_scans(self):
+        [(_, _, scans)] = query_audit.audit([('sem_indice', Payment.objects.filter(notes='x'))])
+        self.assertEqual(scans, ['payments_payment'])
+        postgres_plan = (
+            'Limit  (cost=0.42..8.44 rows=1 width=8)\n'
+            '  ->  Nested Loop\n'
+            '        ->  Index Scan using payment_status_due_date_idx on payments_payment\n'
+            '        ->  Seq Scan on students_student  (cost=0.00..1.01 rows=1 width=8)'
+        )
+        self.assertEqual(query_audit.sequential_scans(postgres_plan, 'postgresql'), ['students_student'])
+        self.assertEqual(query_audit.sequential_scans('SEARCH videos_video USING INDEX video_published_at_idx (published_at<?)', 'sqlite'), [])
+
+
+class PublicPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.url = reverse('core:home')
+
+    def test_hit_skips_template_and_database(self):
+        first = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', first['Vary'])
+        body = gzip.decompress(first.content)
+        self.assertIn(b'Aurora', body)
+
+        with self.assertNumQueries(0), patch.object(pagecache.TemplateView, 'get', side_effect=AssertionError):
+            again = self.client.get(self.url + '?utm_source=instagram&gclid=x')
+        self.assertNotIn('Content-Encoding', again)
+        self.assertEqual(again.content, body)
+        self.assertNotEqual(again['ETag'], first['ETag'])
+        self.assertTrue(again['ETag'].startswith('"'))
+
+    def test_conditional_get_returns_304(self):
+        first = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], first['ETag'])
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"outro"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_brand_change_and_session_bypass(self):
+        self.client.get(self.url)
+        key = pagecache.page_key(RequestFactory().get(self.url), 'core/home.html')
+        self.assertIsNotNone(cache.get(key))
+        brand.invalidate()
+        self.addCleanup(brand.invalidate)
+        self.assertNotEqual(pagecache.page_key(RequestFactory().get(self.url), 'core/home.html'), key)
+
+        self.client.cookies['sessionid'] = 'qualquer'
+        with patch.object(pagecache.cache, 'get', side_effect=AssertionError):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+    def test_accept_encoding_quality(self):
+        self.assertEqual(pagecache.accepted_encodings('gzip;q=0, br;q=0.8, identity'), {'br', 'identity'})
+
+
+class OptimizedStaticStorageTests(TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.source, 'images'))
+        Image.new('RGB', (400, 200), (255, 179, 102)).save(os.path.join(self.source, 'images', 'logo.png'))
+        with open(os.path.join(self.source, 'site.css'), 'w') as fh:
+            fh.write('body { color: #9b59b6; }\n' * 200)
+
+    def collectstatic(self):
+        with override_settings(
+            STATICFILES_DIRS=[self.source], STATIC_ROOT=self.root,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'core.static_storage.OptimizedStaticFilesStorage'},
+            },
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            storage = staticfiles_storage._wrapped
+            return storage.skipped, len(storage._state), storage.stored_name('images/logo.webp')
+
+    def test_siblings_compression_and_skip_unchanged(self):
+        skipped, processed, webp = self.collectstatic()
+        self.assertEqual(skipped, 0)
+        self.assertRegex(webp, r'^images/logo\.[0-9a-f]{12}\.webp$')
+        with Image.open(os.path.join(self.root, webp)) as image:
+            self.assertEqual(image.format, 'WEBP')
+        css = [name for name in os.listdir(self.root) if name.startswith('site.') and name.endswith('.css')]
+        self.assertEqual(len(css), 2)
+        for name in css:
+            self.assertTrue(os.path.exists(os.path.join(self.root, name + '.gz')))
+
+        # Segundo deploy: nada é reconvertido nem recomprimido
+        skipped, _, webp_again = self.collectstatic()
+        self.assertEqual(webp_again, webp)
+        self.assertEqual(skipped, processed)
+
+
+class DatabaseSettingsTests(TestCase):
+    def database(self, **env):
+        with patch.dict(os.environ, env):
+            return database.database_settings(Path(tempfile.gettempdir()))
+
+    def test_database_url_uses_persistent_connections(self):
+        config = self.database(DATABASE_URL='postgres://aurora:segredo@db:5432/aurora', DB_CONN_MAX_AGE='300')
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((config['HOST'], config['NAME']), ('db', 'aurora'))
+        self.assertEqual(config['CONN_MAX_AGE'], 300)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('pool', config['OPTIONS'])
+
+    def test_pool_size_fits_worker_budget(self):
+        self.assertEqual(database.pool_size(workers=4, concurrency=8, max_connections=20, reserved=4), (1, 4))
+        self.assertEqual(database.pool_size(workers=2, concurrency=4, max_connections=100), (1, 4))
+        self.assertEqual(database.pool_size(workers=50, concurrency=4, max_connections=20), (1, 1))
+
+    def test_asgi_closes_connections_per_request(self):
+        config = self.database(DATABASE_URL='postgres://aurora:segredo@db:5432/aurora', DJANGO_ASGI='True')
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+
+    def test_sqlite_url_options_are_kept(self):
+        config = self.database(DATABASE_URL='sqlite:////tmp/aurora.sqlite3?check_same_thread=False')
+        self.assertIn('check_same_thread', config['OPTIONS'])
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+
+class CacheAsideTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        REGISTRY.clear()
+        self.calls = []
+
+        @caching.cached(VideoCategory, 'catalogo', timeout=60, lock_timeout=0.2)
+        def category_names(prefix, upper=False):
+            self.calls.append(prefix)
+            names = list(VideoCategory.objects.filter(name__startswith=prefix).values_list('name', flat=True))
+            return [name.upper() for name in names] if upper else names or None
+
+        self.category_names = category_names
+        self.label = f'{__name__}.CacheAsideTests.setUp.<locals>.category_names'
+
+    def test_hit_miss_and_model_invalidation(self):
+        VideoCategory.objects.create(name='Yoga', slug='yoga')
+        self.assertEqual(self.category_names('Yo'), ['Yoga'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.category_names('Yo'), ['Yoga'])
+        self.assertEqual(self.category_names('Yo', upper=True), ['YOGA'])
+        # None também fica em cache
+        self.assertIsNone(self.category_names('Pi'))
+        self.assertIsNone(self.category_names('Pi'))
+        self.assertEqual(self.calls, ['Yo', 'Yo', 'Pi'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            VideoCategory.objects.create(name='Yoga Nidra', slug='yoga-nidra')
+        self.assertEqual(self.category_names('Yo'), ['Yoga', 'Yoga Nidra'])
+        self.assertEqual(caching.REQUESTS.value(function=self.label, result='hit'), 2)
+        self.assertEqual(caching.REQUESTS.value(function=self.label, result='miss'), 4)
+
+        caching.bump('catalogo')
+        self.category_names('Yo')
+        self.assertEqual(len(self.calls), 5)
+
+    def test_stampede_protection(self):
+        self.category_names('Yo')
+        key = self.category_names.key('Yo')
+        # Recomputação cara e vencimento iminente: XFetch renova antes de expirar
+        cache.set(key, (None, 1e6, time.time() + 1), 60)
+        self.category_names('Yo')
+        self.assertEqual(caching.REQUESTS.value(function=self.label, result='early'), 1)
+        self.assertEqual(len(self.calls), 2)
+
+        # Chave fria com outro worker calculando: espera o lock e só então calcula
+        self.category_names.invalidate('Yo')
+        cache.add(f'{key}:lock', 1, 60)
+        began = time.perf_counter()
+        self.category_names('Yo')
+        self.assertGreaterEqual(time.perf_counter() - began, 0.2)
+        self.assertEqual(len(self.calls), 3)
+
+    def test_cache_url(self):
+        self.assertEqual(
+            cache_settings('redis://cache:6379/1')['BACKEND'], 'django.core.cache.backends.redis.RedisCache',
+        )
+        self.assertEqual(cache_settings('memcached://a:11211,b:11211')['LOCATION'], ['a:11211', 'b:11211'])
+        self.assertEqual(cache_settings('file:///var/tmp/aurora')['LOCATION'], '/var/tmp/aurora')
+        with self.assertRaises(ImproperlyConfigured):
+            cache_settings('mongodb://x')
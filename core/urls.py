@@ -1,8 +1,11 @@
 from django.urls import path
-from django.views.generic import TemplateView
+
+from . import views
+from .pagecache import PublicPageView
 
 app_name = 'core'
 
 urlpatterns = [
-    path('', TemplateView.as_view(template_name='core/home.html'), name='home'),
-]
\ No newline at end of file
+    path('', PublicPageView.as_view(template_name='core/home.html'), name='home'),
+    path('metrics', views.metrics, name='metrics'),
+]
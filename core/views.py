@@ -1,3 +1,21 @@
-from django.shortcuts import render
+import hmac
 
-# Create your views here.
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from .metrics import REGISTRY
+
+
+def _metrics_allowed(request):
+    if settings.METRICS_TOKEN:
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        scheme, _, token = header.partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), settings.METRICS_TOKEN.encode())
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics(request):
+    """Métricas de todos os workers no formato texto do Prometheus (token ou IPs locais)"""
+    if not _metrics_allowed(request):
+        raise Http404
+    return HttpResponse(REGISTRY.render(settings.METRICS_DIR), content_type='text/plain; version=0.0.4; charset=utf-8')
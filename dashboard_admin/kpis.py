@@ -0,0 +1,89 @@
+"""
+Indicadores do painel, calculados apenas a partir dos rollups.
+
+Cada consulta percorre no máximo uma linha por dia/plano/categoria, então o
+tempo de resposta não depende do tamanho de ``Payment``.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import DailyPaymentStats, DailySubscriptionStats, DailyVideoViewStats, PlanMetrics
+
+CHURN_WINDOW_DAYS = 30
+VIEWS_WINDOW_DAYS = 30
+OVERDUE_BUCKETS = ((1, 30), (31, 60), (61, 90), (91, None))
+
+
+def mrr_by_plan():
+    metrics = PlanMetrics.objects.select_related('plan').filter(active_subscriptions__gt=0).order_by('-mrr')
+    return [
+        {'plan': metric.plan.name, 'plan_id': metric.plan_id, 'active_subscriptions': metric.active_subscriptions, 'mrr': metric.mrr}
+        for metric in metrics
+    ]
+
+
+def churn(today, plans):
+    """Cancelamentos nos últimos 30 dias sobre as ativas no início da janela (em %)"""
+    since = today - timedelta(days=CHURN_WINDOW_DAYS)
+    cancellations = DailySubscriptionStats.objects.filter(date__gt=since, date__lte=today).aggregate(
+        total=Sum('cancellations'),
+    )['total'] or 0
+    baseline = DailySubscriptionStats.objects.filter(date=since, active_subscriptions__isnull=False).aggregate(
+        total=Sum('active_subscriptions'),
+    )['total']
+    if baseline is None:
+        # Sem retrato do início da janela: aproxima pelas ativas de hoje + canceladas
+        baseline = sum(plan['active_subscriptions'] for plan in plans) + cancellations
+    rate = Decimal(cancellations * 100) / baseline if baseline else Decimal(0)
+    return {'cancellations': cancellations, 'base': baseline, 'percent': rate.quantize(Decimal('0.01'))}
+
+
+def overdue_payments(today):
+    """Cobranças pendentes vencidas, no total e por faixa de atraso"""
+    aggregates = {}
+    for low, high in OVERDUE_BUCKETS:
+        condition = Q(due_date__lte=today - timedelta(days=low))
+        if high is not None:
+            condition &= Q(due_date__gte=today - timedelta(days=high))
+        label = f'{low}-{high}' if high else f'{low}+'
+        aggregates[f'count_{label}'] = Sum('payments', filter=condition)
+        aggregates[f'amount_{label}'] = Sum('amount', filter=condition)
+    totals = DailyPaymentStats.objects.filter(status='pending', due_date__lt=today).aggregate(
+        overdue_count=Sum('payments'), overdue_amount=Sum('amount'), **aggregates,
+    )
+    buckets = []
+    for low, high in OVERDUE_BUCKETS:
+        label = f'{low}-{high}' if high else f'{low}+'
+        buckets.append({
+            'label': label, 'count': totals[f'count_{label}'] or 0, 'amount': totals[f'amount_{label}'] or Decimal(0),
+        })
+    return {'count': totals['overdue_count'] or 0, 'amount': totals['overdue_amount'] or Decimal(0), 'buckets': buckets}
+
+
+def video_views_by_category(today):
+    since = today - timedelta(days=VIEWS_WINDOW_DAYS)
+    rows = (
+        DailyVideoViewStats.objects.filter(date__gt=since, date__lte=today)
+        .values('category_id', 'category__name').annotate(views=Sum('views')).order_by('-views')
+    )
+    return [
+        {'category': row['category__name'] or 'Sem categoria', 'category_id': row['category_id'], 'views': row['views']}
+        for row in rows
+    ]
+
+
+def get_dashboard(today=None):
+    today = today or timezone.localdate()
+    plans = mrr_by_plan()
+    return {
+        'date': today,
+        'mrr': sum((plan['mrr'] for plan in plans), Decimal(0)),
+        'active_subscriptions': sum(plan['active_subscriptions'] for plan in plans),
+        'mrr_by_plan': plans,
+        'churn': churn(today, plans),
+        'overdue': overdue_payments(today),
+        'video_views': video_views_by_category(today),
+    }
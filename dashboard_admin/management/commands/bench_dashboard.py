@@ -0,0 +1,136 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from dashboard_admin.kpis import OVERDUE_BUCKETS, get_dashboard
+from dashboard_admin.rollups import refresh_payments, refresh_subscriptions
+from payments.models import Payment, Plan, Subscription
+from students.models import Student
+from videos.models import Video
+
+STATUSES = ('pending', 'approved', 'approved', 'approved', 'rejected', 'cancelled')
+INSERT_BATCH = 50_000
+
+
+def naive_dashboard(today):
+    """As mesmas métricas agregando direto as tabelas de origem (para comparação)"""
+    active = Subscription.objects.filter(is_active=True, plan__isnull=False)
+    by_plan = list(active.values('plan_id', 'plan__price').annotate(total=Count('pk')).order_by())
+    cancellations = Subscription.objects.filter(cancelled_at__date__gt=today - timedelta(days=30)).count()
+    overdue = {}
+    for low, high in OVERDUE_BUCKETS:
+        condition = Q(due_date__lte=today - timedelta(days=low))
+        if high is not None:
+            condition &= Q(due_date__gte=today - timedelta(days=high))
+        overdue[f'count_{low}'] = Count('pk', filter=condition)
+        overdue[f'amount_{low}'] = Sum('amount', filter=condition)
+    overdue = Payment.objects.filter(status='pending', due_date__lt=today).aggregate(
+        overdue_count=Count('pk'), overdue_amount=Sum('amount'), **overdue,
+    )
+    views = list(Video.objects.values('category_id').annotate(views=Sum('views_count')).order_by())
+    return by_plan, cancellations, overdue, views
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - began) * 1000)
+    return statistics.median(samples)
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga do painel: mede a latência dos indicadores enquanto Payment cresce '
+        '(tudo é desfeito no final)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000,5000000', help='Totais de cobranças, separados por vírgula')
+        parser.add_argument('--students', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--skip-naive', action='store_true', help='Não mede as agregações diretas (lentas em tabelas grandes)')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        with transaction.atomic():
+            plans, students = self._seed(options['students'])
+            # Cobranças distribuídas em vencimentos diários até hoje: uma por aluna e dia
+            days = -(-sizes[-1] // len(students))
+            self.first_due = timezone.localdate() - timedelta(days=days)
+            today = timezone.localdate()
+            self.inserted = 0
+            for size in sizes:
+                began = time.perf_counter()
+                self._grow(size, plans, students)
+                grown = time.perf_counter() - began
+
+                began = time.perf_counter()
+                refresh_payments()
+                refresh_subscriptions()
+                refreshed = time.perf_counter() - began
+
+                dashboard = timed(lambda: get_dashboard(today), options['repeat'])
+                line = (
+                    f'{size:>9} cobranças | carga {grown:.1f}s | job incremental {refreshed:.2f}s | '
+                    f'painel (rollups) {dashboard:.1f}ms'
+                )
+                if not options['skip_naive']:
+                    naive = timed(lambda: naive_dashboard(today), max(options['repeat'] // 2, 1))
+                    line += f' | agregação direta {naive:.1f}ms'
+                self.stdout.write(line)
+            transaction.set_rollback(True)
+
+    def _seed(self, total):
+        plans = [
+            Plan.objects.create(name=f'Bench {plan_type}', slug=f'bench-dash-{plan_type}', description='', price=99, plan_type=plan_type)
+            for plan_type in ('monthly', 'quarterly', 'annual')
+        ]
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f'bench-dashboard-{index}', password='!') for index in range(total)], batch_size=5000,
+        )
+        users = CustomUser.objects.filter(username__startswith='bench-dashboard-').order_by('pk')
+        Student.objects.bulk_create(
+            [Student(user=user, cpf=f'bench-dash-{index}') for index, user in enumerate(users)], batch_size=5000,
+        )
+        students = list(Student.objects.filter(cpf__startswith='bench-dash-').order_by('pk').values_list('pk', flat=True))
+        Subscription.objects.bulk_create(
+            [
+                Subscription(student_id=student_id, plan=random.choice(plans), start_date=timezone.localdate() - timedelta(days=90))
+                for student_id in students
+            ],
+            batch_size=5000,
+        )
+        return [plan.pk for plan in plans], students
+
+    def _grow(self, size, plans, students):
+        """Insere cobranças até ``size`` com ``executemany`` (sem signals, como as cargas em lote)"""
+        columns = [
+            'student_id', 'plan_id', 'amount', 'due_date', 'status', 'mercadopago_payment_id', 'mercadopago_status',
+            'payment_method', 'reference_code', 'notes', 'created_at', 'updated_at',
+        ]
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(Payment._meta.db_table),
+            ', '.join(connection.ops.quote_name(column) for column in columns),
+            ', '.join(['%s'] * len(columns)),
+        )
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            while self.inserted < size:
+                batch = []
+                for index in range(self.inserted, min(self.inserted + INSERT_BATCH, size)):
+                    due_date = self.first_due + timedelta(days=index // len(students))
+                    batch.append((
+                        students[index % len(students)], plans[index % len(plans)], '99.00', due_date,
+                        random.choice(STATUSES), '', '', '', '', '', now, now,
+                    ))
+                cursor.executemany(sql, batch)
+                self.inserted += len(batch)
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard_admin.rollups import refresh_all
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os rollups do painel (job noturno de recuperação)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recalcula todas as cobranças, não só as alteradas')
+        parser.add_argument('--days', type=int, default=2, help='Dias de novas assinaturas/cancelamentos a recalcular')
+
+    def handle(self, *args, **options):
+        began = time.perf_counter()
+        refreshed = refresh_all(full=options['full'], days=options['days'])
+        self.stdout.write(f'Vencimentos recalculados: {refreshed} em {time.perf_counter() - began:.2f}s')
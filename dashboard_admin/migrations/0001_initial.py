@@ -0,0 +1,89 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('payments', '0005_dashboard_indexes'),
+        ('videos', '0006_chat_message'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Fonte')),
+                ('watermark', models.DateTimeField(verbose_name='Processado até')),
+            ],
+            options={
+                'verbose_name': 'Marca de Processamento',
+                'verbose_name_plural': 'Marcas de Processamento',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPaymentStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_date', models.DateField(verbose_name='Vencimento')),
+                ('status', models.CharField(max_length=20, verbose_name='Status')),
+                ('payments', models.IntegerField(default=0, verbose_name='Cobranças')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Valor')),
+            ],
+            options={
+                'verbose_name': 'Estatística Diária de Cobranças',
+                'verbose_name_plural': 'Estatísticas Diárias de Cobranças',
+                'constraints': [models.UniqueConstraint(fields=('due_date', 'status'), name='daily_payment_stats_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlanMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('active_subscriptions', models.IntegerField(default=0, verbose_name='Assinaturas ativas')),
+                ('mrr', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Receita recorrente mensal')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('plan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='payments.plan', verbose_name='Plano')),
+            ],
+            options={
+                'verbose_name': 'Métricas do Plano',
+                'verbose_name_plural': 'Métricas dos Planos',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySubscriptionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('new_subscriptions', models.IntegerField(default=0, verbose_name='Novas')),
+                ('cancellations', models.IntegerField(default=0, verbose_name='Cancelamentos')),
+                ('active_subscriptions', models.IntegerField(blank=True, null=True, verbose_name='Ativas no fim do dia')),
+                ('mrr', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True, verbose_name='MRR no fim do dia')),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='payments.plan', verbose_name='Plano')),
+            ],
+            options={
+                'verbose_name': 'Estatística Diária de Assinaturas',
+                'verbose_name_plural': 'Estatísticas Diárias de Assinaturas',
+                'constraints': [models.UniqueConstraint(fields=('date', 'plan'), name='daily_subscription_stats_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyVideoViewStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('views', models.BigIntegerField(default=0, verbose_name='Visualizações')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='videos.videocategory', verbose_name='Categoria')),
+            ],
+            options={
+                'verbose_name': 'Estatística Diária de Visualizações',
+                'verbose_name_plural': 'Estatísticas Diárias de Visualizações',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('date', 'category'), name='daily_video_views_unique'), models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('date',), name='daily_video_views_uncategorized_unique')],
+            },
+        ),
+    ]
@@ -1,3 +1,85 @@
 from django.db import models
+from django.db.models import Q
 
-# Create your models here.
+
+class PlanMetrics(models.Model):
+    """Assinaturas ativas e MRR atuais por plano (mantido pelos signals)"""
+    plan = models.OneToOneField('payments.Plan', on_delete=models.CASCADE, related_name='metrics', verbose_name='Plano')
+    active_subscriptions = models.IntegerField(default=0, verbose_name='Assinaturas ativas')
+    mrr = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Receita recorrente mensal')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Métricas do Plano'
+        verbose_name_plural = 'Métricas dos Planos'
+
+    def __str__(self):
+        return f"{self.plan}: {self.active_subscriptions} ativas"
+
+
+class DailySubscriptionStats(models.Model):
+    """Assinaturas por dia e plano: novas, canceladas e o retrato das ativas no fim do dia"""
+    date = models.DateField(verbose_name='Data')
+    plan = models.ForeignKey('payments.Plan', on_delete=models.CASCADE, verbose_name='Plano')
+    new_subscriptions = models.IntegerField(default=0, verbose_name='Novas')
+    cancellations = models.IntegerField(default=0, verbose_name='Cancelamentos')
+    # Preenchidos pelo job noturno
+    active_subscriptions = models.IntegerField(null=True, blank=True, verbose_name='Ativas no fim do dia')
+    mrr = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, verbose_name='MRR no fim do dia')
+
+    class Meta:
+        verbose_name = 'Estatística Diária de Assinaturas'
+        verbose_name_plural = 'Estatísticas Diárias de Assinaturas'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'plan'], name='daily_subscription_stats_unique'),
+        ]
+
+
+class DailyPaymentStats(models.Model):
+    """Quantidade e valor das cobranças por vencimento e status"""
+    due_date = models.DateField(verbose_name='Vencimento')
+    status = models.CharField(max_length=20, verbose_name='Status')
+    payments = models.IntegerField(default=0, verbose_name='Cobranças')
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Valor')
+
+    class Meta:
+        verbose_name = 'Estatística Diária de Cobranças'
+        verbose_name_plural = 'Estatísticas Diárias de Cobranças'
+        constraints = [
+            models.UniqueConstraint(fields=['due_date', 'status'], name='daily_payment_stats_unique'),
+        ]
+
+
+class DailyVideoViewStats(models.Model):
+    """Visualizações de vídeos por dia e categoria"""
+    date = models.DateField(verbose_name='Data')
+    category = models.ForeignKey(
+        'videos.VideoCategory', on_delete=models.CASCADE, null=True, blank=True, verbose_name='Categoria',
+    )
+    views = models.BigIntegerField(default=0, verbose_name='Visualizações')
+
+    class Meta:
+        verbose_name = 'Estatística Diária de Visualizações'
+        verbose_name_plural = 'Estatísticas Diárias de Visualizações'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'category'], condition=Q(category__isnull=False), name='daily_video_views_unique',
+            ),
+            # Vídeos sem categoria
+            models.UniqueConstraint(
+                fields=['date'], condition=Q(category__isnull=True), name='daily_video_views_uncategorized_unique',
+            ),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """Até onde o job de recuperação já processou cada fonte"""
+    name = models.CharField(max_length=50, unique=True, verbose_name='Fonte')
+    watermark = models.DateTimeField(verbose_name='Processado até')
+
+    class Meta:
+        verbose_name = 'Marca de Processamento'
+        verbose_name_plural = 'Marcas de Processamento'
+
+    def __str__(self):
+        return f"{self.name}: {self.watermark}"
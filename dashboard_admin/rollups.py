@@ -0,0 +1,246 @@
+"""
+Tabelas de resumo (rollups) do painel administrativo.
+
+O painel nunca agrega ``Payment``, ``Subscription`` ou ``Video`` diretamente:
+lê apenas as tabelas deste app, que crescem com o número de dias e planos,
+não com o volume de cobranças.
+
+As tabelas são mantidas de duas formas:
+
+* incrementalmente, pelos signals de save/delete (deltas aplicados com
+  ``F()`` na mesma transação da alteração) e pelo flush dos contadores de
+  visualização;
+* pelo job ``refresh_dashboard_rollups``, que recalcula os vencimentos com
+  cobranças alteradas desde a última execução (``updated_at`` acima da marca
+  d'água), cobrindo os caminhos em lote que não disparam signals
+  (``bulk_create``/``update()`` do faturamento, webhooks e conciliação), e
+  refaz o retrato diário das assinaturas.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from payments.billing import CYCLE_MONTHS
+from payments.models import Payment, Plan, Subscription
+from videos.models import Video
+
+from .models import (
+    DailyPaymentStats,
+    DailySubscriptionStats,
+    DailyVideoViewStats,
+    PlanMetrics,
+    RollupWatermark,
+)
+
+# Sobreposição da marca d'água: cobre transações que gravaram um updated_at
+# anterior ao início do job mas só confirmaram depois
+WATERMARK_OVERLAP = timedelta(minutes=5)
+RECOMPUTE_CHUNK = 500
+
+
+def bump(model, lookup, **deltas):
+    """Soma ``deltas`` à linha identificada por ``lookup``, criando-a se preciso"""
+    deltas = {field: amount for field, amount in deltas.items() if amount}
+    if not deltas:
+        return
+    values = {field: F(field) + amount for field, amount in deltas.items()}
+    if model.objects.filter(**lookup).update(**values):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Outra transação criou a linha entre o UPDATE e o INSERT
+        model.objects.filter(**lookup).update(**values)
+
+
+def monthly_value(price, plan_type):
+    """Valor do plano normalizado para um mês (trimestral / 3, anual / 12...)"""
+    return (Decimal(price) / CYCLE_MONTHS.get(plan_type, 1)).quantize(Decimal('0.01'))
+
+
+def _plan_values(plan_ids):
+    plans = Plan.objects.filter(pk__in=[plan_id for plan_id in plan_ids if plan_id]).values_list('pk', 'price', 'plan_type')
+    return {pk: monthly_value(price, plan_type) for pk, price, plan_type in plans}
+
+
+# Assinaturas
+
+def apply_subscription_change(previous, subscription):
+    """
+    Aplica a alteração de uma assinatura às métricas.
+
+    ``previous`` tem ``plan_id``, ``is_active`` e ``cancelled_at`` gravados
+    antes do save (``None`` para assinaturas novas).
+    """
+    old_plan = previous['plan_id'] if previous and previous['is_active'] else None
+    new_plan = subscription.plan_id if subscription.is_active else None
+    if old_plan != new_plan:
+        values = _plan_values([old_plan, new_plan])
+        if old_plan in values:
+            bump(PlanMetrics, {'plan_id': old_plan}, active_subscriptions=-1, mrr=-values[old_plan])
+        if new_plan in values:
+            bump(PlanMetrics, {'plan_id': new_plan}, active_subscriptions=1, mrr=values[new_plan])
+
+    if not subscription.plan_id:
+        return
+    if previous is None:
+        bump(DailySubscriptionStats, {'date': subscription.start_date, 'plan_id': subscription.plan_id}, new_subscriptions=1)
+    if subscription.cancelled_at and not (previous and previous['cancelled_at']):
+        day = timezone.localdate(subscription.cancelled_at)
+        bump(DailySubscriptionStats, {'date': day, 'plan_id': subscription.plan_id}, cancellations=1)
+
+
+def apply_subscription_delete(subscription):
+    if subscription.is_active and subscription.plan_id:
+        value = _plan_values([subscription.plan_id]).get(subscription.plan_id)
+        if value is not None:
+            bump(PlanMetrics, {'plan_id': subscription.plan_id}, active_subscriptions=-1, mrr=-value)
+
+
+def _plan_totals(plan_ids=None):
+    queryset = Subscription.objects.filter(is_active=True, plan__isnull=False)
+    if plan_ids is not None:
+        queryset = queryset.filter(plan_id__in=plan_ids)
+    rows = queryset.values('plan_id', 'plan__price', 'plan__plan_type').annotate(total=Count('pk')).order_by()
+    return {
+        row['plan_id']: (row['total'], monthly_value(row['plan__price'], row['plan__plan_type']) * row['total'])
+        for row in rows
+    }
+
+
+def refresh_plan_metrics(plan_ids=None):
+    """Recalcula ``PlanMetrics`` (de todos os planos ou de ``plan_ids``)"""
+    totals = _plan_totals(plan_ids)
+    plans = Plan.objects.all() if plan_ids is None else Plan.objects.filter(pk__in=plan_ids)
+    rows = [
+        PlanMetrics(plan_id=plan_id, active_subscriptions=totals.get(plan_id, (0, 0))[0], mrr=totals.get(plan_id, (0, 0))[1])
+        for plan_id in plans.values_list('pk', flat=True)
+    ]
+    PlanMetrics.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['plan'], update_fields=['active_subscriptions', 'mrr', 'updated_at'],
+    )
+    return totals
+
+
+def refresh_subscriptions(today=None, days=2):
+    """
+    Refaz as métricas atuais, o retrato de hoje e os eventos (novas e
+    canceladas) dos últimos ``days`` dias.
+    """
+    today = today or timezone.localdate()
+    since = today - timedelta(days=days - 1)
+    with transaction.atomic():
+        totals = refresh_plan_metrics()
+        DailySubscriptionStats.objects.bulk_create(
+            [
+                DailySubscriptionStats(date=today, plan_id=plan_id, active_subscriptions=active, mrr=mrr)
+                for plan_id, (active, mrr) in totals.items()
+            ],
+            update_conflicts=True, unique_fields=['date', 'plan'], update_fields=['active_subscriptions', 'mrr'],
+        )
+        DailySubscriptionStats.objects.filter(date=today).exclude(plan_id__in=list(totals)).update(
+            active_subscriptions=0, mrr=0,
+        )
+
+        events = {}
+        started = (
+            Subscription.objects.filter(plan__isnull=False, start_date__range=(since, today))
+            .values_list('start_date', 'plan_id').annotate(total=Count('pk')).order_by()
+        )
+        for day, plan_id, total in started:
+            events.setdefault((day, plan_id), [0, 0])[0] = total
+        cancelled = (
+            Subscription.objects.filter(plan__isnull=False, cancelled_at__date__range=(since, today))
+            .annotate(day=TruncDate('cancelled_at')).values_list('day', 'plan_id').annotate(total=Count('pk')).order_by()
+        )
+        for day, plan_id, total in cancelled:
+            events.setdefault((day, plan_id), [0, 0])[1] = total
+
+        DailySubscriptionStats.objects.filter(date__range=(since, today)).update(new_subscriptions=0, cancellations=0)
+        DailySubscriptionStats.objects.bulk_create(
+            [
+                DailySubscriptionStats(date=day, plan_id=plan_id, new_subscriptions=new, cancellations=cancellations)
+                for (day, plan_id), (new, cancellations) in events.items()
+            ],
+            update_conflicts=True, unique_fields=['date', 'plan'], update_fields=['new_subscriptions', 'cancellations'],
+        )
+
+
+# Cobranças
+
+def apply_payment_change(previous, payment):
+    """``previous`` tem ``due_date``, ``status`` e ``amount`` antes do save (ou ``None``)"""
+    if previous and (previous['due_date'], previous['status'], previous['amount']) == (payment.due_date, payment.status, Decimal(payment.amount)):
+        return
+    if previous:
+        bump(DailyPaymentStats, {'due_date': previous['due_date'], 'status': previous['status']}, payments=-1, amount=-previous['amount'])
+    bump(DailyPaymentStats, {'due_date': payment.due_date, 'status': payment.status}, payments=1, amount=Decimal(payment.amount))
+
+
+def apply_payment_delete(payment):
+    bump(DailyPaymentStats, {'due_date': payment.due_date, 'status': payment.status}, payments=-1, amount=-Decimal(payment.amount))
+
+
+def recompute_payment_dates(due_dates):
+    """Recalcula exatamente os rollups dos vencimentos informados"""
+    due_dates = sorted(due_dates)
+    for start in range(0, len(due_dates), RECOMPUTE_CHUNK):
+        chunk = due_dates[start:start + RECOMPUTE_CHUNK]
+        rows = (
+            Payment.objects.filter(due_date__in=chunk).values_list('due_date', 'status')
+            .annotate(total=Count('pk'), amount=Sum('amount')).order_by()
+        )
+        with transaction.atomic():
+            DailyPaymentStats.objects.filter(due_date__in=chunk).delete()
+            DailyPaymentStats.objects.bulk_create([
+                DailyPaymentStats(due_date=due_date, status=status, payments=total, amount=amount)
+                for due_date, status, total, amount in rows
+            ])
+
+
+def refresh_payments(full=False):
+    """
+    Recalcula os vencimentos com cobranças alteradas desde a última execução
+    (ou todos, com ``full``). Retorna o número de vencimentos recalculados.
+    """
+    started = timezone.now()
+    state = RollupWatermark.objects.filter(name='payments').first()
+    if full or state is None:
+        DailyPaymentStats.objects.all().delete()
+        due_dates = Payment.objects.order_by().values_list('due_date', flat=True).distinct()
+    else:
+        due_dates = (
+            Payment.objects.filter(updated_at__gte=state.watermark - WATERMARK_OVERLAP)
+            .order_by().values_list('due_date', flat=True).distinct()
+        )
+    due_dates = list(due_dates)
+    recompute_payment_dates(due_dates)
+    RollupWatermark.objects.update_or_create(name='payments', defaults={'watermark': started})
+    return len(due_dates)
+
+
+# Visualizações
+
+def record_video_views(deltas, day=None):
+    """Soma os incrementos de ``views_count`` gravados pelo buffer de contadores"""
+    views = {video_id: fields.get('views_count', 0) for video_id, fields in deltas.items()}
+    views = {video_id: amount for video_id, amount in views.items() if amount}
+    if not views:
+        return
+    day = day or timezone.localdate()
+    by_category = {}
+    for video_id, category_id in Video.objects.filter(pk__in=list(views)).order_by().values_list('pk', 'category_id'):
+        by_category[category_id] = by_category.get(category_id, 0) + views[video_id]
+    for category_id, amount in by_category.items():
+        bump(DailyVideoViewStats, {'date': day, 'category_id': category_id}, views=amount)
+
+
+def refresh_all(full=False, days=2):
+    refreshed = refresh_payments(full=full)
+    refresh_subscriptions(days=days)
+    return refreshed
@@ -0,0 +1,62 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from payments.models import Payment, Plan, Subscription
+from videos.counters import counters_flushed
+
+from . import rollups
+
+
+def _snapshot(instance, *fields):
+    """Valores gravados antes do save (``None`` para objetos novos)"""
+    if instance._state.adding or not instance.pk:
+        return None
+    return type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(pre_save, sender=Payment)
+def snapshot_payment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._rollup_previous = _snapshot(instance, 'due_date', 'status', 'amount')
+
+
+@receiver(post_save, sender=Payment)
+def update_payment_rollups(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    rollups.apply_payment_change(instance.__dict__.pop('_rollup_previous', None), instance)
+
+
+@receiver(post_delete, sender=Payment)
+def remove_payment_from_rollups(sender, instance, **kwargs):
+    rollups.apply_payment_delete(instance)
+
+
+@receiver(pre_save, sender=Subscription)
+def snapshot_subscription(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._rollup_previous = _snapshot(instance, 'plan_id', 'is_active', 'cancelled_at')
+
+
+@receiver(post_save, sender=Subscription)
+def update_subscription_rollups(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    rollups.apply_subscription_change(instance.__dict__.pop('_rollup_previous', None), instance)
+
+
+@receiver(post_delete, sender=Subscription)
+def remove_subscription_from_rollups(sender, instance, **kwargs):
+    rollups.apply_subscription_delete(instance)
+
+
+@receiver(post_save, sender=Plan)
+def refresh_plan_mrr(sender, instance, raw=False, **kwargs):
+    """Mudança de preço ou tipo altera o MRR de todas as assinaturas do plano"""
+    if not raw:
+        rollups.refresh_plan_metrics([instance.pk])
+
+
+@receiver(counters_flushed)
+def record_video_views(sender, deltas, **kwargs):
+    rollups.record_video_views(deltas)
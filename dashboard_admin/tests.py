@@ -1,3 +1,112 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from payments.models import Payment, Plan, Subscription
+from students.models import Student
+from videos.counters import CounterBuffer
+from videos.models import Video, VideoCategory
+
+from . import rollups
+from .kpis import get_dashboard
+from .models import DailyPaymentStats, DailyVideoViewStats, PlanMetrics
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.monthly = Plan.objects.create(name='Mensal', slug='mensal', description='', price=100, plan_type='monthly')
+        cls.annual = Plan.objects.create(name='Anual', slug='anual', description='', price=1200, plan_type='annual')
+        cls.students = [
+            Student.objects.create(user=CustomUser.objects.create_user(f'aluna-kpi-{index}'), cpf=f'kpi-{index}')
+            for index in range(3)
+        ]
+
+    def payment(self, student, days_ago, status='pending', amount=100):
+        return Payment.objects.create(
+            student=student, amount=amount, due_date=timezone.localdate() - timedelta(days=days_ago), status=status,
+        )
+
+    def payment_stats(self):
+        return sorted(DailyPaymentStats.objects.filter(payments__gt=0).values_list('due_date', 'status', 'payments', 'amount'))
+
+    def test_signals_keep_rollups_equal_to_full_recompute(self):
+        first = Subscription.objects.create(student=self.students[0], plan=self.monthly)
+        Subscription.objects.create(student=self.students[1], plan=self.annual)
+        Subscription.objects.create(student=self.students[2], plan=self.monthly)
+        first.plan = self.annual
+        first.save()
+        cancelled = Subscription.objects.get(student=self.students[2])
+        cancelled.is_active = False
+        cancelled.cancelled_at = timezone.now()
+        cancelled.save()
+
+        late = self.payment(self.students[0], 40)
+        self.payment(self.students[1], 5)
+        self.payment(self.students[2], 5, status='approved')
+        late.status = 'approved'
+        late.save()
+        self.payment(self.students[0], 70).delete()
+
+        metrics = dict(PlanMetrics.objects.values_list('plan_id', 'mrr'))
+        self.assertEqual(metrics, {self.monthly.pk: Decimal('0'), self.annual.pk: Decimal('200')})
+        incremental = self.payment_stats()
+
+        rollups.refresh_all(full=True)
+        self.assertEqual(dict(PlanMetrics.objects.values_list('plan_id', 'mrr')), metrics)
+        self.assertEqual(self.payment_stats(), incremental)
+
+        kpis = get_dashboard()
+        self.assertEqual(kpis['active_subscriptions'], 2)
+        self.assertEqual(kpis['churn']['cancellations'], 1)
+        self.assertEqual(kpis['overdue']['count'], 1)
+        self.assertEqual(kpis['overdue']['buckets'][0]['amount'], Decimal('100'))
+
+    def test_refresh_picks_up_bulk_updates(self):
+        payment = self.payment(self.students[0], 10)
+        rollups.refresh_payments()
+        # update() não dispara signals: só o job de recuperação vê a mudança
+        Payment.objects.filter(pk=payment.pk).update(status='approved', updated_at=timezone.now())
+        self.assertEqual(self.payment_stats()[0][1], 'pending')
+
+        self.assertEqual(rollups.refresh_payments(), 1)
+        self.assertEqual(self.payment_stats(), [(payment.due_date, 'approved', 1, Decimal('100'))])
+
+    def test_counter_flush_records_views_by_category(self):
+        category = VideoCategory.objects.create(name='Yoga', slug='yoga')
+        video = Video.objects.create(title='Aula', slug='aula', description='', category=category)
+        loose = Video.objects.create(title='Solta', slug='solta', description='')
+        buffer = CounterBuffer()
+        for _ in range(3):
+            buffer.incr(video.pk)
+        buffer.incr(loose.pk)
+        buffer.incr(video.pk, 'likes_count')
+        buffer.flush()
+
+        self.assertCountEqual(
+            DailyVideoViewStats.objects.values_list('category_id', 'views'), [(None, 1), (category.pk, 3)],
+        )
+        self.assertEqual(get_dashboard()['video_views'][0], {'category': 'Yoga', 'category_id': category.pk, 'views': 3})
+
+    def test_dashboard_reads_only_rollups(self):
+        Subscription.objects.create(student=self.students[0], plan=self.monthly)
+        self.payment(self.students[0], 10)
+        with CaptureQueriesContext(connection) as queries:
+            get_dashboard()
+        for query in queries:
+            self.assertNotIn(Payment._meta.db_table, query['sql'])
+            self.assertNotIn(Subscription._meta.db_table, query['sql'])
 
-# Create your tests here.
+    def test_dashboard_views_require_staff(self):
+        user = CustomUser.objects.create_user('equipe', is_staff=True)
+        self.assertEqual(self.client.get(reverse('dashboard_admin:dashboard')).status_code, 302)
+        self.client.force_login(user)
+        self.assertContains(self.client.get(reverse('dashboard_admin:dashboard')), 'MRR por plano')
+        data = self.client.get(reverse('dashboard_admin:dashboard_api')).json()
+        self.assertEqual(data['active_subscriptions'], 0)
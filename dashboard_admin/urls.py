@@ -1,7 +1,10 @@
 from django.urls import path
 
+from . import views
+
 app_name = 'dashboard_admin'
 
 urlpatterns = [
-    # Adicionar URLs depois
-]
\ No newline at end of file
+    path('', views.dashboard, name='dashboard'),
+    path('api/kpis/', views.dashboard_api, name='dashboard_api'),
+]
@@ -1,3 +1,17 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
 from django.shortcuts import render
 
-# Create your views here.
+from .kpis import get_dashboard
+
+
+@staff_member_required
+def dashboard(request):
+    """Painel com os indicadores do negócio (lê apenas os rollups)"""
+    return render(request, 'dashboard_admin/dashboard.html', {'kpis': get_dashboard()})
+
+
+@staff_member_required
+def dashboard_api(request):
+    return JsonResponse(get_dashboard(), encoder=DjangoJSONEncoder)
@@ -0,0 +1,28 @@
+"""
+Configuração do gunicorn (lida automaticamente do diretório de trabalho).
+
+O HTTP é servido pela aplicação WSGI (``config.wsgi``) em workers ``gthread``:
+basta ``gunicorn`` sem argumentos. Respostas em streaming (vídeos com Range,
+exportações) saem bloco a bloco no WSGI; sob ASGI o Django leria os iteradores
+síncronos inteiros para a memória. O WebSocket do chat roda num processo ASGI
+separado (``gunicorn -c gunicorn_chat.conf.py``).
+
+``WEB_CONCURRENCY`` e ``WORKER_CONCURRENCY`` (threads por worker) são as mesmas
+variáveis que dimensionam o pool de conexões em ``config/settings/database.py``.
+As métricas de workers de uma execução anterior (``METRICS_DIR``, ver
+``core.metrics``) são apagadas na partida.
+"""
+import shutil
+from pathlib import Path
+
+from decouple import config
+
+wsgi_app = 'config.wsgi:application'
+worker_class = 'gthread'
+workers = config('WEB_CONCURRENCY', default=2, cast=int)
+threads = config('WORKER_CONCURRENCY', default=10, cast=int)
+
+
+def on_starting(server):
+    metrics_dir = config('METRICS_DIR', default=str(Path(__file__).resolve().parent / '.metrics'))
+    shutil.rmtree(metrics_dir, ignore_errors=True)
@@ -0,0 +1,14 @@
+"""
+Processo do chat das aulas ao vivo: ``gunicorn -c gunicorn_chat.conf.py``.
+
+Serve apenas o WebSocket (``config.asgi``) em workers do uvicorn; o proxy
+encaminha ``/ws/`` para ``CHAT_BIND`` e o restante para o gunicorn do HTTP
+(``gunicorn.conf.py``). Com mais de um worker, use um broker compartilhado
+(``CHAT_BROKER_BACKEND``) para que as mensagens cheguem a todas as salas.
+"""
+from decouple import config
+
+wsgi_app = 'config.asgi:application'
+worker_class = 'uvicorn_worker.UvicornWorker'
+bind = config('CHAT_BIND', default='127.0.0.1:8001')
+workers = config('CHAT_WEB_CONCURRENCY', default=1, cast=int)
@@ -1,3 +1,64 @@
 from django.contrib import admin
 
-# Register your models here.
+from core.paginator import EstimatedCountPaginator
+
+from .models import BillingRun, MercadoPagoNotification, Payment, Plan, Subscription
+
+
+@admin.register(Plan)
+class PlanAdmin(admin.ModelAdmin):
+    list_display = ['name', 'plan_type', 'price', 'classes_per_week', 'has_video_access', 'is_active', 'order']
+    list_filter = ['plan_type', 'is_active']
+    search_fields = ['name', 'slug']
+    prepopulated_fields = {'slug': ['name']}
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    list_display = ['student', 'amount', 'due_date', 'status', 'plan', 'payment_date', 'payment_method']
+    list_filter = ['status']
+    # Payment.__str__ usa str(student), que usa o usuário
+    list_select_related = ['student__user', 'plan']
+    search_fields = [
+        'reference_code', 'mercadopago_payment_id', 'student__cpf', 'student__user__first_name', 'student__user__last_name',
+    ]
+    autocomplete_fields = ['student', 'plan']
+    readonly_fields = ['mercadopago_response', 'created_at', 'updated_at']
+    # Índice payment_due_date_status_idx começa por due_date
+    date_hierarchy = 'due_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Subscription)
+class SubscriptionAdmin(admin.ModelAdmin):
+    list_display = ['student', 'plan', 'is_active', 'start_date', 'end_date', 'auto_renewal', 'cancelled_at']
+    list_filter = ['is_active', 'auto_renewal', 'plan']
+    list_select_related = ['student__user', 'plan']
+    search_fields = ['mercadopago_subscription_id', 'student__cpf', 'student__user__first_name', 'student__user__last_name']
+    autocomplete_fields = ['student', 'plan']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(BillingRun)
+class BillingRunAdmin(admin.ModelAdmin):
+    list_display = [
+        'period_start', 'period_end', 'status', 'subscriptions_processed', 'payments_created', 'payments_skipped',
+        'elapsed_seconds', 'started_at',
+    ]
+    list_filter = ['status']
+    readonly_fields = [field.name for field in BillingRun._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(MercadoPagoNotification)
+class MercadoPagoNotificationAdmin(admin.ModelAdmin):
+    list_display = ['topic', 'resource_id', 'action', 'status', 'attempts', 'received_at', 'processed_at']
+    list_filter = ['status', 'topic']
+    search_fields = ['resource_id']
+    readonly_fields = ['payload', 'last_error', 'received_at', 'processed_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
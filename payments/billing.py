@@ -0,0 +1,173 @@
+"""
+Faturamento das assinaturas: gera as cobranças (``Payment``) de cada ciclo.
+
+O vencimento de cada ciclo é a data de início da assinatura somada a
+múltiplos da duração do plano (1, 3, 6 ou 12 meses, com o dia limitado ao
+fim do mês). Uma rodada gera todos os vencimentos dentro da janela
+``[period_start, period_end]``; o ``end_date`` da assinatura é exclusivo (o
+acesso termina nesse dia, então não há cobrança com vencimento nele).
+
+As assinaturas são lidas em blocos por chave (``pk > último processado``),
+com uma consulta para o bloco, uma para as cobranças de assinatura já
+existentes e um ``bulk_create`` num savepoint. A restrição única (aluna,
+vencimento), restrita às cobranças de assinatura (referência ``SUB-``, ver
+``reference_code``), torna a rodada idempotente sem considerar cobranças
+avulsas no mesmo dia; se outra rodada gravar parte do bloco entre a consulta
+e o INSERT, o bloco é regravado linha a linha e só as inseridas contam. O ponto de retomada gravado em ``BillingRun``
+na mesma transação de cada bloco permite continuar uma rodada interrompida.
+"""
+import calendar
+import time
+from datetime import date
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BillingRun, Payment, Subscription
+
+# Prefixo das referências das cobranças de assinatura (ver payment_unique_student_due_date)
+REFERENCE_PREFIX = 'SUB-'
+
+CYCLE_MONTHS = {
+    'monthly': 1,
+    'quarterly': 3,
+    'semiannual': 6,
+    'annual': 12,
+}
+
+
+def add_months(day, months):
+    """Soma ``months`` meses a ``day``, limitando ao último dia do mês"""
+    month_index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(month_index, 12)
+    month += 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def due_dates(start_date, cycle_months, period_start, period_end, end_date=None):
+    """Vencimentos do ciclo dentro de ``[period_start, period_end]`` e antes de ``end_date``"""
+    if start_date > period_end or (end_date and start_date >= end_date):
+        return []
+    elapsed = (period_start.year - start_date.year) * 12 + period_start.month - start_date.month
+    # Começa um ciclo antes da estimativa para cobrir o ajuste de fim de mês
+    cycle = max(elapsed // cycle_months - 1, 0)
+    dates = []
+    while True:
+        due = add_months(start_date, cycle * cycle_months)
+        if due > period_end or (end_date and due >= end_date):
+            return dates
+        if due >= period_start:
+            dates.append(due)
+        cycle += 1
+
+
+def reference_code(subscription_id, due_date):
+    """Referência estável da cobrança (``external_reference`` no Mercado Pago)"""
+    return f'{REFERENCE_PREFIX}{subscription_id}-{due_date:%Y%m%d}'
+
+
+def billable_subscriptions(period_start, period_end):
+    return Subscription.objects.filter(
+        Q(end_date__isnull=True) | Q(end_date__gt=period_start),
+        is_active=True, plan__isnull=False, start_date__lte=period_end,
+    )
+
+
+def _bill_chunk(rows, period_start, period_end):
+    """Cria as cobranças de um bloco de assinaturas; retorna ``(criadas, existentes)``"""
+    candidates = []
+    for subscription_id, student_id, plan_id, plan_type, price, start_date, end_date in rows:
+        cycle_months = CYCLE_MONTHS.get(plan_type)
+        if cycle_months is None:
+            continue
+        for due in due_dates(start_date, cycle_months, period_start, period_end, end_date):
+            candidates.append(Payment(
+                student_id=student_id, plan_id=plan_id, amount=price, due_date=due,
+                reference_code=reference_code(subscription_id, due),
+            ))
+    if not candidates:
+        return 0, 0
+
+    existing = _existing_charges(candidates, period_start, period_end)
+    created = _insert([payment for payment in candidates if (payment.student_id, payment.due_date) not in existing])
+    return created, len(candidates) - created
+
+
+def _existing_charges(candidates, period_start, period_end):
+    """(aluna, vencimento) que já têm cobrança de assinatura na janela"""
+    return set(
+        Payment.objects.filter(
+            student_id__in={payment.student_id for payment in candidates},
+            due_date__range=(period_start, period_end),
+            reference_code__startswith=REFERENCE_PREFIX,
+        ).order_by().values_list('student_id', 'due_date')
+    )
+
+
+def _insert(payments):
+    """Grava ``payments`` e retorna quantas foram de fato inseridas"""
+    if not payments:
+        return 0
+    try:
+        with transaction.atomic():
+            Payment.objects.bulk_create(payments)
+        return len(payments)
+    except IntegrityError:
+        pass
+    # Outra rodada gravou algum destes vencimentos depois da consulta
+    created = 0
+    for payment in payments:
+        try:
+            with transaction.atomic():
+                Payment.objects.bulk_create([payment])
+        except IntegrityError:
+            continue
+        created += 1
+    return created
+
+
+def generate_invoices(period_start, period_end, chunk_size=None, resume=True, progress=None):
+    """
+    Gera as cobranças com vencimento em ``[period_start, period_end]``.
+
+    Com ``resume`` continua a última rodada não concluída da mesma janela.
+    ``progress(run)`` é chamado após cada bloco. Retorna a ``BillingRun``.
+    """
+    chunk_size = chunk_size or settings.BILLING_CHUNK_SIZE
+    run = None
+    if resume:
+        run = BillingRun.objects.filter(
+            period_start=period_start, period_end=period_end, status='running',
+        ).order_by('-started_at').first()
+    if run is None:
+        run = BillingRun.objects.create(period_start=period_start, period_end=period_end)
+
+    queryset = billable_subscriptions(period_start, period_end).order_by('pk').values_list(
+        'pk', 'student_id', 'plan_id', 'plan__plan_type', 'plan__price', 'start_date', 'end_date',
+    )
+    began = time.perf_counter() - run.elapsed_seconds
+    while True:
+        rows = list(queryset.filter(pk__gt=run.last_subscription_id)[:chunk_size])
+        if not rows:
+            break
+        with transaction.atomic():
+            created, skipped = _bill_chunk(rows, period_start, period_end)
+            run.last_subscription_id = rows[-1][0]
+            run.subscriptions_processed += len(rows)
+            run.payments_created += created
+            run.payments_skipped += skipped
+            run.elapsed_seconds = time.perf_counter() - began
+            run.save(update_fields=[
+                'last_subscription_id', 'subscriptions_processed', 'payments_created',
+                'payments_skipped', 'elapsed_seconds',
+            ])
+        if progress:
+            progress(run)
+
+    run.status = 'finished'
+    run.finished_at = timezone.now()
+    run.elapsed_seconds = time.perf_counter() - began
+    run.save(update_fields=['status', 'finished_at', 'elapsed_seconds'])
+    return run
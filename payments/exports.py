@@ -0,0 +1,41 @@
+from django.utils.dateparse import parse_date
+
+from core.exports import Column, Export, choice_label
+
+from .models import Payment
+
+
+def _date_param(params, key):
+    """Data ``AAAA-MM-DD`` de ``params[key]``; ``None`` se ausente ou inválida (ex.: 2024-02-30)"""
+    try:
+        return parse_date(params.get(key) or '')
+    except ValueError:
+        return None
+
+
+def payment_export(params):
+    """Razão de cobranças; aceita ``?status=``, ``?from=`` e ``?to=`` (vencimento)"""
+    queryset = Payment.objects.order_by('due_date', 'pk')
+    if params.get('status'):
+        queryset = queryset.filter(status=params['status'])
+    start, end = _date_param(params, 'from'), _date_param(params, 'to')
+    if start:
+        queryset = queryset.filter(due_date__gte=start)
+    if end:
+        queryset = queryset.filter(due_date__lte=end)
+    columns = [
+        Column('ID', 'pk'),
+        Column('ID Aluna', 'student_id'),
+        Column('Nome', 'student__user__first_name'),
+        Column('Sobrenome', 'student__user__last_name'),
+        Column('CPF', 'student__cpf'),
+        Column('Plano', 'plan__name'),
+        Column('Valor', 'amount'),
+        Column('Vencimento', 'due_date'),
+        Column('Data de Pagamento', 'payment_date'),
+        Column('Status', 'status', choice_label(Payment._meta.get_field('status'))),
+        Column('Método de Pagamento', 'payment_method'),
+        Column('ID Mercado Pago', 'mercadopago_payment_id'),
+        Column('Código de Referência', 'reference_code'),
+    ]
+    return Export('cobrancas', queryset, columns)
@@ -0,0 +1,114 @@
+"""
+Servidor HTTP local que imita ``GET /v1/payments/<id>`` da API do Mercado Pago.
+
+Usado nos testes e no ``bench_mp_webhooks``::
+
+    with FakeMercadoPago(latency=0.02) as fake:
+        fake.add_payment('123', status='approved', external_reference='REF-1')
+        client = MercadoPagoClient(access_token='teste', base_url=fake.url)
+
+Conta requisições e conexões TCP abertas, para conferir o keep-alive do
+cliente, e permite simular erros por id (``fake.failures['123'] = 500``).
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.utils import timezone
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Cabeçalhos e corpo saem em escritas separadas; sem isso o keep-alive
+    # esbarra no Nagle + ACK atrasado (~40ms por resposta)
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.fake._count('connections')
+
+    def do_GET(self):
+        fake = self.server.fake
+        fake._count('requests')
+        if fake.latency:
+            time.sleep(fake.latency)
+        prefix = '/v1/payments/'
+        payment_id = self.path[len(prefix):] if self.path.startswith(prefix) else None
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self._reply(401, {'message': 'unauthorized'})
+        if payment_id in fake.failures:
+            return self._reply(fake.failures[payment_id], {'message': 'simulated failure'})
+        if payment_id not in fake.payments:
+            return self._reply(404, {'message': 'Payment not found'})
+        return self._reply(200, fake.payments[payment_id])
+
+    def _reply(self, status, body):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeMercadoPago:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.payments = {}
+        self.failures = {}
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def add_payment(self, payment_id, status='approved', external_reference='', **extra):
+        now = timezone.now().isoformat()
+        payment = {
+            'id': int(payment_id) if str(payment_id).isdigit() else payment_id,
+            'status': status,
+            'status_detail': 'accredited' if status == 'approved' else status,
+            'external_reference': external_reference,
+            'payment_method_id': 'pix',
+            'transaction_amount': 100.0,
+            'date_created': now,
+            'date_last_updated': now,
+            'date_approved': now if status == 'approved' else None,
+        }
+        payment.update(extra)
+        self.payments[str(payment_id)] = payment
+        return payment
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-mercadopago', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
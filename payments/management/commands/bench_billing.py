@@ -0,0 +1,60 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import CustomUser
+from payments.billing import generate_invoices
+from payments.models import Plan, Subscription
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Teste de carga do faturamento: gera cobranças para N assinaturas (tudo é desfeito no final)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscriptions', type=int, default=100_000)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._seed(options['subscriptions'])
+            today = date.today()
+            for label in ('primeira rodada', 'repetição (idempotente)'):
+                began = time.perf_counter()
+                run = generate_invoices(today, today + timedelta(days=30), chunk_size=options['chunk_size'], resume=False)
+                elapsed = time.perf_counter() - began
+                self.stdout.write(
+                    f'{label}: {run.subscriptions_processed} assinaturas em {elapsed:.2f}s '
+                    f'({run.subscriptions_processed / elapsed:.0f}/s) | criadas={run.payments_created} | '
+                    f'já existentes={run.payments_skipped}'
+                )
+            transaction.set_rollback(True)
+
+    def _seed(self, total):
+        began = time.perf_counter()
+        plans = [
+            Plan.objects.create(name=f'Bench {plan_type}', slug=f'bench-{plan_type}', description='', price=99, plan_type=plan_type)
+            for plan_type in ('monthly', 'quarterly', 'semiannual', 'annual')
+        ]
+        users = CustomUser.objects.bulk_create(
+            [CustomUser(username=f'bench-billing-{index}', password='!') for index in range(total)], batch_size=5000,
+        )
+        if users[0].pk is None:
+            users = list(CustomUser.objects.filter(username__startswith='bench-billing-').order_by('pk'))
+        students = Student.objects.bulk_create(
+            [Student(user=user, cpf=f'bench-{index}') for index, user in enumerate(users)], batch_size=5000,
+        )
+        if students[0].pk is None:
+            students = list(Student.objects.filter(cpf__startswith='bench-').order_by('pk'))
+        start = date.today() - timedelta(days=400)
+        Subscription.objects.bulk_create(
+            [
+                Subscription(student=student, plan=random.choice(plans), start_date=start + timedelta(days=random.randrange(400)))
+                for student in students
+            ],
+            batch_size=5000,
+        )
+        self.stdout.write(f'{total} assinaturas criadas em {time.perf_counter() - began:.2f}s')
@@ -0,0 +1,99 @@
+import random
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from payments.fake_mercadopago import FakeMercadoPago
+from payments.mercadopago import MercadoPagoClient
+from payments.models import MercadoPagoNotification, Payment
+from payments.webhooks import process_queue
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Rajada de webhooks do Mercado Pago: latência do recebimento e vazão do worker (API simulada)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notifications', type=int, default=5000)
+        parser.add_argument('--duplicates', type=float, default=0.3, help='Fração de notificações repetidas')
+        parser.add_argument('--threads', type=int, default=16, help='Clientes enviando webhooks em paralelo')
+        parser.add_argument('--latency', type=float, default=0.02, help='Latência simulada da API, em segundos')
+        parser.add_argument('--pool-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        token = uuid.uuid4().hex[:10]
+        unique = max(int(options['notifications'] * (1 - options['duplicates'])), 1)
+        user = CustomUser.objects.create_user(f'bench-mp-{token}')
+        student = Student.objects.create(user=user, cpf=token)
+        references = [f'bench-{token}-{index}' for index in range(unique)]
+        Payment.objects.bulk_create(
+            [
+                Payment(student=student, amount=100, due_date=date.today() + timedelta(days=index), reference_code=ref)
+                for index, ref in enumerate(references)
+            ],
+            batch_size=1000,
+        )
+        resource_ids = [f'{token}{index}' for index in range(unique)]
+        stream = resource_ids + random.choices(resource_ids, k=options['notifications'] - unique)
+        random.shuffle(stream)
+
+        try:
+            with FakeMercadoPago(latency=options['latency']) as fake:
+                for resource_id, reference in zip(resource_ids, references):
+                    fake.add_payment(resource_id, status='approved', external_reference=reference)
+                self._ingest(stream, options)
+                queued = MercadoPagoNotification.objects.filter(resource_id__in=resource_ids).count()
+                self.stdout.write(f'Fila: {queued} notificações únicas de {len(stream)} recebidas')
+
+                client = MercadoPagoClient(access_token='bench', base_url=fake.url, pool_size=options['pool_size'])
+                began = time.perf_counter()
+                processed, failed = process_queue(client=client)
+                elapsed = time.perf_counter() - began
+                client.close()
+                approved = Payment.objects.filter(reference_code__in=references, status='approved').count()
+                self.stdout.write(
+                    f'Worker: {processed} processadas, {failed} falhas em {elapsed:.2f}s '
+                    f'({processed / elapsed:.0f}/s) | requisições à API={fake.requests} | '
+                    f'conexões TCP={fake.connections} | pagamentos aprovados={approved}/{unique}'
+                )
+        finally:
+            MercadoPagoNotification.objects.filter(resource_id__in=resource_ids).delete()
+            user.delete()
+
+    def _ingest(self, stream, options):
+        url = reverse('payments:mercadopago_webhook')
+        chunks = [stream[index::options['threads']] for index in range(options['threads'])]
+
+        def send(chunk):
+            client = Client()
+            timings = []
+            try:
+                for resource_id in chunk:
+                    body = {'type': 'payment', 'action': 'payment.updated', 'data': {'id': resource_id}}
+                    began = time.perf_counter()
+                    response = client.post(url, body, content_type='application/json')
+                    timings.append(time.perf_counter() - began)
+                    assert response.status_code == 200, response.content
+            finally:
+                connection.close()
+            return timings
+
+        began = time.perf_counter()
+        with override_settings(ALLOWED_HOSTS=['testserver'], MERCADOPAGO_WEBHOOK_SECRET=''):
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                timings = sorted(t for chunk in executor.map(send, chunks) for t in chunk)
+        elapsed = time.perf_counter() - began
+        percentile = lambda p: timings[min(int(len(timings) * p), len(timings) - 1)] * 1000
+        self.stdout.write(
+            f'Webhook: {len(timings)} notificações em {elapsed:.2f}s ({len(timings) / elapsed:.0f}/s) | '
+            f'p50={statistics.median(timings) * 1000:.1f}ms p95={percentile(0.95):.1f}ms '
+            f'p99={percentile(0.99):.1f}ms máx={timings[-1] * 1000:.1f}ms'
+        )
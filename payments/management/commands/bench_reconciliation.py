@@ -0,0 +1,75 @@
+import csv
+import os
+import random
+import resource
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import CustomUser
+from payments.models import Payment
+from payments.reconciliation import Reconciler
+from students.models import Student
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = 'Teste de carga da conciliação: relatório sintético de um ano contra N pagamentos (tudo é desfeito no final)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=200_000)
+        parser.add_argument('--chunk-size', type=int, default=50_000)
+
+    def handle(self, *args, **options):
+        total = options['payments']
+        start = date.today() - timedelta(days=365)
+        with transaction.atomic(), tempfile.TemporaryDirectory() as directory:
+            began = time.perf_counter()
+            token = uuid.uuid4().hex[:8]
+            students = []
+            for index in range(total // 365 + 1):
+                user = CustomUser.objects.create_user(f'bench-rec-{token}-{index}')
+                students.append(Student.objects.create(user=user, cpf=f'rec-{token}-{index}'))
+            path = os.path.join(directory, 'settlement.csv')
+            rows = 0
+            with open(path, 'w', newline='') as fh:
+                writer = csv.writer(fh, delimiter=';')
+                writer.writerow(['SOURCE_ID', 'EXTERNAL_REFERENCE', 'TRANSACTION_TYPE', 'TRANSACTION_AMOUNT', 'TRANSACTION_DATE'])
+                batch = []
+                for index in range(total):
+                    due = start + timedelta(days=index % 365)
+                    amount = random.choice((99, 149, 199))
+                    batch.append(Payment(
+                        student=students[index // 365], amount=amount, due_date=due, payment_date=due,
+                        status='approved' if random.random() < 0.98 else 'pending',
+                        mercadopago_payment_id=str(10_000_000 + index), reference_code=f'REF-{index}',
+                    ))
+                    writer.writerow([10_000_000 + index, f'REF-{index}', 'SETTLEMENT', amount, due.isoformat()])
+                    rows += 1
+                    if random.random() < 0.02:
+                        writer.writerow([10_000_000 + index, f'REF-{index}', 'REFUND', -amount, due.isoformat()])
+                        rows += 1
+                    if len(batch) == 5000:
+                        Payment.objects.bulk_create(batch)
+                        batch = []
+                Payment.objects.bulk_create(batch)
+            self.stdout.write(f'{total} pagamentos e {rows} linhas de relatório gerados em {time.perf_counter() - began:.2f}s')
+
+            rss_before = peak_rss_mb()
+            began = time.perf_counter()
+            reconciler = Reconciler(apply=True, chunk_size=options['chunk_size'])
+            counts = reconciler.run(path, start, date.today())
+            elapsed = time.perf_counter() - began
+            self.stdout.write(
+                f'Conciliação: {reconciler.rows} linhas em {elapsed:.2f}s ({reconciler.rows / elapsed:.0f} linhas/s) | '
+                f'{counts} | corrigidos={reconciler.corrected} | '
+                f'pico de RSS {rss_before:.0f}MB -> {peak_rss_mb():.0f}MB'
+            )
+            transaction.set_rollback(True)
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from payments.billing import generate_invoices
+
+
+class Command(BaseCommand):
+    help = 'Gera as cobranças das assinaturas ativas com vencimento na janela informada'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='period_start', help='Primeiro vencimento (AAAA-MM-DD, padrão: hoje)')
+        parser.add_argument('--to', dest='period_end', help='Último vencimento (padrão: hoje + BILLING_DAYS_AHEAD)')
+        parser.add_argument('--chunk-size', type=int, help='Assinaturas por bloco (padrão: BILLING_CHUNK_SIZE)')
+        parser.add_argument('--restart', action='store_true', help='Ignora uma rodada interrompida e começa do zero')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        period_start = self._date(options['period_start']) or today
+        period_end = self._date(options['period_end']) or today + timedelta(days=settings.BILLING_DAYS_AHEAD)
+        if period_end < period_start:
+            raise CommandError('--to deve ser igual ou posterior a --from')
+
+        def progress(run):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {run.subscriptions_processed} assinaturas, {run.payments_created} cobranças')
+
+        run = generate_invoices(
+            period_start, period_end, chunk_size=options['chunk_size'],
+            resume=not options['restart'], progress=progress,
+        )
+        rate = run.subscriptions_processed / run.elapsed_seconds if run.elapsed_seconds else 0
+        self.stdout.write(
+            f'Vencimentos de {period_start} a {period_end}: {run.subscriptions_processed} assinaturas em '
+            f'{run.elapsed_seconds:.2f}s ({rate:.0f}/s) | cobranças criadas={run.payments_created} | '
+            f'já existentes={run.payments_skipped}'
+        )
+
+    def _date(self, value):
+        if value is None:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            # Formato válido, data impossível (ex.: 2024-02-30)
+            parsed = None
+        if parsed is None:
+            raise CommandError(f'Data inválida: {value}')
+        return parsed
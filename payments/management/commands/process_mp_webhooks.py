@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.webhooks import process_queue
+
+
+class Command(BaseCommand):
+    help = 'Processa a fila de notificações (webhooks) do Mercado Pago'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Notificações por lote (padrão: MERCADOPAGO_WEBHOOK_BATCH_SIZE)')
+        parser.add_argument('--loop', action='store_true', help='Continua aguardando novas notificações')
+        parser.add_argument('--interval', type=float, default=1.0, help='Segundos entre verificações no modo --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            processed, failed = process_queue(batch_size=options['batch_size'])
+            if processed or failed:
+                self.stdout.write(f'Notificações processadas: {processed} | falhas: {failed}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from payments.reconciliation import Reconciler, csv_writer
+
+
+class Command(BaseCommand):
+    help = 'Concilia os pagamentos com um relatório de liquidação do Mercado Pago (CSV ou JSON Lines)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('report', help='Arquivo exportado do Mercado Pago (.csv, .json/.jsonl com um objeto por linha)')
+        parser.add_argument('--output', help='CSV de divergências (padrão: saída padrão)')
+        parser.add_argument('--apply', action='store_true', help='Corrige os status divergentes')
+        parser.add_argument('--from', dest='period_start', help='Início do período do relatório (AAAA-MM-DD)')
+        parser.add_argument('--to', dest='period_end', help='Fim do período do relatório (AAAA-MM-DD)')
+        parser.add_argument('--chunk-size', type=int, default=50_000, help='Linhas do relatório por bloco')
+
+    def handle(self, *args, **options):
+        period = [parse_date(options[key]) if options[key] else None for key in ('period_start', 'period_end')]
+        if any(options[key] and value is None for key, value in zip(('period_start', 'period_end'), period)):
+            raise CommandError('Datas devem estar no formato AAAA-MM-DD')
+
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            reconciler = Reconciler(writer=csv_writer(output), apply=options['apply'], chunk_size=options['chunk_size'])
+            counts = reconciler.run(options['report'], *period)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        summary = ' | '.join(f'{kind}={count}' for kind, count in counts.items())
+        self.stderr.write(
+            f'{reconciler.rows} linhas, {reconciler.payments} pagamentos do MP | {summary} | '
+            f'status corrigidos={reconciler.corrected}'
+        )
@@ -0,0 +1,123 @@
+"""
+Cliente da API do Mercado Pago e mapeamento de status.
+
+Uma única ``requests.Session`` por processo mantém conexões keep-alive com a
+API (``MERCADOPAGO_HTTP_POOL_SIZE`` conexões no pool), evitando um handshake
+TLS por notificação processada.
+"""
+import hashlib
+import hmac
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Status do Mercado Pago -> Payment.status
+STATUS_MAP = {
+    'pending': 'pending',
+    'authorized': 'pending',
+    'in_process': 'pending',
+    'in_mediation': 'pending',
+    'approved': 'approved',
+    'rejected': 'rejected',
+    'cancelled': 'cancelled',
+    'refunded': 'refunded',
+    'charged_back': 'refunded',
+}
+
+
+def map_status(mercadopago_status):
+    """Status local para o status do MP (``None`` se desconhecido)"""
+    return STATUS_MAP.get(mercadopago_status)
+
+
+class MercadoPagoError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def retryable(self):
+        """Falhas de rede, limite de requisições e erros 5xx valem nova tentativa"""
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+
+class MercadoPagoClient:
+    def __init__(self, access_token=None, base_url=None, pool_size=None, timeout=None):
+        self.access_token = access_token if access_token is not None else settings.MERCADOPAGO_ACCESS_TOKEN
+        self.base_url = (base_url or settings.MERCADOPAGO_API_URL).rstrip('/')
+        self.timeout = timeout or settings.MERCADOPAGO_HTTP_TIMEOUT
+        self.pool_size = pool_size or settings.MERCADOPAGO_HTTP_POOL_SIZE
+        self.session = requests.Session()
+        # Retentativas aqui só cobrem falhas de conexão; erros HTTP voltam
+        # para a fila com backoff
+        retry = Retry(total=2, connect=2, read=1, status=0, backoff_factor=0.1, allowed_methods=['GET'])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Authorization'] = f'Bearer {self.access_token}'
+
+    def get_payment(self, payment_id):
+        try:
+            response = self.session.get(f'{self.base_url}/v1/payments/{payment_id}', timeout=self.timeout)
+        except requests.RequestException as exc:
+            raise MercadoPagoError(f'Falha de conexão: {exc}') from exc
+        if response.status_code != 200:
+            raise MercadoPagoError(
+                f'Pagamento {payment_id}: HTTP {response.status_code} {response.text[:200]}',
+                status_code=response.status_code,
+            )
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MercadoPagoClient()
+    return _client
+
+
+def _signed_at(ts):
+    """``ts`` do cabeçalho em segundos (o MP já enviou em segundos e em milissegundos)"""
+    try:
+        value = int(ts)
+    except ValueError:
+        return None
+    return value / 1000 if value > 10 ** 11 else value
+
+
+def verify_signature(signature_header, request_id, data_id, secret=None, tolerance=None, now=None):
+    """
+    Confere o cabeçalho ``x-signature`` (``ts=...,v1=...``) de um webhook.
+
+    O manifesto assinado é ``id:<data.id>;request-id:<x-request-id>;ts:<ts>;``.
+    Assinaturas com ``ts`` a mais de ``tolerance`` segundos do relógio local
+    são recusadas, o que impede reenviar uma notificação capturada.
+    """
+    secret = secret if secret is not None else settings.MERCADOPAGO_WEBHOOK_SECRET
+    tolerance = tolerance if tolerance is not None else settings.MERCADOPAGO_WEBHOOK_TOLERANCE
+    parts = dict(
+        item.strip().split('=', 1) for item in (signature_header or '').split(',') if '=' in item
+    )
+    if 'ts' not in parts or 'v1' not in parts:
+        return False
+    signed_at = _signed_at(parts['ts'])
+    if signed_at is None or abs((now if now is not None else time.time()) - signed_at) > tolerance:
+        return False
+    # Partes ausentes na notificação ficam fora do manifesto
+    pieces = (('id', str(data_id or '').lower()), ('request-id', request_id), ('ts', parts['ts']))
+    manifest = ''.join(f'{name}:{value};' for name, value in pieces if value)
+    expected = hmac.new(secret.encode(), manifest.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, parts['v1'])
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_initial'),
+        ('students', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MercadoPagoNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=50, verbose_name='Tópico')),
+                ('resource_id', models.CharField(max_length=100, verbose_name='ID no Mercado Pago')),
+                ('action', models.CharField(blank=True, max_length=50, verbose_name='Ação')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Conteúdo')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('processing', 'Processando'), ('done', 'Processada'), ('failed', 'Falhou')], default='pending', max_length=20, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último erro')),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Recebida em')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Disponível em')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Processada em')),
+            ],
+            options={
+                'verbose_name': 'Notificação Mercado Pago',
+                'verbose_name_plural': 'Notificações Mercado Pago',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['reference_code'], name='payment_reference_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(('mercadopago_payment_id', ''), _negated=True), fields=('mercadopago_payment_id',), name='payment_unique_mp_id'),
+        ),
+        migrations.AddIndex(
+            model_name='mercadopagonotification',
+            index=models.Index(fields=['status', 'available_at'], name='mp_notification_queue_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='mercadopagonotification',
+            constraint=models.UniqueConstraint(fields=('topic', 'resource_id'), name='mp_notification_unique_resource'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_mercadopago_notifications'),
+        ('students', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField(verbose_name='Vencimentos a partir de')),
+                ('period_end', models.DateField(verbose_name='Vencimentos até')),
+                ('status', models.CharField(choices=[('running', 'Em andamento'), ('finished', 'Concluída')], default='running', max_length=20, verbose_name='Status')),
+                ('last_subscription_id', models.BigIntegerField(default=0, verbose_name='Última assinatura processada')),
+                ('subscriptions_processed', models.PositiveIntegerField(default=0, verbose_name='Assinaturas processadas')),
+                ('payments_created', models.PositiveIntegerField(default=0, verbose_name='Cobranças criadas')),
+                ('payments_skipped', models.PositiveIntegerField(default=0, verbose_name='Cobranças já existentes')),
+                ('elapsed_seconds', models.FloatField(default=0, verbose_name='Duração (s)')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Iniciada em')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Concluída em')),
+            ],
+            options={
+                'verbose_name': 'Rodada de Faturamento',
+                'verbose_name_plural': 'Rodadas de Faturamento',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(('reference_code__startswith', 'SUB-')), fields=('student', 'due_date'), name='payment_unique_student_due_date'),
+        ),
+    ]
@@ -76,6 +76,32 @@ class Payment(models.Model):
         verbose_name = 'Pagamento'
         verbose_name_plural = 'Pagamentos'
         ordering = ['-due_date']
+        constraints = [
+            # Também serve de índice para a busca pelo id do MP: as consultas repetem
+            # o filtro exclude(mercadopago_payment_id='')
+            models.UniqueConstraint(
+                fields=['mercadopago_payment_id'],
+                condition=~models.Q(mercadopago_payment_id=''),
+                name='payment_unique_mp_id',
+            ),
+            # Uma cobrança de assinatura por aluna e vencimento (rodadas de faturamento
+            # idempotentes); cobranças avulsas no mesmo dia continuam permitidas
+            models.UniqueConstraint(
+                fields=['student', 'due_date'],
+                condition=models.Q(reference_code__startswith='SUB-'),
+                name='payment_unique_student_due_date',
+            ),
+        ]
+        indexes = [
+            # external_reference das notificações do Mercado Pago
+            models.Index(fields=['reference_code'], name='payment_reference_idx'),
+            # Recuperação incremental dos rollups do painel
+            models.Index(fields=['updated_at'], name='payment_updated_at_idx'),
+            # Rollups do painel por vencimento (due_date IN (...), agrupando por status)
+            models.Index(fields=['due_date', 'status'], name='payment_due_date_status_idx'),
+            # Cobranças de um status por vencimento (inadimplência, régua de cobrança)
+            models.Index(fields=['status', 'due_date'], name='payment_status_due_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student} - R$ {self.amount} - {self.get_status_display()}"
@@ -105,6 +131,77 @@ class Subscription(models.Model):
     class Meta:
         verbose_name = 'Assinatura'
         verbose_name_plural = 'Assinaturas'
+        indexes = [
+            # Renovações/vencimentos: só as ativas interessam
+            models.Index(fields=['end_date'], condition=models.Q(is_active=True), name='subscription_active_only_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.student} - {self.plan}"
\ No newline at end of file
+        return f"{self.student} - {self.plan}"
+
+
+class BillingRun(models.Model):
+    """Rodada de faturamento (geração das cobranças das assinaturas)"""
+    STATUS_CHOICES = (
+        ('running', 'Em andamento'),
+        ('finished', 'Concluída'),
+    )
+
+    period_start = models.DateField(verbose_name='Vencimentos a partir de')
+    period_end = models.DateField(verbose_name='Vencimentos até')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running', verbose_name='Status')
+
+    # Ponto de retomada: assinaturas com id <= last_subscription_id já foram processadas
+    last_subscription_id = models.BigIntegerField(default=0, verbose_name='Última assinatura processada')
+    subscriptions_processed = models.PositiveIntegerField(default=0, verbose_name='Assinaturas processadas')
+    payments_created = models.PositiveIntegerField(default=0, verbose_name='Cobranças criadas')
+    payments_skipped = models.PositiveIntegerField(default=0, verbose_name='Cobranças já existentes')
+    elapsed_seconds = models.FloatField(default=0, verbose_name='Duração (s)')
+
+    started_at = models.DateTimeField(auto_now_add=True, verbose_name='Iniciada em')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Concluída em')
+
+    class Meta:
+        verbose_name = 'Rodada de Faturamento'
+        verbose_name_plural = 'Rodadas de Faturamento'
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.period_start} a {self.period_end} ({self.get_status_display()})"
+
+
+class MercadoPagoNotification(models.Model):
+    """Fila de notificações (webhooks) recebidas do Mercado Pago"""
+    STATUS_CHOICES = (
+        ('pending', 'Pendente'),
+        ('processing', 'Processando'),
+        ('done', 'Processada'),
+        ('failed', 'Falhou'),
+    )
+
+    # Uma linha por recurso do MP: notificações repetidas reabrem a mesma linha
+    topic = models.CharField(max_length=50, verbose_name='Tópico')
+    resource_id = models.CharField(max_length=100, verbose_name='ID no Mercado Pago')
+    action = models.CharField(max_length=50, blank=True, verbose_name='Ação')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Conteúdo')
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='Status')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Tentativas')
+    last_error = models.TextField(blank=True, verbose_name='Último erro')
+
+    received_at = models.DateTimeField(default=timezone.now, verbose_name='Recebida em')
+    available_at = models.DateTimeField(default=timezone.now, verbose_name='Disponível em')
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name='Processada em')
+
+    class Meta:
+        verbose_name = 'Notificação Mercado Pago'
+        verbose_name_plural = 'Notificações Mercado Pago'
+        constraints = [
+            models.UniqueConstraint(fields=['topic', 'resource_id'], name='mp_notification_unique_resource'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='mp_notification_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} {self.resource_id} ({self.get_status_display()})"
@@ -0,0 +1,303 @@
+"""
+Conciliação dos pagamentos com os relatórios de liquidação do Mercado Pago.
+
+O relatório (CSV ou JSON Lines) é lido em blocos com pandas e reduzido a
+uma linha por pagamento do MP em todo o relatório (o status de maior
+precedência vence: um estorno prevalece sobre a liquidação, mesmo que as
+duas linhas caiam em blocos diferentes; o valor é o da liquidação). Depois,
+em fatias de ``chunk_size`` pagamentos:
+
+1. a fatia correspondente de ``Payment`` é carregada com ``values_list``
+   (pelo id do MP, ou pela ``reference_code`` quando ainda não há id);
+2. valores e status são comparados de forma vetorizada;
+3. as divergências são escritas no relatório de saída e, com ``apply``, os
+   status são corrigidos com um ``UPDATE`` por grupo de valores (os aprovados
+   recebem a ``payment_date`` da liquidação, como no webhook).
+
+Ao final, os pagamentos aprovados no período que não apareceram no relatório
+são listados. A memória fica limitada ao bloco lido mais uma linha compacta
+por pagamento do relatório.
+"""
+import csv
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .mercadopago import map_status
+from .models import Payment
+
+# Colunas do relatório de liquidação -> nomes internos
+DEFAULT_COLUMNS = {
+    'SOURCE_ID': 'mp_id',
+    'EXTERNAL_REFERENCE': 'external_reference',
+    'TRANSACTION_TYPE': 'transaction_type',
+    'TRANSACTION_AMOUNT': 'amount',
+    'TRANSACTION_DATE': 'date',
+}
+
+# Tipo de transação -> status do Mercado Pago
+TRANSACTION_STATUS = {
+    'SETTLEMENT': 'approved',
+    'CANCELLATION': 'cancelled',
+    'REFUND': 'refunded',
+    'CHARGEBACK': 'charged_back',
+}
+STATUS_PRECEDENCE = {'approved': 0, 'cancelled': 1, 'refunded': 2, 'charged_back': 3}
+
+MISSING_LOCAL = 'missing_local'
+MISSING_IN_REPORT = 'missing_in_report'
+AMOUNT_MISMATCH = 'amount_mismatch'
+STATUS_MISMATCH = 'status_mismatch'
+
+REPORT_FIELDS = [
+    'kind', 'mp_payment_id', 'payment_id', 'external_reference',
+    'report_amount', 'local_amount', 'report_status', 'local_status',
+]
+
+LOCAL_FIELDS = ['pk', 'mercadopago_payment_id', 'reference_code', 'amount', 'status']
+LOCAL_COLUMNS = ['payment_id', 'local_mp_id', 'reference_code', 'local_amount', 'local_status']
+
+
+def read_report(path, chunk_size=50_000, columns=None):
+    """Blocos (DataFrames) do relatório com as colunas renomeadas"""
+    columns = columns or DEFAULT_COLUMNS
+    if str(path).endswith(('.json', '.jsonl')):
+        reader = pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as fh:
+            separator = ';' if fh.readline().count(';') > 0 else ','
+        reader = pd.read_csv(
+            path, sep=separator, chunksize=chunk_size, usecols=lambda name: name in columns,
+            dtype={name: str for name in columns}, keep_default_na=False, encoding='utf-8-sig',
+        )
+    for chunk in reader:
+        yield chunk.rename(columns=columns)
+
+
+def _collapse(frame):
+    """Uma linha por ``mp_id``: status de maior precedência, valor liquidado e referência"""
+    frame = frame.reset_index(drop=True)
+    latest = frame.loc[frame.groupby('mp_id')['precedence'].idxmax()].set_index('mp_id')
+    settled = frame.dropna(subset=['settled_cents']).groupby('mp_id')[['settled_cents', 'settled_at']].first()
+    references = frame[frame['external_reference'] != ''].groupby('mp_id')['external_reference'].first()
+    latest['settled_cents'] = settled['settled_cents'].reindex(latest.index)
+    latest['settled_at'] = settled['settled_at'].reindex(latest.index).fillna('')
+    latest['external_reference'] = references.reindex(latest.index).fillna('')
+    return latest.reset_index()
+
+
+def summarize(chunk):
+    """Resumo parcial de um bloco; ``combine`` junta os blocos e ``finalize`` gera o status"""
+    frame = pd.DataFrame({
+        'mp_id': chunk['mp_id'].astype(str).str.strip(),
+        'external_reference': chunk.get('external_reference', pd.Series('', index=chunk.index)).fillna('').astype(str),
+        'mp_status': chunk['transaction_type'].astype(str).str.strip().str.upper().map(TRANSACTION_STATUS),
+        'amount_cents': (pd.to_numeric(chunk['amount'], errors='coerce').abs() * 100).round(),
+        'date': chunk.get('date', pd.Series('', index=chunk.index)).fillna('').astype(str).str.strip(),
+    })
+    frame = frame[frame['mp_status'].notna() & (frame['mp_id'] != '')]
+    if frame.empty:
+        return frame.drop(columns='date').assign(
+            precedence=pd.Series(dtype='int64'), settled_cents=pd.Series(dtype='float64'), settled_at=pd.Series(dtype='object'),
+        )
+    frame['precedence'] = frame['mp_status'].map(STATUS_PRECEDENCE)
+    settlement = frame['mp_status'] == 'approved'
+    frame['settled_cents'] = frame['amount_cents'].where(settlement)
+    frame['settled_at'] = frame.pop('date').where(settlement, '')
+    return _collapse(frame)
+
+
+def combine(parts):
+    """Junta resumos parciais (de blocos diferentes) do mesmo relatório"""
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return pd.DataFrame()
+    return _collapse(pd.concat(parts, ignore_index=True)) if len(parts) > 1 else parts[0]
+
+
+def finalize(summary):
+    """Valor de comparação (o liquidado, se houver) e status local esperado"""
+    summary = summary.copy()
+    summary['amount_cents'] = summary['settled_cents'].fillna(summary['amount_cents'])
+    summary['status'] = summary['mp_status'].map(map_status)
+    return summary.drop(columns=['precedence', 'settled_cents'])
+
+
+def settlement_date(value):
+    """Data local de ``TRANSACTION_DATE`` (data ou data e hora ISO); ``None`` se ilegível"""
+    try:
+        moment = parse_datetime(value)
+        if moment is not None:
+            return timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+        return parse_date(value[:10])
+    except ValueError:
+        return None
+
+
+def load_local(*conditions, **lookup):
+    """Fatia de ``Payment`` referente a um bloco do relatório"""
+    rows = Payment.objects.filter(*conditions, **lookup).order_by().values_list(*LOCAL_FIELDS)
+    local = pd.DataFrame.from_records(list(rows), columns=LOCAL_COLUMNS)
+    local['local_cents'] = (local['local_amount'].astype(float) * 100).round()
+    return local.drop(columns='local_amount')
+
+
+def match(report):
+    """
+    Associa cada linha do relatório ao pagamento local: pelo id do MP e, para
+    as que sobrarem, pela referência de pagamentos ainda sem id do MP.
+    """
+    # ~Q(...='') repete a condição da constraint parcial, que serve de índice para o id do MP
+    local = load_local(Q(mercadopago_payment_id__in=report['mp_id'].tolist()) & ~Q(mercadopago_payment_id=''))
+    merged = report.merge(local, how='left', left_on='mp_id', right_on='local_mp_id')
+    unmatched = (merged['payment_id'].isna() & (merged['external_reference'] != '')).to_numpy()
+    if unmatched.any():
+        by_reference = load_local(
+            mercadopago_payment_id='', reference_code__in=report.loc[unmatched, 'external_reference'].tolist(),
+        ).drop_duplicates('reference_code')
+        fallback = report[unmatched].merge(by_reference, how='left', left_on='external_reference', right_on='reference_code')
+        merged.loc[unmatched, by_reference.columns] = fallback[by_reference.columns].to_numpy()
+    return merged
+
+
+class Reconciler:
+    """
+    Concilia um relatório de liquidação; com ``apply`` grava as correções de status.
+
+    ``writer`` recebe cada divergência como dict com as chaves ``REPORT_FIELDS``.
+    """
+
+    def __init__(self, writer=None, apply=False, chunk_size=50_000, columns=None):
+        self.writer = writer
+        self.apply = apply
+        self.chunk_size = chunk_size
+        self.columns = columns
+        self.counts = dict.fromkeys([MISSING_LOCAL, AMOUNT_MISMATCH, STATUS_MISMATCH, MISSING_IN_REPORT], 0)
+        self.rows = 0
+        self.payments = 0
+        self.corrected = 0
+        self._seen = []
+
+    def run(self, path, period_start=None, period_end=None):
+        summary, pending, pending_rows = pd.DataFrame(), [], 0
+        for chunk in read_report(path, chunk_size=self.chunk_size, columns=self.columns):
+            self.rows += len(chunk)
+            part = summarize(chunk)
+            pending.append(part)
+            pending_rows += len(part)
+            # Recompacta de tempos em tempos: memória ~ uma linha por pagamento
+            if pending_rows >= self.chunk_size * 4:
+                summary, pending, pending_rows = combine([summary] + pending), [], 0
+        summary = combine([summary] + pending)
+        if not summary.empty:
+            report = finalize(summary)
+            for start in range(0, len(report), self.chunk_size):
+                self.reconcile_payments(report.iloc[start:start + self.chunk_size].reset_index(drop=True))
+        if period_start and period_end:
+            self.find_missing_in_report(period_start, period_end)
+        return self.counts
+
+    def reconcile_payments(self, report):
+        """Concilia uma fatia do relatório já reduzido a uma linha por pagamento"""
+        self.payments += len(report)
+        self._seen.append(pd.to_numeric(report['mp_id'], errors='coerce').dropna().astype(np.int64).to_numpy())
+
+        merged = match(report)
+
+        missing = merged['payment_id'].isna()
+        self._emit(MISSING_LOCAL, merged[missing])
+        found = merged[~missing]
+        self._emit(AMOUNT_MISMATCH, found[(found['amount_cents'] - found['local_cents']).abs() >= 1])
+        wrong_status = found[found['status'].notna() & (found['status'] != found['local_status'])]
+        self._emit(STATUS_MISMATCH, wrong_status)
+        if self.apply:
+            self._correct(found, wrong_status)
+
+    def _correct(self, found, wrong_status):
+        """Um UPDATE por status corrigido; vincula o id do MP quando a associação foi pela referência"""
+        with transaction.atomic():
+            self._update_statuses(wrong_status)
+            self._link_mp_ids(found[found['local_mp_id'] == ''])
+
+    def _update_statuses(self, wrong_status):
+        now = timezone.now()
+        # Uma conversão por valor distinto; os grupos ficam por dia de liquidação
+        dates = {value: settlement_date(value) for value in wrong_status['settled_at'].unique()}
+        wrong_status = wrong_status.assign(
+            payment_date=wrong_status['settled_at'].map(dates).where(wrong_status['status'] == 'approved'),
+        )
+        for (status, mp_status, payment_date), group in wrong_status.groupby(
+            ['status', 'mp_status', 'payment_date'], dropna=False, sort=False,
+        ):
+            fields = {'status': status, 'mercadopago_status': mp_status, 'updated_at': now}
+            if not pd.isna(payment_date):
+                fields['payment_date'] = payment_date
+            ids = group['payment_id'].astype(np.int64).tolist()
+            self.corrected += Payment.objects.filter(pk__in=ids).update(**fields)
+
+    def _link_mp_ids(self, unlinked):
+        Payment.objects.bulk_update(
+            [
+                Payment(pk=payment_id, mercadopago_payment_id=mp_id)
+                for payment_id, mp_id in zip(unlinked['payment_id'].astype(np.int64).tolist(), unlinked['mp_id'])
+            ],
+            ['mercadopago_payment_id'],
+            batch_size=1000,
+        )
+
+    def find_missing_in_report(self, period_start, period_end, chunk_size=None):
+        """Pagamentos aprovados no período, com id do MP, ausentes do relatório"""
+        seen = np.unique(np.concatenate(self._seen)) if self._seen else np.array([], dtype=np.int64)
+        queryset = Payment.objects.filter(
+            status='approved', payment_date__range=(period_start, period_end),
+        ).exclude(mercadopago_payment_id='').order_by('pk').values_list(*LOCAL_FIELDS)
+        last_pk = 0
+        while True:
+            rows = list(queryset.filter(pk__gt=last_pk)[:chunk_size or self.chunk_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            local = pd.DataFrame.from_records(rows, columns=LOCAL_COLUMNS)
+            ids = pd.to_numeric(local['local_mp_id'], errors='coerce')
+            absent = local[ids.notna().to_numpy() & ~np.isin(ids.fillna(-1).astype(np.int64).to_numpy(), seen)]
+            self.counts[MISSING_IN_REPORT] += len(absent)
+            if self.writer is None:
+                continue
+            for row in absent.itertuples(index=False):
+                self.writer({
+                    'kind': MISSING_IN_REPORT,
+                    'mp_payment_id': row.local_mp_id,
+                    'payment_id': row.payment_id,
+                    'external_reference': row.reference_code,
+                    'report_amount': '',
+                    'local_amount': f'{row.local_amount:.2f}',
+                    'report_status': '',
+                    'local_status': row.local_status,
+                })
+
+    def _emit(self, kind, frame):
+        self.counts[kind] += len(frame)
+        if self.writer is None or frame.empty:
+            return
+        for row in frame.itertuples(index=False):
+            self.writer({
+                'kind': kind,
+                'mp_payment_id': row.mp_id,
+                'payment_id': '' if pd.isna(row.payment_id) else int(row.payment_id),
+                'external_reference': row.external_reference,
+                'report_amount': f'{row.amount_cents / 100:.2f}',
+                'local_amount': '' if pd.isna(row.local_cents) else f'{row.local_cents / 100:.2f}',
+                'report_status': row.status,
+                'local_status': '' if pd.isna(row.local_status) else row.local_status,
+            })
+
+
+def csv_writer(fh):
+    """``writer`` para o ``Reconciler`` que grava as divergências em CSV"""
+    writer = csv.DictWriter(fh, fieldnames=REPORT_FIELDS)
+    writer.writeheader()
+    return writer.writerow
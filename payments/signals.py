@@ -0,0 +1,6 @@
+from core.caching import invalidate_on_change
+
+from .models import Plan
+
+# Funções com @cached(Plan) são invalidadas a cada alteração de plano
+invalidate_on_change(Plan)
@@ -1,3 +1,359 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from students.models import Student
+
+from . import billing, webhooks
+from .fake_mercadopago import FakeMercadoPago
+from .mercadopago import MercadoPagoClient
+from .models import BillingRun, MercadoPagoNotification, Payment, Plan, Subscription
+from .reconciliation import Reconciler
+
+
+@override_settings(MERCADOPAGO_WEBHOOK_SECRET='')
+class MercadoPagoWebhookTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create_user('aluna-mp')
+        cls.student = Student.objects.create(user=user, cpf='000.000.000-00')
+
+    def setUp(self):
+        self.fake = FakeMercadoPago().start()
+        self.addCleanup(self.fake.stop)
+        self.client_api = MercadoPagoClient(access_token='teste', base_url=self.fake.url, pool_size=4)
+        self.addCleanup(self.client_api.close)
+
+    def notify(self, resource_id, **headers):
+        body = {'type': 'payment', 'action': 'payment.updated', 'data': {'id': resource_id}}
+        return self.client.post(
+            reverse('payments:mercadopago_webhook'), body, content_type='application/json', **headers,
+        )
+
+    def process(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            return webhooks.process_batch(executor, client=self.client_api)
+
+    def test_duplicate_notifications_are_queued_once(self):
+        for _ in range(3):
+            self.assertEqual(self.notify('111').status_code, 200)
+        self.notify('222')
+        # Formato IPN legado, por query string
+        self.client.post(reverse('payments:mercadopago_webhook') + '?topic=payment&id=111')
+        # Tópicos não tratados são apenas confirmados
+        self.client.post(reverse('payments:mercadopago_webhook') + '?topic=merchant_order&id=9')
+
+        self.assertEqual(
+            sorted(MercadoPagoNotification.objects.values_list('resource_id', flat=True)), ['111', '222'],
+        )
+        self.assertEqual(self.client.post(reverse('payments:mercadopago_webhook')).status_code, 400)
+
+    @override_settings(MERCADOPAGO_WEBHOOK_SECRET='segredo')
+    def test_signature_is_verified(self):
+        ts = int(time.time())
+        self.assertEqual(self.notify('111', HTTP_X_SIGNATURE=f'ts={ts},v1=abc', HTTP_X_REQUEST_ID='r1').status_code, 401)
+        digest = hmac.new(b'segredo', f'id:111;request-id:r1;ts:{ts};'.encode(), hashlib.sha256).hexdigest()
+        self.assertEqual(self.notify('111', HTTP_X_SIGNATURE=f'ts={ts},v1={digest}', HTTP_X_REQUEST_ID='r1').status_code, 200)
+        self.assertEqual(MercadoPagoNotification.objects.count(), 1)
+
+    @override_settings(MERCADOPAGO_WEBHOOK_SECRET='segredo', MERCADOPAGO_WEBHOOK_TOLERANCE=300)
+    def test_replayed_signature_is_rejected(self):
+        ts = int(time.time()) - 3600
+        digest = hmac.new(b'segredo', f'id:111;request-id:r1;ts:{ts};'.encode(), hashlib.sha256).hexdigest()
+        self.assertEqual(self.notify('111', HTTP_X_SIGNATURE=f'ts={ts},v1={digest}', HTTP_X_REQUEST_ID='r1').status_code, 401)
+        # Em milissegundos, dentro da janela
+        ts = int(time.time() * 1000)
+        digest = hmac.new(b'segredo', f'id:111;request-id:r1;ts:{ts};'.encode(), hashlib.sha256).hexdigest()
+        self.assertEqual(self.notify('111', HTTP_X_SIGNATURE=f'ts={ts},v1={digest}', HTTP_X_REQUEST_ID='r1').status_code, 200)
+        self.assertEqual(MercadoPagoNotification.objects.count(), 1)
+
+    def test_worker_applies_statuses_in_bulk_over_keep_alive(self):
+        payments = [
+            Payment.objects.create(
+                student=self.student, amount=100, due_date=date.today() + timedelta(days=i), reference_code=f'REF-{i}',
+            )
+            for i in range(6)
+        ]
+        for index, payment in enumerate(payments):
+            status = 'rejected' if index == 0 else 'approved'
+            self.fake.add_payment(str(1000 + index), status=status, external_reference=payment.reference_code)
+            self.notify(str(1000 + index))
+
+        with self.assertNumQueries(8):
+            # claim (3) + savepoint + busca dos pagamentos + bulk_update + conclusão + release
+            self.assertEqual(self.process(), (6, 0))
+
+        self.assertEqual(self.fake.requests, 6)
+        self.assertLessEqual(self.fake.connections, 4)
+        payments[0].refresh_from_db()
+        payments[1].refresh_from_db()
+        self.assertEqual((payments[0].status, payments[0].mercadopago_payment_id), ('rejected', '1000'))
+        self.assertEqual(payments[1].status, 'approved')
+        self.assertEqual(payments[1].payment_date, timezone.localdate())
+        self.assertFalse(MercadoPagoNotification.objects.exclude(status='done').exists())
+
+    def test_out_of_order_notification_does_not_regress_status(self):
+        payment = Payment.objects.create(student=self.student, amount=100, due_date=date.today(), reference_code='REF')
+        newer = timezone.now()
+        self.fake.add_payment('55', status='approved', external_reference='REF', date_last_updated=newer.isoformat())
+        webhooks.apply_payments([self.fake.payments['55']])
+        stale = dict(self.fake.payments['55'], status='pending', date_last_updated=(newer - timedelta(minutes=5)).isoformat())
+        webhooks.apply_payments([stale])
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'approved')
+
+    def test_failures_are_retried_with_backoff_or_given_up(self):
+        self.fake.failures['1'] = 503
+        self.notify('1')
+        self.notify('2')  # inexistente no MP: 404
+        with self.assertLogs('payments.webhooks', 'WARNING'):
+            self.assertEqual(self.process(), (0, 2))
+
+        retry = MercadoPagoNotification.objects.get(resource_id='1')
+        self.assertEqual((retry.status, retry.attempts), ('pending', 1))
+        self.assertGreater(retry.available_at, timezone.now())
+        self.assertEqual(MercadoPagoNotification.objects.get(resource_id='2').status, 'failed')
+        # Ainda não disponível: nada a processar
+        self.assertEqual(self.process(), (0, 0))
+
+    def test_apply_failure_falls_back_to_one_by_one(self):
+        for index in range(3):
+            Payment.objects.create(
+                student=self.student, amount=100, due_date=date.today() + timedelta(days=index), reference_code=f'REF-{index}',
+            )
+            self.fake.add_payment(str(300 + index), external_reference=f'REF-{index}')
+            self.notify(str(300 + index))
+        original = webhooks.apply_payments
+
+        def apply_payments(details_list):
+            if any(str(details['id']) == '301' for details in details_list):
+                raise ValueError('resposta inesperada')
+            return original(details_list)
+
+        with patch.object(webhooks, 'apply_payments', apply_payments), self.assertLogs('payments.webhooks', 'WARNING'):
+            self.assertEqual(self.process(), (2, 1))
+
+        statuses = dict(MercadoPagoNotification.objects.values_list('resource_id', 'status'))
+        self.assertEqual(statuses, {'300': 'done', '301': 'pending', '302': 'done'})
+        failed = MercadoPagoNotification.objects.get(resource_id='301')
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('resposta inesperada', failed.last_error)
+
+    def test_notification_received_while_processing_is_kept_pending(self):
+        Payment.objects.create(student=self.student, amount=100, due_date=date.today(), reference_code='REF')
+        self.fake.add_payment('77', external_reference='REF')
+        self.notify('77')
+        claimed = webhooks.claim_batch()
+        self.notify('77')  # chega enquanto o lote está em processamento
+        webhooks.MercadoPagoNotification.objects.filter(
+            pk__in=[n.pk for n in claimed], status='processing',
+        ).update(status='done')
+        self.assertEqual(MercadoPagoNotification.objects.get(resource_id='77').status, 'pending')
+        self.assertEqual(self.process(), (1, 0))
+
+
+class BillingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.monthly = Plan.objects.create(name='Mensal', slug='mensal', description='', price=120, plan_type='monthly')
+        cls.quarterly = Plan.objects.create(name='Tri', slug='tri', description='', price=330, plan_type='quarterly')
+
+    def subscribe(self, username, plan, start_date, **fields):
+        user = CustomUser.objects.create_user(username)
+        student = Student.objects.create(user=user, cpf=username)
+        return Subscription.objects.create(student=student, plan=plan, start_date=start_date, **fields)
+
+    def test_due_dates_follow_plan_cycle(self):
+        self.assertEqual(billing.add_months(date(2024, 1, 31), 1), date(2024, 2, 29))
+        self.assertEqual(
+            billing.due_dates(date(2024, 1, 31), 1, date(2024, 2, 1), date(2024, 4, 30)),
+            [date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)],
+        )
+        self.assertEqual(billing.due_dates(date(2024, 1, 15), 3, date(2024, 2, 1), date(2024, 4, 30)), [date(2024, 4, 15)])
+        self.assertEqual(billing.due_dates(date(2024, 1, 15), 1, date(2024, 3, 1), date(2024, 4, 30), end_date=date(2024, 3, 31)), [date(2024, 3, 15)])
+        # end_date exclusivo: a assinatura que termina no vencimento não é cobrada de novo
+        self.assertEqual(billing.due_dates(date(2024, 1, 15), 1, date(2024, 3, 1), date(2024, 4, 30), end_date=date(2024, 4, 15)), [date(2024, 3, 15)])
+        self.assertEqual(billing.due_dates(date(2024, 3, 1), 1, date(2024, 3, 1), date(2024, 4, 30), end_date=date(2024, 3, 1)), [])
+
+    def test_run_is_idempotent_and_skips_inactive(self):
+        monthly = self.subscribe('mensal', self.monthly, date(2024, 1, 10))
+        self.subscribe('trimestral', self.quarterly, date(2024, 1, 20))
+        self.subscribe('cancelada', self.monthly, date(2024, 1, 10), is_active=False)
+        self.subscribe('encerrada', self.monthly, date(2023, 1, 10), end_date=date(2023, 12, 31))
+
+        run = billing.generate_invoices(date(2024, 3, 1), date(2024, 4, 30), chunk_size=2)
+        self.assertEqual((run.status, run.subscriptions_processed, run.payments_created), ('finished', 2, 3))
+        self.assertEqual(
+            sorted(Payment.objects.values_list('reference_code', 'amount')),
+            [
+                (f'SUB-{monthly.pk}-20240310', 120), (f'SUB-{monthly.pk}-20240410', 120),
+                (f'SUB-{monthly.pk + 1}-20240420', 330),
+            ],
+        )
+
+        again = billing.generate_invoices(date(2024, 3, 1), date(2024, 4, 30))
+        self.assertEqual((again.payments_created, again.payments_skipped), (0, 3))
+        self.assertEqual(Payment.objects.count(), 3)
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        first = self.subscribe('primeira', self.monthly, date(2024, 1, 10))
+        self.subscribe('segunda', self.monthly, date(2024, 1, 10))
+        BillingRun.objects.create(
+            period_start=date(2024, 3, 1), period_end=date(2024, 3, 31),
+            last_subscription_id=first.pk, subscriptions_processed=1,
+        )
+        run = billing.generate_invoices(date(2024, 3, 1), date(2024, 3, 31))
+        self.assertEqual((run.subscriptions_processed, run.payments_created), (2, 1))
+        self.assertFalse(Payment.objects.filter(student=first.student).exists())
+        self.assertEqual(BillingRun.objects.count(), 1)
+
+    def test_conflicts_with_a_parallel_run_are_not_counted(self):
+        subscription = self.subscribe('paralela', self.monthly, date(2024, 1, 10))
+        # Outra rodada grava o mesmo vencimento entre a consulta e o INSERT
+        Payment.objects.create(
+            student=subscription.student, amount=120, due_date=date(2024, 3, 10),
+            reference_code=billing.reference_code(subscription.pk, date(2024, 3, 10)),
+        )
+        with patch.object(billing, '_existing_charges', return_value=set()):
+            run = billing.generate_invoices(date(2024, 3, 1), date(2024, 4, 30))
+        self.assertEqual((run.payments_created, run.payments_skipped), (1, 1))
+        self.assertEqual(Payment.objects.count(), 2)
+
+    def test_manual_charge_does_not_suppress_the_invoice(self):
+        subscription = self.subscribe('com-avulsa', self.monthly, date(2024, 1, 10))
+        Payment.objects.create(student=subscription.student, amount=50, due_date=date(2024, 3, 10), reference_code='AVULSA')
+        run = billing.generate_invoices(date(2024, 3, 1), date(2024, 3, 31))
+        self.assertEqual((run.payments_created, run.payments_skipped), (1, 0))
+        self.assertTrue(Payment.objects.filter(reference_code=billing.reference_code(subscription.pk, date(2024, 3, 10))).exists())
+
+    def test_manual_charge_on_the_same_due_date_is_allowed(self):
+        subscription = self.subscribe('avulsa', self.monthly, date(2024, 1, 10))
+        Payment.objects.create(student=subscription.student, amount=50, due_date=date(2024, 3, 10), reference_code='AVULSA')
+        Payment.objects.create(
+            student=subscription.student, amount=120, due_date=date(2024, 3, 10),
+            reference_code=billing.reference_code(subscription.pk, date(2024, 3, 10)),
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Payment.objects.create(
+                student=subscription.student, amount=120, due_date=date(2024, 3, 10),
+                reference_code=billing.reference_code(subscription.pk, date(2024, 3, 10)),
+            )
+
+    def test_queries_per_chunk_do_not_grow_with_subscriptions(self):
+        for index in range(10):
+            self.subscribe(f'aluna-{index}', self.monthly, date(2024, 1, 10))
+        # rodada (2) + bloco com savepoints (8) + bloco vazio + conclusão
+        with self.assertNumQueries(12):
+            run = billing.generate_invoices(date(2024, 3, 1), date(2024, 3, 31), chunk_size=100)
+        self.assertEqual(run.payments_created, 10)
+
+
+class ReconciliationTests(TestCase):
+    REPORT = (
+        'SOURCE_ID;EXTERNAL_REFERENCE;TRANSACTION_TYPE;TRANSACTION_AMOUNT;TRANSACTION_DATE\n'
+        '101;A;SETTLEMENT;100.00;2024-03-01\n'
+        '102;B;SETTLEMENT;80.00;2024-03-02\n'
+        '103;C;SETTLEMENT;50.00;2024-03-03\n'
+        '999;Z;SETTLEMENT;10.00;2024-03-03\n'
+        '104;D;SETTLEMENT;70.00;2024-03-04\n'
+        '101;A;REFUND;-100.00;2024-03-20\n'
+        ';;PAYOUT;-300.00;2024-03-21\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create_user('aluna-conciliacao')
+        student = Student.objects.create(user=user, cpf='111')
+
+        def payment(day, reference, amount, status, mp_id='', payment_date=None):
+            return Payment.objects.create(
+                student=student, due_date=date(2024, 3, day), reference_code=reference, amount=amount,
+                status=status, mercadopago_payment_id=mp_id, payment_date=payment_date,
+            )
+
+        cls.refunded = payment(1, 'A', 100, 'approved', '101', date(2024, 3, 1))
+        cls.wrong_amount = payment(2, 'B', 90, 'approved', '102', date(2024, 3, 2))
+        cls.pending = payment(3, 'C', 50, 'pending', '103')
+        cls.unlinked = payment(4, 'D', 70, 'pending')
+        cls.absent = payment(5, 'E', 60, 'approved', '105', date(2024, 3, 5))
+
+    def reconcile(self, path, apply=False):
+        found = []
+        reconciler = Reconciler(writer=found.append, apply=apply, chunk_size=3)
+        counts = reconciler.run(path, date(2024, 3, 1), date(2024, 3, 31))
+        return reconciler, counts, found
+
+    def write(self, name, content):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, name)
+        with open(path, 'w') as fh:
+            fh.write(content)
+        return path
+
+    def test_discrepancies_across_chunks(self):
+        reconciler, counts, found = self.reconcile(self.write('report.csv', self.REPORT))
+        self.assertEqual(counts, {
+            'missing_local': 1, 'amount_mismatch': 1, 'status_mismatch': 3, 'missing_in_report': 1,
+        })
+        by_kind = {(row['kind'], str(row['payment_id'])) for row in found}
+        self.assertIn(('missing_local', ''), by_kind)
+        self.assertIn(('amount_mismatch', str(self.wrong_amount.pk)), by_kind)
+        self.assertIn(('status_mismatch', str(self.refunded.pk)), by_kind)
+        self.assertIn(('missing_in_report', str(self.absent.pk)), by_kind)
+        self.assertEqual((reconciler.rows, reconciler.payments, reconciler.corrected), (7, 5, 0))
+        self.refunded.refresh_from_db()
+        self.assertEqual(self.refunded.status, 'approved')
+
+    def test_partial_refund_in_another_chunk_counts_once(self):
+        report = (
+            'SOURCE_ID;EXTERNAL_REFERENCE;TRANSACTION_TYPE;TRANSACTION_AMOUNT;TRANSACTION_DATE\n'
+            '101;A;SETTLEMENT;100.00;2024-03-01\n'
+            '103;C;SETTLEMENT;50.00;2024-03-03\n'
+            '102;B;SETTLEMENT;90.00;2024-03-02\n'
+            # Bloco seguinte: estorno parcial do 101
+            '101;;REFUND;-30.00;2024-03-20\n'
+        )
+        reconciler, counts, found = self.reconcile(self.write('split.csv', report))
+        self.assertEqual(reconciler.payments, 3)
+        self.assertEqual(counts['amount_mismatch'], 0)
+        refunds = [row for row in found if row['mp_payment_id'] == '101']
+        self.assertEqual(len(refunds), 1)
+        self.assertEqual(
+            (refunds[0]['kind'], refunds[0]['report_status'], refunds[0]['report_amount'], refunds[0]['external_reference']),
+            ('status_mismatch', 'refunded', '100.00', 'A'),
+        )
+
+    def test_apply_corrects_statuses_in_bulk(self):
+        report = '\n'.join(
+            json.dumps(dict(zip(['SOURCE_ID', 'EXTERNAL_REFERENCE', 'TRANSACTION_TYPE', 'TRANSACTION_AMOUNT', 'TRANSACTION_DATE'], row)))
+            for row in [
+                ('101', 'A', 'REFUND', '-100', '2024-03-20T10:00:00.000-03:00'),
+                ('103', 'C', 'SETTLEMENT', '50', '2024-03-03T09:30:00.000-03:00'),
+                ('104', 'D', 'SETTLEMENT', '70', '2024-03-04'),
+            ]
+        )
+        reconciler, counts, _ = self.reconcile(self.write('report.jsonl', report), apply=True)
+        self.assertEqual(reconciler.corrected, 3)
+        self.refunded.refresh_from_db()
+        self.pending.refresh_from_db()
+        self.unlinked.refresh_from_db()
+        self.assertEqual((self.refunded.status, self.refunded.mercadopago_status), ('refunded', 'refunded'))
+        self.assertEqual((self.pending.status, self.pending.payment_date), ('approved', date(2024, 3, 3)))
+        self.assertEqual((self.unlinked.status, self.unlinked.mercadopago_payment_id), ('approved', '104'))
+        self.assertEqual(self.unlinked.payment_date, date(2024, 3, 4))
+        # Estorno não mexe na data do pagamento original
+        self.assertEqual(self.refunded.payment_date, date(2024, 3, 1))
@@ -1,7 +1,10 @@
 from django.urls import path
 
+from . import views
+
 app_name = 'payments'
 
 urlpatterns = [
-    # Adicionar URLs depois
-]
\ No newline at end of file
+    path('webhooks/mercadopago/', views.mercadopago_webhook, name='mercadopago_webhook'),
+    path('export/', views.export_payments, name='export_payments'),
+]
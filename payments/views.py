@@ -1,3 +1,36 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
-# Create your views here.
+from core.exports import export_view_response
+
+from . import webhooks
+from .exports import payment_export
+from .mercadopago import verify_signature
+
+
+@csrf_exempt
+@require_POST
+def mercadopago_webhook(request):
+    """Recebe notificações do Mercado Pago; o processamento é feito pelo worker"""
+    try:
+        topic, resource_id, action, payload = webhooks.parse_notification(request)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    if settings.MERCADOPAGO_WEBHOOK_SECRET and not verify_signature(
+        request.headers.get('x-signature'), request.headers.get('x-request-id'), resource_id,
+    ):
+        return HttpResponse('Assinatura inválida', status=401)
+
+    if topic in webhooks.SUPPORTED_TOPICS:
+        webhooks.enqueue([(topic, resource_id, action, payload)])
+    return HttpResponse('OK')
+
+
+@staff_member_required
+def export_payments(request):
+    """Planilha de cobranças (``?format=csv|xlsx&gzip=1``)"""
+    return export_view_response(request, payment_export(request.GET))
@@ -0,0 +1,244 @@
+"""
+Fila de notificações do Mercado Pago.
+
+O webhook só grava a notificação em ``MercadoPagoNotification`` e responde;
+o trabalho pesado (consultar o pagamento na API e atualizar ``Payment``) fica
+com o worker ``process_mp_webhooks``.
+
+A tabela tem uma linha por recurso do MP (índice único em ``topic`` +
+``resource_id``). Notificações repetidas fazem upsert na mesma linha e a
+devolvem para ``pending``; se isso acontecer durante o processamento, a linha
+não é marcada como concluída e o pagamento é consultado de novo no lote
+seguinte. Como sempre se consulta o estado atual na API, processar a mesma
+notificação duas vezes é inofensivo.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .mercadopago import MercadoPagoError, get_client, map_status
+from .models import MercadoPagoNotification, Payment
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_TOPICS = ('payment',)
+
+# Tempo máximo de um lote em processamento antes de outro worker retomá-lo
+LEASE_SECONDS = 300
+MAX_BACKOFF_SECONDS = 3600
+
+
+def parse_notification(request):
+    """
+    Extrai ``(topic, resource_id, action, payload)`` de um webhook.
+
+    Aceita o formato de webhooks (JSON ``{"type", "action", "data": {"id"}}``
+    ou ``?type=payment&data.id=...``) e o legado IPN (``?topic=...&id=...``).
+    Levanta ``ValueError`` se não houver tópico ou id.
+    """
+    payload = {}
+    if request.body:
+        try:
+            payload = json.loads(request.body)
+        except ValueError as exc:
+            raise ValueError('JSON inválido') from exc
+        if not isinstance(payload, dict):
+            raise ValueError('JSON inválido')
+    data = payload.get('data') if isinstance(payload.get('data'), dict) else {}
+    topic = payload.get('type') or payload.get('topic') or request.GET.get('type') or request.GET.get('topic')
+    resource_id = data.get('id') or request.GET.get('data.id') or request.GET.get('id')
+    if not topic or not resource_id:
+        raise ValueError('Notificação sem tópico ou id')
+    return str(topic), str(resource_id), str(payload.get('action', '')), payload
+
+
+def enqueue(notifications):
+    """Grava (ou reabre) notificações ``(topic, resource_id, action, payload)``"""
+    now = timezone.now()
+    rows = {}
+    for topic, resource_id, action, payload in notifications:
+        rows[(topic, resource_id)] = MercadoPagoNotification(
+            topic=topic, resource_id=resource_id, action=action, payload=payload,
+            status='pending', attempts=0, received_at=now, available_at=now,
+        )
+    MercadoPagoNotification.objects.bulk_create(
+        list(rows.values()),
+        update_conflicts=True,
+        unique_fields=['topic', 'resource_id'],
+        update_fields=['action', 'payload', 'status', 'attempts', 'received_at', 'available_at'],
+    )
+    return len(rows)
+
+
+def claim_batch(limit=None):
+    """
+    Marca atomicamente um lote da fila como ``processing``.
+
+    Lotes presos em ``processing`` (worker morto) voltam a ser elegíveis
+    quando o ``available_at`` (usado como lease) expira.
+    """
+    limit = limit or settings.MERCADOPAGO_WEBHOOK_BATCH_SIZE
+    now = timezone.now()
+    eligible = Q(status__in=('pending', 'processing'), available_at__lte=now)
+    candidates = list(
+        MercadoPagoNotification.objects.filter(eligible)
+        .order_by('available_at', 'pk')
+        .values_list('pk', flat=True)[:limit]
+    )
+    if not candidates:
+        return []
+    lease = now + timedelta(seconds=LEASE_SECONDS)
+    MercadoPagoNotification.objects.filter(eligible, pk__in=candidates).update(
+        status='processing', available_at=lease,
+    )
+    # O lease identifica as linhas deste worker (outro pode ter pego algumas)
+    return list(MercadoPagoNotification.objects.filter(pk__in=candidates, status='processing', available_at=lease))
+
+
+def _is_stale(payment, details):
+    """A resposta gravada é mais recente que ``details`` (notificação fora de ordem)?"""
+    previous = payment.mercadopago_response or {}
+    if str(previous.get('id')) != str(details.get('id')):
+        return False
+    stored = parse_datetime(previous.get('date_last_updated') or '')
+    incoming = parse_datetime(details.get('date_last_updated') or '')
+    return bool(stored and incoming and incoming < stored)
+
+
+def apply_payments(details_list):
+    """
+    Aplica os pagamentos consultados na API a ``Payment`` com um ``bulk_update``.
+
+    O pagamento local é localizado pelo id do MP ou, no primeiro aviso, pelo
+    ``external_reference`` (= ``Payment.reference_code``). Retorna o número de
+    pagamentos alterados.
+    """
+    by_mp_id = {str(details['id']): details for details in details_list}
+    references = {details.get('external_reference') for details in details_list} - {None, ''}
+    # ~Q(...='') repete a condição da constraint parcial, que serve de índice para o id do MP
+    known = Payment.objects.filter(
+        (Q(mercadopago_payment_id__in=list(by_mp_id)) & ~Q(mercadopago_payment_id='')) | Q(reference_code__in=references)
+    ).order_by()
+    by_payment_id = {payment.mercadopago_payment_id: payment for payment in known if payment.mercadopago_payment_id}
+    by_reference = {payment.reference_code: payment for payment in known if payment.reference_code}
+
+    now = timezone.now()
+    changed = {}
+    for mp_id, details in by_mp_id.items():
+        payment = by_payment_id.get(mp_id) or by_reference.get(details.get('external_reference'))
+        status = map_status(details.get('status'))
+        if payment is None or status is None:
+            logger.warning('Pagamento MP %s sem correspondente local (status %s)', mp_id, details.get('status'))
+            continue
+        if payment.mercadopago_payment_id and payment.mercadopago_payment_id != mp_id:
+            # Nova tentativa de pagamento da mesma cobrança: só substitui uma aprovada por outra aprovada
+            if payment.status == 'approved' and status != 'approved':
+                continue
+            by_payment_id.pop(payment.mercadopago_payment_id, None)
+        elif _is_stale(payment, details):
+            continue
+        payment.mercadopago_payment_id = mp_id
+        payment.mercadopago_status = details.get('status', '')
+        payment.mercadopago_response = details
+        payment.status = status
+        payment.payment_method = details.get('payment_method_id') or payment.payment_method
+        approved_at = parse_datetime(details.get('date_approved') or '')
+        if status == 'approved' and approved_at:
+            payment.payment_date = timezone.localdate(approved_at)
+        payment.updated_at = now
+        by_payment_id[mp_id] = payment
+        changed[payment.pk] = payment
+
+    Payment.objects.bulk_update(
+        list(changed.values()),
+        ['mercadopago_payment_id', 'mercadopago_status', 'mercadopago_response', 'status',
+         'payment_method', 'payment_date', 'updated_at'],
+        batch_size=500,
+    )
+    return len(changed)
+
+
+def _fetch(client, notification):
+    try:
+        return notification, client.get_payment(notification.resource_id), None
+    except MercadoPagoError as exc:
+        return notification, None, exc
+
+
+def _reschedule(notification, error, now):
+    attempts = notification.attempts + 1
+    if error.retryable and attempts < settings.MERCADOPAGO_WEBHOOK_MAX_ATTEMPTS:
+        delay = min(30 * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+        fields = {'status': 'pending', 'available_at': now + timedelta(seconds=delay)}
+    else:
+        fields = {'status': 'failed', 'processed_at': now}
+    # Só altera se a linha não foi reaberta por uma notificação nova
+    MercadoPagoNotification.objects.filter(pk=notification.pk, status='processing').update(
+        attempts=attempts, last_error=str(error)[:1000], **fields,
+    )
+
+
+def _apply(fetched, now):
+    with transaction.atomic():
+        apply_payments([details for _, details in fetched])
+        MercadoPagoNotification.objects.filter(
+            pk__in=[notification.pk for notification, _ in fetched], status='processing',
+        ).update(status='done', processed_at=now, last_error='')
+
+
+def process_batch(executor, client=None, limit=None):
+    """Processa um lote da fila; retorna ``(processadas, falhas)``"""
+    notifications = claim_batch(limit)
+    if not notifications:
+        return 0, 0
+    client = client or get_client()
+
+    fetched, errors = [], []
+    for notification, details, error in executor.map(lambda item: _fetch(client, item), notifications):
+        if error is None:
+            fetched.append((notification, details))
+        else:
+            errors.append((notification, error))
+
+    now = timezone.now()
+    try:
+        _apply(fetched, now)
+    except Exception:
+        # Uma notificação ruim não pode prender o lote inteiro em "processing":
+        # aplica uma por vez e só as que falharem voltam para a fila (ou desistem)
+        logger.exception('Lote de %s notificações MP falhou; aplicando uma a uma', len(fetched))
+        applied = []
+        for notification, details in fetched:
+            try:
+                _apply([(notification, details)], now)
+            except Exception as exc:
+                errors.append((notification, MercadoPagoError(f'Falha ao aplicar o pagamento: {exc}')))
+            else:
+                applied.append((notification, details))
+        fetched = applied
+    for notification, error in errors:
+        logger.warning('Notificação MP %s falhou: %s', notification.resource_id, error)
+        _reschedule(notification, error, now)
+    return len(fetched), len(errors)
+
+
+def process_queue(client=None, batch_size=None, max_batches=None):
+    """Processa lotes até a fila esvaziar; retorna ``(processadas, falhas)``"""
+    client = client or get_client()
+    processed = failed = batches = 0
+    with ThreadPoolExecutor(max_workers=client.pool_size, thread_name_prefix='mercadopago') as executor:
+        while max_batches is None or batches < max_batches:
+            done, errors = process_batch(executor, client=client, limit=batch_size)
+            if not done and not errors:
+                break
+            processed += done
+            failed += errors
+            batches += 1
+    return processed, failed
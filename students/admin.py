@@ -1,3 +1,89 @@
 from django.contrib import admin
 
-# Register your models here.
+from core.paginator import EstimatedCountPaginator
+
+from .models import Anamnesis, CyclePhaseSpan, CyclePrediction, Measurement, MenstrualCycle, Student
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    """Tabelas calculadas (students.cycles): só consulta"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Student)
+class StudentAdmin(admin.ModelAdmin):
+    list_display = ['full_name', 'cpf', 'email', 'city', 'modality', 'is_active', 'enrollment_date']
+    list_filter = ['is_active']
+    list_select_related = ['user', 'modality']
+    search_fields = ['cpf', 'user__first_name', 'user__last_name', 'user__email', 'user__username']
+    autocomplete_fields = ['user', 'modality']
+    date_hierarchy = 'enrollment_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @admin.display(description='Nome', ordering='user__first_name')
+    def full_name(self, obj):
+        return obj.user.get_full_name() or obj.user.username
+
+    @admin.display(description='E-mail', ordering='user__email')
+    def email(self, obj):
+        return obj.user.email
+
+
+@admin.register(Anamnesis)
+class AnamnesisAdmin(admin.ModelAdmin):
+    list_display = ['student', 'activity_level', 'has_health_issues', 'has_injuries', 'smoker', 'updated_at']
+    list_filter = ['activity_level', 'has_health_issues', 'has_injuries']
+    list_select_related = ['student__user']
+    search_fields = ['student__cpf', 'student__user__first_name', 'student__user__last_name']
+    autocomplete_fields = ['student']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(MenstrualCycle)
+class MenstrualCycleAdmin(admin.ModelAdmin):
+    list_display = ['student', 'cycle_start_date', 'cycle_duration', 'has_symptoms', 'symptoms_intensity']
+    list_filter = ['has_symptoms', 'symptoms_intensity']
+    list_select_related = ['student__user']
+    search_fields = ['student__cpf', 'student__user__first_name', 'student__user__last_name']
+    autocomplete_fields = ['student']
+    date_hierarchy = 'cycle_start_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Measurement)
+class MeasurementAdmin(admin.ModelAdmin):
+    list_display = ['student', 'measurement_date', 'weight', 'height', 'bmi', 'body_fat_percentage']
+    list_select_related = ['student__user']
+    search_fields = ['student__cpf', 'student__user__first_name', 'student__user__last_name']
+    autocomplete_fields = ['student']
+    readonly_fields = ['bmi']
+    date_hierarchy = 'measurement_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(CyclePrediction)
+class CyclePredictionAdmin(ReadOnlyAdmin):
+    list_display = ['student', 'cycles_observed', 'mean_duration', 'std_duration', 'last_start', 'next_start', 'calendar_end']
+    list_select_related = ['student__user']
+    search_fields = ['student__cpf', 'student__user__first_name', 'student__user__last_name']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(CyclePhaseSpan)
+class CyclePhaseSpanAdmin(ReadOnlyAdmin):
+    list_display = ['student', 'phase', 'start_date', 'end_date', 'cycle_day', 'predicted', 'uncertainty_days']
+    list_filter = ['phase', 'predicted']
+    list_select_related = ['student__user']
+    search_fields = ['student__cpf', 'student__user__first_name', 'student__user__last_name']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,291 @@
+"""
+Análises de composição corporal sobre o histórico de ``Measurement``.
+
+As medidas de uma aluna (ou de toda a base) são lidas em uma única consulta,
+ordenadas por ``(student_id, measurement_date)``, e viram vetores NumPy. Todos
+os cálculos são feitos sobre os vetores inteiros, sem laço por linha:
+
+* os limites de cada aluna saem de ``np.flatnonzero`` sobre a troca de
+  ``student_id`` e as somas por aluna (regressão linear) usam ``np.bincount``;
+* as variações em janela (30/90 dias) usam ``searchsorted`` sobre a chave
+  composta ``(aluna, dia)``;
+* o percentil em relação à base usa os valores mais recentes ordenados.
+
+O resumo de cada aluna fica em cache e é apagado pelos signals de
+``Measurement`` após o commit. A distribuição da base (para os percentis) é
+cacheada à parte, com expiração, já que muda pouco com uma medida a mais.
+"""
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import Measurement
+
+CIRCUMFERENCES = (
+    'neck', 'chest', 'waist', 'abdomen', 'hip', 'right_arm', 'left_arm',
+    'right_thigh', 'left_thigh', 'right_calf', 'left_calf',
+)
+NUMERIC_FIELDS = ('weight', 'height') + CIRCUMFERENCES + ('body_fat_percentage', 'muscle_mass_percentage')
+# Indicadores com tendência e percentil
+TRACKED = ('weight', 'bmi', 'waist', 'waist_to_hip', 'body_fat_percentage', 'lean_mass')
+WINDOWS = (30, 90)
+
+# Espaço entre alunas na chave composta (aluna, dia): maior que qualquer intervalo de datas
+_KEY_STRIDE = 1 << 20
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class MeasurementArrays:
+    """Medidas em vetores paralelos, ordenados por aluna e data"""
+
+    def __init__(self, student, day, values):
+        self.student = student
+        self.day = day
+        self.values = values
+        self._derived = None
+
+    def __len__(self):
+        return len(self.student)
+
+    @property
+    def starts(self):
+        """Índice da primeira medida de cada aluna"""
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(np.r_[True, self.student[1:] != self.student[:-1]])
+
+    @property
+    def ends(self):
+        """Índice da última medida (a mais recente) de cada aluna"""
+        return np.r_[self.starts[1:], len(self)] - 1
+
+    @property
+    def group(self):
+        """Posição da aluna de cada linha em ``students``"""
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+        return np.cumsum(np.r_[True, self.student[1:] != self.student[:-1]]) - 1
+
+    @property
+    def students(self):
+        return self.student[self.starts]
+
+    def __getitem__(self, name):
+        if name in self.values:
+            return self.values[name]
+        return self.derived()[name]
+
+    def derived(self):
+        if self._derived is None:
+            self._derived = derive(self)
+        return self._derived
+
+
+def load(student_ids=None):
+    """Lê as medidas (de ``student_ids`` ou de todas as alunas) em uma consulta"""
+    queryset = Measurement.objects.order_by('student_id', 'measurement_date', 'pk')
+    if student_ids is not None:
+        queryset = queryset.filter(student_id__in=list(student_ids))
+    queryset = queryset.values_list('student_id', 'measurement_date', *NUMERIC_FIELDS)
+    # SQL direto: evita os conversores por valor do ORM (Decimal/date linha a linha)
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    if not rows:
+        empty = np.empty(0)
+        return MeasurementArrays(np.empty(0, dtype=np.int64), np.empty(0, dtype='datetime64[D]'), {
+            name: empty for name in NUMERIC_FIELDS
+        })
+    columns = list(zip(*rows))
+    # None vira NaN na conversão para float
+    values = {name: np.array(column, dtype=float) for name, column in zip(NUMERIC_FIELDS, columns[2:])}
+    return MeasurementArrays(np.array(columns[0], dtype=np.int64), _to_days(columns[1]), values)
+
+
+def _to_days(dates):
+    """``date``s em ``datetime64[D]`` via ordinal (~50x mais rápido que converter objeto a objeto)"""
+    if isinstance(dates[0], str):
+        return np.array(dates, dtype='datetime64[D]')
+    ordinals = np.fromiter(map(date.toordinal, dates), dtype=np.int64, count=len(dates))
+    return (ordinals - _EPOCH_ORDINAL).astype('datetime64[D]')
+
+
+def _previous_within(arrays, days):
+    """Índice da medida mais antiga da mesma aluna nos últimos ``days`` dias"""
+    key = arrays.student * _KEY_STRIDE + arrays.day.astype(np.int64)
+    return np.searchsorted(key, key - days, side='left')
+
+
+def derive(arrays):
+    """Indicadores calculados a partir das medidas brutas"""
+    weight, height = arrays.values['weight'], arrays.values['height']
+    waist, hip = arrays.values['waist'], arrays.values['hip']
+    body_fat = arrays.values['body_fat_percentage']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        derived = {
+            'bmi': weight / height ** 2,
+            'waist_to_hip': np.where(hip > 0, waist / hip, np.nan),
+            'fat_mass': weight * body_fat / 100,
+            'lean_mass': weight * (1 - body_fat / 100),
+        }
+
+    # Variação para a medida anterior da mesma aluna
+    first = np.zeros(len(arrays), dtype=bool)
+    first[arrays.starts] = True
+    for name in ('weight', 'bmi', 'waist', 'lean_mass'):
+        series = arrays.values.get(name, derived.get(name))
+        delta = np.empty(len(arrays))
+        delta[:1] = np.nan
+        delta[1:] = series[1:] - series[:-1]
+        delta[first] = np.nan
+        derived[f'{name}_delta'] = delta
+
+    # Variação em janelas móveis (contra a medida mais antiga dentro da janela)
+    for days in WINDOWS:
+        previous = _previous_within(arrays, days)
+        has_history = previous < np.arange(len(arrays))
+        for name in ('weight', 'waist'):
+            series = arrays.values[name]
+            derived[f'{name}_change_{days}d'] = np.where(has_history, series - series[previous], np.nan)
+    return derived
+
+
+def trends(arrays, names=TRACKED):
+    """
+    Inclinação da reta de regressão por aluna, em unidades por semana.
+
+    Retorna ``{indicador: vetor}`` alinhado com ``arrays.students``; alunas
+    com menos de duas medidas válidas ficam com NaN.
+    """
+    group = arrays.group
+    size = len(arrays.starts)
+    if not len(arrays):
+        return {name: np.empty(0) for name in names}
+    x = (arrays.day - arrays.day.min()).astype(float) / 7
+    result = {}
+    for name in names:
+        y = arrays[name]
+        valid = ~np.isnan(y)
+        g, xv, yv = group[valid], x[valid], y[valid]
+        n = np.bincount(g, minlength=size)
+        sx = np.bincount(g, xv, minlength=size)
+        sy = np.bincount(g, yv, minlength=size)
+        sxx = np.bincount(g, xv * xv, minlength=size)
+        sxy = np.bincount(g, xv * yv, minlength=size)
+        denominator = n * sxx - sx * sx
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result[name] = np.where((n >= 2) & (denominator > 0), (n * sxy - sx * sy) / denominator, np.nan)
+    return result
+
+
+def percentile_ranks(values, reference=None):
+    """
+    Percentil (0-100) de cada valor em ``reference`` (por padrão, os próprios
+    valores): a fração da base com valor menor ou igual. NaN fica NaN.
+    """
+    reference = values if reference is None else reference
+    reference = np.sort(reference[~np.isnan(reference)])
+    ranks = np.full(len(values), np.nan)
+    if len(reference):
+        valid = ~np.isnan(values)
+        ranks[valid] = np.searchsorted(reference, values[valid], side='right') / len(reference) * 100
+    return ranks
+
+
+def latest_values(arrays, names=TRACKED):
+    """Último valor conhecido de cada indicador por aluna (ignorando medidas sem o dado)"""
+    if not len(arrays):
+        return {name: np.empty(0) for name in names}
+    positions = np.arange(len(arrays))
+    result = {}
+    for name in names:
+        series = arrays[name]
+        # Posição da última medida com o dado até cada linha
+        last_valid = np.maximum.accumulate(np.where(np.isnan(series), -1, positions))
+        picked = last_valid[arrays.ends]
+        result[name] = np.where(picked >= arrays.starts, series[picked], np.nan)
+    return result
+
+
+def cohort_report(student_ids=None):
+    """
+    Indicadores de toda a base (ou de ``student_ids``), uma entrada por aluna:
+    último valor, tendência semanal e percentil de cada indicador.
+    """
+    arrays = load(student_ids)
+    latest = latest_values(arrays)
+    slopes = trends(arrays)
+    ranks = {name: percentile_ranks(values) for name, values in latest.items()}
+    counts = np.diff(np.r_[arrays.starts, len(arrays)])
+    return {
+        'students': arrays.students,
+        'measurements': counts,
+        'first_date': arrays.day[arrays.starts],
+        'last_date': arrays.day[arrays.ends],
+        'latest': latest,
+        'trend_per_week': slopes,
+        'percentile': ranks,
+    }
+
+
+def _float(value):
+    return None if np.isnan(value) else round(float(value), 3)
+
+
+def cohort_distribution():
+    """Últimos valores de toda a base, ordenados, para os percentis individuais"""
+    key = 'students:analytics:cohort'
+    distribution = cache.get(key)
+    if distribution is None:
+        latest = latest_values(load())
+        distribution = {name: np.sort(values[~np.isnan(values)]) for name, values in latest.items()}
+        cache.set(key, distribution, settings.MEASUREMENT_COHORT_CACHE_TIMEOUT)
+    return distribution
+
+
+def _summary_key(student_id):
+    return f'students:analytics:summary:{student_id}'
+
+
+def build_student_summary(student_id):
+    arrays = load([student_id])
+    if not len(arrays):
+        return None
+    latest = {name: values[0] for name, values in latest_values(arrays).items()}
+    slopes = {name: values[0] for name, values in trends(arrays).items()}
+    distribution = cohort_distribution()
+    series_names = ('weight', 'bmi', 'waist_to_hip', 'lean_mass', 'fat_mass', 'weight_delta') + tuple(
+        f'{name}_change_{days}d' for days in WINDOWS for name in ('weight', 'waist')
+    )
+    return {
+        'student_id': student_id,
+        'dates': [str(day) for day in arrays.day],
+        'series': {name: [_float(value) for value in arrays[name]] for name in series_names},
+        'latest': {name: _float(value) for name, value in latest.items()},
+        'trend_per_week': {name: _float(value) for name, value in slopes.items()},
+        'percentile': {
+            name: _float(percentile_ranks(np.array([latest[name]]), distribution[name])[0]) for name in TRACKED
+        },
+    }
+
+
+def student_summary(student_id):
+    """Resumo de uma aluna (séries, tendências e percentis), servido do cache"""
+    key = _summary_key(student_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_student_summary(student_id)
+        cache.set(key, summary, settings.MEASUREMENT_ANALYTICS_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_student(student_id):
+    cache.delete(_summary_key(student_id))
+
+
+def invalidate_students(student_ids):
+    cache.delete_many([_summary_key(student_id) for student_id in student_ids])
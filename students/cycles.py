@@ -0,0 +1,165 @@
+"""
+Previsão das fases do ciclo menstrual.
+
+A duração do ciclo de cada aluna é estimada pelos intervalos entre os inícios
+registrados em ``MenstrualCycle``: média e variância ponderadas, com peso
+decrescente para ciclos mais antigos (``DECAY``). Sem histórico suficiente,
+vale a duração informada no último registro.
+
+A partir do último início registrado, os próximos ciclos são projetados até
+``CYCLE_CALENDAR_WEEKS`` semanas à frente e cada ciclo é dividido em fases
+(menstrual, folicular, ovulatória e lútea, com a fase lútea fixa em
+``LUTEAL_DAYS``). O calendário é gravado de forma compacta em
+``CyclePhaseSpan``, uma linha por fase, e não por dia.
+
+O calendário de uma aluna é refeito quando um registro dela muda (signals).
+O job diário ``refresh_cycle_calendars`` remove as fases já encerradas e
+estende o horizonte das alunas que estão chegando ao fim do calendário.
+Assim, a fase de hoje de todas as alunas é uma única consulta indexada em
+``(start_date, end_date)``.
+"""
+import math
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CyclePhaseSpan, CyclePrediction, MenstrualCycle
+
+MIN_DURATION = 15
+MAX_DURATION = 60
+# Peso de cada ciclo em relação ao seguinte (o mais recente pesa 1)
+DECAY = 0.7
+# Desvio mínimo assumido quando há poucos ciclos observados
+MIN_STD = 1.0
+DEFAULT_STD = 3.0
+PERIOD_DAYS = 5
+LUTEAL_DAYS = 14
+# O calendário é estendido quando faltam menos que isto para o fim
+REFRESH_MARGIN = timedelta(days=7)
+REFRESH_CHUNK = 2000
+
+
+def estimate(cycles):
+    """
+    ``cycles`` é a lista ``[(início, duração informada), ...]`` em ordem
+    cronológica. Retorna ``(média, desvio, ciclos observados)``.
+    """
+    starts = [start for start, _ in cycles]
+    observed = [(after - before).days for before, after in zip(starts, starts[1:])]
+    observed = [days for days in observed if MIN_DURATION <= days <= MAX_DURATION]
+    if not observed:
+        declared = min(max(cycles[-1][1] or 28, MIN_DURATION), MAX_DURATION)
+        return float(declared), DEFAULT_STD, 0
+    weights = [DECAY ** age for age in range(len(observed) - 1, -1, -1)]
+    total = sum(weights)
+    mean = sum(weight * days for weight, days in zip(weights, observed)) / total
+    variance = sum(weight * (days - mean) ** 2 for weight, days in zip(weights, observed)) / total
+    return mean, max(math.sqrt(variance), MIN_STD), len(observed)
+
+
+def phases(length):
+    """Fases de um ciclo de ``length`` dias: ``[(fase, primeiro dia, último dia), ...]``"""
+    period = min(PERIOD_DAYS, length // 3)
+    ovulation = max(length - LUTEAL_DAYS, period + 2)
+    spans = [
+        ('menstrual', 1, period),
+        ('follicular', period + 1, ovulation - 2),
+        ('ovulatory', max(ovulation - 1, period + 1), ovulation + 1),
+        ('luteal', ovulation + 2, length),
+    ]
+    return [(phase, first, last) for phase, first, last in spans if first <= last]
+
+
+def build_calendar(student_id, cycles, today, weeks):
+    """Previsão e fases (ainda não gravadas) de uma aluna"""
+    mean, std, observed = estimate(cycles)
+    last_start = cycles[-1][0]
+    horizon = today + timedelta(weeks=weeks)
+    spans = []
+    cycle = 0
+    start = last_start
+    while start <= horizon:
+        next_start = last_start + timedelta(days=round((cycle + 1) * mean))
+        length = (next_start - start).days
+        uncertainty = round(std * math.sqrt(cycle)) if cycle else 0
+        for phase, first, last in phases(length):
+            span_end = start + timedelta(days=last - 1)
+            if span_end < today:
+                continue
+            spans.append(CyclePhaseSpan(
+                student_id=student_id, phase=phase, start_date=start + timedelta(days=first - 1), end_date=span_end,
+                cycle_start=start, cycle_day=first, predicted=cycle > 0, uncertainty_days=uncertainty,
+            ))
+        cycle += 1
+        start = next_start
+    prediction = CyclePrediction(
+        student_id=student_id, cycles_observed=observed, mean_duration=round(mean, 1), std_duration=round(std, 1),
+        last_start=last_start, next_start=last_start + timedelta(days=round(mean)), calendar_end=start - timedelta(days=1),
+    )
+    return prediction, spans
+
+
+def refresh_students(student_ids, today=None, weeks=None):
+    """Refaz previsão e calendário das alunas informadas (uma leitura, um lote de escrita)"""
+    today = today or timezone.localdate()
+    weeks = weeks or settings.CYCLE_CALENDAR_WEEKS
+    student_ids = list(student_ids)
+    rows = (
+        MenstrualCycle.objects.filter(student_id__in=student_ids)
+        .order_by('student_id', 'cycle_start_date', 'pk').values_list('student_id', 'cycle_start_date', 'cycle_duration')
+    )
+    predictions, spans = [], []
+    for student_id, group in groupby(rows, key=lambda row: row[0]):
+        prediction, student_spans = build_calendar(student_id, [(start, days) for _, start, days in group], today, weeks)
+        predictions.append(prediction)
+        spans.extend(student_spans)
+
+    with transaction.atomic():
+        CyclePhaseSpan.objects.filter(student_id__in=student_ids).delete()
+        CyclePrediction.objects.filter(student_id__in=student_ids).exclude(
+            student_id__in=[prediction.student_id for prediction in predictions],
+        ).delete()
+        CyclePrediction.objects.bulk_create(
+            predictions, update_conflicts=True, unique_fields=['student'],
+            update_fields=['cycles_observed', 'mean_duration', 'std_duration', 'last_start', 'next_start', 'calendar_end', 'updated_at'],
+        )
+        CyclePhaseSpan.objects.bulk_create(spans, batch_size=1000)
+    return len(predictions)
+
+
+def refresh_due(today=None, weeks=None, full=False):
+    """
+    Job diário: apaga as fases encerradas e refaz as alunas cujo calendário
+    termina em menos de ``REFRESH_MARGIN`` (ou todas, com ``full``).
+    """
+    today = today or timezone.localdate()
+    weeks = weeks or settings.CYCLE_CALENDAR_WEEKS
+    pruned, _ = CyclePhaseSpan.objects.filter(end_date__lt=today).delete()
+    if full:
+        due = MenstrualCycle.objects.values_list('student_id', flat=True).distinct()
+    else:
+        due = CyclePrediction.objects.filter(
+            calendar_end__lt=today + timedelta(weeks=weeks) - REFRESH_MARGIN,
+        ).values_list('student_id', flat=True)
+    due = sorted(set(due))
+    refreshed = 0
+    for start in range(0, len(due), REFRESH_CHUNK):
+        refreshed += refresh_students(due[start:start + REFRESH_CHUNK], today, weeks)
+    return refreshed, pruned
+
+
+def phases_on(day=None, instructor=None):
+    """Fase de cada aluna ativa em ``day`` (hoje), em uma consulta
+
+    Com ``instructor``, só as alunas inscritas em alguma aula ao vivo dela.
+    """
+    day = day or timezone.localdate()
+    spans = CyclePhaseSpan.objects.filter(start_date__lte=day, end_date__gte=day, student__is_active=True)
+    if instructor is not None:
+        followed = get_user_model().objects.filter(registered_lives__instructor=instructor).values('pk')
+        spans = spans.filter(student__user__in=followed)
+    return spans.select_related('student__user').order_by('student__user__first_name', 'student__user__last_name')
@@ -0,0 +1,47 @@
+from core.exports import Column, Export, yes_no
+
+from .models import Measurement, Student
+
+MEASUREMENT_FIELDS = (
+    'weight', 'height', 'bmi', 'neck', 'chest', 'waist', 'abdomen', 'hip', 'right_arm', 'left_arm',
+    'right_thigh', 'left_thigh', 'right_calf', 'left_calf', 'body_fat_percentage', 'muscle_mass_percentage',
+)
+
+
+def student_export(params):
+    """Lista de alunas; ``?active=1`` ou ``?active=0`` filtra por situação"""
+    queryset = Student.objects.order_by('pk')
+    if params.get('active') in ('0', '1'):
+        queryset = queryset.filter(is_active=params['active'] == '1')
+    columns = [
+        Column('ID', 'pk'),
+        Column('Nome', 'user__first_name'),
+        Column('Sobrenome', 'user__last_name'),
+        Column('E-mail', 'user__email'),
+        Column('Telefone', 'user__phone'),
+        Column('Data de Nascimento', 'user__birth_date'),
+        Column('CPF', 'cpf'),
+        Column('Cidade', 'city'),
+        Column('Estado', 'state'),
+        Column('Plano', 'modality__name'),
+        Column('Data de Matrícula', 'enrollment_date'),
+        Column('Ativo', 'is_active', yes_no),
+    ]
+    return Export('alunas', queryset, columns)
+
+
+def measurement_export(params):
+    """Histórico de medidas; ``?student=<id>`` restringe a uma aluna"""
+    queryset = Measurement.objects.order_by('student_id', 'measurement_date', 'pk')
+    if params.get('student', '').isdigit():
+        queryset = queryset.filter(student_id=params['student'])
+    columns = [
+        Column('ID Aluna', 'student_id'),
+        Column('Nome', 'student__user__first_name'),
+        Column('Sobrenome', 'student__user__last_name'),
+        Column('CPF', 'student__cpf'),
+        Column('Data da Medição', 'measurement_date'),
+    ]
+    columns += [Column(str(Measurement._meta.get_field(name).verbose_name), name) for name in MEASUREMENT_FIELDS]
+    columns.append(Column('Observações', 'observations'))
+    return Export('medidas', queryset, columns)
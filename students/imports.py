@@ -0,0 +1,294 @@
+"""
+Importação em lote de medidas exportadas por balanças de bioimpedância.
+
+O arquivo (CSV com ``;`` ou ``,``, JSON ou JSON Lines) é lido em blocos com
+pandas. Para cada bloco, sem laço por linha:
+
+1. as alunas são resolvidas pelo CPF (só dígitos) em um mapa carregado uma
+   única vez no início da importação;
+2. datas e números são convertidos (aceita vírgula decimal e altura em cm) e
+   validados com máscaras NumPy; cada linha rejeitada recebe o primeiro
+   motivo que falhou;
+3. medidas já existentes para a mesma aluna e data são ignoradas (a
+   importação pode ser repetida);
+4. o IMC é calculado em centésimos inteiros, com o mesmo arredondamento
+   (meio para o par) que o ``DecimalField`` aplicaria ao ``save()``;
+5. as linhas válidas são gravadas com ``bulk_create`` em lotes.
+
+``Measurement.save()`` não é chamado, então o cache de análises das alunas
+afetadas é invalidado explicitamente após o commit de cada bloco.
+"""
+import csv
+import time
+import unicodedata
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from . import analytics
+from .models import Measurement, Student
+
+# Cabeçalhos aceitos (sem acentos, minúsculos) -> campo
+COLUMN_ALIASES = {
+    'cpf': 'cpf',
+    'data': 'measurement_date', 'data da medicao': 'measurement_date', 'date': 'measurement_date',
+    'measurement_date': 'measurement_date',
+    'peso': 'weight', 'peso (kg)': 'weight', 'weight': 'weight',
+    'altura': 'height', 'altura (m)': 'height', 'altura (cm)': 'height', 'height': 'height',
+    'pescoco': 'neck', 'pescoco (cm)': 'neck', 'neck': 'neck',
+    'peitoral': 'chest', 'peitoral (cm)': 'chest', 'chest': 'chest',
+    'cintura': 'waist', 'cintura (cm)': 'waist', 'waist': 'waist',
+    'abdomen': 'abdomen', 'abdomen (cm)': 'abdomen',
+    'quadril': 'hip', 'quadril (cm)': 'hip', 'hip': 'hip',
+    'braco direito': 'right_arm', 'braco direito (cm)': 'right_arm', 'right_arm': 'right_arm',
+    'braco esquerdo': 'left_arm', 'braco esquerdo (cm)': 'left_arm', 'left_arm': 'left_arm',
+    'coxa direita': 'right_thigh', 'coxa direita (cm)': 'right_thigh', 'right_thigh': 'right_thigh',
+    'coxa esquerda': 'left_thigh', 'coxa esquerda (cm)': 'left_thigh', 'left_thigh': 'left_thigh',
+    'panturrilha direita': 'right_calf', 'panturrilha direita (cm)': 'right_calf', 'right_calf': 'right_calf',
+    'panturrilha esquerda': 'left_calf', 'panturrilha esquerda (cm)': 'left_calf', 'left_calf': 'left_calf',
+    '% gordura': 'body_fat_percentage', 'gordura': 'body_fat_percentage', 'gordura corporal': 'body_fat_percentage',
+    'body_fat': 'body_fat_percentage', 'body_fat_percentage': 'body_fat_percentage',
+    '% massa muscular': 'muscle_mass_percentage', 'massa muscular': 'muscle_mass_percentage',
+    'muscle_mass': 'muscle_mass_percentage', 'muscle_mass_percentage': 'muscle_mass_percentage',
+    'observacoes': 'observations', 'observations': 'observations',
+}
+
+REQUIRED = ('cpf', 'measurement_date', 'weight', 'height')
+# Faixas aceitas (limites inclusivos); campos opcionais vazios passam
+RANGES = {
+    'weight': (20, 350),
+    'height': (0.5, 2.5),
+    'body_fat_percentage': (1, 75),
+    'muscle_mass_percentage': (5, 80),
+}
+RANGES.update({name: (5, 300) for name in analytics.CIRCUMFERENCES})
+NUMERIC_FIELDS = tuple(RANGES)
+
+# Measurement.bmi é DecimalField(max_digits=5, decimal_places=2): no máximo 999,99
+MAX_BMI_CENTS = 100_000
+
+UNKNOWN_CPF = 'unknown_cpf'
+INVALID_DATE = 'invalid_date'
+INVALID_BMI = 'invalid_bmi'
+DUPLICATE = 'duplicate'
+
+REJECTED_FIELDS = ['line', 'cpf', 'measurement_date', 'reason']
+
+
+def normalize_header(name):
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode()
+    return ' '.join(text.lower().split())
+
+
+def cpf_digits(values):
+    return values.astype(str).str.replace(r'\D', '', regex=True)
+
+
+def read_file(path, chunk_size=20_000, aliases=COLUMN_ALIASES):
+    """Blocos (DataFrames de texto) com as colunas renomeadas para os campos do modelo"""
+    if str(path).endswith(('.json', '.jsonl')):
+        with open(path, encoding='utf-8-sig') as fh:
+            lines = not fh.read(1024).lstrip().startswith('[')
+        options = {'dtype': False, 'convert_dates': False, 'keep_default_dates': False}
+        if lines:
+            reader = pd.read_json(path, lines=True, chunksize=chunk_size, **options)
+        else:
+            frame = pd.read_json(path, **options)
+            reader = (frame.iloc[start:start + chunk_size] for start in range(0, len(frame), chunk_size))
+        # Mesmo tratamento do CSV: tudo como texto, nulos como vazio
+        reader = (chunk.astype(object).where(chunk.notna(), '').astype(str) for chunk in reader)
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as fh:
+            separator = ';' if fh.readline().count(';') > 0 else ','
+        reader = pd.read_csv(
+            path, sep=separator, chunksize=chunk_size, dtype=str, keep_default_na=False, encoding='utf-8-sig',
+        )
+    for chunk in reader:
+        columns = {name: aliases.get(normalize_header(name)) for name in chunk.columns}
+        chunk = chunk[[name for name, field in columns.items() if field]].rename(columns=columns)
+        yield chunk.loc[:, ~chunk.columns.duplicated()]
+
+
+def to_cents(values):
+    """Texto -> centésimos inteiros (float com NaN para vazios/inválidos)"""
+    text = values.astype(str).str.strip().str.replace(',', '.', regex=False)
+    return np.round(pd.to_numeric(text, errors='coerce').to_numpy(dtype=float) * 100)
+
+
+def parse_dates(values):
+    text = values.astype(str).str.strip()
+    parsed = pd.to_datetime(text, format='%Y-%m-%d', errors='coerce')
+    parsed = parsed.fillna(pd.to_datetime(text, format='%d/%m/%Y', errors='coerce'))
+    return parsed.to_numpy(dtype='datetime64[D]')
+
+
+def bmi_cents(weight_cents, height_cents):
+    """
+    IMC em centésimos, exato: ``peso / altura²`` com peso e altura em
+    centésimos é ``peso_c * 10000 / altura_c²``, arredondado meio para o par.
+    """
+    numerator = weight_cents.astype(np.int64) * 10_000
+    denominator = height_cents.astype(np.int64) ** 2
+    quotient, remainder = np.divmod(numerator, denominator)
+    twice = remainder * 2
+    round_up = (twice > denominator) | ((twice == denominator) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def _decimals(cents, present):
+    return [Decimal(int(value)).scaleb(-2) if ok else None for value, ok in zip(cents.tolist(), present.tolist())]
+
+
+class MeasurementImporter:
+    """Valida e grava as medidas de um arquivo, bloco a bloco"""
+
+    def __init__(self, chunk_size=20_000, batch_size=2000, dry_run=False, rejected=None):
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        # Recebe dicionários com REJECTED_FIELDS para cada linha recusada
+        self.rejected = rejected
+        self.rows = 0
+        self.imported = 0
+        self.reasons = {}
+        self.elapsed = 0.0
+        self._students = None
+
+    @property
+    def rejected_count(self):
+        return sum(self.reasons.values())
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def student_map(self):
+        """CPF (só dígitos) -> id da aluna, carregado uma vez por importação"""
+        if self._students is None:
+            rows = list(Student.objects.values_list('cpf', 'pk'))
+            cpfs = cpf_digits(pd.Series([cpf for cpf, _ in rows], dtype=str))
+            students = pd.Series([pk for _, pk in rows], index=cpfs, dtype='float64')
+            self._students = students[~students.index.duplicated()]
+        return self._students
+
+    def run(self, path):
+        began = time.perf_counter()
+        # Linha do arquivo no CSV (a 1 é o cabeçalho); posição do registro no JSON
+        line = 1 if str(path).endswith(('.json', '.jsonl')) else 2
+        for chunk in read_file(path, self.chunk_size):
+            self.import_chunk(chunk, first_line=line)
+            line += len(chunk)
+        self.elapsed = time.perf_counter() - began
+        return self.imported, self.reasons
+
+    def import_chunk(self, chunk, first_line=2):
+        size = len(chunk)
+        self.rows += size
+        missing = [name for name in REQUIRED if name not in chunk]
+        if missing:
+            self._reject(chunk, np.full(size, f'missing_column_{missing[0]}', dtype=object), first_line)
+            return 0
+
+        # Primeiro motivo de rejeição de cada linha ('' = válida)
+        reason = np.full(size, '', dtype=object)
+
+        def fail(mask, code):
+            reason[mask & (reason == '')] = code
+
+        students = cpf_digits(chunk['cpf']).map(self.student_map()).to_numpy(dtype=float)
+        fail(np.isnan(students), UNKNOWN_CPF)
+
+        dates = parse_dates(chunk['measurement_date'])
+        fail(np.isnat(dates) | (dates > np.datetime64(timezone.localdate())), INVALID_DATE)
+
+        cents = {}
+        present = {}
+        for name in NUMERIC_FIELDS:
+            raw = chunk[name] if name in chunk else pd.Series('', index=chunk.index)
+            blank = raw.astype(str).str.strip().eq('').to_numpy()
+            values = to_cents(raw)
+            if name == 'height':
+                # Balanças que exportam a altura em cm
+                values = np.where(values >= 300, np.round(values / 100), values)
+            low, high = RANGES[name]
+            invalid = ~blank & ~((values >= low * 100) & (values <= high * 100))
+            if name in REQUIRED:
+                invalid |= blank
+            fail(invalid, f'invalid_{name}')
+            cents[name] = np.nan_to_num(values)
+            present[name] = ~blank & ~invalid
+
+        valid = reason == ''
+        bmi = np.zeros(size, dtype=np.int64)
+        bmi[valid] = bmi_cents(cents['weight'][valid], cents['height'][valid])
+        # Peso e altura nas faixas ainda podem dar um IMC que não cabe na coluna
+        fail(valid & (bmi >= MAX_BMI_CENTS), INVALID_BMI)
+
+        valid = reason == ''
+        student_ids = np.where(valid, students, 0).astype(np.int64)
+        fail(valid & self._existing(student_ids, dates, valid), DUPLICATE)
+        valid = reason == ''
+
+        self._reject(chunk, reason, first_line)
+        if not valid.any():
+            return 0
+
+        observations = chunk['observations'].astype(str).to_numpy() if 'observations' in chunk else np.full(size, '')
+
+        indexes = np.flatnonzero(valid)
+        columns = {name: _decimals(cents[name][indexes], present[name][indexes]) for name in NUMERIC_FIELDS}
+        bmi_values = _decimals(bmi[indexes], np.ones(len(indexes), dtype=bool))
+        days = dates[indexes].tolist()
+        objects = [
+            Measurement(
+                student_id=int(student_ids[index]), measurement_date=days[position], bmi=bmi_values[position],
+                observations=observations[index], **{name: columns[name][position] for name in NUMERIC_FIELDS},
+            )
+            for position, index in enumerate(indexes)
+        ]
+        if not self.dry_run:
+            affected = set(student_ids[indexes].tolist())
+            with transaction.atomic():
+                Measurement.objects.bulk_create(objects, batch_size=self.batch_size)
+                transaction.on_commit(lambda: analytics.invalidate_students(affected))
+        self.imported += len(objects)
+        return len(objects)
+
+    def _existing(self, student_ids, dates, valid):
+        """Marca as linhas (aluna, data) que já estão no banco ou repetidas no próprio bloco"""
+        duplicated = np.zeros(len(student_ids), dtype=bool)
+        if not valid.any():
+            return duplicated
+        keys = pd.Series(list(zip(student_ids.tolist(), dates.tolist())))
+        duplicated |= (keys.duplicated() & pd.Series(valid)).to_numpy()
+        stored = Measurement.objects.filter(
+            student_id__in=set(student_ids[valid].tolist()),
+            measurement_date__range=(dates[valid].min().item(), dates[valid].max().item()),
+        ).values_list('student_id', 'measurement_date')
+        duplicated |= keys.isin(set(stored)).to_numpy()
+        return duplicated
+
+    def _reject(self, chunk, reason, first_line):
+        rejected = np.flatnonzero(reason != '')
+        if not len(rejected):
+            return
+        codes, counts = np.unique(reason[rejected].astype(str), return_counts=True)
+        for code, count in zip(codes.tolist(), counts.tolist()):
+            self.reasons[code] = self.reasons.get(code, 0) + count
+        if self.rejected is None:
+            return
+        cpfs = chunk['cpf'].to_numpy() if 'cpf' in chunk else np.full(len(chunk), '')
+        dates = chunk['measurement_date'].to_numpy() if 'measurement_date' in chunk else np.full(len(chunk), '')
+        for index in rejected.tolist():
+            self.rejected({
+                'line': first_line + index, 'cpf': cpfs[index], 'measurement_date': dates[index], 'reason': reason[index],
+            })
+
+
+def csv_rejected_writer(output):
+    writer = csv.DictWriter(output, fieldnames=REJECTED_FIELDS)
+    writer.writeheader()
+    return writer.writerow
@@ -0,0 +1,110 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from students import analytics
+from students.models import Measurement, Student
+
+INSERT_BATCH = 50_000
+
+
+def naive_report(student_ids):
+    """O mesmo relatório com o ORM e laços em Python (para comparação)"""
+    report = {}
+    for student_id in student_ids:
+        measurements = list(Measurement.objects.filter(student_id=student_id).order_by('measurement_date', 'pk'))
+        if not measurements:
+            continue
+        xs = [(m.measurement_date - measurements[0].measurement_date).days / 7 for m in measurements]
+        ys = [float(m.weight) for m in measurements]
+        n = len(xs)
+        mean_x, mean_y = sum(xs) / n, sum(ys) / n
+        var_x = sum((x - mean_x) ** 2 for x in xs)
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x if var_x else None
+        last = measurements[-1]
+        report[student_id] = {
+            'weight': float(last.weight),
+            'waist_to_hip': float(last.waist / last.hip) if last.waist and last.hip else None,
+            'lean_mass': float(last.weight * (1 - last.body_fat_percentage / 100)) if last.body_fat_percentage else None,
+            'trend': slope,
+        }
+    weights = sorted(entry['weight'] for entry in report.values())
+    for entry in report.values():
+        entry['percentile'] = sum(1 for weight in weights if weight <= entry['weight']) / len(weights) * 100
+    return report
+
+
+class Command(BaseCommand):
+    help = 'Teste de carga das análises de medidas: relatório da base inteira (tudo é desfeito no final)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=50_000)
+        parser.add_argument('--per-student', type=int, default=12, help='Medidas por aluna')
+        parser.add_argument('--naive-sample', type=int, default=2000, help='Alunas na comparação com o ORM (0 desativa)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            student_ids = self._seed(options['students'], options['per_student'])
+
+            began = time.perf_counter()
+            arrays = analytics.load()
+            loaded = time.perf_counter() - began
+            began = time.perf_counter()
+            report = analytics.cohort_report()
+            total = time.perf_counter() - began
+            self.stdout.write(
+                f'{len(arrays)} medidas de {len(report["students"])} alunas | só a leitura {loaded:.2f}s | '
+                f'relatório completo (leitura + cálculos) {total:.2f}s'
+            )
+
+            sample = options['naive_sample']
+            if sample:
+                began = time.perf_counter()
+                naive_report(student_ids[:sample])
+                elapsed = time.perf_counter() - began
+                self.stdout.write(
+                    f'ORM + Python: {sample} alunas em {elapsed:.2f}s '
+                    f'(~{elapsed * len(student_ids) / sample:.0f}s estimados para a base inteira)'
+                )
+            transaction.set_rollback(True)
+
+    def _seed(self, total, per_student):
+        began = time.perf_counter()
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f'bench-analytics-{index}', password='!') for index in range(total)], batch_size=5000,
+        )
+        users = CustomUser.objects.filter(username__startswith='bench-analytics-').order_by('pk')
+        Student.objects.bulk_create(
+            [Student(user=user, cpf=f'bench-an-{index}') for index, user in enumerate(users)], batch_size=5000,
+        )
+        student_ids = list(Student.objects.filter(cpf__startswith='bench-an-').order_by('pk').values_list('pk', flat=True))
+        columns = ['student_id', 'measurement_date', 'weight', 'height', 'waist', 'hip', 'body_fat_percentage', 'observations', 'created_at']
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(Measurement._meta.db_table),
+            ', '.join(connection.ops.quote_name(column) for column in columns),
+            ', '.join(['%s'] * len(columns)),
+        )
+        now = timezone.now()
+        first_day = date.today() - timedelta(days=30 * per_student)
+        batch = []
+        with connection.cursor() as cursor:
+            for student_id in student_ids:
+                weight, waist, body_fat = random.uniform(55, 95), random.uniform(65, 100), random.uniform(18, 38)
+                for month in range(per_student):
+                    weight += random.uniform(-1.5, 1)
+                    batch.append((
+                        student_id, first_day + timedelta(days=30 * month + random.randrange(5)), round(weight, 2),
+                        1.65, round(waist - month * 0.3, 2), 100.0, round(body_fat - month * 0.2, 2), '', now,
+                    ))
+                if len(batch) >= INSERT_BATCH:
+                    cursor.executemany(sql, batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+        self.stdout.write(f'{total * per_student} medidas criadas em {time.perf_counter() - began:.1f}s')
+        return student_ids
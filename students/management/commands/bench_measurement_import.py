@@ -0,0 +1,63 @@
+import csv
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import CustomUser
+from students.imports import MeasurementImporter
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Teste de carga da importação de medidas: gera um CSV de N linhas e importa (tudo é desfeito no final)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--students', type=int, default=10_000)
+        parser.add_argument('--invalid', type=float, default=0.02, help='Fração de linhas inválidas')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            cpfs = self._seed(options['students'])
+            fd, path = tempfile.mkstemp(suffix='.csv')
+            try:
+                with os.fdopen(fd, 'w', newline='', encoding='utf-8') as fh:
+                    self._write_csv(fh, cpfs, options['rows'], options['invalid'])
+                importer = MeasurementImporter()
+                importer.run(path)
+            finally:
+                os.unlink(path)
+            self.stdout.write(
+                f'{importer.rows} linhas em {importer.elapsed:.2f}s ({importer.rows_per_second * 60:.0f} linhas/min) | '
+                f'importadas={importer.imported} | recusadas={importer.rejected_count} {importer.reasons}'
+            )
+            transaction.set_rollback(True)
+
+    def _seed(self, total):
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f'bench-import-{index}', password='!') for index in range(total)], batch_size=5000,
+        )
+        users = CustomUser.objects.filter(username__startswith='bench-import-').order_by('pk')
+        cpfs = [f'{index:03d}.{index % 1000:03d}.{index % 777:03d}-{index % 97:02d}' for index in range(total)]
+        Student.objects.bulk_create([Student(user=user, cpf=cpf) for user, cpf in zip(users, cpfs)], batch_size=5000)
+        return cpfs
+
+    def _write_csv(self, fh, cpfs, rows, invalid):
+        writer = csv.writer(fh, delimiter=';')
+        writer.writerow(['CPF', 'Data', 'Peso (kg)', 'Altura (cm)', 'Cintura (cm)', 'Quadril (cm)', '% Gordura', '% Massa Muscular'])
+        first_day = date.today() - timedelta(days=rows // len(cpfs) + 10)
+        for index in range(rows):
+            cpf = cpfs[index % len(cpfs)].replace('.', '').replace('-', '')
+            weight = f'{random.uniform(50, 95):.1f}'.replace('.', ',')
+            if random.random() < invalid:
+                weight = random.choice(['', 'abc', '999'])
+            day = first_day + timedelta(days=index // len(cpfs))
+            writer.writerow([
+                cpf, day.strftime('%d/%m/%Y'), weight, random.randint(150, 185),
+                f'{random.uniform(60, 100):.1f}', f'{random.uniform(85, 120):.1f}',
+                f'{random.uniform(15, 40):.1f}', f'{random.uniform(25, 45):.1f}',
+            ])
@@ -0,0 +1,70 @@
+import csv
+import os
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import CustomUser
+from students.models import Anamnesis, Student
+from students.onboarding import StudentOnboarding
+
+GOALS = ['Emagrecimento', 'Hipertrofia', 'Condicionamento', 'Reabilitação', '']
+LEVELS = ['Sedentário', 'Atividade Leve', 'moderate', '']
+
+
+class Command(BaseCommand):
+    help = 'Teste de carga do cadastro em lote de alunas: gera um CSV de N linhas e importa (tudo é desfeito no final)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50_000)
+        parser.add_argument('--passwords', type=int, default=200, help='Linhas com senha (as demais recebem convite)')
+        parser.add_argument('--workers', type=int, help='Processos para o hash das senhas')
+        parser.add_argument('--naive-sample', type=int, default=50, help='Linhas na comparação com create_user (0 desativa)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fd, path = tempfile.mkstemp(suffix='.csv')
+            try:
+                with os.fdopen(fd, 'w', newline='', encoding='utf-8') as fh:
+                    self._write_csv(fh, options['rows'], options['passwords'])
+                importer = StudentOnboarding(workers=options['workers'], invites=lambda invite: None)
+                importer.run(path)
+            finally:
+                os.unlink(path)
+            self.stdout.write(
+                f'{importer.rows} linhas em {importer.elapsed:.2f}s ({importer.rows_per_second * 60:.0f} linhas/min) | '
+                f'hash de {options["passwords"]} senhas: {importer.hashing:.2f}s | cadastradas={importer.created} | '
+                f'convites={importer.invited} | recusadas={importer.rejected_count} {importer.reasons}'
+            )
+
+            sample = options['naive_sample']
+            if sample:
+                began = time.perf_counter()
+                for index in range(sample):
+                    user = CustomUser.objects.create_user(f'bench-naive-{index}', password='segredo123', first_name='Aluna')
+                    student = Student.objects.create(user=user, cpf=f'naive-{index}')
+                    Anamnesis.objects.create(student=student, main_goal='Emagrecimento')
+                elapsed = time.perf_counter() - began
+                self.stdout.write(
+                    f'create_user linha a linha: {sample} alunas em {elapsed:.2f}s '
+                    f'(~{elapsed * importer.rows / sample / 60:.0f} min estimados para o arquivo inteiro)'
+                )
+            transaction.set_rollback(True)
+
+    def _write_csv(self, fh, rows, passwords):
+        writer = csv.writer(fh, delimiter=';')
+        writer.writerow([
+            'CPF', 'Nome completo', 'E-mail', 'Senha', 'Telefone', 'Data de nascimento', 'Cidade', 'UF',
+            'Objetivo principal', 'Nível de atividade', 'Fumante', 'Horas de sono', 'Lesões',
+        ])
+        for index in range(rows):
+            writer.writerow([
+                f'{900_000_000_00 + index:011d}', f'Aluna {index} Bench', f'bench-onboarding-{index}@example.com',
+                f'senha-{index}' if index < passwords else '', '(11) 99999-0000',
+                f'{random.randint(1, 28):02d}/{random.randint(1, 12):02d}/{random.randint(1960, 2005)}',
+                'São Paulo', 'sp', random.choice(GOALS), random.choice(LEVELS),
+                random.choice(['sim', 'não']), random.randint(5, 9), random.choice(['', '', 'Joelho']),
+            ])
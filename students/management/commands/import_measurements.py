@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from students.imports import MeasurementImporter, csv_rejected_writer
+
+
+class Command(BaseCommand):
+    help = 'Importa medidas exportadas pela balança de bioimpedância (CSV, JSON ou JSON Lines)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo exportado (.csv, .json ou .jsonl)')
+        parser.add_argument('--rejected', help='CSV com as linhas recusadas e o motivo')
+        parser.add_argument('--dry-run', action='store_true', help='Só valida, sem gravar')
+        parser.add_argument('--chunk-size', type=int, default=20_000, help='Linhas lidas por bloco')
+
+    def handle(self, *args, **options):
+        output = open(options['rejected'], 'w', newline='', encoding='utf-8') if options['rejected'] else None
+        try:
+            importer = MeasurementImporter(
+                chunk_size=options['chunk_size'], dry_run=options['dry_run'],
+                rejected=csv_rejected_writer(output) if output else None,
+            )
+            importer.run(options['path'])
+        finally:
+            if output:
+                output.close()
+
+        reasons = ' | '.join(f'{code}={count}' for code, count in sorted(importer.reasons.items()))
+        self.stdout.write(
+            f'{importer.rows} linhas em {importer.elapsed:.2f}s ({importer.rows_per_second:.0f} linhas/s) | '
+            f'importadas={importer.imported} | recusadas={importer.rejected_count}' + (f' ({reasons})' if reasons else '')
+        )
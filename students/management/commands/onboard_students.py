@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from students.onboarding import INVITE_FIELDS, REJECTED_FIELDS, StudentOnboarding, csv_writer
+
+
+class Command(BaseCommand):
+    help = 'Cadastra alunas em lote (usuária, perfil e anamnese) a partir de CSV, JSON ou JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo exportado do sistema anterior (.csv, .json ou .jsonl)')
+        parser.add_argument('--rejected', help='CSV com as linhas recusadas e o motivo')
+        parser.add_argument('--invites', help='CSV com uid/token de convite das alunas sem senha')
+        parser.add_argument('--dry-run', action='store_true', help='Só valida, sem gravar')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Linhas por bloco (uma transação cada)')
+        parser.add_argument('--workers', type=int, help='Processos para o hash das senhas (0 = no próprio processo)')
+
+    def handle(self, *args, **options):
+        rejected = open(options['rejected'], 'w', newline='', encoding='utf-8') if options['rejected'] else None
+        invites = open(options['invites'], 'w', newline='', encoding='utf-8') if options['invites'] else None
+        try:
+            importer = StudentOnboarding(
+                chunk_size=options['chunk_size'], workers=options['workers'], dry_run=options['dry_run'],
+                rejected=csv_writer(rejected, REJECTED_FIELDS) if rejected else None,
+                invites=csv_writer(invites, INVITE_FIELDS) if invites else None,
+                progress=self.report_progress,
+            )
+            importer.run(options['path'])
+        finally:
+            for output in (rejected, invites):
+                if output:
+                    output.close()
+
+        reasons = ' | '.join(f'{code}={count}' for code, count in sorted(importer.reasons.items()))
+        self.stdout.write(
+            f'{importer.rows} linhas em {importer.elapsed:.2f}s ({importer.rows_per_second:.0f} linhas/s, '
+            f'{importer.hashing:.2f}s em hash de senhas) | cadastradas={importer.created} | '
+            f'convites={importer.invited} | recusadas={importer.rejected_count}' + (f' ({reasons})' if reasons else '')
+        )
+
+    def report_progress(self, importer):
+        self.stdout.write(
+            f'  {importer.rows} linhas | cadastradas={importer.created} | recusadas={importer.rejected_count} | '
+            f'{importer.rows_per_second:.0f} linhas/s'
+        )
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from students.cycles import refresh_due
+
+
+class Command(BaseCommand):
+    help = 'Remove fases encerradas e estende os calendários de ciclo que estão acabando (job diário)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recalcula o calendário de todas as alunas')
+        parser.add_argument('--weeks', type=int, help='Semanas à frente (padrão: CYCLE_CALENDAR_WEEKS)')
+
+    def handle(self, *args, **options):
+        began = time.perf_counter()
+        refreshed, pruned = refresh_due(weeks=options['weeks'], full=options['full'])
+        self.stdout.write(
+            f'Calendários recalculados: {refreshed} | fases encerradas removidas: {pruned} '
+            f'em {time.perf_counter() - began:.2f}s'
+        )
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CyclePrediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cycles_observed', models.IntegerField(default=0, verbose_name='Ciclos observados')),
+                ('mean_duration', models.DecimalField(decimal_places=1, max_digits=4, verbose_name='Duração média (dias)')),
+                ('std_duration', models.DecimalField(decimal_places=1, max_digits=4, verbose_name='Desvio padrão (dias)')),
+                ('last_start', models.DateField(verbose_name='Início do último ciclo registrado')),
+                ('next_start', models.DateField(verbose_name='Próximo início previsto')),
+                ('calendar_end', models.DateField(verbose_name='Calendário calculado até')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cycle_prediction', to='students.student')),
+            ],
+            options={
+                'verbose_name': 'Previsão de Ciclo',
+                'verbose_name_plural': 'Previsões de Ciclo',
+            },
+        ),
+        migrations.CreateModel(
+            name='CyclePhaseSpan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phase', models.CharField(choices=[('menstrual', 'Menstrual'), ('follicular', 'Folicular'), ('ovulatory', 'Ovulatória'), ('luteal', 'Lútea')], max_length=20, verbose_name='Fase')),
+                ('start_date', models.DateField(verbose_name='Início')),
+                ('end_date', models.DateField(verbose_name='Fim')),
+                ('cycle_start', models.DateField(verbose_name='Início do ciclo')),
+                ('cycle_day', models.IntegerField(verbose_name='Dia do ciclo no início da fase')),
+                ('predicted', models.BooleanField(default=True, verbose_name='Previsto?')),
+                ('uncertainty_days', models.IntegerField(default=0, verbose_name='Incerteza (dias)')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cycle_phases', to='students.student')),
+            ],
+            options={
+                'verbose_name': 'Fase do Ciclo',
+                'verbose_name_plural': 'Fases do Ciclo',
+                'indexes': [models.Index(fields=['start_date', 'end_date'], name='cycle_phase_span_dates_idx'), models.Index(fields=['student', 'start_date'], name='cycle_phase_span_student_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_dashboard_indexes'),
+        ('students', '0002_cycleprediction_cyclephasespan'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='measurement',
+            index=models.Index(fields=['measurement_date'], name='measurement_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menstrualcycle',
+            index=models.Index(fields=['cycle_start_date'], name='menstrual_cycle_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['enrollment_date'], name='student_enrollment_date_idx'),
+        ),
+    ]
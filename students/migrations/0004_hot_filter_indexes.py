@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_admin_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='measurement',
+            index=models.Index(fields=['student', 'measurement_date'], name='measurement_student_date_idx'),
+        ),
+    ]
@@ -30,6 +30,10 @@ class Student(models.Model):
         verbose_name = 'Aluna'
         verbose_name_plural = 'Alunas'
         ordering = ['user__first_name']
+        indexes = [
+            # date_hierarchy do admin
+            models.Index(fields=['enrollment_date'], name='student_enrollment_date_idx'),
+        ]
     
     def __str__(self):
         return self.user.get_full_name() or self.user.username
@@ -112,11 +116,65 @@ class MenstrualCycle(models.Model):
         verbose_name = 'Ciclo Menstrual'
         verbose_name_plural = 'Ciclos Menstruais'
         ordering = ['-cycle_start_date']
+        indexes = [
+            models.Index(fields=['cycle_start_date'], name='menstrual_cycle_start_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.user.get_full_name()} - {self.cycle_start_date}"
 
 
+class CyclePrediction(models.Model):
+    """Estimativa do ciclo de cada aluna a partir do histórico (mantida por students.cycles)"""
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='cycle_prediction')
+    cycles_observed = models.IntegerField(default=0, verbose_name='Ciclos observados')
+    mean_duration = models.DecimalField(max_digits=4, decimal_places=1, verbose_name='Duração média (dias)')
+    std_duration = models.DecimalField(max_digits=4, decimal_places=1, verbose_name='Desvio padrão (dias)')
+    last_start = models.DateField(verbose_name='Início do último ciclo registrado')
+    next_start = models.DateField(verbose_name='Próximo início previsto')
+    calendar_end = models.DateField(verbose_name='Calendário calculado até')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Previsão de Ciclo'
+        verbose_name_plural = 'Previsões de Ciclo'
+
+    def __str__(self):
+        return f"{self.student} - próximo ciclo em {self.next_start}"
+
+
+class CyclePhaseSpan(models.Model):
+    """Intervalo de dias em uma fase do ciclo (calendário previsto, uma linha por fase)"""
+    PHASE_CHOICES = (
+        ('menstrual', 'Menstrual'),
+        ('follicular', 'Folicular'),
+        ('ovulatory', 'Ovulatória'),
+        ('luteal', 'Lútea'),
+    )
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='cycle_phases')
+    phase = models.CharField(max_length=20, choices=PHASE_CHOICES, verbose_name='Fase')
+    start_date = models.DateField(verbose_name='Início')
+    end_date = models.DateField(verbose_name='Fim')
+    cycle_start = models.DateField(verbose_name='Início do ciclo')
+    cycle_day = models.IntegerField(verbose_name='Dia do ciclo no início da fase')
+    predicted = models.BooleanField(default=True, verbose_name='Previsto?')
+    # Incerteza acumulada do início do ciclo (± dias)
+    uncertainty_days = models.IntegerField(default=0, verbose_name='Incerteza (dias)')
+
+    class Meta:
+        verbose_name = 'Fase do Ciclo'
+        verbose_name_plural = 'Fases do Ciclo'
+        indexes = [
+            # Fase de hoje de todas as alunas: spans vencidos são removidos pelo job diário
+            models.Index(fields=['start_date', 'end_date'], name='cycle_phase_span_dates_idx'),
+            models.Index(fields=['student', 'start_date'], name='cycle_phase_span_student_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.get_phase_display()} ({self.start_date} a {self.end_date})"
+
+
 class Measurement(models.Model):
     """Medidas e Avaliação Física"""
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='measurements')
@@ -156,6 +214,11 @@ class Measurement(models.Model):
         verbose_name = 'Medida'
         verbose_name_plural = 'Medidas'
         ordering = ['-measurement_date']
+        indexes = [
+            models.Index(fields=['measurement_date'], name='measurement_date_idx'),
+            # Histórico de uma aluna em ordem (students.analytics, imports); cobre também o FK
+            models.Index(fields=['student', 'measurement_date'], name='measurement_student_date_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         # Calcular IMC automaticamente
@@ -0,0 +1,328 @@
+"""
+Cadastro em lote de alunas vindas de outro sistema (migração de estúdio).
+
+Cada linha do arquivo vira um ``CustomUser``, um ``Student`` e, quando há
+objetivo informado, uma ``Anamnesis``. O arquivo é lido em blocos (mesmo
+leitor das medidas, ``imports.read_file``) e cada bloco:
+
+1. é validado com operações de coluna do pandas; CPFs e usuários já
+   cadastrados vêm de uma única consulta feita no início da importação e
+   mantida em memória (junto com os do próprio arquivo);
+2. tem as senhas informadas transformadas em hash em um pool de processos
+   (o PBKDF2 é proposital e caro: ~0,3 s por senha). Linhas sem senha ficam
+   com senha inutilizável e recebem um convite: o par ``uid``/``token`` do
+   gerador de redefinição de senha do Django, aceito em
+   ``accounts:invite``;
+3. é gravado com ``bulk_create`` nos três modelos, em uma transação.
+
+Cada bloco é confirmado separadamente. Se a importação for interrompida,
+basta rodá-la de novo: as linhas já gravadas são reconhecidas pelo CPF e
+contadas como ``existing``.
+"""
+import csv
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+import numpy as np
+import pandas as pd
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.db import transaction
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from accounts.models import CustomUser
+
+from .imports import cpf_digits, normalize_header, parse_dates, read_file
+from .models import Anamnesis, Student
+
+COLUMN_ALIASES = {
+    'cpf': 'cpf',
+    'usuario': 'username', 'username': 'username', 'login': 'username',
+    'email': 'email', 'e-mail': 'email',
+    'nome': 'first_name', 'first_name': 'first_name', 'nome completo': 'first_name',
+    'sobrenome': 'last_name', 'last_name': 'last_name',
+    'senha': 'password', 'password': 'password',
+    'telefone': 'phone', 'celular': 'phone', 'phone': 'phone',
+    'data de nascimento': 'birth_date', 'nascimento': 'birth_date', 'birth_date': 'birth_date',
+    'rg': 'rg',
+    'endereco': 'address', 'address': 'address',
+    'cidade': 'city', 'city': 'city',
+    'estado': 'state', 'uf': 'state', 'state': 'state',
+    'cep': 'zip_code', 'zip_code': 'zip_code',
+    'contato de emergencia': 'emergency_contact_name', 'emergency_contact_name': 'emergency_contact_name',
+    'telefone de emergencia': 'emergency_contact_phone', 'emergency_contact_phone': 'emergency_contact_phone',
+    'data de matricula': 'enrollment_date', 'matricula': 'enrollment_date', 'enrollment_date': 'enrollment_date',
+    'objetivo': 'main_goal', 'objetivo principal': 'main_goal', 'main_goal': 'main_goal',
+    'objetivos secundarios': 'secondary_goals', 'secondary_goals': 'secondary_goals',
+    'problemas de saude': 'health_issues_description', 'health_issues': 'health_issues_description',
+    'lesoes': 'injuries_description', 'injuries': 'injuries_description',
+    'cirurgias': 'surgeries_description', 'surgeries': 'surgeries_description',
+    'medicamentos': 'medication_list', 'medications': 'medication_list',
+    'nivel de atividade': 'activity_level', 'activity_level': 'activity_level',
+    'atividades anteriores': 'previous_exercises', 'previous_exercises': 'previous_exercises',
+    'fumante': 'smoker', 'smoker': 'smoker',
+    'consumo de alcool': 'alcohol_consumption', 'alcohol_consumption': 'alcohol_consumption',
+    'horas de sono': 'sleep_hours', 'sleep_hours': 'sleep_hours',
+    'observacoes': 'observations', 'observations': 'observations',
+}
+
+USER_FIELDS = ('username', 'email', 'first_name', 'last_name', 'phone')
+STUDENT_FIELDS = (
+    'rg', 'address', 'city', 'state', 'zip_code', 'emergency_contact_name', 'emergency_contact_phone',
+)
+ANAMNESIS_FIELDS = (
+    'main_goal', 'secondary_goals', 'health_issues_description', 'injuries_description',
+    'surgeries_description', 'medication_list', 'previous_exercises', 'alcohol_consumption', 'observations',
+)
+# Descrição preenchida marca o "possui?" correspondente
+ANAMNESIS_FLAGS = {
+    'health_issues_description': 'has_health_issues',
+    'injuries_description': 'has_injuries',
+    'surgeries_description': 'has_surgeries',
+    'medication_list': 'takes_medication',
+}
+ACTIVITY_LEVELS = {normalize_header(label): value for value, label in Anamnesis.ACTIVITY_LEVEL_CHOICES}
+ACTIVITY_LEVELS.update({value: value for value, _ in Anamnesis.ACTIVITY_LEVEL_CHOICES})
+YES = {'sim', 's', 'yes', 'y', 'true', '1', 'x'}
+EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+INVALID_CPF = 'invalid_cpf'
+EXISTING = 'existing'
+DUPLICATE_CPF = 'duplicate_cpf'
+USERNAME_TAKEN = 'username_taken'
+MISSING_NAME = 'missing_name'
+INVALID_EMAIL = 'invalid_email'
+INVALID_BIRTH_DATE = 'invalid_birth_date'
+INVALID_ENROLLMENT_DATE = 'invalid_enrollment_date'
+INVALID_ACTIVITY_LEVEL = 'invalid_activity_level'
+INVALID_SLEEP_HOURS = 'invalid_sleep_hours'
+
+REJECTED_FIELDS = ['line', 'cpf', 'username', 'reason']
+INVITE_FIELDS = ['cpf', 'username', 'email', 'first_name', 'uid', 'token']
+
+
+def _init_worker():
+    # Com "spawn" (macOS/Windows) o processo filho começa sem o Django configurado
+    django.setup()
+
+
+def format_cpf(digits):
+    return f'{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}'
+
+
+class StudentOnboarding:
+    """Cadastra usuárias, perfis e anamneses de um arquivo, bloco a bloco"""
+
+    def __init__(self, chunk_size=5000, batch_size=1000, workers=None, dry_run=False,
+                 rejected=None, invites=None, progress=None):
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        # 0 = hash no próprio processo (arquivos pequenos, testes)
+        self.workers = workers
+        self.dry_run = dry_run
+        # Recebem dicionários com REJECTED_FIELDS / INVITE_FIELDS
+        self.rejected = rejected
+        self.invites = invites
+        # Chamado após cada bloco com o próprio importador
+        self.progress = progress
+        self.rows = 0
+        self.created = 0
+        self.invited = 0
+        self.reasons = {}
+        self.elapsed = 0.0
+        self.hashing = 0.0
+        self._pool = None
+        self._cpfs = None
+        self._usernames = None
+
+    @property
+    def rejected_count(self):
+        return sum(self.reasons.values())
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def load_existing(self):
+        """CPFs (só dígitos) e usuários já cadastrados, em uma consulta"""
+        rows = list(CustomUser.objects.values_list('username', 'student_profile__cpf'))
+        self._usernames = {username for username, _ in rows}
+        cpfs = cpf_digits(pd.Series([cpf for _, cpf in rows if cpf], dtype=str))
+        self._cpfs = set(cpfs.tolist())
+
+    def run(self, path):
+        began = time.perf_counter()
+        self.load_existing()
+        line = 1 if str(path).endswith(('.json', '.jsonl')) else 2
+        try:
+            if self.workers != 0:
+                self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+            for chunk in read_file(path, self.chunk_size, aliases=COLUMN_ALIASES):
+                self.import_chunk(chunk, first_line=line)
+                line += len(chunk)
+                self.elapsed = time.perf_counter() - began
+                if self.progress:
+                    self.progress(self)
+        finally:
+            if self._pool:
+                self._pool.shutdown()
+                self._pool = None
+        self.elapsed = time.perf_counter() - began
+        return self.created, self.reasons
+
+    def hash_passwords(self, passwords):
+        """Hash das senhas informadas; vazias viram senha inutilizável"""
+        began = time.perf_counter()
+        raw = [password for password in passwords if password]
+        if self._pool and len(raw) > 1:
+            chunksize = max(1, len(raw) // ((self.workers or os.cpu_count()) * 4))
+            hashed = iter(list(self._pool.map(make_password, raw, chunksize=chunksize)))
+        else:
+            hashed = iter([make_password(password) for password in raw])
+        result = [next(hashed) if password else make_password(None) for password in passwords]
+        self.hashing += time.perf_counter() - began
+        return result
+
+    def import_chunk(self, chunk, first_line=2):
+        if self._cpfs is None:
+            self.load_existing()
+        size = len(chunk)
+        self.rows += size
+        reason = np.full(size, '', dtype=object)
+
+        def fail(mask, code):
+            reason[np.asarray(mask) & (reason == '')] = code
+
+        def text(name):
+            if name not in chunk:
+                return pd.Series('', index=chunk.index, dtype=object)
+            return chunk[name].astype(str).str.strip()
+
+        digits = cpf_digits(text('cpf'))
+        fail(digits.str.len().ne(11), INVALID_CPF)
+        fail(digits.isin(self._cpfs), EXISTING)
+        fail(digits.duplicated(), DUPLICATE_CPF)
+
+        email = text('email').str.lower()
+        username = text('username')
+        username = username.where(username.ne(''), email.where(email.ne(''), digits))
+        fail(username.isin(self._usernames) | username.duplicated(), USERNAME_TAKEN)
+
+        first_name, last_name = text('first_name'), text('last_name')
+        # "Nome completo" em uma coluna só: o sobrenome é o que vem depois do primeiro espaço
+        split = first_name.str.split(' ', n=1, expand=True).reindex(columns=[0, 1]).fillna('')
+        single = last_name.eq('') & split[1].ne('')
+        first_name = first_name.where(~single, split[0])
+        last_name = last_name.where(~single, split[1].str.strip())
+        fail(first_name.eq(''), MISSING_NAME)
+        fail(email.ne('') & ~email.str.match(EMAIL), INVALID_EMAIL)
+
+        birth_raw, enrollment_raw = text('birth_date'), text('enrollment_date')
+        birth = parse_dates(birth_raw)
+        enrollment = parse_dates(enrollment_raw)
+        today = np.datetime64(timezone.localdate())
+        fail(birth_raw.ne('').to_numpy() & (np.isnat(birth) | (birth > today)), INVALID_BIRTH_DATE)
+        fail(enrollment_raw.ne('').to_numpy() & np.isnat(enrollment), INVALID_ENROLLMENT_DATE)
+
+        activity_raw = text('activity_level')
+        activity = activity_raw.map(lambda value: ACTIVITY_LEVELS.get(normalize_header(value)) if value else 'sedentary')
+        fail(activity.isna(), INVALID_ACTIVITY_LEVEL)
+        sleep_raw = text('sleep_hours').str.replace(',', '.', regex=False)
+        sleep = pd.to_numeric(sleep_raw, errors='coerce')
+        fail(sleep_raw.ne('') & ~sleep.between(0, 24), INVALID_SLEEP_HOURS)
+
+        self._reject(first_line, reason, text('cpf'), username)
+        indexes = np.flatnonzero(reason == '')
+        if not len(indexes):
+            return 0
+
+        columns = {name: text(name).to_numpy()[indexes].tolist() for name in USER_FIELDS + STUDENT_FIELDS + ANAMNESIS_FIELDS}
+        columns.update(
+            username=username.to_numpy()[indexes].tolist(), email=email.to_numpy()[indexes].tolist(),
+            first_name=first_name.to_numpy()[indexes].tolist(), last_name=last_name.to_numpy()[indexes].tolist(),
+        )
+        for model, names in ((CustomUser, USER_FIELDS), (Student, STUDENT_FIELDS), (Anamnesis, ANAMNESIS_FIELDS)):
+            for name in names:
+                length = model._meta.get_field(name).max_length
+                if length:
+                    columns[name] = [value[:length] for value in columns[name]]
+        columns['state'] = [state.upper() for state in columns['state']]
+        cpfs = digits.to_numpy()[indexes].tolist()
+        birth_dates = birth[indexes].tolist()
+        enrollment_dates = enrollment[indexes].tolist()
+        activities = activity.to_numpy()[indexes].tolist()
+        sleep_hours = sleep.to_numpy()[indexes].tolist()
+        smokers = text('smoker').str.lower().isin(YES).to_numpy()[indexes].tolist()
+        passwords = self.hash_passwords(text('password').to_numpy()[indexes].tolist())
+
+        users = [
+            CustomUser(
+                password=passwords[position], birth_date=birth_dates[position], user_type='student',
+                **{name: columns[name][position] for name in USER_FIELDS},
+            )
+            for position in range(len(indexes))
+        ]
+        with transaction.atomic():
+            if not self.dry_run:
+                CustomUser.objects.bulk_create(users, batch_size=self.batch_size)
+            students = [
+                Student(
+                    user=user, cpf=format_cpf(cpfs[position]), enrollment_date=enrollment_dates[position] or timezone.localdate(),
+                    **{name: columns[name][position] for name in STUDENT_FIELDS},
+                )
+                for position, user in enumerate(users)
+            ]
+            if not self.dry_run:
+                Student.objects.bulk_create(students, batch_size=self.batch_size)
+            anamneses = [
+                Anamnesis(
+                    student=student, activity_level=activities[position], smoker=smokers[position],
+                    sleep_hours=None if np.isnan(sleep_hours[position]) else round(sleep_hours[position]),
+                    **{name: columns[name][position] for name in ANAMNESIS_FIELDS},
+                    **{flag: bool(columns[name][position]) for name, flag in ANAMNESIS_FLAGS.items()},
+                )
+                for position, student in enumerate(students) if columns['main_goal'][position]
+            ]
+            if not self.dry_run:
+                Anamnesis.objects.bulk_create(anamneses, batch_size=self.batch_size)
+
+        self._cpfs.update(cpfs)
+        self._usernames.update(columns['username'])
+        self.created += len(users)
+        if self.invites and not self.dry_run:
+            self._invite(users, cpfs)
+        return len(users)
+
+    def _invite(self, users, cpfs):
+        for user, cpf in zip(users, cpfs):
+            if user.has_usable_password():
+                continue
+            self.invited += 1
+            self.invites({
+                'cpf': format_cpf(cpf), 'username': user.username, 'email': user.email, 'first_name': user.first_name,
+                'uid': urlsafe_base64_encode(force_bytes(user.pk)), 'token': default_token_generator.make_token(user),
+            })
+
+    def _reject(self, first_line, reason, cpfs, usernames):
+        rejected = np.flatnonzero(reason != '')
+        if not len(rejected):
+            return
+        codes, counts = np.unique(reason[rejected].astype(str), return_counts=True)
+        for code, count in zip(codes.tolist(), counts.tolist()):
+            self.reasons[code] = self.reasons.get(code, 0) + count
+        if self.rejected is None:
+            return
+        cpfs, usernames = cpfs.to_numpy(), usernames.to_numpy()
+        for index in rejected.tolist():
+            self.rejected({'line': first_line + index, 'cpf': cpfs[index], 'username': usernames[index], 'reason': reason[index]})
+
+
+def csv_writer(output, fieldnames):
+    writer = csv.DictWriter(output, fieldnames=fieldnames)
+    writer.writeheader()
+    return writer.writerow
@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import analytics, cycles
+from .models import Measurement, MenstrualCycle
+
+
+@receiver(post_save, sender=Measurement)
+@receiver(post_delete, sender=Measurement)
+def invalidate_measurement_analytics(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: analytics.invalidate_student(instance.student_id))
+
+
+@receiver(post_save, sender=MenstrualCycle)
+@receiver(post_delete, sender=MenstrualCycle)
+def refresh_cycle_calendar(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: cycles.refresh_students([instance.student_id]))
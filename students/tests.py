@@ -1,3 +1,306 @@
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from videos.models import LiveClass
+
+from . import analytics, cycles, imports, onboarding
+from .models import Anamnesis, CyclePhaseSpan, CyclePrediction, Measurement, MenstrualCycle, Student
+
+
+class MeasurementAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = [
+            Student.objects.create(user=CustomUser.objects.create_user(f'aluna-medidas-{index}'), cpf=f'medidas-{index}')
+            for index in range(3)
+        ]
+        start = date(2024, 1, 1)
+        # Aluna 0 perde 1 kg por semana; aluna 1 tem uma medida só; aluna 2 não tem medidas
+        for week in range(4):
+            cls.measure(cls.students[0], start + timedelta(weeks=week), 80 - week, waist=90 - week, hip=100, body_fat=30)
+        cls.measure(cls.students[1], start, 60, waist=70, hip=100)
+
+    @staticmethod
+    def measure(student, day, weight, waist=None, hip=None, body_fat=None):
+        return Measurement.objects.create(
+            student=student, measurement_date=day, weight=Decimal(weight), height=Decimal('1.60'),
+            waist=waist, hip=hip, body_fat_percentage=body_fat,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cohort_report(self):
+        report = analytics.cohort_report()
+        self.assertEqual(report['students'].tolist(), [self.students[0].pk, self.students[1].pk])
+        self.assertEqual(report['measurements'].tolist(), [4, 1])
+        self.assertAlmostEqual(report['trend_per_week']['weight'][0], -1)
+        self.assertTrue(np.isnan(report['trend_per_week']['weight'][1]))
+        self.assertAlmostEqual(report['latest']['waist_to_hip'][0], 0.87)
+        self.assertAlmostEqual(report['latest']['lean_mass'][0], 77 * 0.7)
+        # Sem % de gordura: sem massa magra, nem percentil
+        self.assertTrue(np.isnan(report['latest']['lean_mass'][1]))
+        self.assertEqual(report['percentile']['weight'].tolist(), [100, 50])
+
+    def test_rolling_deltas(self):
+        arrays = analytics.load([self.students[0].pk])
+        self.assertTrue(np.isnan(arrays['weight_delta'][0]))
+        self.assertEqual(arrays['weight_delta'][1:].tolist(), [-1, -1, -1])
+        # Janela de 30 dias: a medida mais antiga dentro dela é de 3 semanas antes
+        self.assertEqual(arrays['weight_change_30d'][3], -3)
+        self.assertAlmostEqual(arrays['bmi'][0], 80 / 1.6 ** 2)
+
+    def test_summary_is_cached_and_invalidated(self):
+        student = self.students[0]
+        summary = analytics.student_summary(student.pk)
+        self.assertEqual(summary['latest']['weight'], 77)
+        with self.assertNumQueries(0):
+            analytics.student_summary(student.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.measure(student, date(2024, 2, 1), 75)
+        self.assertEqual(analytics.student_summary(student.pk)['latest']['weight'], 75)
+        self.assertEqual(len(analytics.student_summary(student.pk)['dates']), 5)
+
+    def test_analytics_view(self):
+        self.client.force_login(CustomUser.objects.create_user('equipe-medidas', is_staff=True))
+        response = self.client.get(reverse('students:measurement_analytics', args=[self.students[0].pk]))
+        self.assertEqual(response.json()['trend_per_week']['weight'], -1)
+        response = self.client.get(reverse('students:measurement_analytics', args=[self.students[2].pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class MeasurementImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = Student.objects.create(user=CustomUser.objects.create_user('ana-import'), cpf='123.456.789-01')
+        cls.bia = Student.objects.create(user=CustomUser.objects.create_user('bia-import'), cpf='98765432100')
+        Measurement.objects.create(student=cls.bia, measurement_date=date(2024, 3, 1), weight=Decimal('60'), height=Decimal('1.60'))
+
+    def write(self, content, suffix='.csv'):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            fh.write(content)
+        self.addCleanup(os.unlink, path)
+        return path
+
+    def test_csv_import_validates_and_computes_bmi(self):
+        path = self.write(
+            'CPF;Data;Peso (kg);Altura (cm);Cintura (cm);% Gordura\n'
+            '12345678901;01/03/2024;62,35;163;70,5;28\n'
+            '123.456.789-01;2024-04-01;61.9;1.63;;\n'
+            '11111111111;01/03/2024;62;163;;\n'
+            '12345678901;31/02/2024;62;163;;\n'
+            '12345678901;02/03/2024;;163;;\n'
+            '12345678901;03/03/2024;62;163;70;90\n'
+            '12345678901;01/03/2024;62;163;;\n'
+            '98765432100;01/03/2024;60;160;;\n'
+        )
+        rejected = []
+        importer = imports.MeasurementImporter(rejected=rejected.append)
+        with self.captureOnCommitCallbacks(execute=True):
+            importer.run(path)
+
+        self.assertEqual(importer.imported, 2)
+        self.assertEqual(importer.reasons, {
+            'unknown_cpf': 1, 'invalid_date': 1, 'invalid_weight': 1, 'invalid_body_fat_percentage': 1, 'duplicate': 2,
+        })
+        self.assertEqual([row['line'] for row in rejected], [4, 5, 6, 7, 8, 9])
+
+        imported = Measurement.objects.filter(student=self.ana).order_by('measurement_date')
+        first = imported[0]
+        self.assertEqual((first.weight, first.height, first.waist, first.hip), (Decimal('62.35'), Decimal('1.63'), Decimal('70.50'), None))
+        # Mesmo IMC que o save() gravaria
+        self.assertEqual(first.bmi, (first.weight / first.height ** 2).quantize(Decimal('0.01')))
+        self.assertEqual(imported[1].bmi, Decimal('23.30'))
+
+    def test_json_import_and_dry_run(self):
+        records = [
+            {'cpf': '12345678901', 'measurement_date': '2024-05-01', 'weight': 70.2, 'height': 1.7, 'hip': None},
+            {'cpf': '98765432100', 'measurement_date': '2024-05-01', 'weight': 10, 'height': 1.7},
+            # Peso e altura dentro das faixas, mas IMC acima de 999,99
+            {'cpf': '12345678901', 'measurement_date': '2024-05-02', 'weight': 340, 'height': 0.55},
+        ]
+        path = self.write(json.dumps(records), suffix='.json')
+        with self.assertNumQueries(2):  # mapa de CPFs + medidas já existentes
+            importer = imports.MeasurementImporter(dry_run=True)
+            importer.run(path)
+        self.assertEqual((importer.imported, importer.reasons), (1, {'invalid_weight': 1, 'invalid_bmi': 1}))
+        self.assertFalse(Measurement.objects.filter(student=self.ana).exists())
+
+    def test_bmi_rounding_matches_decimal(self):
+        weights = np.arange(3000, 15000, 37)
+        heights = np.resize(np.arange(140, 200), len(weights))
+        bmi = imports.bmi_cents(weights, heights)
+        for weight, height, value in zip(weights.tolist(), heights.tolist(), bmi.tolist()):
+            exact = (Decimal(weight).scaleb(-2) / Decimal(height).scaleb(-2) ** 2).quantize(Decimal('0.01'))
+            self.assertEqual(Decimal(value).scaleb(-2), exact)
+
+
+class CyclePredictionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.localdate()
+        cls.ana = Student.objects.create(
+            user=CustomUser.objects.create_user('ana-ciclo', first_name='Ana'), cpf='ciclo-1',
+        )
+        cls.bia = Student.objects.create(
+            user=CustomUser.objects.create_user('bia-ciclo', first_name='Bia'), cpf='ciclo-2',
+        )
+
+    def record(self, student, days_ago, duration=28):
+        with self.captureOnCommitCallbacks(execute=True):
+            return MenstrualCycle.objects.create(
+                student=student, cycle_start_date=self.today - timedelta(days=days_ago), cycle_duration=duration,
+            )
+
+    def test_estimate_weights_recent_cycles(self):
+        start = date(2024, 1, 1)
+        history = [(start, 28), (start + timedelta(days=28), 28), (start + timedelta(days=58), 28), (start + timedelta(days=84), 28)]
+        mean, std, observed = cycles.estimate(history)
+        self.assertEqual(observed, 3)
+        # Intervalos de 28, 30 e 26 dias: o mais recente pesa mais
+        self.assertTrue(26 < mean < 28)
+        self.assertGreater(std, cycles.MIN_STD)
+        # Sem intervalos observados vale a duração informada
+        self.assertEqual(cycles.estimate([(start, 32)])[:2], (32.0, cycles.DEFAULT_STD))
+        self.assertEqual(cycles.phases(28), [
+            ('menstrual', 1, 5), ('follicular', 6, 12), ('ovulatory', 13, 15), ('luteal', 16, 28),
+        ])
+
+    def test_calendar_follows_new_entries(self):
+        self.record(self.ana, 30)
+        self.record(self.ana, 2)
+        prediction = CyclePrediction.objects.get(student=self.ana)
+        self.assertEqual(prediction.mean_duration, 28)
+        self.assertEqual(prediction.next_start, self.today + timedelta(days=26))
+        self.assertGreaterEqual(prediction.calendar_end, self.today + timedelta(weeks=12))
+
+        current = cycles.phases_on(self.today).get()
+        self.assertEqual((current.phase, current.predicted, current.cycle_start), ('menstrual', False, self.today - timedelta(days=2)))
+        following = CyclePhaseSpan.objects.filter(student=self.ana, cycle_start=prediction.next_start)
+        self.assertEqual(following.count(), 4)
+        self.assertTrue(all(span.predicted and span.uncertainty_days == 1 for span in following))
+        # Nada de fases encerradas: o calendário começa na fase atual
+        self.assertFalse(CyclePhaseSpan.objects.filter(end_date__lt=self.today).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MenstrualCycle.objects.filter(student=self.ana).delete()
+        self.assertFalse(CyclePrediction.objects.filter(student=self.ana).exists())
+        self.assertFalse(CyclePhaseSpan.objects.filter(student=self.ana).exists())
+
+    def test_phases_today_is_one_query(self):
+        self.record(self.ana, 2)
+        self.record(self.bia, 20)
+        with self.assertNumQueries(1):
+            listing = [(span.student.user.get_full_name(), span.phase) for span in cycles.phases_on(self.today)]
+        self.assertEqual(listing, [('Ana', 'menstrual'), ('Bia', 'luteal')])
+
+    def test_daily_refresh_prunes_and_extends(self):
+        self.record(self.ana, 2)
+        later = self.today + timedelta(days=40)
+        refreshed, pruned = cycles.refresh_due(today=later)
+        self.assertEqual(refreshed, 1)
+        self.assertGreater(pruned, 0)
+        self.assertFalse(CyclePhaseSpan.objects.filter(end_date__lt=later).exists())
+        self.assertGreaterEqual(CyclePrediction.objects.get().calendar_end, later + timedelta(weeks=12))
+        self.assertEqual(cycles.phases_on(later).count(), 1)
+
+    def test_phases_view_is_scoped_to_the_instructor_students(self):
+        self.record(self.ana, 2)
+        self.record(self.bia, 2)
+        url = reverse('students:cycle_phases')
+        self.client.force_login(self.ana.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        instructor = CustomUser.objects.create_user('prof-ciclo', user_type='instructor')
+        live = LiveClass.objects.create(title='Live', description='', instructor=instructor, scheduled_date=timezone.now())
+        live.registered_participants.add(self.ana.user)
+        self.client.force_login(instructor)
+        phases = self.client.get(url).json()['phases']
+        self.assertEqual([(phase['student_id'], phase['phase']) for phase in phases], [(self.ana.pk, 'menstrual')])
+
+        # Instrutora sem aulas com as alunas não vê nenhuma fase
+        self.client.force_login(CustomUser.objects.create_user('outra-prof', user_type='instructor'))
+        self.assertEqual(self.client.get(url).json()['phases'], [])
+
+        self.client.force_login(CustomUser.objects.create_user('equipe-ciclo', is_staff=True))
+        phases = self.client.get(url).json()['phases']
+        self.assertEqual([phase['student_id'] for phase in phases], [self.ana.pk, self.bia.pk])
+
+
+class StudentOnboardingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Student.objects.create(user=CustomUser.objects.create_user('ja-cadastrada'), cpf='111.222.333-44')
+
+    def write(self, content):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            fh.write(content)
+        self.addCleanup(os.unlink, path)
+        return path
+
+    def test_import_creates_users_profiles_and_invites(self):
+        path = self.write(
+            'CPF;Nome completo;E-mail;Senha;UF;Objetivo principal;Nível de atividade;Lesões;Horas de sono\n'
+            '123.456.789-01;Ana Maria Souza;Ana@Example.com;;sp;Emagrecer;Atividade Leve;Joelho;7\n'
+            '98765432100;Bia;bia@example.com;segredo123;RJ;;;;\n'
+            '11122233344;Já Existe;ja@example.com;;;;;;\n'
+            '98765432100;Bia de novo;outra@example.com;;;;;;\n'
+            '555;Sem CPF;;;;;;;\n'
+            '22233344455;Carla;carla@;;;;;;\n'
+            '33344455566;Dani;;;;Força;Maratonista;;\n'
+            '44455566677;Eva;eva@example.com;;;;;;30\n'
+        )
+        rejected, invites = [], []
+        importer = onboarding.StudentOnboarding(workers=0, rejected=rejected.append, invites=invites.append)
+        importer.run(path)
+
+        self.assertEqual(importer.created, 2)
+        self.assertEqual(importer.reasons, {
+            'existing': 1, 'duplicate_cpf': 1, 'invalid_cpf': 1, 'invalid_email': 1,
+            'invalid_activity_level': 1, 'invalid_sleep_hours': 1,
+        })
+        self.assertEqual([row['line'] for row in rejected], [4, 5, 6, 7, 8, 9])
+
+        ana = Student.objects.select_related('user', 'anamnesis').get(cpf='123.456.789-01')
+        self.assertEqual((ana.user.username, ana.user.first_name, ana.user.last_name), ('ana@example.com', 'Ana', 'Maria Souza'))
+        self.assertEqual((ana.state, ana.anamnesis.activity_level, ana.anamnesis.sleep_hours), ('SP', 'light', 7))
+        self.assertTrue(ana.anamnesis.has_injuries)
+        self.assertFalse(ana.user.has_usable_password())
+
+        bia = Student.objects.select_related('user').get(cpf='987.654.321-00')
+        self.assertTrue(bia.user.check_password('segredo123'))
+        self.assertFalse(Anamnesis.objects.filter(student=bia).exists())
+
+        # Só quem ficou sem senha recebe convite, e o token abre a tela de primeira senha
+        self.assertEqual([invite['username'] for invite in invites], ['ana@example.com'])
+        self.assertTrue(default_token_generator.check_token(ana.user, invites[0]['token']))
+        response = self.client.get(reverse('accounts:invite', args=[invites[0]['uid'], invites[0]['token']]), follow=True)
+        self.assertTrue(response.context['validlink'])
+
+        # Reexecução (importação interrompida): nada é duplicado
+        again = onboarding.StudentOnboarding(workers=0)
+        with self.assertNumQueries(1):
+            again.run(path)
+        self.assertEqual((again.created, again.reasons['existing']), (0, 4))
 
-# Create your tests here.
+    def test_passwords_hashed_in_process_pool(self):
+        path = self.write('cpf,nome,senha\n12345678901,Ana,primeira-senha\n98765432100,Bia,segunda-senha\n')
+        importer = onboarding.StudentOnboarding(workers=2)
+        importer.run(path)
+        users = CustomUser.objects.filter(first_name__in=['Ana', 'Bia']).order_by('first_name')
+        self.assertTrue(users[0].check_password('primeira-senha'))
+        self.assertTrue(users[1].check_password('segunda-senha'))
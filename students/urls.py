@@ -1,7 +1,12 @@
 from django.urls import path
 
+from . import views
+
 app_name = 'students'
 
 urlpatterns = [
-    # Adicionar URLs depois
-]
\ No newline at end of file
+    path('export/', views.export_students, name='export_students'),
+    path('export/measurements/', views.export_measurements, name='export_measurements'),
+    path('<int:student_id>/analytics/', views.measurement_analytics, name='measurement_analytics'),
+    path('cycles/today/', views.cycle_phases, name='cycle_phases'),
+]
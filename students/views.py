@@ -1,3 +1,58 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import user_passes_test
+from django.http import Http404, JsonResponse
+from django.utils.dateparse import parse_date
 
-# Create your views here.
+from core.exports import export_view_response
+
+from . import analytics, cycles
+from .exports import measurement_export, student_export
+
+
+@staff_member_required
+def export_students(request):
+    """Planilha de alunas (``?format=csv|xlsx&gzip=1``)"""
+    return export_view_response(request, student_export(request.GET))
+
+
+@staff_member_required
+def export_measurements(request):
+    return export_view_response(request, measurement_export(request.GET))
+
+
+@staff_member_required
+def measurement_analytics(request, student_id):
+    """Séries, tendências e percentis das medidas de uma aluna"""
+    summary = analytics.student_summary(student_id)
+    if summary is None:
+        raise Http404('Nenhuma medida registrada')
+    return JsonResponse(summary)
+
+
+def _can_follow_students(user):
+    return user.is_active and (user.is_staff or user.user_type == 'instructor')
+
+
+@user_passes_test(_can_follow_students)
+def cycle_phases(request):
+    """Fase do ciclo de cada aluna hoje (ou em ``?date=AAAA-MM-DD``)"""
+    try:
+        day = parse_date(request.GET.get('date', ''))
+    except ValueError:
+        day = None
+    # Instrutoras veem só as alunas das suas aulas; a equipe vê todas
+    spans = cycles.phases_on(day, instructor=None if request.user.is_staff else request.user)
+    return JsonResponse({'phases': [
+        {
+            'student_id': span.student_id,
+            'student': span.student.user.get_full_name(),
+            'phase': span.phase,
+            'phase_display': span.get_phase_display(),
+            'start_date': span.start_date,
+            'end_date': span.end_date,
+            'cycle_day': span.cycle_day,
+            'predicted': span.predicted,
+            'uncertainty_days': span.uncertainty_days,
+        }
+        for span in spans
+    ]})
@@ -1,3 +1,86 @@
 from django.contrib import admin
 
-# Register your models here.
+from core.paginator import EstimatedCountPaginator
+
+from .models import ChatMessage, LiveClass, LiveClassWaitlist, SearchDocument, Video, VideoCategory, VideoLike
+
+
+@admin.register(VideoCategory)
+class VideoCategoryAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'order']
+    search_fields = ['name']
+    prepopulated_fields = {'slug': ['name']}
+
+
+@admin.register(Video)
+class VideoAdmin(admin.ModelAdmin):
+    list_display = ['title', 'category', 'instructor', 'is_public', 'transcode_status', 'views_count', 'published_at']
+    list_filter = ['is_public', 'requires_subscription', 'video_type', 'transcode_status', 'category']
+    list_select_related = ['category', 'instructor']
+    search_fields = ['title', 'slug']
+    autocomplete_fields = ['category', 'instructor']
+    prepopulated_fields = {'slug': ['title']}
+    readonly_fields = [
+        'views_count', 'likes_count', 'transcode_status', 'transcode_updated_at', 'transcode_attempts',
+        'transcode_error', 'hls_path', 'renditions',
+    ]
+    date_hierarchy = 'published_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(LiveClass)
+class LiveClassAdmin(admin.ModelAdmin):
+    list_display = ['title', 'instructor', 'category', 'scheduled_date', 'status', 'registered_count', 'max_participants']
+    list_filter = ['status', 'category']
+    list_select_related = ['instructor', 'category']
+    search_fields = ['title']
+    # Sem autocomplete, o M2M de participantes carregaria todas as usuárias no formulário
+    autocomplete_fields = ['instructor', 'category', 'archived_video', 'registered_participants']
+    readonly_fields = ['registered_count']
+    date_hierarchy = 'scheduled_date'
+
+
+@admin.register(LiveClassWaitlist)
+class LiveClassWaitlistAdmin(admin.ModelAdmin):
+    list_display = ['user', 'live_class', 'created_at']
+    list_select_related = ['user', 'live_class']
+    search_fields = ['live_class__title', 'user__username', 'user__first_name', 'user__last_name']
+    autocomplete_fields = ['live_class', 'user']
+
+
+@admin.register(VideoLike)
+class VideoLikeAdmin(admin.ModelAdmin):
+    list_display = ['user', 'video', 'created_at']
+    list_select_related = ['user', 'video']
+    search_fields = ['video__title', 'user__username']
+    autocomplete_fields = ['video', 'user']
+
+
+@admin.register(ChatMessage)
+class ChatMessageAdmin(admin.ModelAdmin):
+    list_display = ['author_name', 'live_class', 'excerpt', 'created_at']
+    list_select_related = ['live_class']
+    search_fields = ['author_name', 'body']
+    autocomplete_fields = ['live_class', 'user']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @admin.display(description='Mensagem')
+    def excerpt(self, obj):
+        return obj.body[:80]
+
+
+@admin.register(SearchDocument)
+class SearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ['title', 'kind', 'object_id', 'is_visible', 'updated_at']
+    list_filter = ['kind', 'is_visible']
+    search_fields = ['title']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,118 @@
+"""
+Catálogo de vídeos com paginação por keyset e cache versionado por categoria.
+
+A paginação usa o cursor ``(published_at, id)`` em vez de OFFSET, então
+qualquer página custa o mesmo que a primeira: um range scan no índice
+``(is_public, published_at)``. Cada página fica em cache sob uma chave que
+inclui a versão da categoria (namespaces de ``core.caching``); os signals de
+``Video``/``VideoCategory`` incrementam a versão e as páginas antigas
+simplesmente expiram.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from core.caching import bump, cached, versions
+
+from .models import Video, VideoCategory
+
+ALL_CATEGORIES = 'all'
+
+
+class InvalidCursor(ValueError):
+    """Cursor de paginação malformado"""
+
+
+def encode_cursor(video):
+    raw = f'{video.published_at.isoformat()}|{video.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        published_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(published_at), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor('Cursor inválido')
+
+
+def _namespace(category_id):
+    # Versões em core.caching: reiniciam por um valor do relógio se a chave for expulsa
+    return f'videos.catalog:{category_id or ALL_CATEGORIES}'
+
+
+def get_version(category_id=None):
+    return versions(_namespace(category_id))[0]
+
+
+def invalidate(*category_ids):
+    """Invalida o catálogo geral e o das categorias informadas"""
+    bump(_namespace(None), *{_namespace(category_id) for category_id in category_ids if category_id})
+
+
+@cached(VideoCategory, timeout=settings.VIDEO_CATALOG_CACHE_TIMEOUT)
+def categories():
+    """Categorias do menu do catálogo"""
+    return list(VideoCategory.objects.all())
+
+
+def catalog_queryset(category_id=None):
+    queryset = (
+        Video.objects
+        .filter(is_public=True, published_at__isnull=False)
+        .select_related('category', 'instructor')
+        .order_by('-published_at', '-id')
+    )
+    if category_id:
+        queryset = queryset.filter(category_id=category_id)
+    return queryset
+
+
+def fetch_page(category_id=None, cursor=None, limit=None):
+    """Retorna ``(videos, next_cursor)`` sem consultar o cache"""
+    limit = limit or settings.VIDEO_CATALOG_PAGE_SIZE
+    queryset = catalog_queryset(category_id)
+    if cursor:
+        published_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(published_at__lt=published_at) | Q(published_at=published_at, pk__lt=pk))
+    videos = list(queryset[:limit + 1])
+    next_cursor = encode_cursor(videos[limit - 1]) if len(videos) > limit else None
+    return videos[:limit], next_cursor
+
+
+def get_page(category_id=None, cursor=None, limit=None):
+    """Página do catálogo, servida do cache quando possível"""
+    limit = max(1, min(limit or settings.VIDEO_CATALOG_PAGE_SIZE, settings.VIDEO_CATALOG_MAX_PAGE_SIZE))
+    if cursor:
+        decode_cursor(cursor)
+    key = (
+        f'videos:catalog:{category_id or ALL_CATEGORIES}:v{get_version(category_id)}:'
+        f'{cursor or "first"}:{limit}'
+    )
+    page = cache.get(key)
+    if page is None:
+        page = fetch_page(category_id, cursor, limit)
+        cache.set(key, page, settings.VIDEO_CATALOG_CACHE_TIMEOUT)
+    return page
+
+
+def serialize_video(video):
+    return {
+        'id': video.pk,
+        'title': video.title,
+        'slug': video.slug,
+        'description': video.description,
+        'category': {'name': video.category.name, 'slug': video.category.slug} if video.category else None,
+        'instructor': video.instructor.get_full_name() if video.instructor else None,
+        'duration': video.duration.total_seconds() if video.duration else None,
+        'thumbnail': video.thumbnail.url if video.thumbnail else None,
+        'playback_url': video.get_playback_url(),
+        'views_count': video.views_count,
+        'likes_count': video.likes_count,
+        'published_at': video.published_at.isoformat(),
+    }
@@ -0,0 +1,4 @@
+from .app import ChatApplication
+from .hub import ChatHub, MessageWriter, get_hub
+
+__all__ = ['ChatApplication', 'ChatHub', 'MessageWriter', 'get_hub']
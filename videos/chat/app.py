@@ -0,0 +1,131 @@
+"""
+Aplicação ASGI do chat: ``ws://<host>/ws/lives/<id>/chat/``.
+
+O cliente envia ``{"message": "..."}`` e recebe o histórico recente seguido
+das mensagens da sala, todas no formato ``{"type": "message", ...}``.
+"""
+import json
+import re
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.http.cookie import parse_cookie
+from django.http.request import split_domain_port, validate_host
+from django.utils import timezone
+
+from ..models import ChatMessage, LiveClass
+from .hub import get_hub
+
+PATH_RE = re.compile(r'^/ws/lives/(?P<live_class_id>\d+)/chat/$')
+
+CLOSE_NOT_FOUND = 4404
+CLOSE_FORBIDDEN = 4403
+
+
+def _headers(scope):
+    return {name.decode('latin1').lower(): value.decode('latin1') for name, value in scope.get('headers', [])}
+
+
+def _origin_allowed(headers):
+    origin = headers.get('origin')
+    if not origin:
+        return True
+    host = origin.split('://', 1)[-1]
+    domain, _ = split_domain_port(host)
+    return bool(domain) and validate_host(domain, settings.ALLOWED_HOSTS)
+
+
+@sync_to_async
+def authorize(session_key, live_class_id):
+    """Usuária autenticada com acesso ao chat da live, ou ``None``"""
+    if not session_key:
+        return None
+    session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    user = get_user(SimpleNamespace(session=session))
+    if not user.is_authenticated:
+        return None
+    live_class = LiveClass.objects.filter(
+        pk=live_class_id, chat_enabled=True, status__in=('scheduled', 'live'),
+    ).only('pk', 'instructor_id').first()
+    if live_class is None:
+        return None
+    if user.is_staff or live_class.instructor_id == user.pk:
+        return user
+    if live_class.registered_participants.filter(pk=user.pk).exists():
+        return user
+    return None
+
+
+@sync_to_async
+def recent_history(live_class_id, limit):
+    messages = ChatMessage.objects.filter(live_class_id=live_class_id).order_by('-created_at')[:limit]
+    return [
+        json.dumps({
+            'type': 'message',
+            'author': message.author_name,
+            'body': message.body,
+            'created_at': message.created_at.isoformat(),
+        })
+        for message in reversed(messages)
+    ]
+
+
+class ChatApplication:
+    def __init__(self, hub=None):
+        self._hub = hub
+
+    @property
+    def hub(self):
+        return self._hub or get_hub()
+
+    async def __call__(self, scope, receive, send):
+        event = await receive()
+        if event['type'] != 'websocket.connect':
+            return
+
+        match = PATH_RE.match(scope['path'])
+        if match is None:
+            await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+            return
+        live_class_id = int(match['live_class_id'])
+
+        headers = _headers(scope)
+        session_key = parse_cookie(headers.get('cookie', '')).get(settings.SESSION_COOKIE_NAME)
+        user = await authorize(session_key, live_class_id) if _origin_allowed(headers) else None
+        if user is None:
+            await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+            return
+
+        hub = self.hub
+        connection = hub.connection(send)
+        for text in await recent_history(live_class_id, settings.CHAT_HISTORY_SIZE):
+            connection.push(text)
+        # Entra na sala antes do accept para não perder mensagens publicadas
+        # entre o handshake e a inscrição; a fila só é drenada após o accept
+        await hub.join(live_class_id, connection)
+        try:
+            await send({'type': 'websocket.accept'})
+            connection.start()
+            while connection.close_code is None:
+                event = await receive()
+                if event['type'] == 'websocket.disconnect':
+                    break
+                if event['type'] != 'websocket.receive':
+                    continue
+                body = self._parse(event)
+                if body:
+                    await hub.post(live_class_id, user, body, timezone.now())
+        finally:
+            await hub.leave(live_class_id, connection)
+
+    def _parse(self, event):
+        try:
+            data = json.loads(event.get('text') or event.get('bytes') or b'')
+        except ValueError:
+            return ''
+        if not isinstance(data, dict):
+            return ''
+        return str(data.get('message', '')).strip()[:settings.CHAT_MAX_MESSAGE_LENGTH]
@@ -0,0 +1,95 @@
+"""
+Brokers de pub/sub do chat.
+
+O broker só transporta texto já serializado entre processos; o fan-out para
+as conexões locais é feito pelo ``ChatHub``. Com um único worker (ou nos
+testes) o ``InMemoryBroker`` basta; com vários workers use o ``RedisBroker``.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryBroker:
+    """Pub/sub dentro do próprio processo"""
+
+    def __init__(self, **options):
+        self._subscribers = defaultdict(set)
+
+    async def publish(self, channel, text):
+        for callback in list(self._subscribers.get(channel, ())):
+            callback(text)
+
+    async def subscribe(self, channel, callback):
+        self._subscribers[channel].add(callback)
+
+    async def unsubscribe(self, channel, callback):
+        callbacks = self._subscribers.get(channel)
+        if callbacks is not None:
+            callbacks.discard(callback)
+            if not callbacks:
+                del self._subscribers[channel]
+
+    async def close(self):
+        self._subscribers.clear()
+
+
+class RedisBroker:
+    """
+    Pub/sub via Redis (requer o pacote ``redis``).
+
+    Usa uma única conexão de assinatura por worker, independentemente do
+    número de salas e de conexões WebSocket.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', **options):
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as exc:
+            raise ImportError('O RedisBroker requer o pacote "redis" instalado') from exc
+        self._redis = aioredis.from_url(url)
+        self._pubsub = self._redis.pubsub()
+        self._callbacks = defaultdict(set)
+        self._reader = None
+
+    async def publish(self, channel, text):
+        await self._redis.publish(channel, text)
+
+    async def subscribe(self, channel, callback):
+        if channel not in self._callbacks:
+            await self._pubsub.subscribe(channel)
+        self._callbacks[channel].add(callback)
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read())
+
+    async def unsubscribe(self, channel, callback):
+        callbacks = self._callbacks.get(channel)
+        if callbacks is None:
+            return
+        callbacks.discard(callback)
+        if not callbacks:
+            del self._callbacks[channel]
+            await self._pubsub.unsubscribe(channel)
+
+    async def _read(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except Exception:
+                logger.exception('Falha lendo mensagens do Redis')
+                await asyncio.sleep(1)
+                continue
+            if message is None:
+                continue
+            channel = message['channel'].decode()
+            text = message['data'].decode()
+            for callback in list(self._callbacks.get(channel, ())):
+                callback(text)
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        await self._pubsub.aclose()
+        await self._redis.aclose()
@@ -0,0 +1,205 @@
+"""
+Salas, conexões e persistência do chat das aulas ao vivo.
+
+Cada mensagem é serializada uma única vez e distribuída para as conexões
+locais com ``put_nowait`` em filas limitadas. Uma conexão cuja fila enche
+(cliente lento) é encerrada em vez de segurar memória ou atrasar a sala.
+
+As mensagens são gravadas pelo ``MessageWriter`` em lotes com
+``bulk_create``, nunca uma ida ao banco por mensagem. Se o banco falhar, o
+lote volta para a fila, limitada a ``max_pending`` mensagens (as mais antigas
+são descartadas).
+"""
+import asyncio
+import json
+import logging
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from ..models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+SLOW_CONSUMER_CLOSE_CODE = 4008
+
+
+def room_channel(live_class_id):
+    return f'videos.chat.live.{live_class_id}'
+
+
+class Connection:
+    """Uma conexão WebSocket com fila de envio limitada"""
+
+    def __init__(self, send, queue_size):
+        self._send = send
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.close_code = None
+        self._writer = None
+
+    def start(self):
+        self._writer = asyncio.create_task(self._drain())
+
+    def push(self, text):
+        """Enfileira ``text``; derruba a conexão se a fila estiver cheia"""
+        if self.close_code is not None:
+            return False
+        try:
+            self.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self.close_code = SLOW_CONSUMER_CLOSE_CODE
+            asyncio.get_running_loop().create_task(self._close())
+            return False
+        return True
+
+    async def _drain(self):
+        while True:
+            text = await self.queue.get()
+            await self._send({'type': 'websocket.send', 'text': text})
+
+    async def _close(self):
+        await self.stop()
+        try:
+            await self._send({'type': 'websocket.close', 'code': self.close_code})
+        except Exception:
+            # O cliente pode já ter desconectado
+            pass
+
+    async def stop(self):
+        if self._writer is not None and not self._writer.done():
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+
+
+class MessageWriter:
+    """Acumula mensagens e grava em lote por tamanho ou intervalo"""
+
+    def __init__(self, batch_size=200, interval=0.5, max_pending=5000):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending = []
+        self._wake = None
+        self._task = None
+
+    def add(self, message):
+        self._pending.append(message)
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        try:
+            await sync_to_async(ChatMessage.objects.bulk_create)(batch, batch_size=self.batch_size)
+        except Exception:
+            logger.exception('Falha ao gravar %s mensagens do chat; nova tentativa no próximo lote', len(batch))
+            self._pending[:0] = batch
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                del self._pending[:overflow]
+                logger.error('Fila de gravação do chat cheia: %s mensagens antigas descartadas', overflow)
+            return 0
+        return len(batch)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+class ChatHub:
+    """Salas do processo atual, ligadas ao broker compartilhado"""
+
+    def __init__(self, broker, writer, queue_size=100):
+        self.broker = broker
+        self.writer = writer
+        self.queue_size = queue_size
+        self.rooms = {}
+        self._callbacks = {}
+
+    def connection(self, send):
+        return Connection(send, self.queue_size)
+
+    async def join(self, live_class_id, connection):
+        """Inscreve a conexão na sala; o envio começa em ``connection.start()``"""
+        if live_class_id not in self.rooms:
+            self.rooms[live_class_id] = set()
+            callback = partial(self._fan_out, live_class_id)
+            self._callbacks[live_class_id] = callback
+            await self.broker.subscribe(room_channel(live_class_id), callback)
+        self.rooms[live_class_id].add(connection)
+
+    async def leave(self, live_class_id, connection):
+        await connection.stop()
+        members = self.rooms.get(live_class_id)
+        if members is None:
+            return
+        members.discard(connection)
+        if not members:
+            del self.rooms[live_class_id]
+            await self.broker.unsubscribe(room_channel(live_class_id), self._callbacks.pop(live_class_id))
+
+    def _fan_out(self, live_class_id, text):
+        for connection in list(self.rooms.get(live_class_id, ())):
+            connection.push(text)
+
+    async def publish(self, live_class_id, payload):
+        await self.broker.publish(room_channel(live_class_id), json.dumps(payload))
+
+    async def post(self, live_class_id, user, body, created_at):
+        """Persiste (em lote) e distribui uma mensagem enviada por ``user``"""
+        author_name = user.get_full_name() or user.get_username()
+        self.writer.add(ChatMessage(
+            live_class_id=live_class_id, user_id=user.pk, author_name=author_name,
+            body=body, created_at=created_at,
+        ))
+        await self.publish(live_class_id, {
+            'type': 'message',
+            'author': author_name,
+            'body': body,
+            'created_at': created_at.isoformat(),
+        })
+
+    async def close(self):
+        await self.writer.close()
+        await self.broker.close()
+
+
+_hub = None
+
+
+def get_hub():
+    global _hub
+    if _hub is None:
+        broker = import_string(settings.CHAT_BROKER_BACKEND)(**settings.CHAT_BROKER_OPTIONS)
+        writer = MessageWriter(
+            batch_size=settings.CHAT_PERSIST_BATCH_SIZE,
+            interval=settings.CHAT_PERSIST_INTERVAL,
+            max_pending=settings.CHAT_PERSIST_MAX_PENDING,
+        )
+        _hub = ChatHub(broker, writer, queue_size=settings.CHAT_SEND_QUEUE_SIZE)
+    return _hub
@@ -0,0 +1,164 @@
+"""
+Contadores de visualizações e curtidas com escrita agrupada.
+
+Um ``save()`` por reprodução transforma a linha do vídeo mais popular em um
+ponto de contenção de locks. Aqui os incrementos são acumulados em memória no
+processo e gravados periodicamente (``VIDEO_COUNTER_FLUSH_INTERVAL``) ou ao
+atingir ``VIDEO_COUNTER_FLUSH_THRESHOLD`` incrementos, com um ``UPDATE ...
+SET campo = campo + n`` por grupo de vídeos com o mesmo delta. Atingir o
+limite só acorda a thread de gravação: a requisição nunca espera pelo banco.
+
+Se a gravação falhar, os deltas voltam para o buffer (semântica
+at-least-once) e o buffer é descarregado novamente no encerramento do worker.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.dispatch import Signal
+
+from .models import Video
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ('views_count', 'likes_count')
+
+# Enviado após cada gravação com ``deltas={video_id: {campo: incremento}}``
+counters_flushed = Signal()
+
+
+class CounterBuffer:
+    """Acumula incrementos por vídeo e os grava em lote"""
+
+    def __init__(self, flush_interval=None, flush_threshold=1000):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(Counter)
+        self._pending_total = 0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def incr(self, video_id, field='views_count', amount=1):
+        if field not in COUNTER_FIELDS:
+            raise ValueError(f'Contador desconhecido: {field}')
+        with self._lock:
+            self._pending[video_id][field] += amount
+            self._pending_total += amount
+            should_flush = self._pending_total >= self.flush_threshold
+        if not should_flush:
+            self._ensure_thread()
+        elif self._ensure_thread():
+            self._wake.set()
+        else:
+            # Sem thread de gravação (flush_interval vazio): grava aqui, mas uma
+            # falha não derruba a requisição; os deltas ficam no buffer
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Falha ao gravar contadores de vídeo; mantidos para a próxima gravação')
+
+    def pending(self):
+        with self._lock:
+            return {video_id: dict(deltas) for video_id, deltas in self._pending.items()}
+
+    def flush(self):
+        """Grava os incrementos pendentes; retorna o número de UPDATEs"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, defaultdict(Counter)
+                self._pending_total = 0
+            if not batch:
+                return 0
+
+            # Vídeos com o mesmo conjunto de deltas compartilham um UPDATE
+            groups = defaultdict(list)
+            for video_id, deltas in batch.items():
+                key = tuple(sorted((field, amount) for field, amount in deltas.items() if amount))
+                if key:
+                    groups[key].append(video_id)
+
+            try:
+                with transaction.atomic():
+                    for key, video_ids in groups.items():
+                        Video.objects.filter(pk__in=sorted(video_ids)).update(
+                            **{field: F(field) + amount for field, amount in key}
+                        )
+            except Exception:
+                self._restore(batch)
+                raise
+        for _, response in counters_flushed.send_robust(sender=CounterBuffer, deltas=batch):
+            if isinstance(response, Exception):
+                logger.error('Falha em um receiver de counters_flushed', exc_info=response)
+        return len(groups)
+
+    def _restore(self, batch):
+        with self._lock:
+            for video_id, deltas in batch.items():
+                self._pending[video_id].update(deltas)
+                self._pending_total += sum(deltas.values())
+
+    def _ensure_thread(self):
+        """Inicia a thread de gravação se preciso; ``False`` se não há (sem ``flush_interval``)"""
+        if not self.flush_interval or self._stop.is_set():
+            return False
+        if self._thread and self._thread.is_alive():
+            return True
+        with self._lock:
+            if not (self._thread and self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name='video-counter-flush', daemon=True)
+                self._thread.start()
+        return True
+
+    def _run(self):
+        while True:
+            # Acorda a cada intervalo ou quando incr() atinge o limite
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Falha ao gravar contadores de vídeo; nova tentativa no próximo ciclo')
+            finally:
+                close_old_connections()
+
+    def shutdown(self):
+        self._stop.set()
+        self._wake.set()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Contadores de vídeo não gravados no encerramento: %s', self.pending())
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = CounterBuffer(
+                    flush_interval=getattr(settings, 'VIDEO_COUNTER_FLUSH_INTERVAL', 5),
+                    flush_threshold=getattr(settings, 'VIDEO_COUNTER_FLUSH_THRESHOLD', 1000),
+                )
+                atexit.register(_buffer.shutdown)
+    return _buffer
+
+
+def record_view(video_id):
+    get_buffer().incr(video_id, 'views_count')
+
+
+def record_like(video_id):
+    get_buffer().incr(video_id, 'likes_count')
@@ -0,0 +1,81 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from videos.models import Video
+from videos.search import rebuild_index, search
+
+WORDS = (
+    'alongamento', 'respiração', 'glúteos', 'abdômen', 'pilates', 'yoga', 'funcional', 'dança',
+    'mobilidade', 'postura', 'força', 'resistência', 'meditação', 'iniciantes', 'avançado',
+    'quadril', 'ombros', 'coluna', 'relaxamento', 'equilíbrio', 'cardio', 'treino', 'aeróbico',
+    'gestantes', 'pós-parto', 'flexibilidade', 'core', 'pernas', 'braços', 'energia',
+)
+QUERIES = ('alongamentos', 'respiracao', 'gluteo', 'yoga iniciante', 'danca aerobica', 'equilibrio coluna')
+SYLLABLES = ('ba', 'ca', 'de', 'fi', 'go', 'lu', 'ma', 'ne', 'pi', 'ro', 'sa', 'te', 'vi', 'zo')
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compara a latência da busca textual com icontains sobre N vídeos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        rng = random.Random(42)
+        now = timezone.now()
+        # Vocabulário grande para que os termos tenham seletividade realista
+        filler = [''.join(rng.choices(SYLLABLES, k=4)) for _ in range(20_000)]
+        began = time.perf_counter()
+        Video.objects.bulk_create(
+            (
+                Video(
+                    title=' '.join(rng.choices(WORDS, k=1) + rng.choices(filler, k=3)).capitalize(),
+                    slug=f'bench-search-{index}',
+                    description=' '.join(rng.choices(WORDS, k=2) + rng.choices(filler, k=38)),
+                    is_public=True,
+                    published_at=now,
+                )
+                for index in range(options['rows'])
+            ),
+            batch_size=2000,
+        )
+        indexed = rebuild_index()
+        self.stdout.write(f'{indexed} documentos indexados em {time.perf_counter() - began:.1f}s')
+
+        for query in QUERIES:
+            search_times, icontains_times = [], []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                search(query, limit=20)
+                search_times.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                list(
+                    Video.objects
+                    .filter(Q(title__icontains=query) | Q(description__icontains=query))
+                    .order_by('-published_at')[:20]
+                )
+                icontains_times.append(time.perf_counter() - started)
+            self.stdout.write(
+                f'{query!r}: busca={statistics.median(search_times) * 1000:.2f}ms | '
+                f'icontains={statistics.median(icontains_times) * 1000:.2f}ms (mediana de {options["repeat"]})'
+            )
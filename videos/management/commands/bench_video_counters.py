@@ -0,0 +1,107 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+
+from videos.counters import CounterBuffer
+from videos.models import Video
+
+
+class StatementStats:
+    """Conta UPDATEs e o tempo gasto neles (inclui espera por lock)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.updates = 0
+        self.update_seconds = 0.0
+        self.lock_retries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith('UPDATE'):
+            return execute(sql, params, many, context)
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self.lock:
+                self.updates += 1
+                self.update_seconds += time.perf_counter() - began
+
+
+class Command(BaseCommand):
+    help = 'Teste de carga dos contadores de vídeo: UPDATE por reprodução vs. buffer agrupado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plays', type=int, default=10_000)
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--threshold', type=int, default=1000, help='Limite de flush do buffer')
+
+    def handle(self, *args, **options):
+        video = Video.objects.create(
+            title='Benchmark contadores', slug=f'bench-{uuid.uuid4().hex[:12]}', description='',
+        )
+        try:
+            for label, runner in (('update por reprodução', self._naive), ('buffer agrupado', self._buffered)):
+                Video.objects.filter(pk=video.pk).update(views_count=0)
+                stats = StatementStats()
+                began = time.perf_counter()
+                runner(video.pk, options, stats)
+                elapsed = time.perf_counter() - began
+                final = Video.objects.values_list('views_count', flat=True).get(pk=video.pk)
+                self.stdout.write(
+                    f'{label}: {options["plays"]} reproduções em {elapsed:.2f}s | '
+                    f'UPDATEs={stats.updates} | tempo em UPDATE={stats.update_seconds:.2f}s | '
+                    f'retentativas por lock={stats.lock_retries} | views_count final={final}'
+                )
+        finally:
+            video.delete()
+
+    def _run_threads(self, options, work):
+        per_thread = [options['plays'] // options['threads']] * options['threads']
+        per_thread[0] += options['plays'] - sum(per_thread)
+
+        def run(count):
+            try:
+                work(count)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            list(executor.map(run, per_thread))
+
+    def _naive(self, video_id, options, stats):
+        def work(count):
+            with connection.execute_wrapper(stats):
+                for _ in range(count):
+                    while True:
+                        try:
+                            with transaction.atomic():
+                                Video.objects.filter(pk=video_id).update(views_count=F('views_count') + 1)
+                            break
+                        except OperationalError:
+                            with stats.lock:
+                                stats.lock_retries += 1
+                            time.sleep(0.001)
+
+        self._run_threads(options, work)
+
+    def _buffered(self, video_id, options, stats):
+        buffer = CounterBuffer(flush_threshold=options['threshold'])
+
+        def work(count):
+            with connection.execute_wrapper(stats):
+                for _ in range(count):
+                    try:
+                        buffer.incr(video_id)
+                    except OperationalError:
+                        # O delta volta para o buffer e é gravado no próximo flush
+                        with stats.lock:
+                            stats.lock_retries += 1
+
+        self._run_threads(options, work)
+        with connection.execute_wrapper(stats):
+            buffer.flush()
@@ -0,0 +1,95 @@
+import os
+import random
+import resource
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from videos.streaming import serve_file_range
+
+
+def current_rss_mb():
+    """RSS atual do processo em MB (Linux); cai para o pico em outros SOs"""
+    try:
+        with open('/proc/self/statm') as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = 'Mede RSS do worker e tempo até o primeiro byte em seeks sobre arquivos grandes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=1024, help='Tamanho do arquivo de teste')
+        parser.add_argument('--requests', type=int, default=50, help='Quantidade de seeks')
+        parser.add_argument('--read-mb', type=int, default=4, help='MB consumidos por resposta')
+        parser.add_argument('--file', help='Usa um arquivo existente em vez de gerar um')
+        parser.add_argument('--naive', action='store_true', help='Compara com leitura completa do arquivo')
+
+    def handle(self, *args, **options):
+        path = options['file']
+        cleanup = False
+        if not path:
+            fd, path = tempfile.mkstemp(suffix='.mp4')
+            with os.fdopen(fd, 'wb') as fh:
+                # Arquivo esparso com dados no início e no fim
+                fh.write(os.urandom(1024 * 1024))
+                fh.seek(options['size_mb'] * 1024 * 1024 - 1024 * 1024)
+                fh.write(os.urandom(1024 * 1024))
+            cleanup = True
+
+        try:
+            size = os.path.getsize(path)
+            read_limit = options['read_mb'] * 1024 * 1024
+            factory = RequestFactory()
+            rss_before = current_rss_mb()
+            ttfb, totals = [], []
+
+            for _ in range(options['requests']):
+                start = random.randrange(0, max(size - read_limit, 1))
+                request = factory.get('/', HTTP_RANGE=f'bytes={start}-')
+                began = time.perf_counter()
+                response = serve_file_range(request, path)
+                consumed = 0
+                for chunk in response.streaming_content:
+                    if not consumed:
+                        ttfb.append(time.perf_counter() - began)
+                    consumed += len(chunk)
+                    if consumed >= read_limit:
+                        break
+                response.close()
+                totals.append(time.perf_counter() - began)
+
+            rss_after = current_rss_mb()
+            self._report('range/mmap', ttfb, totals, rss_before, rss_after)
+
+            if options['naive']:
+                rss_before = current_rss_mb()
+                ttfb = []
+                for _ in range(min(options['requests'], 5)):
+                    start = random.randrange(0, max(size - read_limit, 1))
+                    began = time.perf_counter()
+                    with open(path, 'rb') as fh:
+                        data = fh.read()
+                    _ = data[start:start + read_limit]
+                    ttfb.append(time.perf_counter() - began)
+                    rss_after = max(rss_after, current_rss_mb())
+                    del data
+                self._report('leitura completa', ttfb, ttfb, rss_before, rss_after)
+        finally:
+            if cleanup:
+                os.unlink(path)
+
+    def _report(self, label, ttfb, totals, rss_before, rss_after):
+        ttfb = sorted(ttfb)
+        p50 = ttfb[len(ttfb) // 2] * 1000
+        p95 = ttfb[int(len(ttfb) * 0.95) - 1 if len(ttfb) > 1 else 0] * 1000
+        self.stdout.write(
+            f'{label}: {len(totals)} requisições | TTFB p50={p50:.2f}ms p95={p95:.2f}ms | '
+            f'total médio={sum(totals) / len(totals) * 1000:.2f}ms | '
+            f'RSS {rss_before:.1f}MB -> {rss_after:.1f}MB'
+        )
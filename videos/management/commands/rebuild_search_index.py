@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from videos.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca de vídeos e aulas ao vivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{total} documentos indexados'))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from videos.models import Video
+from videos.transcoding import process_queue
+
+
+class Command(BaseCommand):
+    help = 'Processa a fila de transcodificação HLS dos vídeos enviados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--video', type=int, help='Processa apenas o vídeo informado')
+        parser.add_argument('--workers', type=int, help='Processos de transcodificação (padrão: VIDEO_TRANSCODE_MAX_WORKERS)')
+        parser.add_argument('--loop', action='store_true', help='Continua aguardando novos uploads')
+        parser.add_argument('--interval', type=int, default=30, help='Segundos entre verificações no modo --loop')
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Devolve à fila os vídeos que esgotaram VIDEO_TRANSCODE_MAX_ATTEMPTS',
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            requeued = Video.objects.filter(transcode_status='failed').exclude(video_file='').update(
+                transcode_status='pending', transcode_attempts=0,
+            )
+            self.stdout.write(f'Vídeos devolvidos à fila: {requeued}')
+        while True:
+            succeeded, failed = process_queue(max_workers=options['workers'], video_id=options['video'])
+            if succeeded or failed:
+                self.stdout.write(f'Transcodificados: {succeeded} | falhas: {failed}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='hls_path',
+            field=models.CharField(blank=True, help_text='Diretório das renditions HLS dentro de MEDIA_ROOT', max_length=255, verbose_name='Diretório HLS'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='renditions',
+            field=models.JSONField(blank=True, default=list, verbose_name='Renditions'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='transcode_error',
+            field=models.TextField(blank=True, verbose_name='Erro da Transcodificação'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='transcode_status',
+            field=models.CharField(choices=[('none', 'Sem arquivo'), ('pending', 'Aguardando'), ('processing', 'Processando'), ('ready', 'Pronto'), ('failed', 'Falhou')], default='none', max_length=20, verbose_name='Status da Transcodificação'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='transcode_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Transcodificação atualizada em'),
+        ),
+    ]
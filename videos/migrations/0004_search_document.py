@@ -0,0 +1,65 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:23
+
+from django.db import migrations, models
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE videos_searchdocument ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('portuguese'::regconfig, coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('portuguese'::regconfig, coalesce(content, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX videos_searchdocument_vector_idx ON videos_searchdocument USING GIN (search_vector)',
+]
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS videos_searchdocument_vector_idx',
+    'ALTER TABLE videos_searchdocument DROP COLUMN IF EXISTS search_vector',
+]
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE videos_searchdocument_fts
+    USING fts5(title, content, tokenize = 'unicode61 remove_diacritics 2')
+    """,
+]
+SQLITE_BACKWARD = [
+    'DROP TABLE IF EXISTS videos_searchdocument_fts',
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0003_video_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('video', 'Vídeo'), ('live', 'Aula ao Vivo')], max_length=10, verbose_name='Tipo')),
+                ('object_id', models.BigIntegerField(verbose_name='ID do Objeto')),
+                ('title', models.TextField(verbose_name='Título')),
+                ('content', models.TextField(blank=True, verbose_name='Conteúdo')),
+                ('is_visible', models.BooleanField(default=True, verbose_name='Visível na busca?')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Documento de Busca',
+                'verbose_name_plural': 'Documentos de Busca',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(
+            _run({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            _run({'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}),
+        ),
+    ]
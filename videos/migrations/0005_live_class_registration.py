@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_registered_count(apps, schema_editor):
+    LiveClass = apps.get_model('videos', 'LiveClass')
+    Through = LiveClass.registered_participants.through
+    counts = (
+        Through.objects.filter(liveclass_id=OuterRef('pk'))
+        .values('liveclass_id').annotate(total=Count('pk')).values('total')
+    )
+    LiveClass.objects.update(registered_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0004_search_document'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='liveclass',
+            name='registered_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Inscritas'),
+        ),
+        migrations.CreateModel(
+            name='LiveClassWaitlist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Entrou em')),
+                ('live_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='videos.liveclass', verbose_name='Aula ao Vivo')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlisted_lives', to=settings.AUTH_USER_MODEL, verbose_name='Usuária')),
+            ],
+            options={
+                'verbose_name': 'Lista de Espera',
+                'verbose_name_plural': 'Listas de Espera',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['live_class', 'created_at'], name='live_waitlist_order_idx')],
+                'constraints': [models.UniqueConstraint(fields=('live_class', 'user'), name='unique_live_waitlist_entry')],
+            },
+        ),
+        migrations.RunPython(backfill_registered_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0005_live_class_registration'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author_name', models.CharField(max_length=150, verbose_name='Autora')),
+                ('body', models.TextField(verbose_name='Mensagem')),
+                ('created_at', models.DateTimeField(verbose_name='Enviada em')),
+                ('live_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_messages', to='videos.liveclass', verbose_name='Aula ao Vivo')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Usuária')),
+            ],
+            options={
+                'verbose_name': 'Mensagem do Chat',
+                'verbose_name_plural': 'Mensagens do Chat',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['live_class', 'created_at'], name='chat_message_live_idx')],
+            },
+        ),
+    ]
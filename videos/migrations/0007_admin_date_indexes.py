@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0006_chat_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='liveclass',
+            index=models.Index(fields=['scheduled_date'], name='live_class_scheduled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['published_at'], name='video_published_at_idx'),
+        ),
+    ]
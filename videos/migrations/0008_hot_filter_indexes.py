@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0007_admin_date_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='liveclass',
+            index=models.Index(fields=['status', 'scheduled_date'], name='live_class_status_sched_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0008_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='transcode_attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas de Transcodificação'),
+        ),
+    ]
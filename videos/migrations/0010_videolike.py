@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0009_video_transcode_attempts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoLike',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Curtido em')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='video_likes', to=settings.AUTH_USER_MODEL, verbose_name='Usuária')),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='likes', to='videos.video', verbose_name='Vídeo')),
+            ],
+            options={
+                'verbose_name': 'Curtida',
+                'verbose_name_plural': 'Curtidas',
+                'constraints': [models.UniqueConstraint(fields=('video', 'user'), name='unique_video_like')],
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.urls import reverse
 
 class VideoCategory(models.Model):
     """Categorias de vídeos"""
@@ -24,6 +25,13 @@ class Video(models.Model):
         ('recorded', 'Gravado'),
         ('live_archived', 'Live Arquivada'),
     )
+    TRANSCODE_STATUS_CHOICES = (
+        ('none', 'Sem arquivo'),
+        ('pending', 'Aguardando'),
+        ('processing', 'Processando'),
+        ('ready', 'Pronto'),
+        ('failed', 'Falhou'),
+    )
     
     title = models.CharField(max_length=200, verbose_name='Título')
     slug = models.SlugField(unique=True)
@@ -50,13 +58,64 @@ class Video(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     published_at = models.DateTimeField(null=True, blank=True, verbose_name='Publicado em')
     
+    # Transcodificação HLS (ver videos/transcoding.py)
+    transcode_status = models.CharField(max_length=20, choices=TRANSCODE_STATUS_CHOICES, default='none', verbose_name='Status da Transcodificação')
+    transcode_updated_at = models.DateTimeField(null=True, blank=True, verbose_name='Transcodificação atualizada em')
+    transcode_error = models.TextField(blank=True, verbose_name='Erro da Transcodificação')
+    transcode_attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas de Transcodificação')
+    hls_path = models.CharField(max_length=255, blank=True, help_text='Diretório das renditions HLS dentro de MEDIA_ROOT', verbose_name='Diretório HLS')
+    renditions = models.JSONField(default=list, blank=True, verbose_name='Renditions')
+    
     class Meta:
         verbose_name = 'Vídeo'
         verbose_name_plural = 'Vídeos'
         ordering = ['-published_at']
+        indexes = [
+            # Catálogo paginado por keyset (videos/catalog.py)
+            models.Index(fields=['is_public', 'published_at'], name='video_public_published_idx'),
+            models.Index(fields=['category', 'is_public', 'published_at'], name='video_cat_published_idx'),
+            # Ordenação padrão e date_hierarchy do admin
+            models.Index(fields=['published_at'], name='video_published_at_idx'),
+        ]
     
     def __str__(self):
         return self.title
+    
+    def pick_rendition(self, max_height=None, max_bandwidth=None):
+        """Maior rendition pronta que respeita os limites informados"""
+        candidates = [
+            rendition for rendition in self.renditions
+            if (max_height is None or rendition['height'] <= max_height)
+            and (max_bandwidth is None or rendition['bandwidth'] <= max_bandwidth)
+        ]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda rendition: rendition['bandwidth'])
+    
+    def get_playback_url(self):
+        """URL que o player deve usar: HLS quando pronto, senão o arquivo original"""
+        if self.transcode_status == 'ready' and self.renditions:
+            return reverse('videos:hls', args=[self.slug, 'master.m3u8'])
+        if self.video_file:
+            return reverse('videos:stream', args=[self.slug])
+        return self.video_url
+
+
+class VideoLike(models.Model):
+    """Curtida de uma usuária (uma por vídeo; o total fica em Video.likes_count)"""
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='likes', verbose_name='Vídeo')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='video_likes', verbose_name='Usuária')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Curtido em')
+    
+    class Meta:
+        verbose_name = 'Curtida'
+        verbose_name_plural = 'Curtidas'
+        constraints = [
+            models.UniqueConstraint(fields=['video', 'user'], name='unique_video_like'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} - {self.video}"
 
 
 class LiveClass(models.Model):
@@ -90,6 +149,8 @@ class LiveClass(models.Model):
     # Metadados
     max_participants = models.IntegerField(null=True, blank=True, verbose_name='Máximo de Participantes')
     registered_participants = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='registered_lives', blank=True, verbose_name='Participantes Registrados')
+    # Mantido por videos/registrations.py para não contar o M2M a cada página
+    registered_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Inscritas')
     
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -97,6 +158,100 @@ class LiveClass(models.Model):
         verbose_name = 'Aula ao Vivo'
         verbose_name_plural = 'Aulas ao Vivo'
         ordering = ['scheduled_date']
+        indexes = [
+            models.Index(fields=['scheduled_date'], name='live_class_scheduled_idx'),
+            # Próximas aulas agendadas / ao vivo
+            models.Index(fields=['status', 'scheduled_date'], name='live_class_status_sched_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} - {self.scheduled_date.strftime('%d/%m/%Y %H:%M')}"
+    
+    def save(self, *args, **kwargs):
+        # registered_count só muda por UPDATE condicional (videos/registrations.py);
+        # um save() com a instância desatualizada não pode sobrescrevê-lo
+        if not self._state.adding and kwargs.get('update_fields') is None and not args:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'registered_count'
+            ]
+        super().save(*args, **kwargs)
+    
+    @property
+    def spots_left(self):
+        if self.max_participants is None:
+            return None
+        return max(self.max_participants - self.registered_count, 0)
+    
+    @property
+    def is_full(self):
+        return self.spots_left == 0
+
+
+class LiveClassWaitlist(models.Model):
+    """Lista de espera de uma aula ao vivo lotada"""
+    live_class = models.ForeignKey(LiveClass, on_delete=models.CASCADE, related_name='waitlist', verbose_name='Aula ao Vivo')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='waitlisted_lives', verbose_name='Usuária')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Entrou em')
+    
+    class Meta:
+        verbose_name = 'Lista de Espera'
+        verbose_name_plural = 'Listas de Espera'
+        ordering = ['created_at', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['live_class', 'user'], name='unique_live_waitlist_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['live_class', 'created_at'], name='live_waitlist_order_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} - {self.live_class}"
+
+
+class SearchDocument(models.Model):
+    """Texto normalizado de vídeos e lives para a busca (ver videos/search.py)"""
+    KIND_VIDEO = 'video'
+    KIND_LIVE = 'live'
+    KIND_CHOICES = (
+        (KIND_VIDEO, 'Vídeo'),
+        (KIND_LIVE, 'Aula ao Vivo'),
+    )
+    
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name='Tipo')
+    object_id = models.BigIntegerField(verbose_name='ID do Objeto')
+    title = models.TextField(verbose_name='Título')
+    content = models.TextField(blank=True, verbose_name='Conteúdo')
+    is_visible = models.BooleanField(default=True, verbose_name='Visível na busca?')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Documento de Busca'
+        verbose_name_plural = 'Documentos de Busca'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id}"
+
+
+
+class ChatMessage(models.Model):
+    """Mensagens do chat das aulas ao vivo (gravadas em lote por videos/chat)"""
+    live_class = models.ForeignKey(LiveClass, on_delete=models.CASCADE, related_name='chat_messages', verbose_name='Aula ao Vivo')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, verbose_name='Usuária')
+    author_name = models.CharField(max_length=150, verbose_name='Autora')
+    body = models.TextField(verbose_name='Mensagem')
+    created_at = models.DateTimeField(verbose_name='Enviada em')
+    
+    class Meta:
+        verbose_name = 'Mensagem do Chat'
+        verbose_name_plural = 'Mensagens do Chat'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['live_class', 'created_at'], name='chat_message_live_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.title} - {self.scheduled_date.strftime('%d/%m/%Y %H:%M')}"
\ No newline at end of file
+        return f"{self.author_name}: {self.body[:50]}"
@@ -0,0 +1,125 @@
+"""
+Inscrições em aulas ao vivo com controle de vagas e lista de espera.
+
+A vaga é reservada com um UPDATE condicional sobre ``registered_count``::
+
+    UPDATE ... SET registered_count = registered_count + 1
+    WHERE id = %s AND (max_participants IS NULL OR registered_count < max_participants)
+
+O banco serializa os UPDATEs na mesma linha, então duas requisições nunca
+ocupam a mesma última vaga, sem ``SELECT ... FOR UPDATE`` na aula inteira.
+Se a inscrição no M2M falhar (inscrição duplicada concorrente), a transação
+desfaz também o incremento.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+
+from .models import LiveClass, LiveClassWaitlist
+
+REGISTERED = 'registered'
+WAITLISTED = 'waitlisted'
+ALREADY_REGISTERED = 'already_registered'
+ALREADY_WAITLISTED = 'already_waitlisted'
+
+OPEN_STATUSES = ('scheduled', 'live')
+
+Registration = LiveClass.registered_participants.through
+
+
+class RegistrationClosed(Exception):
+    """A aula não existe ou não aceita mais inscrições"""
+
+
+def _claim_seat(live_class_id):
+    has_room = Q(max_participants__isnull=True) | Q(registered_count__lt=F('max_participants'))
+    return LiveClass.objects.filter(has_room, pk=live_class_id, status__in=OPEN_STATUSES).update(
+        registered_count=F('registered_count') + 1,
+    )
+
+
+def _release_seat(live_class_id):
+    LiveClass.objects.filter(pk=live_class_id, registered_count__gt=0).update(
+        registered_count=F('registered_count') - 1,
+    )
+
+
+def register(live_class_id, user):
+    """
+    Inscreve ``user`` na aula ou o coloca na lista de espera.
+
+    Retorna uma das constantes ``REGISTERED``, ``WAITLISTED``,
+    ``ALREADY_REGISTERED`` ou ``ALREADY_WAITLISTED``.
+    """
+    try:
+        with transaction.atomic():
+            if Registration.objects.filter(liveclass_id=live_class_id, customuser_id=user.pk).exists():
+                return ALREADY_REGISTERED
+            if _claim_seat(live_class_id):
+                Registration.objects.create(liveclass_id=live_class_id, customuser_id=user.pk)
+                LiveClassWaitlist.objects.filter(live_class_id=live_class_id, user_id=user.pk).delete()
+                return REGISTERED
+            if not LiveClass.objects.filter(pk=live_class_id, status__in=OPEN_STATUSES).exists():
+                raise RegistrationClosed('Inscrições encerradas para esta aula')
+            _, created = LiveClassWaitlist.objects.get_or_create(live_class_id=live_class_id, user_id=user.pk)
+            return WAITLISTED if created else ALREADY_WAITLISTED
+    except IntegrityError:
+        # Outra requisição da mesma usuária venceu a corrida
+        if Registration.objects.filter(liveclass_id=live_class_id, customuser_id=user.pk).exists():
+            return ALREADY_REGISTERED
+        return ALREADY_WAITLISTED
+
+
+def promote_waitlist(live_class_id):
+    """Move da lista de espera para a aula enquanto houver vagas"""
+    promoted = []
+    with transaction.atomic():
+        while True:
+            entry = (
+                LiveClassWaitlist.objects.select_for_update(skip_locked=True)
+                .filter(live_class_id=live_class_id)
+                .order_by('created_at', 'id')
+                .first()
+            )
+            if entry is None or not _claim_seat(live_class_id):
+                break
+            entry.delete()
+            _, created = Registration.objects.get_or_create(liveclass_id=live_class_id, customuser_id=entry.user_id)
+            if created:
+                promoted.append(entry.user_id)
+            else:
+                _release_seat(live_class_id)
+    return promoted
+
+
+def cancel(live_class_id, user):
+    """
+    Cancela a inscrição (ou a posição na lista de espera) de ``user``.
+
+    Retorna os ids das usuárias promovidas da lista de espera.
+    """
+    with transaction.atomic():
+        removed, _ = Registration.objects.filter(liveclass_id=live_class_id, customuser_id=user.pk).delete()
+        if not removed:
+            LiveClassWaitlist.objects.filter(live_class_id=live_class_id, user_id=user.pk).delete()
+            return []
+        _release_seat(live_class_id)
+        return promote_waitlist(live_class_id)
+
+
+def waitlist_position(live_class_id, user):
+    """Posição (1-based) de ``user`` na lista de espera, ou ``None``"""
+    entry = LiveClassWaitlist.objects.filter(live_class_id=live_class_id, user_id=user.pk).first()
+    if entry is None:
+        return None
+    ahead = LiveClassWaitlist.objects.filter(live_class_id=live_class_id).filter(
+        Q(created_at__lt=entry.created_at) | Q(created_at=entry.created_at, pk__lt=entry.pk)
+    ).count()
+    return ahead + 1
+
+
+def sync_registered_count(live_class_ids):
+    """Recalcula o contador a partir do M2M (edições feitas fora deste módulo)"""
+    for live_class_id in live_class_ids:
+        LiveClass.objects.filter(pk=live_class_id).update(
+            registered_count=Registration.objects.filter(liveclass_id=live_class_id).count(),
+        )
@@ -0,0 +1,256 @@
+"""
+Busca textual em vídeos e aulas ao vivo.
+
+Cada objeto pesquisável tem uma linha em ``SearchDocument`` com o texto já
+normalizado (minúsculo e sem acentos), atualizada pelos signals a cada save.
+O índice depende do banco:
+
+* PostgreSQL: coluna gerada ``search_vector`` (``to_tsvector('portuguese')``,
+  título com peso A) e índice GIN; ranking por ``ts_rank``.
+* SQLite (desenvolvimento): tabela FTS5 ``videos_searchdocument_fts`` com o
+  texto passado pelo stemmer leve de português abaixo; ranking por ``bm25``.
+* Outros bancos: ``icontains`` sobre o texto normalizado, sem índice.
+
+Os dois caminhos respondem com o mesmo formato em ``search()``.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+from django.db import connection, transaction
+from django.db.models import Case, FloatField, Q, Value, When
+
+from .models import LiveClass, SearchDocument, Video
+
+FTS_TABLE = 'videos_searchdocument_fts'
+
+TOKEN_RE = re.compile(r'\w+')
+
+STOPWORDS = frozenset(
+    'a ao aos as com da das de do dos e em na nas no nos o os ou para pela pelas pelo pelos '
+    'por que se sem um uma umas uns'.split()
+)
+
+# Sufixos removidos pelo stemmer (do mais longo para o mais curto)
+SUFFIXES = (
+    'amentos', 'imentos', 'amento', 'imento', 'adoras', 'adores', 'acoes', 'mente',
+    'adora', 'ador', 'acao', 'ancia', 'encia', 'idades', 'idade', 'ismos', 'ismo',
+    'istas', 'ista', 'aveis', 'iveis', 'avel', 'ivel', 'ando', 'endo', 'indo',
+    'ados', 'idos', 'adas', 'idas', 'ado', 'ido', 'ada', 'ida', 'ar', 'er', 'ir',
+    'oes', 'aes', 'ais', 'eis', 'ois', 'es', 'os', 'as', 'o', 'a', 'e', 's',
+)
+
+
+ACCENTS = str.maketrans('áàâãäéèêëíìîïóòôõöúùûüçñÁÀÂÃÄÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇÑ', 'aaaaaeeeeiiiiooooouuuucnAAAAAEEEEIIIIOOOOOUUUUCN')
+
+
+def normalize(text):
+    """Minúsculas e sem acentos ('Alongamento Rápido' -> 'alongamento rapido')"""
+    text = (text or '').translate(ACCENTS)
+    if not text.isascii():
+        decomposed = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return text.lower()
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    """Stemmer leve para português, aplicado igualmente a documentos e consultas"""
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(normalize(text)) if token not in STOPWORDS]
+
+
+def stemmed_text(text):
+    return ' '.join(stem(token) for token in tokenize(text))
+
+
+def build_document(instance):
+    """``SearchDocument`` (não salvo) para um ``Video`` ou ``LiveClass``"""
+    category = instance.category.name if instance.category_id and instance.category else ''
+    if isinstance(instance, Video):
+        kind = SearchDocument.KIND_VIDEO
+        is_visible = instance.is_public and instance.published_at is not None
+        extra = ''
+    else:
+        kind = SearchDocument.KIND_LIVE
+        is_visible = instance.status in ('scheduled', 'live')
+        extra = instance.instructor.get_full_name() if instance.instructor_id else ''
+    return SearchDocument(
+        kind=kind,
+        object_id=instance.pk,
+        title=normalize(instance.title),
+        content=normalize(' '.join(filter(None, [instance.description, category, extra]))),
+        is_visible=is_visible,
+    )
+
+
+class PostgresBackend:
+    """tsvector + GIN (coluna gerada criada na migração)"""
+
+    def sync(self, documents):
+        pass
+
+    def remove(self, document_ids):
+        pass
+
+    def query(self, text, kind=None, limit=20):
+        sql = (
+            'SELECT d.id, ts_rank(d.search_vector, q) AS rank '
+            f'FROM {SearchDocument._meta.db_table} d, websearch_to_tsquery(\'portuguese\', %s) q '
+            'WHERE d.search_vector @@ q AND d.is_visible'
+        )
+        params = [normalize(text)]
+        if kind:
+            sql += ' AND d.kind = %s'
+            params.append(kind)
+        sql += ' ORDER BY rank DESC, d.id DESC LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class SqliteBackend:
+    """FTS5 com remoção de diacríticos e stemmer em Python"""
+
+    def sync(self, documents):
+        rows = [(document.pk, stemmed_text(document.title), stemmed_text(document.content)) for document in documents]
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(f'INSERT INTO {FTS_TABLE} (rowid, title, content) VALUES (%s, %s, %s)', rows)
+
+    def remove(self, document_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in document_ids])
+
+    def query(self, text, kind=None, limit=20):
+        terms = [stem(token) for token in tokenize(text)]
+        if not terms:
+            return []
+        # Cada termo vira um prefixo entre aspas; termos implícitos em AND
+        match = ' '.join(f'"{term}"*' for term in terms)
+        sql = (
+            f'SELECT d.id, -bm25({FTS_TABLE}, 10.0, 1.0) AS rank '
+            f'FROM {FTS_TABLE} JOIN {SearchDocument._meta.db_table} d ON d.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND d.is_visible'
+        )
+        params = [match]
+        if kind:
+            sql += ' AND d.kind = %s'
+            params.append(kind)
+        sql += ' ORDER BY rank DESC, d.id DESC LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class ContainsBackend:
+    """Outros bancos: ``icontains`` sobre o texto normalizado, sem índice (título vale mais)"""
+
+    def sync(self, documents):
+        pass
+
+    def remove(self, document_ids):
+        pass
+
+    def query(self, text, kind=None, limit=20):
+        terms = tokenize(text)
+        if not terms:
+            return []
+        queryset = SearchDocument.objects.filter(is_visible=True)
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(content__icontains=term))
+        if kind:
+            queryset = queryset.filter(kind=kind)
+        rank = Case(When(title__icontains=terms[0], then=Value(1.0)), default=Value(0.5), output_field=FloatField())
+        return list(queryset.annotate(rank=rank).order_by('-rank', '-pk').values_list('pk', 'rank')[:limit])
+
+
+def get_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresBackend()
+    if connection.vendor == 'sqlite':
+        return SqliteBackend()
+    # Sem índice dedicado, mas os signals de indexação continuam funcionando
+    return ContainsBackend()
+
+
+def index_objects(instances):
+    """Cria/atualiza os documentos de busca de ``instances`` em lote"""
+    documents = [build_document(instance) for instance in instances]
+    if not documents:
+        return 0
+    with transaction.atomic():
+        SearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['title', 'content', 'is_visible'],
+        )
+        lookup = {}
+        for kind in {document.kind for document in documents}:
+            object_ids = [document.object_id for document in documents if document.kind == kind]
+            rows = SearchDocument.objects.filter(kind=kind, object_id__in=object_ids).values_list('object_id', 'pk')
+            lookup.update(((kind, object_id), pk) for object_id, pk in rows)
+        for document in documents:
+            document.pk = lookup[(document.kind, document.object_id)]
+        get_backend().sync(documents)
+    return len(documents)
+
+
+def index_object(instance):
+    return index_objects([instance])
+
+
+def remove_object(kind, object_id):
+    with transaction.atomic():
+        document_ids = list(SearchDocument.objects.filter(kind=kind, object_id=object_id).values_list('pk', flat=True))
+        get_backend().remove(document_ids)
+        SearchDocument.objects.filter(pk__in=document_ids).delete()
+
+
+def rebuild_index(batch_size=2000):
+    """Reindexa todos os vídeos e aulas ao vivo; retorna o total indexado"""
+    total = 0
+    for model in (Video, LiveClass):
+        queryset = model.objects.select_related('category', 'instructor').order_by('pk')
+        batch = []
+        for instance in queryset.iterator(chunk_size=batch_size):
+            batch.append(instance)
+            if len(batch) >= batch_size:
+                total += index_objects(batch)
+                batch = []
+        total += index_objects(batch)
+    return total
+
+
+def search(text, kind=None, limit=20):
+    """
+    Resultados ranqueados: lista de dicts com ``kind``, ``object``, ``rank``.
+    """
+    rows = get_backend().query(text, kind=kind, limit=limit)
+    if not rows:
+        return []
+    ranks = dict(rows)
+    documents = SearchDocument.objects.in_bulk(list(ranks))
+    ids_by_kind = {}
+    for document in documents.values():
+        ids_by_kind.setdefault(document.kind, []).append(document.object_id)
+    objects = {
+        SearchDocument.KIND_VIDEO: Video.objects.select_related('category').in_bulk(ids_by_kind.get(SearchDocument.KIND_VIDEO, [])),
+        SearchDocument.KIND_LIVE: LiveClass.objects.select_related('category').in_bulk(ids_by_kind.get(SearchDocument.KIND_LIVE, [])),
+    }
+    results = []
+    for document_id, rank in rows:
+        document = documents.get(document_id)
+        instance = objects[document.kind].get(document.object_id) if document else None
+        if instance is not None:
+            results.append({'kind': document.kind, 'object': instance, 'rank': float(rank)})
+    return results
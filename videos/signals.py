@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.caching import invalidate_on_change
+from core.imaging import schedule_derivatives, schedule_video_poster
+
+from . import catalog, registrations, search
+from .models import LiveClass, SearchDocument, Video, VideoCategory
+
+
+def previous_state(instance):
+    """
+    Valores gravados antes deste save (uma consulta, memorizada na instância
+    para ser compartilhada pelos receivers de pre_save/post_save).
+    """
+    if not hasattr(instance, '_previous_state'):
+        row = None
+        if instance.pk:
+            row = Video.objects.filter(pk=instance.pk).values('video_file', 'category_id').first()
+        instance._previous_state = row
+    return instance._previous_state
+
+
+# Funções com @cached(Video/VideoCategory) (ex.: catalog.categories)
+invalidate_on_change(Video, VideoCategory)
+
+
+@receiver(pre_save, sender=Video)
+def queue_transcoding(sender, instance, raw=False, **kwargs):
+    """Coloca o vídeo na fila de transcodificação quando o arquivo muda"""
+    if raw:
+        return
+    previous = previous_state(instance)
+    current_file = instance.video_file.name or ''
+    if previous is not None and current_file == (previous['video_file'] or ''):
+        return
+    if current_file:
+        instance.transcode_status = 'pending'
+    else:
+        instance.transcode_status = 'none'
+    instance.transcode_error = ''
+    instance.transcode_attempts = 0
+    instance.hls_path = ''
+    instance.renditions = []
+
+
+@receiver(post_save, sender=Video)
+def queue_thumbnail_derivatives(sender, instance, raw=False, **kwargs):
+    """Gera derivados da miniatura ou extrai um quadro do vídeo"""
+    if raw:
+        return
+    if instance.thumbnail:
+        name = instance.thumbnail.name
+        transaction.on_commit(lambda: schedule_derivatives(name))
+    elif instance.video_file:
+        video_id = instance.pk
+        transaction.on_commit(lambda: schedule_video_poster(video_id))
+
+
+@receiver(post_save, sender=Video)
+def invalidate_catalog_on_save(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    previous_category = previous['category_id'] if previous else None
+    # O snapshot vale apenas para um save
+    instance.__dict__.pop('_previous_state', None)
+    catalog.invalidate(instance.category_id, previous_category)
+
+
+@receiver(post_delete, sender=Video)
+def invalidate_catalog_on_delete(sender, instance, **kwargs):
+    catalog.invalidate(instance.category_id)
+
+
+@receiver(post_save, sender=VideoCategory)
+@receiver(post_delete, sender=VideoCategory)
+def invalidate_catalog_on_category_change(sender, instance, **kwargs):
+    catalog.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Video)
+@receiver(post_save, sender=LiveClass)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_object(instance)
+
+
+@receiver(post_delete, sender=Video)
+def remove_video_from_search_index(sender, instance, **kwargs):
+    search.remove_object(SearchDocument.KIND_VIDEO, instance.pk)
+
+
+@receiver(post_delete, sender=LiveClass)
+def remove_live_from_search_index(sender, instance, **kwargs):
+    search.remove_object(SearchDocument.KIND_LIVE, instance.pk)
+
+
+@receiver(post_save, sender=LiveClass)
+def promote_waitlist_on_save(sender, instance, created=False, raw=False, **kwargs):
+    """Aumentar o limite de vagas libera a lista de espera"""
+    if raw or created:
+        return
+    live_class_id = instance.pk
+    transaction.on_commit(lambda: registrations.promote_waitlist(live_class_id))
+
+
+@receiver(m2m_changed, sender=LiveClass.registered_participants.through)
+def sync_registered_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """Mantém registered_count correto em alterações feitas pelo admin/ORM"""
+    if action == 'pre_clear' and reverse:
+        # Depois do clear as inscrições da usuária já não existem: guarda as aulas afetadas
+        instance._cleared_live_class_ids = list(
+            sender.objects.filter(customuser_id=instance.pk).values_list('liveclass_id', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        live_class_ids = pk_set or []
+        if action == 'post_clear':
+            live_class_ids = instance.__dict__.pop('_cleared_live_class_ids', [])
+    else:
+        live_class_ids = [instance.pk]
+    registrations.sync_registered_count(list(live_class_ids))
@@ -0,0 +1,183 @@
+"""
+Entrega de arquivos de vídeo com suporte a requisições HTTP Range.
+
+O corpo da resposta é produzido a partir de fatias de um ``mmap`` do arquivo,
+em blocos de tamanho fixo, de modo que o worker nunca mantém o vídeo inteiro
+em memória (sob ASGI, via ``core.streams``, um bloco por vez). Quando
+``VIDEO_ACCEL_REDIRECT_PREFIX`` está configurado, o envio
+é delegado ao proxy reverso (nginx ``X-Accel-Redirect``), que usa ``sendfile``
+sem passar os bytes pelo Python.
+"""
+import mimetypes
+import mmap
+import os
+import re
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from core.streams import stream_body
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+DEFAULT_CHUNK_SIZE = 512 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    """O cabeçalho Range não pode ser atendido"""
+
+
+def file_etag(stat_result):
+    """ETag forte derivado de tamanho e mtime (em ns) do arquivo."""
+    return quote_etag(f'{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}')
+
+
+def parse_range_header(header, size):
+    """
+    Converte o cabeçalho Range em um intervalo ``(start, end)`` inclusivo.
+
+    Retorna ``None`` quando o cabeçalho é inválido e deve ser ignorado
+    (RFC 9110, seção 14.2). Múltiplos intervalos não são suportados e
+    levantam ``RangeNotSatisfiable``.
+    """
+    header = header.strip()
+    if not header.startswith('bytes='):
+        return None
+    if ',' in header:
+        raise RangeNotSatisfiable('Múltiplos intervalos não são suportados')
+
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Sufixo: os últimos N bytes do arquivo
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable('Intervalo vazio')
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable('Início além do fim do arquivo')
+    return start, min(end, size - 1)
+
+
+def iter_file_range(path, start, end, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Gera os bytes ``[start, end]`` do arquivo em blocos de ``chunk_size``.
+
+    Cada bloco é copiado de uma ``memoryview`` do ``mmap``; as páginas lidas
+    ficam no page cache do SO e não no heap do processo.
+    """
+    if end < start:
+        return
+    with open(path, 'rb') as fh:
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                position = start
+                while position <= end:
+                    stop = min(position + chunk_size, end + 1)
+                    yield bytes(view[position:stop])
+                    position = stop
+            finally:
+                view.release()
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def _if_range_matches(request, etag, mtime):
+    if_range = request.headers.get('If-Range')
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        # Apenas comparação forte é permitida em If-Range
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def serve_file_range(request, path, content_type=None, accel_name=None):
+    """
+    Responde a ``request`` com o arquivo em ``path`` respeitando Range,
+    If-Range e requisições condicionais (ETag / Last-Modified).
+
+    ``accel_name`` é o caminho relativo usado para montar o
+    ``X-Accel-Redirect`` quando o proxy reverso estiver configurado.
+    """
+    stat_result = os.stat(path)
+    size = stat_result.st_size
+    etag = file_etag(stat_result)
+    mtime = stat_result.st_mtime
+    if content_type is None:
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    common_headers = {
+        'Accept-Ranges': 'bytes',
+        'ETag': etag,
+        'Last-Modified': http_date(mtime),
+        'Cache-Control': 'private, max-age=3600',
+    }
+
+    if _not_modified(request, etag, mtime):
+        response = HttpResponse(status=304)
+        for header, value in common_headers.items():
+            response[header] = value
+        return response
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and request.method in ('GET', 'HEAD') and _if_range_matches(request, etag, mtime):
+        try:
+            byte_range = parse_range_header(range_header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            for header, value in common_headers.items():
+                response[header] = value
+            return response
+
+    start, end = byte_range if byte_range else (0, size - 1)
+    length = end - start + 1 if size else 0
+
+    accel_prefix = getattr(settings, 'VIDEO_ACCEL_REDIRECT_PREFIX', '')
+    if accel_prefix and accel_name:
+        # O nginx trata Range/If-Range sozinho a partir do cabeçalho original
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{accel_name.lstrip('/')}"
+        for header, value in common_headers.items():
+            response[header] = value
+        return response
+
+    if request.method == 'HEAD' or length == 0:
+        response = HttpResponse(content_type=content_type)
+    else:
+        chunk_size = getattr(settings, 'VIDEO_STREAM_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+        response = StreamingHttpResponse(
+            stream_body(request, iter_file_range(path, start, end, chunk_size)),
+            content_type=content_type,
+        )
+
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(length)
+    for header, value in common_headers.items():
+        response[header] = value
+    return response
@@ -1,3 +1,715 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import DatabaseError, OperationalError, connection
+from django.test import AsyncRequestFactory, Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from core import caching
+
+from . import catalog, registrations, search, streaming
+from .chat import ChatApplication, ChatHub, MessageWriter
+from .chat.brokers import InMemoryBroker
+from .chat.hub import SLOW_CONSUMER_CLOSE_CODE
+from .counters import CounterBuffer
+from .models import ChatMessage, LiveClass, Video, VideoCategory, VideoLike
+from .streaming import RangeNotSatisfiable, parse_range_header
+from .transcoding import (
+    DONE_MARKER, RENDITIONS, StubBackend, TranscodeError, claim_video, make_executor, process_queue, renditions_for,
+    transcode_video,
+)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, VIDEO_ACCEL_REDIRECT_PREFIX='')
+class VideoStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.payload = bytes(range(256)) * 40
+        cls.video = Video(title='Aula', slug='aula', description='', is_public=True, requires_subscription=False)
+        cls.video.video_file.save('aula.mp4', ContentFile(cls.payload), save=False)
+        cls.video.save()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.url = reverse('videos:stream', args=[self.video.slug])
+
+    def test_full_response(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), self.payload)
+
+    def test_partial_content(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.payload)}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(b''.join(response.streaming_content), self.payload[100:200])
+
+    def test_suffix_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.payload[-10:])
+
+    def test_multiple_ranges_are_rejected(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1,5-6')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.payload)}')
+
+    def test_if_range_mismatch_returns_full_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"outro"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_range_match_returns_partial(self):
+        etag = self.client.head(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+
+    def test_if_none_match(self):
+        etag = self.client.head(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_private_video_requires_login(self):
+        Video.objects.filter(pk=self.video.pk).update(is_public=False)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_hidden_video_is_limited_to_staff_and_instructors(self):
+        Video.objects.filter(pk=self.video.pk).update(is_public=False)
+        student = CustomUser.objects.create_user('aluna', user_type='student')
+        self.client.force_login(student)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        instructor = CustomUser.objects.create_user('instrutora', user_type='instructor')
+        self.client.force_login(instructor)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(VIDEO_STREAM_CHUNK_SIZE=1000)
+    def test_asgi_response_streams_one_chunk_at_a_time(self):
+        produced = []
+        iter_file_range = streaming.iter_file_range
+
+        def tracking(*args, **kwargs):
+            for chunk in iter_file_range(*args, **kwargs):
+                produced.append(len(chunk))
+                yield chunk
+
+        request = AsyncRequestFactory().get(self.url, headers={'Range': 'bytes=0-2999'})
+        with mock.patch.object(streaming, 'iter_file_range', tracking):
+            response = streaming.serve_file_range(request, self.video.video_file.path)
+        self.assertTrue(response.is_async)
+
+        async def read_two():
+            chunks = response.__aiter__()
+            first = await chunks.__anext__()
+            read_after_first = len(produced)
+            second = await chunks.__anext__()
+            await chunks.aclose()
+            return first, read_after_first, second
+
+        first, read_after_first, second = asyncio.run(read_two())
+        # Só o bloco enviado foi lido do arquivo
+        self.assertEqual(read_after_first, 1)
+        self.assertEqual(first + second, self.payload[:2000])
+
+    @override_settings(VIDEO_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_accel_redirect(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.video.video_file.name}')
+
+    def test_parse_range_header(self):
+        self.assertEqual(parse_range_header('bytes=10-', 100), (10, 99))
+        self.assertEqual(parse_range_header('bytes=10-1000', 100), (10, 99))
+        self.assertIsNone(parse_range_header('items=1-2', 100))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range_header('bytes=200-', 100)
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    VIDEO_ACCEL_REDIRECT_PREFIX='',
+    VIDEO_TRANSCODE_BACKEND='videos.transcoding.StubBackend',
+    VIDEO_TRANSCODE_NICENESS=0,
+)
+class TranscodingTests(TestCase):
+    def setUp(self):
+        self.video = Video(title='Pilates', slug='pilates', description='', is_public=True, requires_subscription=False)
+        self.video.video_file.save('pilates.mp4', ContentFile(b'x' * 3000), save=False)
+        self.video.save()
+
+    def test_upload_queues_video(self):
+        self.assertEqual(self.video.transcode_status, 'pending')
+        self.video.title = 'Pilates 2'
+        self.video.save()
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.transcode_status, 'pending')
+
+    def test_pipeline_generates_renditions(self):
+        self.assertEqual(process_queue(max_workers=1), (1, 0))
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.transcode_status, 'ready')
+        self.assertEqual(len(self.video.renditions), len(RENDITIONS))
+        for rendition in self.video.renditions:
+            rendition_dir = os.path.join(MEDIA_ROOT, self.video.hls_path, rendition['name'])
+            self.assertTrue(os.path.exists(os.path.join(rendition_dir, DONE_MARKER)))
+        self.assertEqual(self.video.pick_rendition(max_height=600)['name'], '540p')
+        self.assertTrue(self.video.get_playback_url().endswith('/hls/master.m3u8'))
+
+    def test_pipeline_is_idempotent(self):
+        process_queue(max_workers=1)
+        self.video.refresh_from_db()
+        segment = os.path.join(MEDIA_ROOT, self.video.hls_path, '360p', 'seg_00000.ts')
+        mtime = os.stat(segment).st_mtime_ns
+        Video.objects.filter(pk=self.video.pk).update(transcode_status='pending')
+        process_queue(max_workers=1)
+        self.assertEqual(os.stat(segment).st_mtime_ns, mtime)
+        self.assertEqual(process_queue(max_workers=1), (0, 0))
+
+    def test_missing_source_marks_video_failed(self):
+        os.unlink(self.video.video_file.path)
+        self.assertEqual(process_queue(max_workers=1), (0, 1))
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.transcode_status, 'failed')
+        self.assertIn('indisponível', self.video.transcode_error)
+        self.assertEqual(process_queue(max_workers=1), (0, 0))
+
+    def test_result_discarded_when_claim_is_lost(self):
+        video = claim_video()
+        # Novo upload durante a transcodificação
+        Video.objects.filter(pk=video.pk).update(transcode_status='pending')
+        with make_executor(1) as executor:
+            self.assertIsNone(transcode_video(video, executor))
+        video.refresh_from_db()
+        self.assertEqual((video.transcode_status, video.renditions), ('pending', []))
+
+    def test_claim_is_renewed_after_each_rendition(self):
+        video = claim_video()
+        claimed_at = video.transcode_updated_at
+        with make_executor(1) as executor:
+            self.assertTrue(transcode_video(video, executor))
+        self.assertGreater(video.transcode_updated_at, claimed_at)
+        video.refresh_from_db()
+        hls_dir = os.path.join(MEDIA_ROOT, video.hls_path)
+        self.assertEqual([name for name in os.listdir(hls_dir) if '.partial' in name], [])
+
+    @override_settings(VIDEO_TRANSCODE_MAX_ATTEMPTS=2, VIDEO_TRANSCODE_RETRY_DELAY=0)
+    def test_failed_rendition_is_retried_before_failing(self):
+        with mock.patch.object(StubBackend, 'transcode', side_effect=TranscodeError('ffmpeg caiu')):
+            self.assertEqual(process_queue(max_workers=1, limit=1), (0, 1))
+            self.video.refresh_from_db()
+            self.assertEqual((self.video.transcode_status, self.video.transcode_attempts), ('pending', 1))
+            self.assertEqual(process_queue(max_workers=1), (0, 1))
+        self.video.refresh_from_db()
+        self.assertEqual((self.video.transcode_status, self.video.transcode_attempts), ('failed', 2))
+        self.assertIn('ffmpeg caiu', self.video.transcode_error)
+
+    def test_skips_renditions_taller_than_source(self):
+        with mock.patch.object(StubBackend, 'source_height', 600):
+            process_queue(max_workers=1)
+        self.video.refresh_from_db()
+        self.assertEqual([rendition['name'] for rendition in self.video.renditions], ['360p', '540p'])
+        self.assertEqual(renditions_for(200), RENDITIONS[:1])
+
+    def test_master_playlist_respects_max_height(self):
+        process_queue(max_workers=1)
+        url = reverse('videos:hls', args=[self.video.slug, 'master.m3u8'])
+        body = self.client.get(url, {'max_height': 540}).content.decode()
+        self.assertIn('360p/index.m3u8', body)
+        self.assertNotIn('720p/index.m3u8', body)
+        segment = self.client.get(reverse('videos:hls', args=[self.video.slug, '360p/seg_00000.ts']))
+        self.assertEqual(segment.status_code, 200)
+        self.assertEqual(segment['Content-Type'], 'video/mp2t')
+
+
+class CounterBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.first = Video.objects.create(title='A', slug='a', description='')
+        cls.second = Video.objects.create(title='B', slug='b', description='')
+
+    def test_flush_coalesces_updates(self):
+        buffer = CounterBuffer(flush_threshold=10_000)
+        for _ in range(50):
+            buffer.incr(self.first.pk)
+            buffer.incr(self.second.pk)
+        buffer.incr(self.first.pk, 'likes_count', 2)
+        # Nada é gravado antes do flush
+        self.assertEqual(Video.objects.get(pk=self.first.pk).views_count, 0)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(buffer.flush(), 2)
+        # Um UPDATE por grupo de deltas (os demais são dos receivers de counters_flushed)
+        updates = [query for query in queries if query['sql'].startswith(f'UPDATE "{Video._meta.db_table}"')]
+        self.assertEqual(len(updates), 2)
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.views_count, self.first.likes_count), (50, 2))
+        self.assertEqual(self.second.views_count, 50)
+        self.assertEqual(buffer.pending(), {})
+
+    def test_threshold_triggers_flush(self):
+        buffer = CounterBuffer(flush_threshold=3)
+        for _ in range(3):
+            buffer.incr(self.first.pk)
+        self.assertEqual(Video.objects.get(pk=self.first.pk).views_count, 3)
+
+    def test_threshold_wakes_background_flusher(self):
+        buffer = CounterBuffer(flush_interval=60, flush_threshold=3)
+        flushed = threading.Event()
+        threads = []
+
+        def flush():
+            threads.append(threading.current_thread().name)
+            flushed.set()
+
+        with mock.patch.object(buffer, 'flush', side_effect=flush):
+            for _ in range(3):
+                buffer.incr(self.first.pk)
+            self.assertTrue(flushed.wait(5))
+            buffer.shutdown()
+        # A gravação aconteceu na thread de fundo, não na da requisição
+        self.assertEqual(threads[0], 'video-counter-flush')
+
+    def test_inline_flush_failure_does_not_raise(self):
+        buffer = CounterBuffer(flush_threshold=1)
+        with mock.patch.object(Video.objects, 'filter', side_effect=DatabaseError('locked')):
+            with self.assertLogs('videos.counters', 'ERROR'):
+                buffer.incr(self.first.pk)
+        self.assertEqual(buffer.pending(), {self.first.pk: {'views_count': 1}})
+
+    def test_failed_flush_keeps_increments(self):
+        buffer = CounterBuffer(flush_threshold=10_000)
+        buffer.incr(self.first.pk)
+        with mock.patch.object(Video.objects, 'filter', side_effect=DatabaseError('locked')):
+            with self.assertRaises(DatabaseError):
+                buffer.flush()
+        self.assertEqual(buffer.pending(), {self.first.pk: {'views_count': 1}})
+        buffer.flush()
+        self.assertEqual(Video.objects.get(pk=self.first.pk).views_count, 1)
+
+    def test_play_endpoint_buffers_view(self):
+        Video.objects.filter(pk=self.first.pk).update(is_public=True, requires_subscription=False)
+        buffer = CounterBuffer(flush_threshold=10_000)
+        with mock.patch('videos.counters.get_buffer', return_value=buffer):
+            response = self.client.post(reverse('videos:play', args=['a']))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(buffer.pending(), {self.first.pk: {'views_count': 1}})
+
+    def test_like_counts_once_per_user(self):
+        Video.objects.filter(pk=self.first.pk).update(is_public=True, requires_subscription=False)
+        self.client.force_login(CustomUser.objects.create_user('fa', user_type='student'))
+        buffer = CounterBuffer(flush_threshold=10_000)
+        with mock.patch('videos.counters.get_buffer', return_value=buffer):
+            first = self.client.post(reverse('videos:like', args=['a']))
+            repeated = self.client.post(reverse('videos:like', args=['a']))
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(repeated.json(), {'status': 'already_liked'})
+        self.assertEqual(buffer.pending(), {self.first.pk: {'likes_count': 1}})
+        self.assertEqual(VideoLike.objects.filter(video=self.first).count(), 1)
+
+    def test_author_plays_hidden_video_with_one_query(self):
+        author = CustomUser.objects.create_user('autora', user_type='student')
+        Video.objects.filter(pk=self.first.pk).update(is_public=False, instructor=author)
+        self.client.force_login(author)
+        buffer = CounterBuffer(flush_threshold=10_000)
+        with mock.patch('videos.counters.get_buffer', return_value=buffer):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(reverse('videos:play', args=['a']))
+        self.assertEqual(response.status_code, 202)
+        # can_watch lê instructor_id sem recarregar o campo adiado
+        selects = [query for query in queries if f'FROM "{Video._meta.db_table}"' in query['sql']]
+        self.assertEqual(len(selects), 1)
+
+
+class CatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = VideoCategory.objects.create(name='Yoga', slug='yoga')
+        published_at = timezone.now()
+        for index in range(25):
+            Video.objects.create(
+                title=f'Aula {index}', slug=f'aula-{index}', description='', is_public=True,
+                category=cls.category if index % 2 else None,
+                # Pares com o mesmo published_at exercitam o desempate por id
+                published_at=published_at - timedelta(hours=index // 2),
+            )
+        Video.objects.create(title='Privado', slug='privado', description='', published_at=published_at)
+
+    def setUp(self):
+        cache.clear()
+
+    def _collect(self, params):
+        slugs, cursor = [], None
+        while True:
+            query = dict(params, limit=10, **({'cursor': cursor} if cursor else {}))
+            data = self.client.get(reverse('videos:catalog_api'), query).json()
+            slugs += [item['slug'] for item in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                return slugs
+
+    def test_keyset_pagination_walks_every_public_video(self):
+        slugs = self._collect({})
+        expected = list(
+            Video.objects.filter(is_public=True).order_by('-published_at', '-id').values_list('slug', flat=True)
+        )
+        self.assertEqual(slugs, expected)
+
+    def test_category_filter(self):
+        self.assertEqual(len(self._collect({'category': 'yoga'})), 12)
+
+    def test_pages_are_cached_until_a_video_changes(self):
+        self.client.get(reverse('videos:catalog_api'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('videos:catalog_api'))
+        Video.objects.create(
+            title='Nova', slug='nova', description='', is_public=True, published_at=timezone.now() + timedelta(days=1),
+        )
+        data = self.client.get(reverse('videos:catalog_api')).json()
+        self.assertEqual(data['results'][0]['slug'], 'nova')
+
+    def test_category_cache_invalidated_when_video_moves(self):
+        self.assertEqual(len(self._collect({'category': 'yoga'})), 12)
+        Video.objects.get(slug='aula-1').delete()
+        self.assertEqual(len(self._collect({'category': 'yoga'})), 11)
+        video = Video.objects.get(slug='aula-0')
+        video.category = self.category
+        video.save()
+        self.assertEqual(len(self._collect({'category': 'yoga'})), 12)
+
+    def test_non_positive_limit_is_clamped(self):
+        for limit in (-1, 0):
+            response = self.client.get(reverse('videos:catalog_api'), {'limit': limit})
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.client.get(reverse('videos:catalog_api'), {'limit': -1}).json()['results']), 1)
+
+    def test_evicted_version_does_not_revive_stale_pages(self):
+        version = catalog.get_version()
+        cache.delete(caching._version_key(catalog._namespace(None)))
+        self.assertNotIn(catalog.get_version(), (1, version))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('videos:catalog_api'), {'cursor': 'lixo'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_html_catalog(self):
+        response = self.client.get(reverse('videos:catalog'))
+        self.assertContains(response, 'Aula 0')
+        self.assertContains(response, 'Mais vídeos')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = VideoCategory.objects.create(name='Alongamento', slug='alongamento')
+        instructor = CustomUser.objects.create_user('ana', first_name='Ana', last_name='Souza', user_type='instructor')
+        cls.video = Video.objects.create(
+            title='Respiração e Alongamentos', slug='respiracao', description='Aula para iniciantes',
+            category=category, is_public=True, published_at=timezone.now(),
+        )
+        cls.hidden = Video.objects.create(
+            title='Respiração avançada', slug='respiracao-avancada', description='', published_at=timezone.now(),
+        )
+        cls.live = LiveClass.objects.create(
+            title='Yoga ao vivo', description='Respiração consciente', instructor=instructor,
+            scheduled_date=timezone.now() + timedelta(days=1),
+        )
+
+    def test_accent_insensitive_and_stemmed(self):
+        results = search.search('respiracao alongamento')
+        self.assertEqual([result['object'] for result in results], [self.video])
+
+    def test_ranks_title_matches_first_and_hides_private_videos(self):
+        results = search.search('respiração')
+        self.assertEqual([result['object'] for result in results], [self.video, self.live])
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+
+    def test_index_is_updated_on_save_and_delete(self):
+        self.live.title = 'Pilates ao vivo'
+        self.live.save()
+        self.assertEqual(search.search('pilates', kind='live')[0]['object'], self.live)
+        self.live.delete()
+        self.assertEqual(search.search('pilates'), [])
+
+    def test_api(self):
+        data = self.client.get(reverse('videos:search_api'), {'q': 'Souza'}).json()
+        self.assertEqual([item['kind'] for item in data['results']], ['live'])
+
+    def test_api_limit_is_clamped(self):
+        data = self.client.get(reverse('videos:search_api'), {'q': 'respiração', 'limit': -3}).json()
+        self.assertEqual(len(data['results']), 1)
+
+    def test_unsupported_vendor_falls_back_to_contains(self):
+        with mock.patch.object(search.connection, 'vendor', 'mssql'):
+            self.assertIsInstance(search.get_backend(), search.ContainsBackend)
+            self.live.title = 'Pilates ao vivo'
+            self.live.save()
+            results = search.search('respiração')
+        self.assertEqual([result['object'] for result in results], [self.video, self.live])
+
+
+class RegistrationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = CustomUser.objects.create_user('prof', user_type='instructor')
+        cls.students = [CustomUser.objects.create_user(f'aluna{index}') for index in range(4)]
+        cls.live = LiveClass.objects.create(
+            title='Live', description='', instructor=cls.instructor,
+            scheduled_date=timezone.now() + timedelta(days=1), max_participants=2,
+        )
+
+    def test_capacity_and_waitlist(self):
+        first, second, third, fourth = self.students
+        self.assertEqual(registrations.register(self.live.pk, first), registrations.REGISTERED)
+        self.assertEqual(registrations.register(self.live.pk, first), registrations.ALREADY_REGISTERED)
+        self.assertEqual(registrations.register(self.live.pk, second), registrations.REGISTERED)
+        self.assertEqual(registrations.register(self.live.pk, third), registrations.WAITLISTED)
+        self.assertEqual(registrations.register(self.live.pk, fourth), registrations.WAITLISTED)
+        self.assertEqual(registrations.waitlist_position(self.live.pk, fourth), 2)
+        self.live.refresh_from_db()
+        self.assertTrue(self.live.is_full)
+
+        self.assertEqual(registrations.cancel(self.live.pk, first), [third.pk])
+        self.live.refresh_from_db()
+        self.assertEqual(self.live.registered_count, 2)
+        self.assertEqual(
+            set(self.live.registered_participants.values_list('pk', flat=True)), {second.pk, third.pk},
+        )
+        self.assertEqual(registrations.waitlist_position(self.live.pk, fourth), 1)
+
+    def test_raising_capacity_promotes_waitlist(self):
+        for student in self.students:
+            registrations.register(self.live.pk, student)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.live.max_participants = 3
+            self.live.save()
+        self.live.refresh_from_db()
+        self.assertEqual(self.live.registered_count, 3)
+        self.assertEqual(self.live.waitlist.count(), 1)
+
+    def test_stale_save_keeps_counter(self):
+        stale = LiveClass.objects.get(pk=self.live.pk)
+        registrations.register(self.live.pk, self.students[0])
+        stale.title = 'Live renomeada'
+        stale.save()
+        self.live.refresh_from_db()
+        self.assertEqual(self.live.registered_count, 1)
+
+    def test_admin_m2m_changes_keep_counter_in_sync(self):
+        self.live.registered_participants.add(*self.students[:2])
+        self.live.refresh_from_db()
+        self.assertEqual(self.live.registered_count, 2)
+        self.live.registered_participants.clear()
+        self.live.refresh_from_db()
+        self.assertEqual(self.live.registered_count, 0)
+
+    def test_reverse_clear_recounts_only_the_user_lives(self):
+        other = LiveClass.objects.create(
+            title='Outra', description='', instructor=self.instructor,
+            scheduled_date=timezone.now() + timedelta(days=2), max_participants=5,
+        )
+        untouched = LiveClass.objects.create(
+            title='Sem a aluna', description='', instructor=self.instructor,
+            scheduled_date=timezone.now() + timedelta(days=3), max_participants=5,
+        )
+        student = self.students[0]
+        self.live.registered_participants.add(student, self.students[1])
+        other.registered_participants.add(student)
+        untouched.registered_participants.add(self.students[1])
+        with CaptureQueriesContext(connection) as queries:
+            student.registered_lives.clear()
+        # Só as duas aulas em que a aluna estava inscrita são recontadas
+        recounted = [query for query in queries if query['sql'].startswith(f'UPDATE "{LiveClass._meta.db_table}"')]
+        self.assertEqual(len(recounted), 2)
+        self.assertEqual(
+            dict(LiveClass.objects.values_list('pk', 'registered_count')),
+            {self.live.pk: 1, other.pk: 0, untouched.pk: 1},
+        )
+
+    def test_closed_live_rejects_registration(self):
+        LiveClass.objects.filter(pk=self.live.pk).update(status='finished')
+        with self.assertRaises(registrations.RegistrationClosed):
+            registrations.register(self.live.pk, self.students[0])
+
+    def test_register_endpoint(self):
+        self.client.force_login(self.students[0])
+        data = self.client.post(reverse('videos:live_register', args=[self.live.pk])).json()
+        self.assertEqual(data, {'status': 'registered', 'registered_count': 1, 'spots_left': 1, 'waitlist_position': None})
+
+
+class RegistrationStressTests(TransactionTestCase):
+    """Inscrições simultâneas nunca ultrapassam max_participants"""
+
+    registrations_count = 500
+    capacity = 40
+    workers = 50
+
+    def test_no_overbooking_under_concurrency(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('SQLite em memória não suporta transações concorrentes entre threads')
+        instructor = CustomUser.objects.create_user('prof-stress', user_type='instructor')
+        users = CustomUser.objects.bulk_create(
+            CustomUser(username=f'stress{index}') for index in range(self.registrations_count)
+        )
+        live = LiveClass.objects.create(
+            title='Live lotada', description='', instructor=instructor,
+            scheduled_date=timezone.now() + timedelta(days=1), max_participants=self.capacity,
+        )
+        start = threading.Event()
+
+        def attempt(user):
+            try:
+                start.wait(timeout=10)
+                while True:
+                    try:
+                        return registrations.register(live.pk, user)
+                    except OperationalError:
+                        # Timeout de lock no SQLite; tenta de novo
+                        time.sleep(0.01)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(attempt, user) for user in users]
+            start.set()
+            results = [future.result() for future in futures]
+
+        live.refresh_from_db()
+        self.assertEqual(results.count(registrations.REGISTERED), self.capacity)
+        self.assertEqual(results.count(registrations.WAITLISTED), self.registrations_count - self.capacity)
+        self.assertEqual(live.registered_count, self.capacity)
+        self.assertEqual(live.registered_participants.count(), self.capacity)
+        self.assertEqual(live.waitlist.count(), self.registrations_count - self.capacity)
+
+
+class FakeWebSocket:
+    """Cliente mínimo para exercitar uma aplicação ASGI WebSocket"""
+
+    def __init__(self, app, path, cookies=''):
+        self.incoming = asyncio.Queue()
+        self.outgoing = asyncio.Queue()
+        scope = {'type': 'websocket', 'path': path, 'headers': [(b'cookie', cookies.encode())]}
+        self.task = asyncio.create_task(app(scope, self.incoming.get, self.outgoing.put))
+
+    async def connect(self):
+        await self.incoming.put({'type': 'websocket.connect'})
+        return await self.receive()
+
+    async def receive(self):
+        return await asyncio.wait_for(self.outgoing.get(), timeout=2)
+
+    async def send_json(self, data):
+        await self.incoming.put({'type': 'websocket.receive', 'text': json.dumps(data)})
+
+    async def disconnect(self):
+        await self.incoming.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, timeout=2)
+
+
+class ChatTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = CustomUser.objects.create_user('prof-chat', first_name='Bia', user_type='instructor')
+        cls.student = CustomUser.objects.create_user('aluna-chat', first_name='Carla')
+        cls.outsider = CustomUser.objects.create_user('visitante')
+        cls.live = LiveClass.objects.create(
+            title='Live', description='', instructor=cls.instructor, scheduled_date=timezone.now(),
+        )
+        cls.live.registered_participants.add(cls.student)
+
+    def setUp(self):
+        self.hub = ChatHub(InMemoryBroker(), MessageWriter(batch_size=100, interval=60), queue_size=3)
+        self.app = ChatApplication(self.hub)
+        self.path = f'/ws/lives/{self.live.pk}/chat/'
+        self.student_cookie = self.session_cookie(self.student)
+        self.outsider_cookie = self.session_cookie(self.outsider)
+
+    def session_cookie(self, user):
+        client = Client()
+        client.force_login(user)
+        return f'sessionid={client.cookies["sessionid"].value}'
+
+    async def test_message_is_broadcast_and_persisted_in_batch(self):
+        first = FakeWebSocket(self.app, self.path, self.student_cookie)
+        second = FakeWebSocket(self.app, self.path, self.student_cookie)
+        self.assertEqual((await first.connect())['type'], 'websocket.accept')
+        self.assertEqual((await second.connect())['type'], 'websocket.accept')
+
+        await first.send_json({'message': '  Bom dia!  '})
+        for socket in (first, second):
+            event = await socket.receive()
+            self.assertEqual(json.loads(event['text'])['body'], 'Bom dia!')
+            self.assertEqual(json.loads(event['text'])['author'], 'Carla')
+
+        # Nada vai ao banco antes do flush do lote
+        self.assertEqual(await ChatMessage.objects.acount(), 0)
+        await first.disconnect()
+        await second.disconnect()
+        self.assertEqual(self.hub.rooms, {})
+        await self.hub.close()
+        self.assertEqual(await ChatMessage.objects.filter(body='Bom dia!').acount(), 1)
+
+    async def test_failed_writes_keep_a_bounded_backlog(self):
+        writer = MessageWriter(batch_size=100, interval=60, max_pending=3)
+        for index in range(5):
+            writer._pending.append(ChatMessage(live_class_id=self.live.pk, author_name='x', body=str(index), created_at=timezone.now()))
+        with mock.patch.object(ChatMessage.objects, 'bulk_create', side_effect=OperationalError('banco fora')):
+            with self.assertLogs('videos.chat.hub', 'ERROR'):
+                self.assertEqual(await writer.flush(), 0)
+        # Só as mais recentes continuam na fila
+        self.assertEqual([message.body for message in writer._pending], ['2', '3', '4'])
+        self.assertEqual(await writer.flush(), 3)
+        self.assertEqual(await ChatMessage.objects.acount(), 3)
+
+    async def test_unregistered_user_is_rejected(self):
+        socket = FakeWebSocket(self.app, self.path, self.outsider_cookie)
+        self.assertEqual(await socket.connect(), {'type': 'websocket.close', 'code': 4403})
+        anonymous = FakeWebSocket(self.app, self.path)
+        self.assertEqual(await anonymous.connect(), {'type': 'websocket.close', 'code': 4403})
+
+    async def test_slow_consumer_is_dropped(self):
+        received = []
+        blocked = asyncio.Event()
+
+        async def fast_send(event):
+            received.append(event)
+
+        async def slow_send(event):
+            if event['type'] == 'websocket.send':
+                await blocked.wait()
+            received.append(event)
+
+        fast = self.hub.connection(fast_send)
+        slow = self.hub.connection(slow_send)
+        for chat_connection in (fast, slow):
+            await self.hub.join(self.live.pk, chat_connection)
+            chat_connection.start()
+        for index in range(6):
+            await self.hub.publish(self.live.pk, {'body': index})
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(slow.close_code, SLOW_CONSUMER_CLOSE_CODE)
+        self.assertIsNone(fast.close_code)
+        self.assertIn({'type': 'websocket.close', 'code': SLOW_CONSUMER_CLOSE_CODE}, received)
+        self.assertEqual(len([event for event in received if event['type'] == 'websocket.send']), 6)
+        await self.hub.leave(self.live.pk, fast)
+        await self.hub.leave(self.live.pk, slow)
@@ -0,0 +1,355 @@
+"""
+Pipeline de transcodificação HLS dos vídeos enviados.
+
+O upload marca o vídeo como ``pending`` (ver ``videos/signals.py``) e o
+comando ``transcode_videos`` processa a fila fora dos workers web. Cada
+rendition roda em um processo de um ``ProcessPoolExecutor`` limitado por
+``VIDEO_TRANSCODE_MAX_WORKERS`` e com prioridade reduzida (``nice``).
+
+Os jobs são idempotentes e retomáveis: o diretório de saída é derivado do
+arquivo de origem (nome, tamanho e mtime) e cada rendition concluída grava um
+marcador ``.done``; uma nova execução pula o que já foi feito. Cada tentativa
+escreve num diretório ``.partial`` próprio, então dois workers nunca apagam o
+trabalho um do outro. Só são geradas as renditions que não ultrapassam a
+altura da origem (``ffprobe``).
+
+O claim é renovado (``transcode_updated_at``) a cada rendition concluída, e o
+resultado só é gravado enquanto o job ainda pertence ao worker (mesmo
+``transcode_updated_at`` da última renovação e ainda em ``processing``). Uma
+rendition que falha devolve o vídeo à fila (``pending``) para nova tentativa
+após ``VIDEO_TRANSCODE_RETRY_DELAY`` segundos; só depois de
+``VIDEO_TRANSCODE_MAX_ATTEMPTS`` tentativas ele fica ``failed``. Para tentar
+de novo um vídeo ``failed``: ``transcode_videos --retry-failed``.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Video
+
+logger = logging.getLogger(__name__)
+
+# (nome, altura, bitrate de vídeo, bitrate de áudio)
+RENDITIONS = (
+    ('360p', 360, 800_000, 96_000),
+    ('540p', 540, 1_400_000, 128_000),
+    ('720p', 720, 2_800_000, 128_000),
+    ('1080p', 1080, 5_000_000, 192_000),
+)
+
+DONE_MARKER = '.done'
+PLAYLIST_NAME = 'index.m3u8'
+MASTER_PLAYLIST_NAME = 'master.m3u8'
+
+
+class TranscodeError(Exception):
+    """Falha ao gerar uma rendition"""
+
+
+class FFmpegBackend:
+    """Gera segmentos HLS com o ffmpeg instalado localmente"""
+
+    def __init__(self, binary=None, segment_seconds=None):
+        self.binary = binary or getattr(settings, 'FFMPEG_BINARY', 'ffmpeg')
+        self.segment_seconds = segment_seconds or getattr(settings, 'VIDEO_HLS_SEGMENT_SECONDS', 6)
+
+    def transcode(self, source, output_dir, name, height, video_bitrate, audio_bitrate):
+        command = [
+            self.binary, '-hide_banner', '-loglevel', 'error', '-y',
+            '-i', source,
+            '-vf', f'scale=-2:{height}',
+            '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main',
+            '-b:v', str(video_bitrate), '-maxrate', str(int(video_bitrate * 1.07)),
+            '-bufsize', str(video_bitrate * 2),
+            '-c:a', 'aac', '-b:a', str(audio_bitrate), '-ac', '2',
+            '-f', 'hls',
+            '-hls_time', str(self.segment_seconds),
+            '-hls_playlist_type', 'vod',
+            '-hls_segment_filename', os.path.join(output_dir, 'seg_%05d.ts'),
+            os.path.join(output_dir, PLAYLIST_NAME),
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise TranscodeError(result.stderr.strip() or f'ffmpeg saiu com código {result.returncode}')
+
+    def probe_height(self, source):
+        """Altura do primeiro stream de vídeo (``None`` se o ffprobe não souber)"""
+        command = [
+            getattr(settings, 'FFPROBE_BINARY', 'ffprobe'), '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries', 'stream=height', '-of', 'csv=p=0', source,
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True)
+            return int(result.stdout.strip().splitlines()[0]) if result.returncode == 0 else None
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def extract_frame(self, source, destination, at_seconds=3):
+        command = [
+            self.binary, '-hide_banner', '-loglevel', 'error', '-y',
+            '-ss', str(at_seconds), '-i', source,
+            '-frames:v', '1', '-q:v', '2', destination,
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0 or not os.path.exists(destination):
+            raise TranscodeError(result.stderr.strip() or 'Não foi possível extrair o quadro')
+
+
+class StubBackend:
+    """
+    Backend em Python puro para testes e desenvolvimento sem ffmpeg.
+
+    Divide o arquivo de origem em segmentos de bytes e escreve uma playlist
+    HLS válida apontando para eles.
+    """
+
+    segment_count = 3
+    # Altura simulada da origem (None: desconhecida, gera todas as renditions)
+    source_height = None
+
+    def probe_height(self, source):
+        return self.source_height
+
+    def transcode(self, source, output_dir, name, height, video_bitrate, audio_bitrate):
+        size = os.path.getsize(source)
+        step = max(size // self.segment_count, 1)
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:6',
+                 '#EXT-X-MEDIA-SEQUENCE:0', '#EXT-X-PLAYLIST-TYPE:VOD']
+        with open(source, 'rb') as fh:
+            for index in range(self.segment_count):
+                segment = f'seg_{index:05d}.ts'
+                with open(os.path.join(output_dir, segment), 'wb') as out:
+                    out.write(fh.read(step if index < self.segment_count - 1 else -1))
+                lines += ['#EXTINF:6.0,', segment]
+        lines.append('#EXT-X-ENDLIST')
+        with open(os.path.join(output_dir, PLAYLIST_NAME), 'w') as playlist:
+            playlist.write('\n'.join(lines) + '\n')
+
+    def extract_frame(self, source, destination, at_seconds=3):
+        from PIL import Image
+
+        Image.new('RGB', (1280, 720), (26, 26, 26)).save(destination)
+
+
+def get_backend():
+    return import_string(settings.VIDEO_TRANSCODE_BACKEND)()
+
+
+def source_fingerprint(path):
+    """Identifica a versão do arquivo de origem sem lê-lo por completo"""
+    stat_result = os.stat(path)
+    raw = f'{os.path.basename(path)}:{stat_result.st_size}:{stat_result.st_mtime_ns}'
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def _lower_priority():
+    niceness = getattr(settings, 'VIDEO_TRANSCODE_NICENESS', 10)
+    if niceness and hasattr(os, 'nice'):
+        os.nice(niceness)
+
+
+def _remove_abandoned_partials(output_dir, older_than):
+    """Apaga diretórios ``.partial`` de tentativas que morreram no meio"""
+    parent, prefix = os.path.split(output_dir)
+    for entry in os.scandir(parent):
+        if entry.name.startswith(f'{prefix}.partial-') and entry.stat().st_mtime < older_than:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def _run_rendition(backend_path, source, output_dir, name, height, video_bitrate, audio_bitrate, abandoned_before=0):
+    """Executado em um processo do pool; pula renditions já concluídas"""
+    if os.path.exists(os.path.join(output_dir, DONE_MARKER)):
+        return name
+
+    _remove_abandoned_partials(output_dir, abandoned_before)
+    # Diretório exclusivo desta tentativa: outro worker com o mesmo job não o toca
+    partial_dir = f'{output_dir}.partial-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+    os.makedirs(partial_dir)
+    try:
+        backend = import_string(backend_path)()
+        backend.transcode(source, partial_dir, name, height, video_bitrate, audio_bitrate)
+        open(os.path.join(partial_dir, DONE_MARKER), 'w').close()
+        if not os.path.exists(os.path.join(output_dir, DONE_MARKER)):
+            shutil.rmtree(output_dir, ignore_errors=True)
+            os.replace(partial_dir, output_dir)
+    finally:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+    return name
+
+
+def build_master_playlist(renditions):
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for rendition in sorted(renditions, key=lambda item: item['bandwidth']):
+        width = int(round(rendition['height'] * 16 / 9 / 2)) * 2
+        lines.append(
+            f"#EXT-X-STREAM-INF:BANDWIDTH={rendition['bandwidth']},"
+            f"RESOLUTION={width}x{rendition['height']},NAME=\"{rendition['name']}\""
+        )
+        lines.append(rendition['playlist'])
+    return '\n'.join(lines) + '\n'
+
+
+def renditions_for(source_height):
+    """Renditions até a altura da origem (ao menos a menor); todas se a altura é desconhecida"""
+    if not source_height:
+        return RENDITIONS
+    return tuple(rendition for rendition in RENDITIONS if rendition[1] <= source_height) or RENDITIONS[:1]
+
+
+def claim_video(video_id=None):
+    """
+    Marca atomicamente um vídeo da fila como ``processing``.
+
+    Vídeos presos em ``processing`` sem renovar o claim há mais de
+    ``VIDEO_TRANSCODE_STALE_AFTER`` segundos (worker morto) voltam a ser
+    elegíveis; os que já falharam esperam ``VIDEO_TRANSCODE_RETRY_DELAY``.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=getattr(settings, 'VIDEO_TRANSCODE_STALE_AFTER', 3600))
+    retry_before = now - timedelta(seconds=getattr(settings, 'VIDEO_TRANSCODE_RETRY_DELAY', 300))
+    eligible = (
+        Q(transcode_status='pending') & (Q(transcode_attempts=0) | Q(transcode_updated_at__lt=retry_before))
+        | Q(transcode_status='processing', transcode_updated_at__lt=stale_before)
+    )
+    queryset = Video.objects.filter(eligible).exclude(video_file='')
+    if video_id is not None:
+        queryset = queryset.filter(pk=video_id)
+
+    for candidate_id in queryset.order_by('pk').values_list('pk', flat=True)[:10]:
+        claimed = Video.objects.filter(eligible, pk=candidate_id).update(
+            transcode_status='processing', transcode_updated_at=now, transcode_attempts=F('transcode_attempts') + 1,
+        )
+        if claimed:
+            return Video.objects.get(pk=candidate_id)
+    return None
+
+
+def _claimed(video):
+    return Video.objects.filter(
+        pk=video.pk, transcode_status='processing', transcode_updated_at=video.transcode_updated_at,
+    )
+
+
+def _heartbeat(video):
+    """Renova o claim para que um job longo não seja tomado como abandonado"""
+    now = timezone.now()
+    if not _claimed(video).update(transcode_updated_at=now):
+        return False
+    video.transcode_updated_at = now
+    return True
+
+
+def _finish(video, **values):
+    """
+    Grava o resultado só se o vídeo ainda está no claim deste worker: um novo
+    upload (volta a ``pending``) ou outro worker que reassumiu o job vencido
+    (novo ``transcode_updated_at``) invalidam o resultado. ``update()`` em vez
+    de ``save()`` para não disparar os signals de upload.
+    """
+    return _claimed(video).update(transcode_updated_at=timezone.now(), **values)
+
+
+def transcode_video(video, executor):
+    """
+    Gera (ou completa) as renditions de ``video`` e registra o resultado.
+
+    Retorna ``True``/``False`` (sucesso/falha, mesmo que o vídeo volte à fila)
+    ou ``None`` quando o resultado foi descartado por ter perdido o claim.
+    """
+    try:
+        source = video.video_file.path
+        relative_dir = os.path.join('hls', str(video.pk), source_fingerprint(source))
+        absolute_dir = os.path.join(settings.MEDIA_ROOT, relative_dir)
+        os.makedirs(absolute_dir, exist_ok=True)
+    except OSError as exc:
+        logger.error('Arquivo de origem do vídeo %s indisponível: %s', video.pk, exc)
+        updated = _finish(video, transcode_status='failed', transcode_error=f'Arquivo de origem indisponível: {exc}')
+        return False if updated else None
+
+    backend_path = settings.VIDEO_TRANSCODE_BACKEND
+    abandoned_before = time.time() - getattr(settings, 'VIDEO_TRANSCODE_STALE_AFTER', 3600)
+    futures = {
+        executor.submit(
+            _run_rendition, backend_path, source, os.path.join(absolute_dir, name),
+            name, height, video_bitrate, audio_bitrate, abandoned_before,
+        ): (name, height, video_bitrate + audio_bitrate)
+        for name, height, video_bitrate, audio_bitrate in renditions_for(get_backend().probe_height(source))
+    }
+
+    renditions, errors = [], []
+    for future in as_completed(futures):
+        name, height, bandwidth = futures[future]
+        try:
+            future.result()
+        except Exception as exc:
+            logger.exception('Falha na rendition %s do vídeo %s', name, video.pk)
+            errors.append(f'{name}: {exc}')
+        else:
+            renditions.append({
+                'name': name,
+                'height': height,
+                'bandwidth': bandwidth,
+                'playlist': f'{name}/{PLAYLIST_NAME}',
+            })
+        if not _heartbeat(video):
+            for pending in futures:
+                pending.cancel()
+            logger.info('Transcodificação do vídeo %s interrompida: claim perdido', video.pk)
+            return None
+
+    renditions.sort(key=lambda item: item['bandwidth'])
+    if renditions:
+        with open(os.path.join(absolute_dir, MASTER_PLAYLIST_NAME), 'w') as master:
+            master.write(build_master_playlist(renditions))
+
+    if errors and video.transcode_attempts < getattr(settings, 'VIDEO_TRANSCODE_MAX_ATTEMPTS', 3):
+        # Falha possivelmente transitória: volta à fila; as renditions prontas são reaproveitadas
+        status = 'pending'
+    else:
+        status = 'failed' if errors else 'ready'
+    updated = _finish(
+        video,
+        transcode_status=status,
+        transcode_attempts=0 if status == 'ready' else video.transcode_attempts,
+        transcode_error='\n'.join(errors),
+        hls_path=relative_dir if renditions else '',
+        renditions=renditions,
+    )
+    if not updated:
+        logger.info('Resultado da transcodificação do vídeo %s descartado: claim perdido', video.pk)
+        return None
+    return not errors
+
+
+def make_executor(max_workers=None):
+    max_workers = max_workers or getattr(settings, 'VIDEO_TRANSCODE_MAX_WORKERS', 2)
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_lower_priority)
+
+
+def process_queue(max_workers=None, video_id=None, limit=None):
+    """Processa a fila de transcodificação; retorna (sucessos, falhas)"""
+    succeeded = failed = 0
+    with make_executor(max_workers) as executor:
+        while limit is None or succeeded + failed < limit:
+            video = claim_video(video_id)
+            if video is None:
+                break
+            result = transcode_video(video, executor)
+            if result:
+                succeeded += 1
+            elif result is not None:
+                failed += 1
+            if video_id is not None:
+                break
+    return succeeded, failed
@@ -1,7 +1,17 @@
 from django.urls import path
 
+from . import views
+
 app_name = 'videos'
 
 urlpatterns = [
-    # Adicionar URLs depois
-]
\ No newline at end of file
+    path('', views.video_catalog, name='catalog'),
+    path('api/catalog/', views.video_catalog_api, name='catalog_api'),
+    path('api/search/', views.search_api, name='search_api'),
+    path('lives/<int:pk>/register/', views.live_register, name='live_register'),
+    path('lives/<int:pk>/cancel/', views.live_cancel, name='live_cancel'),
+    path('<slug:slug>/stream/', views.video_stream, name='stream'),
+    path('<slug:slug>/hls/<path:path>', views.video_hls, name='hls'),
+    path('<slug:slug>/play/', views.video_play, name='play'),
+    path('<slug:slug>/like/', views.video_like, name='like'),
+]
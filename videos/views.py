@@ -1,3 +1,215 @@
-from django.shortcuts import render
+import os
 
-# Create your views here.
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils._os import safe_join
+from django.views.decorators.http import require_http_methods, require_POST
+
+from . import catalog, counters, registrations, search
+from .models import LiveClass, SearchDocument, Video, VideoCategory, VideoLike
+from .streaming import serve_file_range
+from .transcoding import MASTER_PLAYLIST_NAME, build_master_playlist
+
+HLS_CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.ts': 'video/mp2t',
+}
+
+
+def _int_param(request, name):
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def can_watch(user, video):
+    """Regras de acesso ao conteúdo de um vídeo"""
+    if video.is_public and not video.requires_subscription:
+        return True
+    if not user.is_authenticated:
+        return False
+    if user.is_staff or user.user_type in ('instructor', 'admin') or video.instructor_id == user.pk:
+        return True
+    # Rascunhos e vídeos ocultos: só a equipe e as instrutoras
+    if not video.is_public:
+        return False
+    if not video.requires_subscription:
+        return True
+    student = getattr(user, 'student_profile', None)
+    subscription = getattr(student, 'subscription', None) if student else None
+    return bool(subscription and subscription.is_active)
+
+
+def _catalog_page(request):
+    category = None
+    if request.GET.get('category'):
+        category = get_object_or_404(VideoCategory, slug=request.GET['category'])
+    try:
+        videos, next_cursor = catalog.get_page(
+            category_id=category.pk if category else None,
+            cursor=request.GET.get('cursor') or None,
+            limit=_int_param(request, 'limit'),
+        )
+    except catalog.InvalidCursor:
+        raise Http404('Página não encontrada')
+    return category, videos, next_cursor
+
+
+def video_catalog(request):
+    """Catálogo de vídeos públicos, paginado por cursor"""
+    category, videos, next_cursor = _catalog_page(request)
+    return render(request, 'videos/catalog.html', {
+        'category': category,
+        'categories': catalog.categories(),
+        'videos': videos,
+        'next_cursor': next_cursor,
+    })
+
+
+def video_catalog_api(request):
+    """Versão JSON do catálogo: ``?category=<slug>&cursor=<cursor>&limit=<n>``"""
+    category, videos, next_cursor = _catalog_page(request)
+    return JsonResponse({
+        'category': category.slug if category else None,
+        'results': [catalog.serialize_video(video) for video in videos],
+        'next_cursor': next_cursor,
+    })
+
+
+def search_api(request):
+    """Busca ranqueada em vídeos e lives: ``?q=<texto>&kind=video|live``"""
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('kind') or None
+    if kind not in (None, SearchDocument.KIND_VIDEO, SearchDocument.KIND_LIVE):
+        kind = None
+    limit = max(1, min(_int_param(request, 'limit') or 20, 50))
+    results = []
+    for result in search.search(query, kind=kind, limit=limit) if query else []:
+        instance = result['object']
+        item = {
+            'kind': result['kind'],
+            'id': instance.pk,
+            'title': instance.title,
+            'category': instance.category.name if instance.category else None,
+            'rank': result['rank'],
+        }
+        if result['kind'] == SearchDocument.KIND_VIDEO:
+            item['slug'] = instance.slug
+            item['playback_url'] = instance.get_playback_url()
+        else:
+            item['scheduled_date'] = instance.scheduled_date.isoformat()
+            item['status'] = instance.status
+        results.append(item)
+    return JsonResponse({'query': query, 'results': results})
+
+
+@require_http_methods(['GET', 'HEAD'])
+def video_stream(request, slug):
+    """Entrega o arquivo original do vídeo com suporte a Range (seek)"""
+    video = get_object_or_404(Video, slug=slug)
+    if not video.video_file or not can_watch(request.user, video):
+        raise Http404('Vídeo não encontrado')
+    return serve_file_range(request, video.video_file.path, accel_name=video.video_file.name)
+
+
+@require_http_methods(['GET', 'HEAD'])
+def video_hls(request, slug, path):
+    """
+    Playlists e segmentos HLS do vídeo.
+
+    A master playlist é montada a partir das renditions registradas e aceita
+    ``?max_height=`` / ``?max_bandwidth=`` para o player limitar a qualidade.
+    """
+    video = get_object_or_404(Video, slug=slug, transcode_status='ready')
+    if not video.renditions or not can_watch(request.user, video):
+        raise Http404('Vídeo não encontrado')
+
+    if path == MASTER_PLAYLIST_NAME:
+        max_height = _int_param(request, 'max_height')
+        max_bandwidth = _int_param(request, 'max_bandwidth')
+        renditions = [
+            rendition for rendition in video.renditions
+            if (max_height is None or rendition['height'] <= max_height)
+            and (max_bandwidth is None or rendition['bandwidth'] <= max_bandwidth)
+        ]
+        if not renditions:
+            # Sempre entrega ao menos a menor rendition disponível
+            renditions = [min(video.renditions, key=lambda item: item['bandwidth'])]
+        response = HttpResponse(build_master_playlist(renditions), content_type=HLS_CONTENT_TYPES['.m3u8'])
+        response['Cache-Control'] = 'private, max-age=60'
+        return response
+
+    extension = os.path.splitext(path)[1]
+    if extension not in HLS_CONTENT_TYPES:
+        raise Http404('Arquivo não encontrado')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, video.hls_path, path)
+    except ValueError:
+        raise Http404('Arquivo não encontrado')
+    if not os.path.isfile(full_path):
+        raise Http404('Arquivo não encontrado')
+    return serve_file_range(
+        request, full_path,
+        content_type=HLS_CONTENT_TYPES[extension],
+        accel_name=os.path.join(video.hls_path, path),
+    )
+
+
+@require_POST
+def video_play(request, slug):
+    """Registra uma reprodução (gravada em lote por videos.counters)"""
+    video = get_object_or_404(Video.objects.only('pk', 'is_public', 'requires_subscription', 'instructor_id'), slug=slug)
+    if not can_watch(request.user, video):
+        raise Http404('Vídeo não encontrado')
+    counters.record_view(video.pk)
+    return JsonResponse({'status': 'ok'}, status=202)
+
+
+@login_required
+@require_POST
+def video_like(request, slug):
+    """Registra uma curtida por usuária (o total é gravado em lote por videos.counters)"""
+    video = get_object_or_404(Video.objects.only('pk', 'is_public', 'requires_subscription', 'instructor_id'), slug=slug)
+    if not can_watch(request.user, video):
+        raise Http404('Vídeo não encontrado')
+    try:
+        with transaction.atomic():
+            VideoLike.objects.create(video=video, user=request.user)
+    except IntegrityError:
+        return JsonResponse({'status': 'already_liked'})
+    counters.record_like(video.pk)
+    return JsonResponse({'status': 'ok'}, status=202)
+
+
+def _registration_payload(live_class_id, user, status):
+    live_class = LiveClass.objects.only('registered_count', 'max_participants').get(pk=live_class_id)
+    return {
+        'status': status,
+        'registered_count': live_class.registered_count,
+        'spots_left': live_class.spots_left,
+        'waitlist_position': registrations.waitlist_position(live_class_id, user),
+    }
+
+
+@login_required
+@require_POST
+def live_register(request, pk):
+    """Inscreve a usuária na live (ou na lista de espera)"""
+    try:
+        status = registrations.register(pk, request.user)
+    except registrations.RegistrationClosed as exc:
+        return JsonResponse({'status': 'closed', 'detail': str(exc)}, status=409)
+    return JsonResponse(_registration_payload(pk, request.user, status))
+
+
+@login_required
+@require_POST
+def live_cancel(request, pk):
+    """Cancela a inscrição e promove a próxima da lista de espera"""
+    get_object_or_404(LiveClass.objects.only('pk'), pk=pk)
+    registrations.cancel(pk, request.user)
+    return JsonResponse(_registration_payload(pk, request.user, 'cancelled'))